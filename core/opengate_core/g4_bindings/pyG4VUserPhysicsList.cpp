@@ -57,6 +57,9 @@ void init_G4VUserPhysicsList(py::module &m) {
       .def("SetCutValue", py::overload_cast<G4double, const G4String &>(
                               &G4VUserPhysicsList::SetCutValue))
 
+      .def("StorePhysicsTable", &G4VUserPhysicsList::StorePhysicsTable)
+      .def("SetPhysicsTableRetrieved",
+           &G4VUserPhysicsList::SetPhysicsTableRetrieved)
       .def("IsPhysicsTableRetrieved",
            &G4VUserPhysicsList::IsPhysicsTableRetrieved)
       .def("IsStoredInAscii", &G4VUserPhysicsList::IsStoredInAscii)
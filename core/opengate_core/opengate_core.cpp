@@ -321,6 +321,8 @@ void init_G4SPSPosDistribution(py::module &);
 
 void init_GateSPSPosDistribution(py::module &);
 
+void init_GateSPSVoxelsCDF(py::module &);
+
 void init_GateSPSVoxelsPosDistribution(py::module &);
 
 void init_G4SPSAngDistribution(py::module &);
@@ -799,6 +801,7 @@ PYBIND11_MODULE(opengate_core, m) {
   init_GatePhaseSpaceSource(m);
   init_GateGANPairSource(m);
   init_GateSPSPosDistribution(m);
+  init_GateSPSVoxelsCDF(m);
   init_GateSPSVoxelsPosDistribution(m);
   init_GateRunAction(m);
   init_GateEventAction(m);
@@ -0,0 +1,103 @@
+/* --------------------------------------------------
+   Copyright (C): OpenGATE Collaboration
+   This software is distributed under the terms
+   of the GNU Lesser General  Public Licence (LGPL)
+   See LICENSE.md for further details
+   -------------------------------------------------- */
+
+#ifndef GateBatchColumn_h
+#define GateBatchColumn_h
+
+#include "GateHelpers.h"
+#include <cstdint>
+#include <pybind11/numpy.h>
+#include <pybind11/pybind11.h>
+
+namespace py = pybind11;
+
+/*
+ * One column (e.g. the energies) of a batch of particles generated on the
+ * Python side (phsp or GAN sources). The column is a view on the Python buffer
+ * (numpy array, or anything convertible with np.asarray, like a CPU torch
+ * tensor): there is no copy when the buffer is float32, float64, int32 or
+ * int64, whatever its stride (e.g. a column of a 2D array). Other types are
+ * converted (copied) once to T. A reference to the buffer is kept, so the
+ * data stays alive until the next batch: the Python side does not need to
+ * keep it.
+ *
+ * Set/Clear must be called with the GIL (i.e. from Python).
+ */
+template <typename T> class GateBatchColumn {
+public:
+  void Set(const py::handle &values) {
+    auto a = py::array::ensure(values);
+    if (!a || a.ndim() != 1) {
+      Fatal("GateBatchColumn: a batch column must be a 1D array");
+    }
+    if (py::isinstance<py::array_t<float>>(a)) {
+      fType = Float32;
+    } else if (py::isinstance<py::array_t<double>>(a)) {
+      fType = Float64;
+    } else if (py::isinstance<py::array_t<std::int32_t>>(a)) {
+      fType = Int32;
+    } else if (py::isinstance<py::array_t<std::int64_t>>(a)) {
+      fType = Int64;
+    } else {
+      // other types are converted to T
+      a = py::array_t<T, py::array::forcecast>::ensure(a);
+      fType = Native;
+    }
+    fData = static_cast<const char *>(a.data());
+    fStride = a.strides(0);
+    fSize = a.shape(0);
+    fArray = a;
+  }
+
+  void Clear() {
+    fArray = py::array();
+    fData = nullptr;
+    fSize = 0;
+  }
+
+  py::array Get() const { return fArray; }
+
+  size_t size() const { return fSize; }
+
+  bool empty() const { return fSize == 0; }
+
+  T operator[](const size_t i) const {
+    const char *p = fData + i * fStride;
+    switch (fType) {
+    case Float32:
+      return static_cast<T>(*reinterpret_cast<const float *>(p));
+    case Float64:
+      return static_cast<T>(*reinterpret_cast<const double *>(p));
+    case Int32:
+      return static_cast<T>(*reinterpret_cast<const std::int32_t *>(p));
+    case Int64:
+      return static_cast<T>(*reinterpret_cast<const std::int64_t *>(p));
+    default:
+      return *reinterpret_cast<const T *>(p);
+    }
+  }
+
+protected:
+  enum ColumnType { Float32, Float64, Int32, Int64, Native };
+
+  py::array fArray;
+  const char *fData = nullptr;
+  py::ssize_t fStride = 0;
+  size_t fSize = 0;
+  ColumnType fType = Native;
+};
+
+// Expose a batch column of a source as a Python property: assigning an array
+// sets the column (without copy), reading it returns the array
+template <typename C, typename S, typename T>
+void DefBatchColumnProperty(C &c, const char *name, GateBatchColumn<T> S::*m) {
+  c.def_property(
+      name, [m](const S &s) { return (s.*m).Get(); },
+      [m](S &s, const py::object &values) { (s.*m).Set(values); });
+}
+
+#endif // GateBatchColumn_h
@@ -126,7 +126,31 @@ void GateDoseActor::PrepareLocalDataForRun(threadLocalT &data,
             data.lastid_worker_flatimg.end(), 0);
 }
 
+void GateDoseActor::PrepareLocalBuffersForRun(threadLocalT &data,
+                                              const unsigned int numberOfVoxels,
+                                              const bool squared) {
+  data.value_worker_flatimg.assign(numberOfVoxels, 0.0);
+  if (squared) {
+    data.squared_sum_worker_flatimg.assign(numberOfVoxels, 0.0);
+  }
+}
+
+void GateDoseActor::PrepareSparseBuffersForRun(threadLocalT &data) const {
+  data.sparse_worker_img.SetSize(size_edep[0], size_edep[1], size_edep[2]);
+}
+
 void GateDoseActor::BeginOfRunAction(const G4Run *run) {
+  if (fSparseScoringFlag) {
+    // no dense buffer at all, bricks are allocated when first touched
+    PrepareSparseBuffersForRun(fThreadLocalDataEdep.Get());
+    if (fDoseFlag || fDoseSquaredFlag) {
+      PrepareSparseBuffersForRun(fThreadLocalDataDose.Get());
+    }
+    if (fCountsFlag) {
+      PrepareSparseBuffersForRun(fThreadLocalDataCounts.Get());
+    }
+    return;
+  }
   const auto N_voxels = size_edep[0] * size_edep[1] * size_edep[2];
   if (fEdepSquaredFlag) {
     PrepareLocalDataForRun(fThreadLocalDataEdep.Get(), N_voxels);
@@ -134,6 +158,17 @@ void GateDoseActor::BeginOfRunAction(const G4Run *run) {
   if (fDoseSquaredFlag) {
     PrepareLocalDataForRun(fThreadLocalDataDose.Get(), N_voxels);
   }
+  if (fThreadLocalScoringFlag) {
+    PrepareLocalBuffersForRun(fThreadLocalDataEdep.Get(), N_voxels,
+                              fEdepSquaredFlag);
+    if (fDoseFlag || fDoseSquaredFlag) {
+      PrepareLocalBuffersForRun(fThreadLocalDataDose.Get(), N_voxels,
+                                fDoseSquaredFlag);
+    }
+    if (fCountsFlag) {
+      PrepareLocalBuffersForRun(fThreadLocalDataCounts.Get(), N_voxels, false);
+    }
+  }
 }
 
 void GateDoseActor::BeginOfEventAction(const G4Event *event) {
@@ -196,7 +231,7 @@ void GateDoseActor::SteppingAction(G4Step *step) {
     // get edep in MeV (take weight into account)
     const auto w = step->GetTrack()->GetWeight();
     auto edep = step->GetTotalEnergyDeposit() / CLHEP::MeV * w;
-    double dose;
+    double dose = 0;
 
     if (fScoreInOtherMaterial) {
       auto spr = CalculateSPR(step);
@@ -216,8 +251,11 @@ void GateDoseActor::SteppingAction(G4Step *step) {
       dose = edep / density;
     }
 
-    // all ImageAddValue calls in a mutex-scope
-    {
+    if (fThreadLocalScoringFlag) {
+      // no lock: the buffers are reduced into the images at the end of run
+      AddValuesToThreadLocalBuffers(index, edep, dose, fCountsFlag);
+    } else {
+      // all ImageAddValue calls in a mutex-scope
       G4AutoLock mutex(&SetPixelMutex);
       ImageAddValue<Image3DType>(cpp_edep_image, index, edep);
       if (fDoseFlag) {
@@ -229,6 +267,7 @@ void GateDoseActor::SteppingAction(G4Step *step) {
     } // mutex scope
 
     // ScoreSquaredValue() is thread-safe because it contains a mutex
+    // (or only touches thread local data with thread local scoring)
     if (fEdepSquaredFlag || fDoseSquaredFlag) {
       if (fEdepSquaredFlag) {
         ScoreSquaredValue(fThreadLocalDataEdep.Get(), cpp_edep_squared_image,
@@ -252,6 +291,9 @@ void GateDoseActor::EndOfEventAction(const G4Event *event) {
   if (fNbOfEvent >= fNbEventsNextCheck) {
     // flush thread local data into the global image
     // reset local data to zero is done in FlushSquaredValue
+    if (fThreadLocalScoringFlag) {
+      FlushThreadLocalBuffers();
+    }
     if (fEdepSquaredFlag) {
       FlushSquaredValues(fThreadLocalDataEdep.Get(), cpp_edep_squared_image);
     }
@@ -345,6 +387,25 @@ void GateDoseActor::ind2sub(int index_flat, Image3DType::IndexType &index3D) {
 }
 
 void GateDoseActor::EndOfRunAction(const G4Run *run) {
+  // Densify the sparse thread local buffers into the shared images
+  if (fSparseScoringFlag) {
+    FlushSparseValues(fThreadLocalDataEdep.Get(), cpp_edep_image,
+                      fEdepSquaredFlag ? cpp_edep_squared_image : nullptr);
+    if (fDoseFlag || fDoseSquaredFlag) {
+      FlushSparseValues(fThreadLocalDataDose.Get(),
+                        fDoseFlag ? cpp_dose_image : nullptr,
+                        fDoseSquaredFlag ? cpp_dose_squared_image : nullptr);
+    }
+    if (fCountsFlag) {
+      FlushSparseValues(fThreadLocalDataCounts.Get(), cpp_counts_image,
+                        nullptr);
+    }
+    return;
+  }
+  // Reduce the thread local buffers (if any) into the shared images
+  if (fThreadLocalScoringFlag) {
+    FlushThreadLocalBuffers();
+  }
   // FlushSquaredValue() is thread-safe because it contains a mutex
   if (fEdepSquaredFlag) {
     GateDoseActor::FlushSquaredValues(fThreadLocalDataEdep.Get(),
@@ -360,6 +421,17 @@ void GateDoseActor::ScoreSquaredValue(threadLocalT &data,
                                       const Image3DType::Pointer &cpp_image,
                                       const double value, const int event_id,
                                       const Image3DType::IndexType &index) {
+  if (fSparseScoringFlag) {
+    auto &v = data.sparse_worker_img.At(index[0], index[1], index[2]);
+    if (event_id == v.last_id) {
+      v.event_value += value;
+    } else {
+      v.squared_sum += v.event_value * v.event_value;
+      v.event_value = value;
+      v.last_id = event_id;
+    }
+    return;
+  }
   const int index_flat = sub2ind(index);
   const auto previous_id = data.lastid_worker_flatimg[index_flat];
   data.lastid_worker_flatimg[index_flat] = event_id;
@@ -371,7 +443,9 @@ void GateDoseActor::ScoreSquaredValue(threadLocalT &data,
     // Different event: square deposited quantity from the last event ID
     // and start accumulating deposited quantity for this new event ID
     auto v = data.squared_worker_flatimg[index_flat];
-    {
+    if (fThreadLocalScoringFlag) {
+      data.squared_sum_worker_flatimg[index_flat] += v * v;
+    } else {
       G4AutoLock mutex(&SetPixelMutex);
       ImageAddValue<Image3DType>(cpp_image, index, v * v); // implicit flush
     }
@@ -387,13 +461,112 @@ void GateDoseActor::FlushSquaredValues(threadLocalT &data,
       cpp_image, cpp_image->GetLargestPossibleRegion());
   for (iterator3D.GoToBegin(); !iterator3D.IsAtEnd(); ++iterator3D) {
     Image3DType::IndexType index_f = iterator3D.GetIndex();
+    const auto index_flat = sub2ind(index_f);
     Image3DType::PixelType pixelValue3D =
-        data.squared_worker_flatimg[sub2ind(index_f)];
-    ImageAddValue<Image3DType>(cpp_image, index_f, pixelValue3D * pixelValue3D);
+        data.squared_worker_flatimg[index_flat];
+    pixelValue3D *= pixelValue3D;
+    if (fThreadLocalScoringFlag) {
+      pixelValue3D += data.squared_sum_worker_flatimg[index_flat];
+    }
+    ImageAddValue<Image3DType>(cpp_image, index_f, pixelValue3D);
   }
   // reset thread local data to zero
   const auto N_voxels = size_edep[0] * size_edep[1] * size_edep[2];
   PrepareLocalDataForRun(data, N_voxels);
+  if (fThreadLocalScoringFlag) {
+    std::fill(data.squared_sum_worker_flatimg.begin(),
+              data.squared_sum_worker_flatimg.end(), 0.0);
+  }
+}
+
+void GateDoseActor::AddValuesToThreadLocalBuffers(
+    const Image3DType::IndexType &index, const double edep, const double dose,
+    const bool count) {
+  if (fSparseScoringFlag) {
+    fThreadLocalDataEdep.Get()
+        .sparse_worker_img.At(index[0], index[1], index[2])
+        .value += edep;
+    if (fDoseFlag) {
+      fThreadLocalDataDose.Get()
+          .sparse_worker_img.At(index[0], index[1], index[2])
+          .value += dose;
+    }
+    if (count) {
+      fThreadLocalDataCounts.Get()
+          .sparse_worker_img.At(index[0], index[1], index[2])
+          .value += 1;
+    }
+    return;
+  }
+  const auto index_flat = sub2ind(index);
+  fThreadLocalDataEdep.Get().value_worker_flatimg[index_flat] += edep;
+  if (fDoseFlag) {
+    fThreadLocalDataDose.Get().value_worker_flatimg[index_flat] += dose;
+  }
+  if (count) {
+    fThreadLocalDataCounts.Get().value_worker_flatimg[index_flat] += 1;
+  }
+}
+
+void GateDoseActor::FlushValues(threadLocalT &data,
+                                const Image3DType::Pointer &cpp_image) {
+  // The flat index (sub2ind) follows the ITK buffer layout (x fastest), so the
+  // thread local buffer is added to the image buffer in one linear pass
+  {
+    G4AutoLock mutex(&SetPixelMutex);
+    auto *buffer = cpp_image->GetBufferPointer();
+    const auto n = data.value_worker_flatimg.size();
+    for (size_t i = 0; i < n; i++) {
+      buffer[i] += data.value_worker_flatimg[i];
+    }
+  }
+  std::fill(data.value_worker_flatimg.begin(), data.value_worker_flatimg.end(),
+            0.0);
+}
+
+// With sparse scoring, the images are not allocated at the beginning of the
+// run: the first thread that flushes its buffers allocates them.
+static void
+AllocateImageIfNeeded(const GateDoseActor::Image3DType::Pointer &image) {
+  if (image->GetPixelContainer()->Size() == 0) {
+    image->Allocate();
+    image->FillBuffer(0.0);
+  }
+}
+
+void GateDoseActor::FlushSparseValues(
+    threadLocalT &data, const Image3DType::Pointer &cpp_image,
+    const Image3DType::Pointer &cpp_squared_image) {
+  G4AutoLock mutex(&SetPixelMutex);
+  double *buffer = nullptr;
+  double *squared_buffer = nullptr;
+  if (cpp_image) {
+    AllocateImageIfNeeded(cpp_image);
+    buffer = cpp_image->GetBufferPointer();
+  }
+  if (cpp_squared_image) {
+    AllocateImageIfNeeded(cpp_squared_image);
+    squared_buffer = cpp_squared_image->GetBufferPointer();
+  }
+  data.sparse_worker_img.ForEach([&](const size_t i, const sparseVoxelT &v) {
+    if (buffer) {
+      buffer[i] += v.value;
+    }
+    if (squared_buffer) {
+      squared_buffer[i] += v.squared_sum + v.event_value * v.event_value;
+    }
+  });
+  data.sparse_worker_img.Clear();
+}
+
+void GateDoseActor::FlushThreadLocalBuffers() {
+  FlushValues(fThreadLocalDataEdep.Get(), cpp_edep_image);
+  if (fDoseFlag) {
+    FlushValues(fThreadLocalDataDose.Get(), cpp_dose_image);
+  }
+  if (fCountsFlag) {
+    FlushValues(fThreadLocalDataCounts.Get(), cpp_counts_image);
+  }
 }
 
 int GateDoseActor::EndOfRunActionMasterThread(int run_id) { return 0; }
@@ -9,6 +9,7 @@
 #define GateDoseActor_h
 
 #include "GateSPRCache.h"
+#include "GateSparseVoxelImage.h"
 #include "GateVActor.h"
 #include <G4Cache.hh>
 #include <G4EmCalculator.hh>
@@ -77,6 +78,14 @@ public:
 
   bool GetCountsFlag() const { return fCountsFlag; }
 
+  void SetThreadLocalScoringFlag(const bool b) { fThreadLocalScoringFlag = b; }
+
+  bool GetThreadLocalScoringFlag() const { return fThreadLocalScoringFlag; }
+
+  void SetSparseScoringFlag(const bool b) { fSparseScoringFlag = b; }
+
+  bool GetSparseScoringFlag() const { return fSparseScoringFlag; }
+
   void SetUncertaintyGoal(const double b) { fUncertaintyGoal = b; }
 
   void SetTopVoxelsCount(const std::size_t b) { fTopVoxelsCount = b; }
@@ -110,10 +119,25 @@ public:
   Image3DType::Pointer cpp_counts_image;
   Image3DType::SizeType size_edep{};
 
+  // Voxel of the sparse thread local buffers: sum of the values, value of the
+  // current event and sum of the squared per-event values
+  struct sparseVoxelT {
+    double value;
+    double event_value;
+    double squared_sum;
+    int last_id;
+  };
+
   struct threadLocalT {
     std::unique_ptr<G4EmCalculator> emcalc;
     std::vector<double> squared_worker_flatimg;
     std::vector<int> lastid_worker_flatimg;
+    // only used with thread local scoring: per-thread sums of the scored
+    // value and of the squared per-event values, reduced at the end of run
+    std::vector<double> value_worker_flatimg;
+    std::vector<double> squared_sum_worker_flatimg;
+    // only used with sparse scoring
+    GateSparseVoxelImage<sparseVoxelT> sparse_worker_img;
   };
 
   void ScoreSquaredValue(threadLocalT &data,
@@ -126,6 +150,23 @@ public:
   static void PrepareLocalDataForRun(threadLocalT &data,
                                      unsigned int numberOfVoxels);
 
+  static void PrepareLocalBuffersForRun(threadLocalT &data,
+                                        unsigned int numberOfVoxels,
+                                        bool squared);
+
+  void AddValuesToThreadLocalBuffers(const Image3DType::IndexType &index,
+                                     double edep, double dose, bool count);
+
+  void FlushValues(threadLocalT &data, const Image3DType::Pointer &cpp_image);
+
+  void FlushThreadLocalBuffers();
+
+  void PrepareSparseBuffersForRun(threadLocalT &data) const;
+
+  void FlushSparseValues(threadLocalT &data,
+                         const Image3DType::Pointer &cpp_image,
+                         const Image3DType::Pointer &cpp_squared_image);
+
   void GetVoxelPosition(G4Step *step, G4ThreeVector &position, bool &isInside,
                         Image3DType::IndexType &index) const;
 
@@ -145,6 +186,14 @@ public:
   // Option: Are counts to be scored
   bool fCountsFlag{};
 
+  // Option: score in thread local buffers, reduced into the images at the
+  // end of the run (no mutex per step, but one image copy per thread)
+  bool fThreadLocalScoringFlag{};
+
+  // Option: score in sparse (hash of bricks) thread local buffers, the images
+  // are only allocated at the end of the run. Implies thread local scoring.
+  bool fSparseScoringFlag{};
+
   double fVoxelVolume{};
 
   // Option: set target statistical uncertainty for each run
@@ -169,6 +218,7 @@ protected:
   bool fScoreInOtherMaterial;
   G4Cache<threadLocalT> fThreadLocalDataEdep;
   G4Cache<threadLocalT> fThreadLocalDataDose;
+  G4Cache<threadLocalT> fThreadLocalDataCounts;
   GateSPRCache fSPRCache;
   double CalculateSPR(G4Step *step);
 };
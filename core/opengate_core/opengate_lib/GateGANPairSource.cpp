@@ -58,6 +58,29 @@ void GateGANPairSource::SetGeneratorInfo(py::dict &user_info) {
   }
 }
 
+GateBatchColumn<double> *
+GateGANPairSource::GetBatchColumn(const std::string &key) {
+  if (key == "position_x2")
+    return &fPositionX2;
+  if (key == "position_y2")
+    return &fPositionY2;
+  if (key == "position_z2")
+    return &fPositionZ2;
+  if (key == "direction_x2")
+    return &fDirectionX2;
+  if (key == "direction_y2")
+    return &fDirectionY2;
+  if (key == "direction_z2")
+    return &fDirectionZ2;
+  if (key == "energy2")
+    return &fEnergy2;
+  if (key == "weight2")
+    return &fWeight2;
+  if (key == "time2")
+    return &fTime2;
+  return GateGANSource::GetBatchColumn(key);
+}
+
 void GateGANPairSource::GeneratePrimaries(G4Event *event,
                                           double current_simulation_time) {
   if (fCurrentIndex >= fCurrentBatchSize)
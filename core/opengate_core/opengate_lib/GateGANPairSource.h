@@ -29,18 +29,20 @@ public:
 
   void GeneratePrimariesPair(G4Event *event, double current_simulation_time);
 
+  GateBatchColumn<double> *GetBatchColumn(const std::string &key) override;
+
   // For pairs of particles
-  std::vector<double> fPositionX2;
-  std::vector<double> fPositionY2;
-  std::vector<double> fPositionZ2;
+  GateBatchColumn<double> fPositionX2;
+  GateBatchColumn<double> fPositionY2;
+  GateBatchColumn<double> fPositionZ2;
 
-  std::vector<double> fDirectionX2;
-  std::vector<double> fDirectionY2;
-  std::vector<double> fDirectionZ2;
+  GateBatchColumn<double> fDirectionX2;
+  GateBatchColumn<double> fDirectionY2;
+  GateBatchColumn<double> fDirectionZ2;
 
-  std::vector<double> fEnergy2;
-  std::vector<double> fWeight2;
-  std::vector<double> fTime2;
+  GateBatchColumn<double> fEnergy2;
+  GateBatchColumn<double> fWeight2;
+  GateBatchColumn<double> fTime2;
 };
 
 #endif // GateGANPairSource_h
@@ -144,6 +144,38 @@ void GateGANSource::GenerateBatchOfParticles() {
   }
 }
 
+void GateGANSource::SetBatch(const py::dict &batch) {
+  for (const auto &item : batch) {
+    const auto key = py::str(item.first).cast<std::string>();
+    auto *column = GetBatchColumn(key);
+    if (column == nullptr)
+      Fatal("GateGANSource: unknown batch key '" + key + "'");
+    column->Set(item.second);
+  }
+}
+
+GateBatchColumn<double> *GateGANSource::GetBatchColumn(const std::string &key) {
+  if (key == "position_x")
+    return &fPositionX;
+  if (key == "position_y")
+    return &fPositionY;
+  if (key == "position_z")
+    return &fPositionZ;
+  if (key == "direction_x")
+    return &fDirectionX;
+  if (key == "direction_y")
+    return &fDirectionY;
+  if (key == "direction_z")
+    return &fDirectionZ;
+  if (key == "energy")
+    return &fEnergy;
+  if (key == "weight")
+    return &fWeight;
+  if (key == "time")
+    return &fTime;
+  return nullptr;
+}
+
 void GateGANSource::GeneratePrimaries(G4Event *event,
                                       double current_simulation_time) {
 
@@ -8,6 +8,7 @@
 #ifndef GateGANSource_h
 #define GateGANSource_h
 
+#include "GateBatchColumn.h"
 #include "GateGenericSource.h"
 #include "GateSingleParticleSource.h"
 #include <pybind11/stl.h>
@@ -53,6 +54,13 @@ public:
 
   void GenerateBatchOfParticles();
 
+  // Set all the columns of the next batch at once, from a dict of 1D arrays
+  // (keys: position_x, direction_x, energy, time, weight, etc.), without copy
+  void SetBatch(const py::dict &batch);
+
+  // Return the column of the batch with this key (nullptr if unknown)
+  virtual GateBatchColumn<double> *GetBatchColumn(const std::string &key);
+
   bool fPosition_is_set_by_GAN;
   bool fDirection_is_set_by_GAN;
   bool fEnergy_is_set_by_GAN;
@@ -61,13 +69,13 @@ public:
 
   size_t fCurrentBatchSize;
 
-  std::vector<double> fPositionX;
-  std::vector<double> fPositionY;
-  std::vector<double> fPositionZ;
+  GateBatchColumn<double> fPositionX;
+  GateBatchColumn<double> fPositionY;
+  GateBatchColumn<double> fPositionZ;
 
-  std::vector<double> fDirectionX;
-  std::vector<double> fDirectionY;
-  std::vector<double> fDirectionZ;
+  GateBatchColumn<double> fDirectionX;
+  GateBatchColumn<double> fDirectionY;
+  GateBatchColumn<double> fDirectionZ;
 
   /// used to skip event with too low or too high energy
   double fEnergyMinThreshold;
@@ -76,9 +84,9 @@ public:
   SEPolicyType fSkipEnergyPolicy;
 
   bool fRelativeTiming;
-  std::vector<double> fEnergy;
-  std::vector<double> fWeight;
-  std::vector<double> fTime;
+  GateBatchColumn<double> fEnergy;
+  GateBatchColumn<double> fWeight;
+  GateBatchColumn<double> fTime;
 
   ParticleGeneratorType fGenerator;
   size_t fCurrentIndex;
@@ -105,6 +105,10 @@ void GateGenericSource::UpdateActivity(const double time) {
   GateVSource::UpdateActivity(time);
 }
 
+bool GateGenericSource::HasTimeDependentActivity() const {
+  return !fTAC_Times.empty() || GateVSource::HasTimeDependentActivity();
+}
+
 void GateGenericSource::UpdateActivityWithTAC(const double time) {
   // Below/above the TAC ?
   if (time < fTAC_Times.front() || time > fTAC_Times.back()) {
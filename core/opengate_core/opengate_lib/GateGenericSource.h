@@ -133,6 +133,8 @@ protected:
 
   void UpdateActivity(double time) override;
 
+  bool HasTimeDependentActivity() const override;
+
   void UpdateEffectiveEventTime(double current_simulation_time,
                                 unsigned long skipped_particle);
 };
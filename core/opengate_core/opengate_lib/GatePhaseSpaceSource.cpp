@@ -227,49 +227,66 @@ void GatePhaseSpaceSource::AddOnePrimaryVertex(G4Event *event,
   }
 }
 
-void GatePhaseSpaceSource::SetPDGCodeBatch(
-    const py::array_t<std::int32_t> &fPDGCode) {
-  this->fPDGCode = PyBindGetVector<std::int32_t>(fPDGCode);
+void GatePhaseSpaceSource::SetBatch(const py::dict &batch) {
+  for (const auto &item : batch) {
+    const auto key = py::str(item.first).cast<std::string>();
+    if (key == "position_x")
+      fPositionX.Set(item.second);
+    else if (key == "position_y")
+      fPositionY.Set(item.second);
+    else if (key == "position_z")
+      fPositionZ.Set(item.second);
+    else if (key == "direction_x")
+      fDirectionX.Set(item.second);
+    else if (key == "direction_y")
+      fDirectionY.Set(item.second);
+    else if (key == "direction_z")
+      fDirectionZ.Set(item.second);
+    else if (key == "energy")
+      fEnergy.Set(item.second);
+    else if (key == "weight")
+      fWeight.Set(item.second);
+    else if (key == "pdg_code")
+      fPDGCode.Set(item.second);
+    else
+      Fatal("GatePhaseSpaceSource: unknown batch key '" + key + "'");
+  }
+}
+
+void GatePhaseSpaceSource::SetPDGCodeBatch(const py::object &fPDGCode) {
+  this->fPDGCode.Set(fPDGCode);
 }
 
-void GatePhaseSpaceSource::SetEnergyBatch(
-    const py::array_t<std::float_t> &fEnergy) {
-  this->fEnergy = PyBindGetVector(fEnergy);
+void GatePhaseSpaceSource::SetEnergyBatch(const py::object &fEnergy) {
+  this->fEnergy.Set(fEnergy);
 }
 
-void GatePhaseSpaceSource::SetWeightBatch(
-    const py::array_t<std::float_t> &fWeight) {
-  this->fWeight = PyBindGetVector(fWeight);
+void GatePhaseSpaceSource::SetWeightBatch(const py::object &fWeight) {
+  this->fWeight.Set(fWeight);
 }
 
-void GatePhaseSpaceSource::SetPositionXBatch(
-    const py::array_t<std::float_t> &fPositionX) {
-  this->fPositionX = PyBindGetVector(fPositionX);
+void GatePhaseSpaceSource::SetPositionXBatch(const py::object &fPositionX) {
+  this->fPositionX.Set(fPositionX);
 }
 
-void GatePhaseSpaceSource::SetPositionYBatch(
-    const py::array_t<std::float_t> &fPositionY) {
-  this->fPositionY = PyBindGetVector(fPositionY);
+void GatePhaseSpaceSource::SetPositionYBatch(const py::object &fPositionY) {
+  this->fPositionY.Set(fPositionY);
 }
 
-void GatePhaseSpaceSource::SetPositionZBatch(
-    const py::array_t<std::float_t> &fPositionZ) {
-  this->fPositionZ = PyBindGetVector(fPositionZ);
+void GatePhaseSpaceSource::SetPositionZBatch(const py::object &fPositionZ) {
+  this->fPositionZ.Set(fPositionZ);
 }
 
-void GatePhaseSpaceSource::SetDirectionXBatch(
-    const py::array_t<std::float_t> &fDirectionX) {
-  this->fDirectionX = PyBindGetVector(fDirectionX);
+void GatePhaseSpaceSource::SetDirectionXBatch(const py::object &fDirectionX) {
+  this->fDirectionX.Set(fDirectionX);
 }
 
-void GatePhaseSpaceSource::SetDirectionYBatch(
-    const py::array_t<std::float_t> &fDirectionY) {
-  this->fDirectionY = PyBindGetVector(fDirectionY);
+void GatePhaseSpaceSource::SetDirectionYBatch(const py::object &fDirectionY) {
+  this->fDirectionY.Set(fDirectionY);
 }
 
-void GatePhaseSpaceSource::SetDirectionZBatch(
-    const py::array_t<std::float_t> &fDirectionZ) {
-  this->fDirectionZ = PyBindGetVector(fDirectionZ);
+void GatePhaseSpaceSource::SetDirectionZBatch(const py::object &fDirectionZ) {
+  this->fDirectionZ.Set(fDirectionZ);
 }
 
 bool GatePhaseSpaceSource::ParticleIsPrimary() const {
@@ -8,6 +8,7 @@
 #ifndef GatePhaseSpaceSource_h
 #define GatePhaseSpaceSource_h
 
+#include "GateBatchColumn.h"
 #include "GateVSource.h"
 #include <G4ParticleMomentum.hh>
 #include <G4ParticleTable.hh>
@@ -57,23 +58,28 @@ public:
   bool fVerbose;
   G4bool fIsotropicMomentum;
 
-  void SetPDGCodeBatch(const py::array_t<std::int32_t> &fPDGCode);
+  // Set all the columns of the next batch at once, from a dict of 1D arrays
+  // with the keys position_x/y/z, direction_x/y/z, energy, weight and
+  // (optionally) pdg_code. The arrays are used without copy.
+  void SetBatch(const py::dict &batch);
 
-  void SetEnergyBatch(const py::array_t<std::float_t> &fEnergy);
+  void SetPDGCodeBatch(const py::object &fPDGCode);
 
-  void SetWeightBatch(const py::array_t<std::float_t> &fWeight);
+  void SetEnergyBatch(const py::object &fEnergy);
 
-  void SetPositionXBatch(const py::array_t<std::float_t> &fPositionX);
+  void SetWeightBatch(const py::object &fWeight);
 
-  void SetPositionYBatch(const py::array_t<std::float_t> &fPositionY);
+  void SetPositionXBatch(const py::object &fPositionX);
 
-  void SetPositionZBatch(const py::array_t<std::float_t> &fPositionZ);
+  void SetPositionYBatch(const py::object &fPositionY);
 
-  void SetDirectionXBatch(const py::array_t<std::float_t> &fDirectionX);
+  void SetPositionZBatch(const py::object &fPositionZ);
 
-  void SetDirectionYBatch(const py::array_t<std::float_t> &fDirectionY);
+  void SetDirectionXBatch(const py::object &fDirectionX);
 
-  void SetDirectionZBatch(const py::array_t<std::float_t> &fDirectionZ);
+  void SetDirectionYBatch(const py::object &fDirectionY);
+
+  void SetDirectionZBatch(const py::object &fDirectionZ);
 
 protected:
   G4ParticleDefinition *fParticleDefinition = nullptr;
@@ -86,18 +92,18 @@ protected:
   size_t fCurrentIndex = 0;
   size_t fCurrentBatchSize = 0;
 
-  std::int32_t *fPDGCode = nullptr;
+  GateBatchColumn<std::int32_t> fPDGCode;
 
-  std::float_t *fPositionX = nullptr;
-  std::float_t *fPositionY = nullptr;
-  std::float_t *fPositionZ = nullptr;
+  GateBatchColumn<std::float_t> fPositionX;
+  GateBatchColumn<std::float_t> fPositionY;
+  GateBatchColumn<std::float_t> fPositionZ;
 
-  std::float_t *fDirectionX = nullptr;
-  std::float_t *fDirectionY = nullptr;
-  std::float_t *fDirectionZ = nullptr;
+  GateBatchColumn<std::float_t> fDirectionX;
+  GateBatchColumn<std::float_t> fDirectionY;
+  GateBatchColumn<std::float_t> fDirectionZ;
 
-  std::float_t *fEnergy = nullptr;
-  std::float_t *fWeight = nullptr;
+  GateBatchColumn<std::float_t> fEnergy;
+  GateBatchColumn<std::float_t> fWeight;
 };
 
 #endif // GatePhaseSpaceSource_h
@@ -0,0 +1,36 @@
+/* --------------------------------------------------
+   Copyright (C): OpenGate Collaboration
+   This software is distributed under the terms
+   of the GNU Lesser General  Public Licence (LGPL)
+   See LICENSE.md for further details
+   -------------------------------------------------- */
+
+#include "GateSPSVoxelsCDF.h"
+#include <algorithm>
+
+void GateSPSVoxelsCDF::Set(const double *cdf_z, const double *cdf_y,
+                           const double *cdf_x, const size_t nz,
+                           const size_t ny, const size_t nx) {
+  fNz = nz;
+  fNy = ny;
+  fNx = nx;
+  fCDFZ.assign(cdf_z, cdf_z + nz);
+  fCDFY.assign(cdf_y, cdf_y + nz * ny);
+  fCDFX.assign(cdf_x, cdf_x + nz * ny * nx);
+}
+
+size_t GateSPSVoxelsCDF::SampleZ(const double p) const {
+  const auto *b = fCDFZ.data();
+  return std::lower_bound(b, b + fNz, p) - b;
+}
+
+size_t GateSPSVoxelsCDF::SampleY(const size_t i, const double p) const {
+  const auto *b = fCDFY.data() + i * fNy;
+  return std::lower_bound(b, b + fNy, p) - b;
+}
+
+size_t GateSPSVoxelsCDF::SampleX(const size_t i, const size_t j,
+                                 const double p) const {
+  const auto *b = fCDFX.data() + (i * fNy + j) * fNx;
+  return std::lower_bound(b, b + fNx, p) - b;
+}
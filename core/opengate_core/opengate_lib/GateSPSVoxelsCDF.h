@@ -0,0 +1,45 @@
+/* --------------------------------------------------
+   Copyright (C): OpenGATE Collaboration
+   This software is distributed under the terms
+   of the GNU Lesser General  Public Licence (LGPL)
+   See LICENSE.md for further details
+   -------------------------------------------------- */
+
+#ifndef GateSPSVoxelsCDF_h
+#define GateSPSVoxelsCDF_h
+
+#include <vector>
+
+/*
+ * The three Cumulative Distribution Functions of a 3D activity image, stored
+ * as flat contiguous buffers (numpy order Z Y X):
+ *  - CDF Z: nz values
+ *  - CDF Y (knowing Z): nz x ny values
+ *  - CDF X (knowing Z and Y): nz x ny x nx values
+ * It is built once (from the Python side) and shared, read-only, by the
+ * GateSPSVoxelsPosDistribution of all threads.
+ */
+class GateSPSVoxelsCDF {
+public:
+  void Set(const double *cdf_z, const double *cdf_y, const double *cdf_x,
+           size_t nz, size_t ny, size_t nx);
+
+  size_t GetSizeZ() const { return fNz; }
+  size_t GetSizeY() const { return fNy; }
+  size_t GetSizeX() const { return fNx; }
+
+  // Sample the indexes with the given uniform random values in [0, 1]
+  size_t SampleZ(double p) const;
+  size_t SampleY(size_t i, double p) const;
+  size_t SampleX(size_t i, size_t j, double p) const;
+
+protected:
+  std::vector<double> fCDFZ;
+  std::vector<double> fCDFY;
+  std::vector<double> fCDFX;
+  size_t fNz = 0;
+  size_t fNy = 0;
+  size_t fNx = 0;
+};
+
+#endif // GateSPSVoxelsCDF_h
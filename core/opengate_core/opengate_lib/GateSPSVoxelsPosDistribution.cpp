@@ -19,44 +19,36 @@ GateSPSVoxelsPosDistribution::GateSPSVoxelsPosDistribution() {
 }
 
 void GateSPSVoxelsPosDistribution::SetCumulativeDistributionFunction(
-    const VD &vz, const VD2 &vy, const VD3 &vx) {
-  // Warning: this is a COPY of all cumulative distribution functions
-  fCDFZ = vz;
-  fCDFY = vy;
-  fCDFX = vx;
+    std::shared_ptr<GateSPSVoxelsCDF> cdf) {
+  fCDF = cdf;
 }
 
 G4ThreeVector GateSPSVoxelsPosDistribution::VGenerateOne() {
   // G4UniformRand: default boundaries ]0.1[ for operator()().
 
   // Get Cumulative Distribution Function for Z
-  auto i = 0;
+  size_t i = 0;
   do {
-    auto p = G4UniformRand();
-    const auto lower = std::lower_bound(fCDFZ.begin(), fCDFZ.end(), p);
-    i = std::distance(fCDFZ.begin(), lower);
-  } while (i >= (int)fCDFX.size());
+    i = fCDF->SampleZ(G4UniformRand());
+  } while (i >= fCDF->GetSizeZ());
 
   // Get Cumulative Distribution Function for Y, knowing Z
-  auto j = 0;
+  size_t j = 0;
   do {
-    auto p = G4UniformRand();
-    const auto lower = std::lower_bound(fCDFY[i].begin(), fCDFY[i].end(), p);
-    j = std::distance(fCDFY[i].begin(), lower);
-  } while (j >= (int)fCDFX[i].size());
+    j = fCDF->SampleY(i, G4UniformRand());
+  } while (j >= fCDF->GetSizeY());
 
   // Get Cumulative Distribution Function for X, knowing X and Y
-  auto k = 0;
+  size_t k = 0;
   do {
-    auto p = G4UniformRand();
-    const auto lower =
-        std::lower_bound(fCDFX[i][j].begin(), fCDFX[i][j].end(), p);
-    k = std::distance(fCDFX[i][j].begin(), lower);
-  } while (k >= (int)fCDFX[i][j].size());
+    k = fCDF->SampleX(i, j, G4UniformRand());
+  } while (k >= fCDF->GetSizeX());
 
   // convert to physical coordinate
   // (warning to the numpy order Z Y X)
-  const itk::Index<3> index = {k, j, i};
+  const itk::Index<3> index = {static_cast<itk::IndexValueType>(k),
+                               static_cast<itk::IndexValueType>(j),
+                               static_cast<itk::IndexValueType>(i)};
   itk::Point<double> point;
   cpp_image->TransformIndexToPhysicalPoint(index, point);
 
@@ -9,7 +9,9 @@
 #define GateSPSVoxelsPosDistribution_h
 
 #include "GateSPSPosDistribution.h"
+#include "GateSPSVoxelsCDF.h"
 #include <itkImage.h>
+#include <memory>
 
 class GateSPSVoxelsPosDistribution : public GateSPSPosDistribution {
 
@@ -26,8 +28,8 @@ public:
   typedef std::vector<VD> VD2;
   typedef std::vector<std::vector<VD>> VD3;
 
-  void SetCumulativeDistributionFunction(const VD &vz, const VD2 &vy,
-                                         const VD3 &vx);
+  // The CDF are shared (read-only, no copy) by the sources of all threads
+  void SetCumulativeDistributionFunction(std::shared_ptr<GateSPSVoxelsCDF> cdf);
 
   // Image type is 3D float by default (the pixel data are not used
   // nor even allocated. Only useful to convert pixel coordinates
@@ -42,9 +44,7 @@ public:
   G4RotationMatrix fGlobalRotation;
 
 protected:
-  VD3 fCDFX;
-  VD2 fCDFY;
-  VD fCDFZ;
+  std::shared_ptr<const GateSPSVoxelsCDF> fCDF;
 };
 
 #endif // GateSPSVoxelsPosDistribution_h
@@ -25,6 +25,7 @@
 #include <G4UIExecutive.hh>
 #include <G4UImanager.hh>
 #include <G4UnitsTable.hh>
+#include <algorithm>
 #include <cmath>
 #include <iostream>
 #include <limits>
@@ -51,6 +52,7 @@ GateSourceManager::GateSourceManager() {
   fUserEventInformationFlag = false;
   fProgressBarFlag = false;
   fProgressReportInterval = 0.0;
+  fUseSourceQueue = false;
   auto &l = fThreadLocalData.Get();
   l.fStartNewRun = true;
   l.fNextRunId = 0;
@@ -58,6 +60,8 @@ GateSourceManager::GateSourceManager() {
   l.fCurrentSimulationTime = 0;
   l.fNextActiveSource = nullptr;
   l.fNextSimulationTime = 0;
+  l.fNextActiveSourceIndex = 0;
+  l.fSourceQueueIsFilled = false;
   l.fProgressBar = nullptr;
   fExpectedNumberOfEvents = 0;
   fProgressBarStep = 1000;
@@ -142,6 +146,8 @@ void GateSourceManager::Initialize(const TimeIntervals &simulation_times,
   } else {
     SetMaxPrimariesPerRun(GetPlatformMaxPrimariesPerRun());
   }
+  fUseSourceQueue = options.contains("source_scheduler") &&
+                    DictGetStr(options, "source_scheduler") == "queue";
   InstallSignalHandler();
   ComputeExpectedNumberOfEvents();
   InitializeProgressBar();
@@ -332,7 +338,8 @@ void GateSourceManager::PrepareRunToStart(int run_id) {
   for (auto *source : fSources) {
     source->PrepareNextRun();
   }
-  // Check next time
+  // Check next time (all sources are asked, also with the queue)
+  l.fSourceQueueIsFilled = false;
   PrepareNextSource();
   if (l.fNextActiveSource == nullptr) {
     return;
@@ -345,6 +352,10 @@ void GateSourceManager::PrepareRunToStart(int run_id) {
 }
 
 void GateSourceManager::PrepareNextSource() const {
+  if (fUseSourceQueue) {
+    PrepareNextSourceFromQueue();
+    return;
+  }
   auto &l = fThreadLocalData.Get();
   l.fNextActiveSource = nullptr;
   G4int nbOfRunFromTimes = static_cast<G4int>(fSimulationTimes.size());
@@ -367,6 +378,71 @@ void GateSourceManager::PrepareNextSource() const {
   // If no next time in the current interval, active source is NULL
 }
 
+void GateSourceManager::PrepareNextSourceFromQueue() const {
+  /*
+    Same result as the scan of all sources in PrepareNextSource, with equal
+    times the first source is selected. The difference is that the sources
+    that did not generate the last event keep their previous next time: it
+    does not change for the sources with a fixed number of primaries, and it
+    is statistically equivalent for the sources with a constant activity
+    (the time between two decays is exponential, hence memoryless), but the
+    random sequence is not the same. The sources with a time dependent
+    activity (half life, TAC) are asked at each event, as with the scan: the
+    time sampled at the previous rate is not valid anymore, and a source
+    without activity (e.g. before its TAC) must be inserted again once its
+    activity starts.
+  */
+  auto &l = fThreadLocalData.Get();
+  if (!l.fSourceQueueIsFilled) {
+    // start of a run: ask all sources
+    l.fSourceQueue.Reset(fSources.size());
+    l.fTimeDependentSourceIndices.clear();
+    for (std::size_t i = 0; i < fSources.size(); i++) {
+      UpdateSourceInQueue(i);
+      if (fSources[i]->HasTimeDependentActivity()) {
+        l.fTimeDependentSourceIndices.push_back(i);
+      }
+    }
+    l.fSourceQueueIsFilled = true;
+  } else if (l.fNextActiveSource != nullptr) {
+    // the source that generated the last event is asked. It may not be the
+    // top of the queue if it was set with SetActiveSourcebyName
+    if (fSources[l.fNextActiveSourceIndex] != l.fNextActiveSource) {
+      l.fNextActiveSourceIndex =
+          std::find(fSources.begin(), fSources.end(), l.fNextActiveSource) -
+          fSources.begin();
+    }
+    UpdateSourceInQueue(l.fNextActiveSourceIndex);
+    // the other sources with a time dependent activity are asked again
+    for (const auto i : l.fTimeDependentSourceIndices) {
+      if (i != l.fNextActiveSourceIndex) {
+        UpdateSourceInQueue(i);
+      }
+    }
+  }
+
+  // If no next time in the current interval, active source is NULL
+  l.fNextActiveSource = nullptr;
+  if (!l.fSourceQueue.Empty()) {
+    l.fNextActiveSourceIndex = l.fSourceQueue.TopIndex();
+    l.fNextActiveSource = fSources[l.fNextActiveSourceIndex];
+    l.fNextSimulationTime = l.fSourceQueue.TopTime();
+  }
+}
+
+void GateSourceManager::UpdateSourceInQueue(std::size_t index) const {
+  auto &l = fThreadLocalData.Get();
+  auto *source = fSources[index];
+  auto t = source->PrepareNextTime(l.fCurrentSimulationTime,
+                                   source->GetRunGeneratedEvents());
+  if ((t >= l.fCurrentTimeInterval.first) &&
+      (t < l.fCurrentTimeInterval.second)) {
+    l.fSourceQueue.Set(index, t);
+  } else {
+    l.fSourceQueue.Remove(index);
+  }
+}
+
 void GateSourceManager::CheckForNextRun() const {
   auto &l = fThreadLocalData.Get();
   l.fStartNewRun = false;
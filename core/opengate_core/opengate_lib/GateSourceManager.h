@@ -9,6 +9,7 @@
 #define GateSourceManager_h
 
 #include "GateImageBox.h"
+#include "GateSourceQueue.h"
 #include "GateUserEventInformation.h"
 #include "GateVActor.h"
 #include "GateVSource.h"
@@ -97,6 +98,15 @@ public:
   // After an event, prepare for the next
   void PrepareNextSource() const;
 
+  // Same with the queue of the next times (fUseSourceQueue): only the source
+  // that generated the last event, and the sources with a time dependent
+  // activity, are asked for their next time
+  void PrepareNextSourceFromQueue() const;
+
+  // Ask the next time to the source, and put it in (or remove it from) the
+  // queue of the current thread
+  void UpdateSourceInQueue(std::size_t index) const;
+
   // Check if the current run is terminated
   void CheckForNextRun() const;
 
@@ -164,8 +174,17 @@ public:
     // Next simulation time
     double fNextSimulationTime;
 
-    // Next active source
+    // Next active source (and its index in fSources)
     GateVSource *fNextActiveSource;
+    std::size_t fNextActiveSourceIndex;
+
+    // Next time of each source (only with fUseSourceQueue). It is filled at
+    // the start of each run.
+    GateSourceQueue fSourceQueue;
+    bool fSourceQueueIsFilled;
+    // Sources with a time dependent activity, asked at each event as with the
+    // scan of all sources
+    std::vector<std::size_t> fTimeDependentSourceIndices;
 
     // User information data
     GateUserEventInformation *fUserEventInformation;
@@ -179,6 +198,11 @@ public:
   // List of managed sources
   std::vector<GateVSource *> fSources;
 
+  // If true, the next source is found with a queue of the next times of the
+  // sources ("queue" scheduler), instead of asking all sources at each event
+  // ("scan" scheduler)
+  bool fUseSourceQueue;
+
   // List of GateImageBox
   std::vector<GateImageBox *> fImageBoxes;
 
@@ -0,0 +1,118 @@
+/* --------------------------------------------------
+   Copyright (C): OpenGATE Collaboration
+   This software is distributed under the terms
+   of the GNU Lesser General  Public Licence (LGPL)
+   See LICENSE.md for further details
+   -------------------------------------------------- */
+
+#ifndef GateSourceQueue_h
+#define GateSourceQueue_h
+
+#include <cstddef>
+#include <utility>
+#include <vector>
+
+/*
+ * Indexed min-heap of the next time of each source, used by the source
+ * manager to find the next source without asking all sources at each event.
+ *
+ * The sources are identified by their index in the source manager. The order
+ * is (time, index): with equal times, the source with the lowest index comes
+ * first, as with the linear scan of the sources. The time of a source already
+ * in the queue can be updated or removed in O(log n).
+ */
+class GateSourceQueue {
+public:
+  // Remove all sources, the queue can then hold the indices [0, n[
+  void Reset(std::size_t n) {
+    fHeap.clear();
+    fTimes.assign(n, 0.0);
+    fPositions.assign(n, fNotInQueue);
+  }
+
+  bool Empty() const { return fHeap.empty(); }
+
+  // Index of the source with the earliest time (queue must not be empty)
+  std::size_t TopIndex() const { return fHeap.front(); }
+
+  double TopTime() const { return fTimes[fHeap.front()]; }
+
+  // Insert the source, or update its time if it is already in the queue
+  void Set(std::size_t index, double time) {
+    fTimes[index] = time;
+    auto pos = fPositions[index];
+    if (pos == fNotInQueue) {
+      pos = fHeap.size();
+      fHeap.push_back(index);
+      fPositions[index] = pos;
+      SiftUp(pos);
+      return;
+    }
+    SiftDown(SiftUp(pos));
+  }
+
+  // Remove the source from the queue (nothing if it is not in the queue)
+  void Remove(std::size_t index) {
+    const auto pos = fPositions[index];
+    if (pos == fNotInQueue)
+      return;
+    fPositions[index] = fNotInQueue;
+    const auto last = fHeap.back();
+    fHeap.pop_back();
+    if (pos == fHeap.size())
+      return;
+    fHeap[pos] = last;
+    fPositions[last] = pos;
+    SiftDown(SiftUp(pos));
+  }
+
+private:
+  static constexpr std::size_t fNotInQueue = static_cast<std::size_t>(-1);
+
+  bool Before(std::size_t a, std::size_t b) const {
+    return fTimes[a] < fTimes[b] || (fTimes[a] == fTimes[b] && a < b);
+  }
+
+  void Swap(std::size_t i, std::size_t j) {
+    std::swap(fHeap[i], fHeap[j]);
+    fPositions[fHeap[i]] = i;
+    fPositions[fHeap[j]] = j;
+  }
+
+  std::size_t SiftUp(std::size_t pos) {
+    while (pos > 0) {
+      const auto parent = (pos - 1) / 2;
+      if (!Before(fHeap[pos], fHeap[parent]))
+        break;
+      Swap(pos, parent);
+      pos = parent;
+    }
+    return pos;
+  }
+
+  void SiftDown(std::size_t pos) {
+    const auto n = fHeap.size();
+    while (true) {
+      auto smallest = pos;
+      const auto left = 2 * pos + 1;
+      const auto right = left + 1;
+      if (left < n && Before(fHeap[left], fHeap[smallest]))
+        smallest = left;
+      if (right < n && Before(fHeap[right], fHeap[smallest]))
+        smallest = right;
+      if (smallest == pos)
+        return;
+      Swap(pos, smallest);
+      pos = smallest;
+    }
+  }
+
+  // source indices, heap ordered
+  std::vector<std::size_t> fHeap;
+  // next time of each source
+  std::vector<double> fTimes;
+  // position of each source in fHeap (fNotInQueue if absent)
+  std::vector<std::size_t> fPositions;
+};
+
+#endif // GateSourceQueue_h
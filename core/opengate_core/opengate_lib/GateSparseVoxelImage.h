@@ -0,0 +1,101 @@
+/* --------------------------------------------------
+   Copyright (C): OpenGATE Collaboration
+   This software is distributed under the terms
+   of the GNU Lesser General  Public Licence (LGPL)
+   See LICENSE.md for further details
+   -------------------------------------------------- */
+
+#ifndef GateSparseVoxelImage_h
+#define GateSparseVoxelImage_h
+
+#include <array>
+#include <cstdint>
+#include <memory>
+#include <unordered_map>
+
+/*
+ * Sparse voxel storage as a hash of bricks: the image is split into cubic
+ * bricks of 2^BrickBits voxels per side and a brick is only allocated the
+ * first time one of its voxels is touched. Voxels are addressed with the same
+ * (x, y, z) index as the dense ITK image, and ForEach gives the flat index in
+ * the ITK buffer layout (x fastest) so the values can be densified directly
+ * into an image buffer.
+ */
+template <typename T, unsigned int BrickBits = 3> class GateSparseVoxelImage {
+public:
+  static constexpr unsigned int BrickSize = 1u << BrickBits;
+  static constexpr unsigned int BrickMask = BrickSize - 1;
+  static constexpr unsigned int BrickVolume = BrickSize * BrickSize * BrickSize;
+  typedef std::array<T, BrickVolume> BrickType;
+
+  void SetSize(const std::size_t sx, const std::size_t sy,
+               const std::size_t sz) {
+    fSize = {sx, sy, sz};
+    for (auto i = 0; i < 3; i++) {
+      fNbBricks[i] = (fSize[i] + BrickMask) >> BrickBits;
+    }
+    Clear();
+  }
+
+  void Clear() { fBricks.clear(); }
+
+  std::size_t GetNumberOfBricks() const { return fBricks.size(); }
+
+  std::size_t GetNumberOfBytes() const {
+    return fBricks.size() * (sizeof(BrickType) + sizeof(std::uint64_t));
+  }
+
+  // Return the voxel value, the brick is created (zero) if needed
+  T &At(const std::size_t x, const std::size_t y, const std::size_t z) {
+    const std::uint64_t key =
+        (x >> BrickBits) +
+        fNbBricks[0] * ((y >> BrickBits) + fNbBricks[1] * (z >> BrickBits));
+    auto &brick = fBricks[key];
+    if (!brick) {
+      brick = std::make_unique<BrickType>();
+      brick->fill(T{});
+    }
+    const auto offset =
+        (x & BrickMask) +
+        BrickSize * ((y & BrickMask) + BrickSize * (z & BrickMask));
+    return (*brick)[offset];
+  }
+
+  // Call f(flat_index, value) for all voxels of the allocated bricks that are
+  // inside the image
+  template <typename F> void ForEach(F f) {
+    for (auto &kv : fBricks) {
+      auto key = kv.first;
+      const std::size_t bx = key % fNbBricks[0];
+      key /= fNbBricks[0];
+      const std::size_t by = key % fNbBricks[1];
+      const std::size_t bz = key / fNbBricks[1];
+      auto &brick = *kv.second;
+      for (std::size_t k = 0; k < BrickSize; k++) {
+        const auto z = (bz << BrickBits) + k;
+        if (z >= fSize[2])
+          break;
+        for (std::size_t j = 0; j < BrickSize; j++) {
+          const auto y = (by << BrickBits) + j;
+          if (y >= fSize[1])
+            break;
+          const auto offset = BrickSize * (j + BrickSize * k);
+          const auto flat = fSize[0] * (y + fSize[1] * z);
+          for (std::size_t i = 0; i < BrickSize; i++) {
+            const auto x = (bx << BrickBits) + i;
+            if (x >= fSize[0])
+              break;
+            f(flat + x, brick[offset + i]);
+          }
+        }
+      }
+    }
+  }
+
+protected:
+  std::array<std::size_t, 3> fSize{};
+  std::array<std::size_t, 3> fNbBricks{};
+  std::unordered_map<std::uint64_t, std::unique_ptr<BrickType>> fBricks;
+};
+
+#endif // GateSparseVoxelImage_h
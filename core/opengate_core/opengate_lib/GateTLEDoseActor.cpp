@@ -279,11 +279,15 @@ void GateTLEDoseActor::ScoreTLEDepositStep(G4Step *step) {
   const auto event_id =
       G4RunManager::GetRunManager()->GetCurrentEvent()->GetEventID();
   if (isInside) {
-    G4AutoLock mutex(&SetPixelTLEMutex); // mutex is bound to the if-scope
-    if (fDoseFlag) {
-      ImageAddValue<Image3DType>(cpp_dose_image, index, dose);
+    if (fThreadLocalScoringFlag) {
+      AddValuesToThreadLocalBuffers(index, edep, dose, false);
+    } else {
+      G4AutoLock mutex(&SetPixelTLEMutex);
+      if (fDoseFlag) {
+        ImageAddValue<Image3DType>(cpp_dose_image, index, dose);
+      }
+      ImageAddValue<Image3DType>(cpp_edep_image, index, edep);
     }
-    ImageAddValue<Image3DType>(cpp_edep_image, index, edep);
 
     if (fEdepSquaredFlag || fDoseSquaredFlag) {
       if (fEdepSquaredFlag) {
@@ -52,6 +52,8 @@ void GateVSource::UpdateActivity(double time) {
   fActivity = fInitialActivity * exp(-fDecayConstant * (time - fStartTime));
 }
 
+bool GateVSource::HasTimeDependentActivity() const { return fHalfLife > 0; }
+
 double GateVSource::CalcNextTime(double current_simulation_time) {
   double next_time = current_simulation_time;
   if ((fMaxN <= 0)) {
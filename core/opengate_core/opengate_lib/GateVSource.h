@@ -34,6 +34,10 @@ public:
 
   virtual void UpdateActivity(double time);
 
+  // True if the activity changes with time (half life, TAC): the next time
+  // sampled at the previous rate is then not valid anymore
+  virtual bool HasTimeDependentActivity() const;
+
   virtual double CalcNextTime(double current_simulation_time);
 
   virtual void PrepareNextRun();
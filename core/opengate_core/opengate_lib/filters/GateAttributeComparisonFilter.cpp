@@ -21,8 +21,8 @@ void GateAttributeComparisonFilter<std::string>::InitializeUserInfo(
     py::dict &user_info) {
   GateVFilter::InitializeUserInfo(user_info);
   fAttributeName = DictGetStr(user_info, "attribute");
-  fCompareValue = DictGetStr(user_info, "compare_value");
-  fCompareOperation = DictGetStr(user_info, "compare_operation");
+  InitializeCompareOperation(user_info);
+  fMemoSlotIndex = GetMemoSlotIndex(fAttributeName);
 
   fAuxiliaryAttribute =
       GateVAuxiliaryAttribute::GetAuxiliaryAttributeByName(fAttributeName);
@@ -52,32 +52,22 @@ void GateAttributeComparisonFilter<std::string>::InitializeUserInfo(
 // Specialised implementation for std::string (Equality instead of Range)
 template <>
 bool GateAttributeComparisonFilter<std::string>::Evaluate(G4Step *step) const {
-  std::string val;
-  if (fAuxiliaryAttribute != nullptr) {
-    val = fAuxiliaryAttribute->GetSValue(step);
-  } else {
-    fAttribute->ProcessHits(step);
-    val = fAttribute->GetSingleValue();
-  }
-
-  if (fCompareOperation == "eq") {
+  const std::string &val = GetValue(step);
+  switch (fOperation) {
+  case CompareOp::EQ:
     return val == fCompareValue;
-  }
-  if (fCompareOperation == "ne") {
+  case CompareOp::NE:
     return val != fCompareValue;
-  }
-  if (fCompareOperation == "contains") {
+  case CompareOp::IN:
+    return fCompareValues.count(val) > 0;
+  case CompareOp::CONTAINS:
     return val.find(fCompareValue) != std::string::npos;
-  }
-  if (fCompareOperation == "startswith") {
+  case CompareOp::STARTSWITH:
     return val.rfind(fCompareValue, 0) == 0;
+  default:
+    // order operations, rejected at initialization
+    return false;
   }
-
-  std::ostringstream oss;
-  oss << "Unknown compare_operation '" << fCompareOperation
-      << "' for attribute filter '" << fAttributeName << "'.";
-  Fatal(oss.str());
-  return false;
 }
 
 // Forced instantiation for string
@@ -11,6 +11,8 @@
 #include "../GateVAuxiliaryAttribute.h"
 #include "../digitizer/GateTDigiAttribute.h"
 #include "GateVFilter.h"
+#include <unordered_set>
+#include <vector>
 
 /*
  * Generic comparison filter for named runtime attributes.
@@ -21,20 +23,42 @@
  *
  * This lets the same user-facing filter syntax work for both simulation-level
  * auxiliary attributes and the older DigiAttribute-based values.
+ *
+ * The value of the attribute is computed once per step for all the filters of
+ * a filter tree on the same attribute (memoized per evaluation of the tree).
+ * The 'in' operation tests the membership to a set of values (hashed).
  */
 template <typename T> class GateAttributeComparisonFilter : public GateVFilter {
 public:
+  enum class CompareOp { LT, LE, GT, GE, EQ, NE, IN, CONTAINS, STARTSWITH };
+
   GateAttributeComparisonFilter();
 
   void InitializeUserInfo(py::dict &user_info) override;
 
   bool Evaluate(G4Step *step) const override;
 
+  // value of the attribute for this step (memoized)
+  const T &GetValue(G4Step *step) const;
+
   std::string fAttributeName;
   T fCompareValue;
+  std::unordered_set<T> fCompareValues;
   std::string fCompareOperation;
+  CompareOp fOperation = CompareOp::EQ;
   GateTDigiAttribute<T> *fAttribute{nullptr};
   GateVAuxiliaryAttribute *fAuxiliaryAttribute{nullptr};
+
+protected:
+  void InitializeCompareOperation(py::dict &user_info);
+
+  // Memoized values, one slot per attribute name, shared by the filters
+  struct MemoSlot {
+    unsigned long fEvaluationId = 0;
+    T fValue{};
+  };
+  static std::size_t GetMemoSlotIndex(const std::string &attribute_name);
+  std::size_t fMemoSlotIndex = 0;
 };
 
 // Typedefs for common use cases
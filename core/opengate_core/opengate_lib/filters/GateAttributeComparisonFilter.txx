@@ -10,7 +10,10 @@
 #include "../digitizer/GateDigiAttributeManager.h"
 #include "GateAttributeComparisonFilter.h"
 #include <G4Step.hh>
+#include <map>
+#include <mutex>
 #include <pybind11/stl.h>
+#include <sstream>
 
 template <typename T> char GetExpectedAuxiliaryAttributeType();
 template <> inline char GetExpectedAuxiliaryAttributeType<double>() {
@@ -29,8 +32,8 @@ template <typename T>
 void GateAttributeComparisonFilter<T>::InitializeUserInfo(py::dict &user_info) {
   GateVFilter::InitializeUserInfo(user_info);
   fAttributeName = DictGetStr(user_info, "attribute");
-  fCompareValue = user_info["compare_value"].cast<T>();
-  fCompareOperation = DictGetStr(user_info, "compare_operation");
+  InitializeCompareOperation(user_info);
+  fMemoSlotIndex = GetMemoSlotIndex(fAttributeName);
 
   fAuxiliaryAttribute =
       GateVAuxiliaryAttribute::GetAuxiliaryAttributeByName(fAttributeName);
@@ -50,7 +53,6 @@ void GateAttributeComparisonFilter<T>::InitializeUserInfo(py::dict &user_info) {
   auto *att = dgm->GetDigiAttribute(fAttributeName);
   auto *vatt = dgm->CopyDigiAttribute(att);
   fAttribute = dynamic_cast<GateTDigiAttribute<T> *>(vatt);
-  fAttribute->SetSingleValueMode(true);
 
   // Basic safety check for the cast
   if (!fAttribute) {
@@ -59,46 +61,116 @@ void GateAttributeComparisonFilter<T>::InitializeUserInfo(py::dict &user_info) {
         << "' type mismatch in filter.";
     Fatal(oss.str());
   }
+  fAttribute->SetSingleValueMode(true);
 }
 
 template <typename T>
-bool GateAttributeComparisonFilter<T>::Evaluate(G4Step *step) const {
-  T value;
+void GateAttributeComparisonFilter<T>::InitializeCompareOperation(
+    py::dict &user_info) {
+  // parse the operation once, not at each step
+  static const std::map<std::string, CompareOp> operations = {
+      {"lt", CompareOp::LT},
+      {"le", CompareOp::LE},
+      {"gt", CompareOp::GT},
+      {"ge", CompareOp::GE},
+      {"eq", CompareOp::EQ},
+      {"ne", CompareOp::NE},
+      {"in", CompareOp::IN},
+      {"contains", CompareOp::CONTAINS},
+      {"startswith", CompareOp::STARTSWITH}};
+  fCompareOperation = DictGetStr(user_info, "compare_operation");
+  const auto it = operations.find(fCompareOperation);
+  bool valid = it != operations.end();
+  if (valid) {
+    fOperation = it->second;
+    const bool is_string_operation = fOperation == CompareOp::CONTAINS ||
+                                     fOperation == CompareOp::STARTSWITH;
+    const bool is_order_operation =
+        fOperation == CompareOp::LT || fOperation == CompareOp::LE ||
+        fOperation == CompareOp::GT || fOperation == CompareOp::GE;
+    if constexpr (std::is_same_v<T, std::string>)
+      valid = !is_order_operation;
+    else
+      valid = !is_string_operation;
+  }
+  if (!valid) {
+    std::ostringstream oss;
+    oss << "Unknown compare_operation '" << fCompareOperation
+        << "' for attribute filter '" << fAttributeName << "'.";
+    Fatal(oss.str());
+  }
+
+  fCompareValues.clear();
+  if (fOperation == CompareOp::IN) {
+    for (const auto &v : user_info["compare_value"].cast<std::vector<T>>())
+      fCompareValues.insert(v);
+  } else {
+    fCompareValue = user_info["compare_value"].cast<T>();
+  }
+}
+
+template <typename T>
+std::size_t GateAttributeComparisonFilter<T>::GetMemoSlotIndex(
+    const std::string &attribute_name) {
+  static std::mutex mutex;
+  static std::map<std::string, std::size_t> slots;
+  std::lock_guard<std::mutex> lock(mutex);
+  const auto it = slots.find(attribute_name);
+  if (it != slots.end())
+    return it->second;
+  const auto index = slots.size();
+  slots[attribute_name] = index;
+  return index;
+}
+
+template <typename T>
+const T &GateAttributeComparisonFilter<T>::GetValue(G4Step *step) const {
+  static thread_local std::vector<MemoSlot> memo;
+  if (memo.size() <= fMemoSlotIndex)
+    memo.resize(fMemoSlotIndex + 1);
+  auto &slot = memo[fMemoSlotIndex];
+
+  // already computed by another filter of the same tree for this step
+  const auto id = GetCurrentEvaluationId();
+  if (id != 0 && slot.fEvaluationId == id)
+    return slot.fValue;
+
   if (fAuxiliaryAttribute != nullptr) {
     if constexpr (std::is_same_v<T, double>) {
-      value = fAuxiliaryAttribute->GetDValue(step);
+      slot.fValue = fAuxiliaryAttribute->GetDValue(step);
     } else if constexpr (std::is_same_v<T, int>) {
-      value = fAuxiliaryAttribute->GetIValue(step);
+      slot.fValue = fAuxiliaryAttribute->GetIValue(step);
     } else {
-      value = fAttribute->GetSingleValue();
+      slot.fValue = fAuxiliaryAttribute->GetSValue(step);
     }
   } else {
     fAttribute->ProcessHits(step);
-    value = fAttribute->GetSingleValue();
+    slot.fValue = fAttribute->GetSingleValue();
   }
+  slot.fEvaluationId = id;
+  return slot.fValue;
+}
 
-  if (fCompareOperation == "lt") {
+template <typename T>
+bool GateAttributeComparisonFilter<T>::Evaluate(G4Step *step) const {
+  const T &value = GetValue(step);
+  switch (fOperation) {
+  case CompareOp::LT:
     return value < fCompareValue;
-  }
-  if (fCompareOperation == "le") {
+  case CompareOp::LE:
     return value <= fCompareValue;
-  }
-  if (fCompareOperation == "gt") {
+  case CompareOp::GT:
     return value > fCompareValue;
-  }
-  if (fCompareOperation == "ge") {
+  case CompareOp::GE:
     return value >= fCompareValue;
-  }
-  if (fCompareOperation == "eq") {
+  case CompareOp::EQ:
     return value == fCompareValue;
-  }
-  if (fCompareOperation == "ne") {
+  case CompareOp::NE:
     return value != fCompareValue;
+  case CompareOp::IN:
+    return fCompareValues.count(value) > 0;
+  default:
+    // string operations, rejected at initialization
+    return false;
   }
-
-  std::ostringstream oss;
-  oss << "Unknown compare_operation '" << fCompareOperation
-      << "' for attribute filter '" << fAttributeName << "'.";
-  Fatal(oss.str());
-  return false;
 }
@@ -7,6 +7,13 @@
 
 #include "GateVFilter.h"
 #include "../GateHelpersDict.h"
+#include <chrono>
+
+namespace {
+// depth of the Accept(step) calls, a new evaluation starts at depth 0
+thread_local unsigned int gEvaluationDepth = 0;
+thread_local unsigned long gEvaluationId = 0;
+} // namespace
 
 GateVFilter::GateVFilter() = default;
 
@@ -34,8 +41,48 @@ bool GateVFilter::Accept(const G4Track *track) const {
 }
 
 bool GateVFilter::Accept(G4Step *step) const {
-  const bool result = Evaluate(step);
-  return fNegate ? !result : result;
+  if (gEvaluationDepth == 0)
+    ++gEvaluationId;
+  ++gEvaluationDepth;
+  bool result;
+  if (fCollectStatistics) {
+    const auto start = std::chrono::steady_clock::now();
+    result = Evaluate(step) != fNegate;
+    const auto duration = std::chrono::steady_clock::now() - start;
+    fEvaluationTimeNs.fetch_add(
+        std::chrono::duration_cast<std::chrono::nanoseconds>(duration).count(),
+        std::memory_order_relaxed);
+    fNumberOfEvaluations.fetch_add(1, std::memory_order_relaxed);
+    if (result)
+      fNumberOfAccepted.fetch_add(1, std::memory_order_relaxed);
+  } else {
+    result = Evaluate(step) != fNegate;
+  }
+  --gEvaluationDepth;
+  return result;
+}
+
+unsigned long GateVFilter::GetCurrentEvaluationId() {
+  // 0: not in the evaluation of a filter tree
+  return gEvaluationDepth > 0 ? gEvaluationId : 0;
+}
+
+void GateVFilter::ResetStatistics() {
+  fNumberOfEvaluations = 0;
+  fNumberOfAccepted = 0;
+  fEvaluationTimeNs = 0;
+}
+
+unsigned long long GateVFilter::GetNumberOfEvaluations() const {
+  return fNumberOfEvaluations.load();
+}
+
+unsigned long long GateVFilter::GetNumberOfAccepted() const {
+  return fNumberOfAccepted.load();
+}
+
+double GateVFilter::GetEvaluationTime() const {
+  return static_cast<double>(fEvaluationTimeNs.load()) * 1e-9;
 }
 
 bool GateVFilter::Evaluate(const G4Run *) const { return true; }
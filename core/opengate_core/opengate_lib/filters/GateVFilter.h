@@ -11,6 +11,7 @@
 #include <G4Event.hh>
 #include <G4Run.hh>
 #include <G4Step.hh>
+#include <atomic>
 #include <pybind11/stl.h>
 
 namespace py = pybind11;
@@ -40,8 +41,27 @@ public:
 
   virtual bool Evaluate(G4Step *step) const;
 
+  // Statistics of the steps (counted only when enabled, shared by all threads)
+  void SetCollectStatistics(bool b) { fCollectStatistics = b; }
+  void ResetStatistics();
+  unsigned long long GetNumberOfEvaluations() const;
+  unsigned long long GetNumberOfAccepted() const;
+  // total time (in s) spent in this filter, sub-filters included
+  double GetEvaluationTime() const;
+
+  // Identifier of the current evaluation of a filter tree (from its root) in
+  // this thread: the filters of the tree use it to share the attribute values
+  // of the step, that are the same for all the filters of the tree.
+  static unsigned long GetCurrentEvaluationId();
+
   std::string fName;
   bool fNegate = false;
+
+protected:
+  bool fCollectStatistics = false;
+  mutable std::atomic<unsigned long long> fNumberOfEvaluations{0};
+  mutable std::atomic<unsigned long long> fNumberOfAccepted{0};
+  mutable std::atomic<unsigned long long> fEvaluationTimeNs{0};
 };
 
 #endif // GateVFilter_h
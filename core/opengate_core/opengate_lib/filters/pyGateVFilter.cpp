@@ -52,5 +52,10 @@ void init_GateVFilter(py::module &m) {
 
   py::class_<GateVFilter, PyGateVFilter>(m, "GateVFilter")
       .def(py::init())
-      .def("InitializeUserInfo", &GateVFilter::InitializeUserInfo);
+      .def("InitializeUserInfo", &GateVFilter::InitializeUserInfo)
+      .def("SetCollectStatistics", &GateVFilter::SetCollectStatistics)
+      .def("ResetStatistics", &GateVFilter::ResetStatistics)
+      .def("GetNumberOfEvaluations", &GateVFilter::GetNumberOfEvaluations)
+      .def("GetNumberOfAccepted", &GateVFilter::GetNumberOfAccepted)
+      .def("GetEvaluationTime", &GateVFilter::GetEvaluationTime);
 }
@@ -46,7 +46,8 @@ inline void set_region(TImagePointer &img,
                            index,
                        pybind11::array_t<int, pybind11::array::c_style |
                                                   pybind11::array::forcecast>
-                           size) {
+                           size,
+                       const bool allocate = true) {
   using RegionType = typename TImagePointer::ObjectType::RegionType;
   typename RegionType::IndexType itk_index;
   const auto *data_index = static_cast<int *>(
@@ -62,6 +63,12 @@ inline void set_region(TImagePointer &img,
   for (unsigned int i = 0; i < img->ImageDimension; i++)
     itk_size[i] = data_size[i];
   RegionType itk_region(itk_index, itk_size);
+  if (!allocate) {
+    // only set the geometry, and release a previously allocated buffer
+    img->Initialize();
+    img->SetRegions(itk_region);
+    return;
+  }
   img->SetRegions(itk_region);
   img->Allocate();
 };
@@ -88,22 +95,25 @@ void declare_itk_image_ptr(pybind11::module &m, const std::string &typestr) {
       .def(
           "set_size",
           [](TImagePointer &img,
-             py::array_t<int, py::array::c_style | py::array::forcecast> size) {
+             py::array_t<int, py::array::c_style | py::array::forcecast> size,
+             const bool allocate) {
             py::array_t<int, py::array::c_style | py::array::forcecast>
                 zero_index(img->ImageDimension);
             int *raw = static_cast<int *>(zero_index.request().ptr);
             for (unsigned int i = 0; i < img->ImageDimension; i++)
               raw[i] = 0;
-            return set_region(img, zero_index, size);
-          })
+            return set_region(img, zero_index, size, allocate);
+          },
+          py::arg("size"), py::arg("allocate") = true)
       .def(
           "set_region",
           [](TImagePointer &img,
              py::array_t<int, py::array::c_style | py::array::forcecast> index,
-             py::array_t<int, py::array::c_style | py::array::forcecast> size) {
-            return set_region<TImagePointer>(img, index, size);
+             py::array_t<int, py::array::c_style | py::array::forcecast> size,
+             const bool allocate) {
+            return set_region<TImagePointer>(img, index, size, allocate);
           },
-          py::arg("index"), py::arg("size"))
+          py::arg("index"), py::arg("size"), py::arg("allocate") = true)
       .def("spacing",
            [](const TImagePointer &img) {
              return py::array(img->ImageDimension, // shape
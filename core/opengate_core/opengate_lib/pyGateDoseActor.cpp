@@ -52,6 +52,12 @@ void init_GateDoseActor(py::module &m) {
       .def("SetTransitionEnergySPR", &GateDoseActor::SetTransitionEnergySPR)
       .def("GetCountsFlag", &GateDoseActor::GetCountsFlag)
       .def("SetCountsFlag", &GateDoseActor::SetCountsFlag)
+      .def("GetThreadLocalScoringFlag",
+           &GateDoseActor::GetThreadLocalScoringFlag)
+      .def("SetThreadLocalScoringFlag",
+           &GateDoseActor::SetThreadLocalScoringFlag)
+      .def("GetSparseScoringFlag", &GateDoseActor::GetSparseScoringFlag)
+      .def("SetSparseScoringFlag", &GateDoseActor::SetSparseScoringFlag)
       .def("SetUncertaintyGoal", &GateDoseActor::SetUncertaintyGoal)
       .def("SetTopVoxelsCount", &GateDoseActor::SetTopVoxelsCount)
       .def("SetThreshEdepPerc", &GateDoseActor::SetThreshEdepPerc)
@@ -12,21 +12,24 @@
 
 void init_GateGANSource(py::module &m) {
 
-  py::class_<GateGANSource, GateGenericSource>(m, "GateGANSource")
-      .def(py::init())
-      .def("InitializeUserInfo", &GateGANSource::InitializeUserInfo)
-      .def("SetGeneratorFunction", &GateGANSource::SetGeneratorFunction)
-      .def("SetGeneratorInfo", &GateGANSource::SetGeneratorInfo)
+  auto c =
+      py::class_<GateGANSource, GateGenericSource>(m, "GateGANSource")
+          .def(py::init())
+          .def("InitializeUserInfo", &GateGANSource::InitializeUserInfo)
+          .def("SetGeneratorFunction", &GateGANSource::SetGeneratorFunction)
+          .def("SetGeneratorInfo", &GateGANSource::SetGeneratorInfo)
+          .def("SetBatch", &GateGANSource::SetBatch);
 
-      .def_readwrite("fPositionX", &GateGANSource::fPositionX)
-      .def_readwrite("fPositionY", &GateGANSource::fPositionY)
-      .def_readwrite("fPositionZ", &GateGANSource::fPositionZ)
+  // the batch columns can be set one by one (without copy)
+  DefBatchColumnProperty(c, "fPositionX", &GateGANSource::fPositionX);
+  DefBatchColumnProperty(c, "fPositionY", &GateGANSource::fPositionY);
+  DefBatchColumnProperty(c, "fPositionZ", &GateGANSource::fPositionZ);
 
-      .def_readwrite("fDirectionX", &GateGANSource::fDirectionX)
-      .def_readwrite("fDirectionY", &GateGANSource::fDirectionY)
-      .def_readwrite("fDirectionZ", &GateGANSource::fDirectionZ)
+  DefBatchColumnProperty(c, "fDirectionX", &GateGANSource::fDirectionX);
+  DefBatchColumnProperty(c, "fDirectionY", &GateGANSource::fDirectionY);
+  DefBatchColumnProperty(c, "fDirectionZ", &GateGANSource::fDirectionZ);
 
-      .def_readwrite("fEnergy", &GateGANSource::fEnergy)
-      .def_readwrite("fWeight", &GateGANSource::fWeight)
-      .def_readwrite("fTime", &GateGANSource::fTime);
+  DefBatchColumnProperty(c, "fEnergy", &GateGANSource::fEnergy);
+  DefBatchColumnProperty(c, "fWeight", &GateGANSource::fWeight);
+  DefBatchColumnProperty(c, "fTime", &GateGANSource::fTime);
 }
@@ -16,6 +16,7 @@ void init_GatePhaseSpaceSource(py::module &m) {
       .def("InitializeUserInfo", &GatePhaseSpaceSource::InitializeUserInfo)
       .def("SetGeneratorFunction", &GatePhaseSpaceSource::SetGeneratorFunction)
 
+      .def("SetBatch", &GatePhaseSpaceSource::SetBatch)
       .def("SetEnergyBatch", &GatePhaseSpaceSource::SetEnergyBatch)
       .def("SetWeightBatch", &GatePhaseSpaceSource::SetWeightBatch)
       .def("SetPDGCodeBatch", &GatePhaseSpaceSource::SetPDGCodeBatch)
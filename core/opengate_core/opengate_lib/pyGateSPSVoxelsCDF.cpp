@@ -0,0 +1,39 @@
+/* --------------------------------------------------
+   Copyright (C): OpenGATE Collaboration
+   This software is distributed under the terms
+   of the GNU Lesser General  Public Licence (LGPL)
+   See LICENSE.md for further details
+   -------------------------------------------------- */
+
+#include <pybind11/numpy.h>
+#include <pybind11/pybind11.h>
+
+#include "GateHelpers.h"
+#include "GateSPSVoxelsCDF.h"
+
+namespace py = pybind11;
+
+typedef py::array_t<double, py::array::c_style | py::array::forcecast> CDFArray;
+
+void init_GateSPSVoxelsCDF(py::module &m) {
+
+  py::class_<GateSPSVoxelsCDF, std::shared_ptr<GateSPSVoxelsCDF>>(
+      m, "GateSPSVoxelsCDF")
+      .def(py::init())
+      // one copy of the contiguous buffers (Z, ZxY, ZxYxX)
+      .def("SetCumulativeDistributionFunction",
+           [](GateSPSVoxelsCDF &c, const CDFArray &z, const CDFArray &y,
+              const CDFArray &x) {
+             if (z.ndim() != 1 || y.ndim() != 2 || x.ndim() != 3 ||
+                 y.shape(0) != z.shape(0) || x.shape(0) != z.shape(0) ||
+                 x.shape(1) != y.shape(1)) {
+               Fatal("GateSPSVoxelsCDF: the CDF must be 1D (Z), 2D (Z, Y) "
+                     "and 3D (Z, Y, X) arrays");
+             }
+             c.Set(z.data(), y.data(), x.data(), x.shape(0), x.shape(1),
+                   x.shape(2));
+           })
+      .def("GetSizeZ", &GateSPSVoxelsCDF::GetSizeZ)
+      .def("GetSizeY", &GateSPSVoxelsCDF::GetSizeY)
+      .def("GetSizeX", &GateSPSVoxelsCDF::GetSizeX);
+}
@@ -7,6 +7,7 @@
 
 #include "GateSPSPosDistribution.h"
 #include "GateSPSVoxelsPosDistribution.h"
+#include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
@@ -17,8 +18,19 @@ void init_GateSPSVoxelsPosDistribution(py::module &m) {
   py::class_<GateSPSVoxelsPosDistribution, GateSPSPosDistribution>(
       m, "GateSPSVoxelsPosDistribution")
       .def(py::init())
+      // shared CDF (see GateSPSVoxelsCDF)
+      .def(
+          "SetCumulativeDistributionFunction",
+          py::overload_cast<std::shared_ptr<GateSPSVoxelsCDF>>(
+              &GateSPSVoxelsPosDistribution::SetCumulativeDistributionFunction))
+      // CDF Z, Y, X as arrays: they are copied in a new GateSPSVoxelsCDF
       .def("SetCumulativeDistributionFunction",
-           &GateSPSVoxelsPosDistribution::SetCumulativeDistributionFunction)
+           [](GateSPSVoxelsPosDistribution &d, const py::array &z,
+              const py::array &y, const py::array &x) {
+             auto cdf = std::make_shared<GateSPSVoxelsCDF>();
+             py::cast(cdf).attr("SetCumulativeDistributionFunction")(z, y, x);
+             d.SetCumulativeDistributionFunction(cdf);
+           })
       .def("VGenerateOne", &GateSPSVoxelsPosDistribution::VGenerateOne)
       .def_readwrite("cpp_edep_image",
                      &GateSPSVoxelsPosDistribution::cpp_image);
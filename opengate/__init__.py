@@ -168,6 +168,7 @@ from opengate.jobs import (
     jobs_merge,
     jobs_clean_split,
     jobs_status,
+    record_job_durations_in_manifest,
     print_jobs_split_summary,
     print_jobs_merge_summary,
 )
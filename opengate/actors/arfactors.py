@@ -1,6 +1,7 @@
 from box import Box
 import numpy as np
 import itk
+import queue
 import threading
 
 import opengate_core as g4
@@ -213,6 +214,23 @@ class ARFActor(ActorBase, g4.GateARFActor):
             "auto",
             {"doc": "FIXME", "allowed_values": ("cpu", "gpu", "auto")},
         ),
+        "queue_size": (
+            0,
+            {
+                "doc": "If > 0, the batches of projected points are pushed to a queue and the ARF is "
+                "applied by a dedicated inference thread, so the simulation threads do not wait for the "
+                "neural network. This is the maximum number of batches in the queue: when it is full, "
+                "the simulation threads wait. With 0 (default), the ARF is applied by the simulation "
+                "thread that fills the batch (with a lock in multithread mode).",
+            },
+        ),
+        "coalesce_batches": (
+            1,
+            {
+                "doc": "With a queue (queue_size > 0), maximum number of waiting batches that the inference "
+                "thread concatenates before applying the ARF, to run the model on larger inputs.",
+            },
+        ),
     }
 
     user_output_config = {
@@ -238,6 +256,10 @@ class ARFActor(ActorBase, g4.GateARFActor):
         self.detected_particles = 0
         # need a lock when the ARF is applied
         self.lock = None
+        # inference thread (if queue_size > 0)
+        self.arf_queue = None
+        self.arf_worker = None
+        self.arf_worker_error = None
         # local variables
         self.image_plane_spacing = None
         self.image_plane_size_pixel = None
@@ -269,6 +291,9 @@ class ARFActor(ActorBase, g4.GateARFActor):
         return_dict["nn"] = None
         return_dict["lock"] = None
         return_dict["model"] = None
+        return_dict["arf_queue"] = None
+        return_dict["arf_worker"] = None
+        return_dict["arf_worker_error"] = None
         return return_dict
 
     def initialize(self):
@@ -347,14 +372,30 @@ class ARFActor(ActorBase, g4.GateARFActor):
         self.output_image = np.zeros(self.output_size, dtype=np.float64)
 
     def apply(self, actor):
+        # get the projected points of the current thread
+        px = self.get_projected_points(actor)
+        if px is None:
+            return
+        run_id = actor.GetCurrentRunId()
+
+        # send them to the inference thread
+        if self.queue_size > 0:
+            self.push_to_arf_queue(px, run_id)
+            return
+
         # we need a lock when the ARF is applied
         if self.simulation.use_multithread:
             with self.lock:
-                self.arf_build_image_from_projected_points(actor)
+                self.apply_arf_to_points(px, run_id)
         else:
-            self.arf_build_image_from_projected_points(actor)
+            self.apply_arf_to_points(px, run_id)
 
     def arf_build_image_from_projected_points(self, actor):
+        px = self.get_projected_points(actor)
+        if px is not None:
+            self.apply_arf_to_points(px, actor.GetCurrentRunId())
+
+    def get_projected_points(self, actor):
         # get values from the cpp side
         energy = np.array(actor.GetEnergy())
         pos_x = np.array(actor.GetPositionX())
@@ -366,22 +407,23 @@ class ARFActor(ActorBase, g4.GateARFActor):
 
         # do nothing if no hits
         if energy.size == 0:
-            return
+            return None
 
         # (do NOT use plane_axis here, it is included in GateARFActor)
 
         # build the data by passing direction vectors, NOT angles
         px_base = (pos_x, pos_y, dir_x, dir_y, dir_z, energy)
         if len(weights) == 0:
-            px = np.column_stack(px_base)
-        else:
-            px = np.column_stack(px_base + (weights,))
+            return np.column_stack(px_base)
+        return np.column_stack(px_base + (weights,))
+
+    def apply_arf_to_points(self, px, run_id):
         self.debug_nb_hits_before += len(px)
 
         # verbose current batch
         if self.verbose_batch:
             print(
-                f"Apply ARF to {energy.shape[0]} hits (device = {self.model_data['current_gpu_mode']})"
+                f"Apply ARF to {px.shape[0]} hits (device = {self.model_data['current_gpu_mode']})"
             )
 
         # from projected points to image counts
@@ -397,7 +439,6 @@ class ARFActor(ActorBase, g4.GateARFActor):
 
         # do nothing if there is no hit in the image
         if u.shape[0] != 0:
-            run_id = actor.GetCurrentRunId()
             s = self.nb_ene * run_id
             img = self.output_array[s : s + self.nb_ene]
             garf.image_from_coordinates_add_numpy(
@@ -412,7 +453,77 @@ class ARFActor(ActorBase, g4.GateARFActor):
                 )
             self.debug_nb_hits += u.shape[0]
 
+    def start_arf_worker(self):
+        self.arf_queue = queue.Queue(maxsize=int(self.queue_size))
+        self.arf_worker_error = None
+        self.arf_worker = threading.Thread(
+            target=self._arf_worker_loop, name=f"{self.name}_arf", daemon=True
+        )
+        self.arf_worker.start()
+
+    def push_to_arf_queue(self, px, run_id):
+        with self.lock:
+            if self.arf_worker is None:
+                self.start_arf_worker()
+        self.check_arf_worker_error()
+        # wait here if the queue is full (the inference thread is late)
+        self.arf_queue.put((px, run_id))
+
+    def _arf_worker_loop(self):
+        # Apply the ARF to the queued batches, concatenating up to
+        # coalesce_batches waiting batches of the same run. A None item stops
+        # the loop. After an error, the batches are only consumed (so that
+        # flush does not hang) and the error is raised by the simulation threads.
+        stop = False
+        while not stop:
+            items = []
+            item = self.arf_queue.get()
+            while True:
+                if item is None:
+                    stop = True
+                    self.arf_queue.task_done()
+                else:
+                    items.append(item)
+                if stop or len(items) >= self.coalesce_batches:
+                    break
+                try:
+                    item = self.arf_queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if self.arf_worker_error is None:
+                    for run_id in dict.fromkeys(r for _, r in items):
+                        px = np.concatenate([p for p, r in items if r == run_id])
+                        self.apply_arf_to_points(px, run_id)
+            except BaseException as e:
+                self.arf_worker_error = e
+            for _ in items:
+                self.arf_queue.task_done()
+
+    def check_arf_worker_error(self):
+        if self.arf_worker_error is not None:
+            fatal(
+                f"Error in the inference thread of the ARF actor '{self.name}': "
+                f"{self.arf_worker_error}"
+            )
+
+    def flush_arf_queue(self):
+        # wait until all the queued batches are applied
+        if self.arf_worker is not None:
+            self.arf_queue.join()
+        self.check_arf_worker_error()
+
+    def stop_arf_worker(self):
+        if self.arf_worker is None:
+            return
+        self.arf_queue.put(None)
+        self.arf_worker.join()
+        self.arf_worker = None
+        self.arf_queue = None
+
     def EndOfRunActionMasterThread(self, run_index):
+        # all the batches of the threads must be applied before building the image
+        self.flush_arf_queue()
         nb_slice = self.nb_ene
 
         # convert to itk image
@@ -453,6 +564,7 @@ class ARFActor(ActorBase, g4.GateARFActor):
         return 0
 
     def EndSimulationAction(self):
+        self.stop_arf_worker()
         g4.GateARFActor.EndSimulationAction(self)
         ActorBase.EndSimulationAction(self)
         # process the remaining elements in the batch
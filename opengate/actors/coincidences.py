@@ -1,13 +1,11 @@
-from collections import deque
 from dataclasses import dataclass
-from itertools import chain
 from pathlib import Path
 import awkward as ak
 import numpy as np
 import pandas as pd
 import os
-import time
 import logging
+import multiprocessing
 import uproot
 import sys
 from opengate.contrib.root_helpers import *
@@ -16,10 +14,6 @@ from enum import Enum, auto
 logger = logging.getLogger(__name__)
 
 
-class ChunkSizeTooSmallError(Exception):
-    pass
-
-
 class CoincidenceOutputFile:
     def __init__(self, file_path, file_format):
         assert file_format in ["root", "hdf5"]
@@ -87,14 +81,21 @@ class ResultType(Enum):
 
 
 def cc_coincidences_sorter(
-    singles_tree, time_window, chunk_size=100000, output_file_path=None
+    singles_tree,
+    time_window,
+    chunk_size=100000,
+    output_file_path=None,
+    time_index_folder=None,
+    n_workers=1,
 ):
     """
     Sort singles and detect coincidences.
     :param singles_tree: input tree of singles (root format)
     :param time_window: time windows in G4 units (ns)
-    :param chunk_size: singles are processed by this chunk size
+    :param chunk_size: number of singles (in time order) opening a time window that are processed at once
     :param output_file_path: if provided, the coincident singles will be saved to the given file path, in root or hdf5 format depending on the file extension (.root or .hdf5).
+    :param time_index_folder: if provided, the GlobalTime-sorted index of the singles is read from (or saved to) this folder
+    :param n_workers: number of processes used to sort the singles (the singles tree must be read from a file if > 1)
     :return: if output_file_path is given, the return value is None, otherwise the coincident singles are returned as a pandas DataFrame.
 
     Chunk size is important for very large root file to avoid loading everything in memory at once
@@ -103,7 +104,7 @@ def cc_coincidences_sorter(
     if output_file_path is not None:
         if output_file_path.endswith(".root"):
             output_file_format = "root"
-        elif output_file_path.endwith(".hdf5"):
+        elif output_file_path.endswith(".hdf5"):
             output_file_format = "hdf5"
         else:
             raise ValueError("output_file_path must end with .root or .hdf5")
@@ -120,6 +121,8 @@ def cc_coincidences_sorter(
         "pd",
         output_file_path,
         output_file_format or "root",
+        time_index_folder,
+        n_workers,
     )
 
 
@@ -135,6 +138,8 @@ def coincidences_sorter(
     output_file_path=None,
     output_file_format="root",
     allDigiOpenCoincGate=True,
+    time_index_folder=None,
+    n_workers=1,
 ):
     """
     Sort singles and detect coincidences.
@@ -150,10 +155,16 @@ def coincidences_sorter(
     :param min_transaxial_distance: minimum transaxial distance between the two singles of a coincidence
     :param transaxial_plane: "xy", "yz", or "xz"
     :param max_axial_distance: maximum axial distance between the two singles of a coincidence
-    :param chunk_size: singles are processed by this chunk size
+    :param chunk_size: number of singles (in time order) opening a time window that are processed at once
     :param return_type: "dict" or "pd"
     :param output_file_path: if provided, the coincidences will be saved to the given file path
     :param output_file_format: "root" or "hdf5"
+    :param allDigiOpenCoincGate: if False, a single inside the time window of a previous single cannot open a time window
+    :param time_index_folder: if provided, the GlobalTime-sorted index of the singles is read from this folder
+           if it exists, otherwise it is built and saved there (useful to sort the same singles several times)
+    :param n_workers: number of processes used to sort the singles. The time axis is split into slabs of chunk_size
+           singles that are sorted in parallel, the result is the same as with a single process.
+           The singles tree must be read from a file if n_workers > 1.
     :return: if output_file_path is given, the return value is None, otherwise the coincidences are returned
              as a dict of events (return_type "dict") or a pandas DataFrame (return_type "pd")
 
@@ -172,6 +183,8 @@ def coincidences_sorter(
         return_type,
         output_file_path,
         output_file_format,
+        time_index_folder,
+        n_workers,
     )
 
 
@@ -185,6 +198,8 @@ class CoincidenceSorter:
     transaxial_plane: str = "XY"
     chunk_size: int = 100000
     output_file_path: Path = None
+    time_index_folder: Path = None
+    n_workers: int = 1
 
     def run(self, root_filepath, tree_name):
         root_file = uproot.open(root_filepath)
@@ -211,6 +226,8 @@ class CoincidenceSorter:
             self.output_file_path,
             output_file_format,
             self.multi_window,
+            self.time_index_folder,
+            self.n_workers,
         )
 
 
@@ -241,6 +258,259 @@ def _decompose_coincidence_pairs_into_singles(coincidence_pairs):
     return decomposed
 
 
+class SinglesTimeIndex:
+    """GlobalTime-sorted index of a singles tree.
+
+    entries[i] is the tree entry of the i-th single in chronological order,
+    and times[i] its GlobalTime. Only the GlobalTime branch is read to build it,
+    but the index is built in memory: 16 bytes per single, and about 24 bytes
+    per single while the times are sorted. The index can be saved to a folder
+    and memory-mapped later, so that several sortings of the same singles
+    (other policies, time windows, ...) do not need to rebuild it.
+    """
+
+    def __init__(self, entries, times):
+        self.entries = entries
+        self.times = times
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def build(cls, singles_tree, step_size=1000000):
+        times = np.empty(singles_tree.num_entries, dtype=np.float64)
+        n = 0
+        for chunk in singles_tree.iterate(
+            ["GlobalTime"], step_size=step_size, library="np"
+        ):
+            t = chunk["GlobalTime"]
+            times[n : n + len(t)] = t
+            n += len(t)
+        # stable sort: singles with the same time keep their order in the tree
+        entries = np.argsort(times, kind="stable")
+        return cls(entries, times[entries])
+
+    def save(self, folder):
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        np.save(folder / "entries.npy", self.entries)
+        np.save(folder / "times.npy", self.times)
+
+    @classmethod
+    def load(cls, folder):
+        folder = Path(folder)
+        return cls(
+            np.load(folder / "entries.npy", mmap_mode="r"),
+            np.load(folder / "times.npy", mmap_mode="r"),
+        )
+
+    def slab(self, start, stop, time_window, all_digi_open_coinc_gate):
+        """Return the part of the index needed to find the coincidences of the
+        windows opened by the singles start to stop-1 (in time order), i.e.
+        extended by one time window after stop (and before start if a single
+        inside a previous window cannot open one), and the position of start
+        in this part."""
+        a0 = start
+        if not all_digi_open_coinc_gate:
+            a0 = int(
+                np.searchsorted(self.times, self.times[start] - time_window, "left")
+            )
+        e = int(
+            np.searchsorted(self.times, self.times[stop - 1] + time_window, "right")
+        )
+        slab = SinglesTimeIndex(
+            np.array(self.entries[a0:e]), np.array(self.times[a0:e])
+        )
+        return slab, start - a0
+
+    @classmethod
+    def from_tree(cls, singles_tree, index_folder=None, step_size=1000000):
+        """Read the index from index_folder if it exists, otherwise build it
+        (and save it to index_folder if given)."""
+        if index_folder is not None and (Path(index_folder) / "times.npy").exists():
+            index = cls.load(index_folder)
+            if len(index) != singles_tree.num_entries:
+                raise ValueError(
+                    f"The time index in {index_folder} has {len(index)} entries "
+                    f"while the singles tree has {singles_tree.num_entries}"
+                )
+            return index
+        index = cls.build(singles_tree, step_size)
+        if index_folder is not None:
+            # the saved index is memory-mapped instead of kept in memory
+            index.save(index_folder)
+            index = cls.load(index_folder)
+        return index
+
+
+def _read_singles_entries(singles_tree, branches, entries, max_read_size):
+    """Read the given (unordered) tree entries. Entries are read as contiguous
+    ranges of at most max_read_size entries (the entries of a range that are
+    not needed are read and dropped), so that out-of-order singles (e.g. one
+    block per thread) neither require loading the whole tree nor reading
+    large ranges at once."""
+    sorted_entries = np.sort(entries)
+    splits = np.nonzero(np.diff(sorted_entries) >= max_read_size)[0] + 1
+    parts = {b: [] for b in branches}
+    for run in np.split(sorted_entries, splits):
+        # a run without large gaps can still span many entries
+        offsets = (run - run[0]) // max_read_size
+        sub_splits = np.nonzero(np.diff(offsets))[0] + 1
+        for sub_run in np.split(run, sub_splits):
+            arrays = singles_tree.arrays(
+                branches,
+                entry_start=sub_run[0],
+                entry_stop=sub_run[-1] + 1,
+                library="np",
+            )
+            for b in branches:
+                parts[b].append(arrays[b][sub_run - sub_run[0]])
+    rows = np.searchsorted(sorted_entries, entries)
+    return {b: np.concatenate(parts[b])[rows] for b in branches}
+
+
+def _iterate_coincidences(
+    singles_tree,
+    time_index,
+    time_window,
+    block_size,
+    allow_intra_volume_coincidences,
+    all_digi_open_coinc_gate,
+    start=0,
+    stop=None,
+):
+    """
+    Generator of coincidence DataFrames, one per block of block_size singles
+    (in chronological order) that open a time window. All the coincidences of a
+    window are in the same block, so the policies can be applied per block.
+    Only the windows opened by the singles start to stop-1 are considered.
+
+    For each single i (in time order), its window contains the singles i+1 to
+    end[i]-1, with end = searchsorted(times, times + time_window, "right").
+    Only the singles of the block and of the windows it opens are read.
+    """
+    branches = list(singles_tree.keys())
+    entries = time_index.entries
+    times = time_index.times
+    n = len(times) if stop is None else stop
+    a = start
+    while a < n:
+        b = min(a + block_size, n)
+        # If all singles cannot open a window, we also need the windows of the
+        # previous singles that may contain singles of this block.
+        a0 = a
+        if not all_digi_open_coinc_gate:
+            a0 = int(np.searchsorted(times, times[a] - time_window, side="left"))
+        e = int(np.searchsorted(times, times[b - 1] + time_window, side="right"))
+
+        # pairs (i1, i2) of local positions in [a0, e), sorted by i1 then i2
+        t = np.asarray(times[a0:e])
+        n_open = b - a0
+        ends = np.searchsorted(t, t[:n_open] + time_window, side="right")
+        counts = ends - np.arange(1, n_open + 1)
+        i1 = np.repeat(np.arange(n_open), counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        i2 = i1 + 1 + (np.arange(len(i1)) - first)
+
+        block_entries = np.asarray(entries[a0:e])
+        singles = _read_singles_entries(
+            singles_tree, branches, block_entries, max_read_size=block_size
+        )
+        singles["SingleIndex"] = block_entries
+
+        if not allow_intra_volume_coincidences:
+            # Remove coincidences between singles in the same volume
+            # (comparing integer codes is much faster than comparing strings).
+            volume_codes = pd.factorize(singles["PreStepUniqueVolumeID"])[0]
+            keep = volume_codes[i1] != volume_codes[i2]
+            i1 = i1[keep]
+            i2 = i2[keep]
+
+        if not all_digi_open_coinc_gate:
+            # If one single opens a time window, then the following singles which
+            # are inside this time window cannot open a time window of their own.
+            inside_a_window = np.zeros(e - a0, dtype=bool)
+            inside_a_window[i2] = True
+            keep = ~inside_a_window[i1]
+            i1 = i1[keep]
+            i2 = i2[keep]
+
+        # only keep the windows opened by the singles of this block
+        keep = i1 >= a - a0
+        i1 = i1[keep]
+        i2 = i2[keep]
+
+        coincidences = {}
+        for name, values in singles.items():
+            coincidences[f"{name}1"] = values[i1]
+            coincidences[f"{name}2"] = values[i2]
+        yield pd.DataFrame(coincidences)
+        a = b
+
+
+def _sort_coincidences_in_blocks(
+    singles_tree,
+    time_index,
+    start,
+    stop,
+    time_window,
+    block_size,
+    all_digi_open_coinc_gate,
+    result_type,
+    policy,
+    min_transaxial_distance,
+    transaxial_plane,
+    max_axial_distance,
+):
+    """
+    Generator of the processed coincidences (policy applied, or decomposed into
+    coincident singles) of the windows opened by the singles start to stop-1,
+    one DataFrame per block.
+    """
+    allow_intra_volume_coincidences = result_type == ResultType.COINCIDENT_SINGLES
+    for coincidences in _iterate_coincidences(
+        singles_tree,
+        time_index,
+        time_window,
+        block_size,
+        allow_intra_volume_coincidences,
+        all_digi_open_coinc_gate,
+        start,
+        stop,
+    ):
+        if result_type == ResultType.COINCIDENCE_PAIRS:
+            # Apply policy for multiple coincidences
+            processed_coincidences = _policy_functions[str.lower(policy)](
+                coincidences,
+                min_transaxial_distance,
+                transaxial_plane,
+                max_axial_distance,
+            )
+            # Remove the temporary SingleIndex columns
+            yield processed_coincidences.drop(columns=["SingleIndex1", "SingleIndex2"])
+        elif result_type == ResultType.COINCIDENT_SINGLES:
+            yield _decompose_coincidence_pairs_into_singles(coincidences)
+
+
+def _sort_coincidences_in_slab(args):
+    """Worker of the parallel sorting: process one time slab, given as the
+    part of the time index it needs (see SinglesTimeIndex.slab)."""
+    file_path, tree_path, slab_index, start, options = args
+    with uproot.open(file_path) as root_file:
+        singles_tree = root_file[tree_path]
+        stop = start + options["block_size"]
+        blocks = list(
+            _sort_coincidences_in_blocks(
+                singles_tree,
+                slab_index,
+                start,
+                min(stop, len(slab_index)),
+                **options,
+            )
+        )
+    return blocks[0] if len(blocks) == 1 else pd.concat(blocks, ignore_index=True)
+
+
 def _coincidences_sorter(
     singles_tree,
     time_window,
@@ -254,6 +524,8 @@ def _coincidences_sorter(
     return_type="dict",
     output_file_path=None,
     output_file_format="root",
+    time_index_folder=None,
+    n_workers=1,
 ):
     # Check the availability of the necessary branches in the root file
     required_branches = {
@@ -277,20 +549,12 @@ def _coincidences_sorter(
             )
 
     # Check validity of policy parameter
-    policy_functions = {
-        str.lower("RemoveMultiples"): _remove_multiples,
-        str.lower("TakeAllGoods"): _take_all_goods,
-        str.lower("TakeWinnerOfGoods"): _take_winner_of_goods,
-        str.lower("TakeIfOnlyOneGood"): _take_if_only_one_good,
-        str.lower("TakeWinnerIfIsGood"): _take_winner_if_is_good,
-        str.lower("TakeWinnerIfAllAreGoods"): _take_winner_if_all_are_goods,
-    }
     if (
         result_type == ResultType.COINCIDENCE_PAIRS
-        and str.lower(policy) not in policy_functions
+        and str.lower(policy) not in _policy_functions
     ):
         raise ValueError(
-            f"Unknown policy '{policy}', must be one of {policy_functions.keys()}"
+            f"Unknown policy '{policy}', must be one of {_policy_functions.keys()}"
         )
 
     if any((min_transaxial_distance, max_axial_distance)) and not transaxial_plane:
@@ -320,299 +584,94 @@ def _coincidences_sorter(
         if not output_file_path:
             raise ValueError(f"Output file path has not been provided")
 
-    # Since singles in the root file are not guaranteed to be sorted by GlobalTime
-    # (especially in the case of multithreaded simulation), singles in one chunk
-    # may be more recent than the singles in the next chunk.
-    # If that's the case, the chunk size must be increased for successful coincidence sorting.
-    original_chunk_size = chunk_size
-    max_num_chunk_size_increases = 10
-    num_chunk_size_increases = 0
-    processing_finished = False
-    start = time.time()
-    time_lost = 0
-    allow_intra_volume_coincidences = result_type == ResultType.COINCIDENT_SINGLES
-    while (
-        not processing_finished
-        and num_chunk_size_increases < max_num_chunk_size_increases
-    ):
-        try:
-            if output_file_path:
-                output_file = CoincidenceOutputFile(
-                    output_file_path, output_file_format
-                )
-
-            # A double-ended queue is used as a FIFO to store the current and the next chunk of singles
-            queue = deque()
-            num_singles = 0
-            coincidences_to_transfer = None
-            coincidences_to_return = []
-            for chunk in singles_tree.iterate(step_size=chunk_size):
-                num_singles_in_chunk = len(chunk)
-                # Convert chunk to pandas DataFrame
-                chunk_pd = ak.to_dataframe(chunk)
-                # Add a temporary column to assist in applying the various policies
-                chunk_pd["SingleIndex"] = range(
-                    num_singles, num_singles + num_singles_in_chunk
-                )
-                # Add chunk to the right of the queue
-                queue.append(chunk_pd)
-                # Process a chunk, unless only one has been read so far
-                if len(queue) > 1:
-                    coincidences = _process_chunk(
-                        queue, time_window, allow_intra_volume_coincidences
-                    )
-                    # Before filtering coincidences, we want to make sure that we have all
-                    # coincidences that belong to the same time window (same SingleIndex1 value).
-                    # When processing the next chunk of singles, we may still find one or more
-                    # coincidences that belong to the same time window as the last coincidence so far.
-                    #
-                    # All coincidences that have a SingleIndex1 value different from the last one
-                    # can already be filtered, the others will be transferred to be filtered in
-                    # the next iteration.
-                    coincidences_to_process = coincidences.loc[
-                        coincidences["SingleIndex1"]
-                        != coincidences["SingleIndex1"].iloc[-1]
-                    ].reset_index(drop=True)
-                    if coincidences_to_transfer is not None:
-                        coincidences_to_process = pd.concat(
-                            [coincidences_to_transfer, coincidences_to_process],
-                            axis=0,
-                            ignore_index=True,
-                        )
-                    coincidences_to_transfer = coincidences.loc[
-                        coincidences["SingleIndex1"]
-                        == coincidences["SingleIndex1"].iloc[-1]
-                    ].reset_index(drop=True)
-
-                    if not allDigiOpenCoincGate:
-                        # If one single opens a time window, then the following singles which are inside this time window
-                        # cannot open a time window of their own.
-                        # This means that, if a single's index appears in the column "SingleIndex2", then we won't consider
-                        # coincidences where the same index appears in the column "SingleIndex1".
-                        # Remove rows from coincidences_to_process where the "SingleIndex1" value is present in
-                        # the "SingleIndex2" of any row.
-                        indices_to_remove = coincidences_to_process[
-                            "SingleIndex1"
-                        ].isin(coincidences_to_process["SingleIndex2"])
-                        coincidences_to_process = coincidences_to_process[
-                            ~indices_to_remove
-                        ].reset_index(drop=True)
-
-                    if result_type == ResultType.COINCIDENCE_PAIRS:
-                        # Apply policy for multiple coincidences
-                        processed_coincidences = policy_functions[str.lower(policy)](
-                            coincidences_to_process,
-                            min_transaxial_distance,
-                            transaxial_plane,
-                            max_axial_distance,
-                        )
-                        # Remove the temporary SingleIndex columns
-                        processed_coincidences = processed_coincidences.drop(
-                            columns=["SingleIndex1", "SingleIndex2"]
-                        )
-                    elif result_type == ResultType.COINCIDENT_SINGLES:
-                        processed_coincidences = (
-                            _decompose_coincidence_pairs_into_singles(
-                                coincidences_to_process
-                            )
-                        )
-
-                    if output_file_path:
-                        output_file.add(processed_coincidences)
-                    else:
-                        coincidences_to_return.append(processed_coincidences)
-                    # Remove processed chunk from the left of the queue
-                    queue.popleft()
-                num_singles += num_singles_in_chunk
-
-            # At this point, all chunks have been read. Now process the last chunk.
-            coincidences_to_process = _process_chunk(
-                queue, time_window, allow_intra_volume_coincidences
+    # Singles in the root file are not guaranteed to be sorted by GlobalTime
+    # (especially in the case of multithreaded simulation). Instead of sorting
+    # the singles themselves, a (small) index of the singles sorted by time is
+    # built, then the singles are read and processed block by block in time order.
+    # Besides the index (16 bytes per single, memory-mapped with time_index_folder,
+    # about 24 bytes per single while it is built), the memory is bounded by the
+    # singles of a block and each read by chunk_size entries, whatever the order
+    # of the singles.
+    time_index = SinglesTimeIndex.from_tree(singles_tree, time_index_folder)
+    options = {
+        "time_window": time_window,
+        "block_size": chunk_size,
+        "all_digi_open_coinc_gate": allDigiOpenCoincGate,
+        "result_type": result_type,
+        "policy": policy,
+        "min_transaxial_distance": min_transaxial_distance,
+        "transaxial_plane": transaxial_plane,
+        "max_axial_distance": max_axial_distance,
+    }
+    output_file = None
+    if output_file_path:
+        output_file = CoincidenceOutputFile(output_file_path, output_file_format)
+    coincidences_to_return = []
+    pool = None
+    try:
+        if n_workers is None or int(n_workers) <= 1:
+            processed_blocks = _sort_coincidences_in_blocks(
+                singles_tree, time_index, 0, len(time_index), **options
             )
-            if coincidences_to_transfer is not None:
-                coincidences_to_process = pd.concat(
-                    [coincidences_to_transfer, coincidences_to_process],
-                    axis=0,
-                    ignore_index=True,
-                )
-
-            if not allDigiOpenCoincGate:
-                indices_to_remove = coincidences_to_process["SingleIndex1"].isin(
-                    coincidences_to_process["SingleIndex2"]
-                )
-                coincidences_to_process = coincidences_to_process[
-                    ~indices_to_remove
-                ].reset_index(drop=True)
-
-            if result_type == ResultType.COINCIDENCE_PAIRS:
-                processed_coincidences = policy_functions[str.lower(policy)](
-                    coincidences_to_process,
-                    min_transaxial_distance,
-                    transaxial_plane,
-                    max_axial_distance,
-                )
-                # Remove the temporary SingleIndex columns
-                processed_coincidences = processed_coincidences.drop(
-                    columns=["SingleIndex1", "SingleIndex2"]
+        else:
+            # The time axis is split into slabs of chunk_size singles opening a
+            # window, each slab (extended by one time window) is processed by a
+            # worker. A window belongs to the slab of the single that opens it,
+            # so no coincidence is found twice at the slab boundaries, and the
+            # slabs are gathered in time order: the result does not depend on
+            # the number of workers.
+            file_path = singles_tree.file.file_path
+            if not os.path.exists(file_path):
+                raise ValueError(
+                    f"n_workers > 1 requires a singles tree read from a file, "
+                    f"'{file_path}' does not exist"
                 )
-            elif result_type == ResultType.COINCIDENT_SINGLES:
-                processed_coincidences = _decompose_coincidence_pairs_into_singles(
-                    coincidences_to_process
+            slabs = (
+                (file_path, singles_tree.object_path)
+                + time_index.slab(
+                    start,
+                    min(start + chunk_size, len(time_index)),
+                    time_window,
+                    allDigiOpenCoincGate,
                 )
+                + (options,)
+                for start in range(0, len(time_index), chunk_size)
+            )
+            pool = multiprocessing.get_context("spawn").Pool(processes=int(n_workers))
+            processed_blocks = pool.imap(_sort_coincidences_in_slab, slabs)
 
-            if output_file_path:
+        for processed_coincidences in processed_blocks:
+            if output_file is not None:
                 output_file.add(processed_coincidences)
             else:
                 coincidences_to_return.append(processed_coincidences)
 
-            processing_finished = True
-
-        except ChunkSizeTooSmallError:
-            # Double chunk size and start all over again
-            chunk_size *= 2
-            num_chunk_size_increases += 1
-            time_lost = time.time() - start
-
-        finally:
-            if output_file_path:
-                output_file.close()
-
-    if not processing_finished:
-        # Coincidence sorting has failed, even after repeated increases of the chunk size
-        raise ChunkSizeTooSmallError
-
-    if num_chunk_size_increases > 0:
-        time_reduction = time_lost / (time.time() - start)
-        if time_reduction >= 0.01:
-            logger.warning(
-                f"Coincidence sorting execution time can be reduced by {time_reduction*100:.02f}% by using chunk_size {chunk_size} instead of {original_chunk_size}"
-            )
+        if pool is not None:
+            pool.close()
+            pool.join()
+    except Exception:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        raise
+    finally:
+        if output_file is not None:
+            output_file.close()
 
     if output_file_path is None:
-        # Combine all coincidences from all chunks into a single pandas DataFrame
-        coincidences_to_return = pd.concat(
-            coincidences_to_return, axis=0, ignore_index=True
-        )
+        # Combine all coincidences from all blocks into a single pandas DataFrame
+        if len(coincidences_to_return) > 0:
+            coincidences_to_return = pd.concat(
+                coincidences_to_return, axis=0, ignore_index=True
+            )
+        else:
+            coincidences_to_return = pd.DataFrame()
         if return_type == "dict":
             return coincidences_to_return.to_dict(orient="list")
         elif return_type == "pd":
             return coincidences_to_return
 
 
-def _process_chunk(queue, time_window, allow_intra_volume_coincidences):
-    """
-    Processes singles in the chunk queue[0],
-    possibly transferring some of those singles to the next chunk queue[1].
-    """
-    chunk = queue[0]
-    next_chunk = queue[1] if len(queue) > 1 else None
-
-    t1 = chunk["GlobalTime"]
-    t1_min = np.min(t1)
-    t1_max = np.max(t1)
-
-    if next_chunk is not None:
-        t2 = next_chunk["GlobalTime"]
-        t2_min = np.min(t2)
-        t2_max = np.max(t2)
-        # Require that the next chunk's time interval starts later than
-        # the start time of the current chunk's time interval.
-        if t2_min <= t1_min:
-            raise ChunkSizeTooSmallError
-
-    # Find coincidences in the current chunk
-    coincidences = _run_coincidence_detection_in_chunk(
-        chunk, time_window, allow_intra_volume_coincidences
-    )
-
-    if next_chunk is not None:
-        # If there are singles in the current chunk that are beyond t_min
-        # of the next chunk minus time_window, then we want to process them
-        # in the next chunk as well.
-
-        # Remove any coincidences for which those singles have opened the time window
-        # in the current chunk.
-        coincidences = coincidences.loc[
-            coincidences["GlobalTime1"] < t2_min - time_window
-        ].reset_index(drop=True)
-        # Find and add singles to be treated in the next chunk
-        singles_to_transfer = chunk.loc[
-            chunk["GlobalTime"] >= t2_min - time_window
-        ].reset_index(drop=True)
-        queue[1] = pd.concat([singles_to_transfer, next_chunk], axis=0)
-
-    return coincidences
-
-
-def _run_coincidence_detection_in_chunk(
-    chunk, time_window, allow_intra_volume_coincidences
-):
-    """
-    Detects coincidences between singles in the given chunk, excluding coincidences
-    between singles in the same volume.
-    """
-    if not allow_intra_volume_coincidences:
-        # Add a temporary column containing hash values of the strings identifying the volumes,
-        # to assist in excluding coincidences between singles in the same volume
-        # (calculating and comparing hash values is much faster than comparing strings).
-        chunk["VolumeIDHash"] = pd.util.hash_pandas_object(
-            chunk["PreStepUniqueVolumeID"], index=False
-        )
-    time_np = chunk["GlobalTime"].to_numpy()
-    # Sort the time values chronologically (singles in the chunk may not be in chronological order).
-    time_np_sorted_indices = np.argsort(time_np)
-    time_np = time_np[time_np_sorted_indices]
-    # Create NumPy arrays for the indices of the first and second single in each coincidence.
-    indices1 = np.zeros((0,), dtype=np.int32)
-    indices2 = np.zeros((0,), dtype=np.int32)
-    # Repeatedly consider single pairs that are 1, 2, etc. positions apart in the sorted list,
-    # until no more coincidences can be found.
-    offset = 1
-    while True:
-        delta_time = time_np[offset:] - time_np[:-offset]
-        indices = np.nonzero(delta_time <= time_window)[0]
-        if len(indices) == 0:
-            break
-        indices1 = np.concatenate((indices1, indices))
-        indices2 = np.concatenate((indices2, indices + offset))
-        offset += 1
-    # Combine indices1 and indices2 in a two-column NumPy array.
-    indices12 = np.vstack((indices1, indices2)).T
-    # Sort rows such that index1 is increasing, and for rows with the same
-    # index1 value, index2 is increasing.
-    indices12 = indices12[np.lexsort((indices12[:, 1], indices12[:, 0]))]
-    # Create dictionaries to create the names of the columns in the coincidences pandas DataFrame.
-    rename_dict1 = {name: name + "1" for name in chunk.columns.tolist()}
-    rename_dict2 = {name: name + "2" for name in chunk.columns.tolist()}
-    # Create pandas DataFrames with the sorted singles that are part of the coincidences.
-    coincidence_singles1 = (
-        chunk.iloc[time_np_sorted_indices[indices12[:, 0]]]
-        .rename(columns=rename_dict1)
-        .reset_index(drop=True)
-    )
-    coincidence_singles2 = (
-        chunk.iloc[time_np_sorted_indices[indices12[:, 1]]]
-        .rename(columns=rename_dict2)
-        .reset_index(drop=True)
-    )
-    # Combine both DataFrames into one, interleaving the columns.
-    interleaved_columns = list(
-        chain(*zip(coincidence_singles1.columns, coincidence_singles2.columns))
-    )
-    coincidences = pd.concat([coincidence_singles1, coincidence_singles2], axis=1)[
-        interleaved_columns
-    ]
-    if not allow_intra_volume_coincidences:
-        # Remove coincidences between singles in the same volume.
-        coincidences = coincidences.loc[
-            coincidences["VolumeIDHash1"] != coincidences["VolumeIDHash2"]
-        ].reset_index(drop=True)
-        # Remove the temporary volume ID hash columns.
-        coincidences = coincidences.drop(columns=["VolumeIDHash1", "VolumeIDHash2"])
-
-    return coincidences
-
-
 def _remove_multiples(
     coincidences, min_transaxial_distance, transaxial_plane, max_axial_distance
 ):
@@ -709,6 +768,16 @@ def _take_winner_if_all_are_goods(
     return _filter_max_energy(filtered_coincidences)
 
 
+_policy_functions = {
+    str.lower("RemoveMultiples"): _remove_multiples,
+    str.lower("TakeAllGoods"): _take_all_goods,
+    str.lower("TakeWinnerOfGoods"): _take_winner_of_goods,
+    str.lower("TakeIfOnlyOneGood"): _take_if_only_one_good,
+    str.lower("TakeWinnerIfIsGood"): _take_winner_if_is_good,
+    str.lower("TakeWinnerIfAllAreGoods"): _take_winner_if_all_are_goods,
+}
+
+
 def _filter_multi(coincidences):
 
     # Coincidences with the same value of SingleIndex1 belong to the same time window.
@@ -755,8 +824,10 @@ def _filter_max_energy(coincidences):
     )
     # Of all the coincidences with the same "SingleIndex1" value (belonging to the same time window),
     # only keep the one with the highest value in column "TotalEnergyInCoincidence".
+    # The windows are kept in time order (SingleIndex1 is the tree entry, which
+    # is not chronological for multithreaded singles).
     filtered_coincidences = filtered_coincidences.loc[
-        filtered_coincidences.groupby("SingleIndex1")[
+        filtered_coincidences.groupby("SingleIndex1", sort=False)[
             "TotalEnergyInCoincidence"
         ].idxmax()
     ]
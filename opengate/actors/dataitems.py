@@ -1092,6 +1092,44 @@ class RootDataItem(DataItem):
                 (branch_name, chunk[branch_name]) for branch_name in branch_names
             )
 
+    @staticmethod
+    def _remap_run_ids(run_ids, run_id_map):
+        """Map child-local RunID values to the original run indices with a dense
+        lookup table. RunID values which are not in the map are kept.
+        """
+        if len(run_id_map) == 0 or len(run_ids) == 0:
+            return run_ids
+        keys = np.fromiter(run_id_map.keys(), dtype=np.int64, count=len(run_id_map))
+        values = np.fromiter(run_id_map.values(), dtype=np.int64, count=len(run_id_map))
+        first = keys.min()
+        lookup_table = np.arange(first, keys.max() + 1, dtype=np.int64)
+        lookup_table[keys - first] = values
+        indices = run_ids.astype(np.int64) - first
+        inside = (indices >= 0) & (indices < len(lookup_table))
+        if inside.all():
+            remapped = np.take(lookup_table, indices)
+        else:
+            remapped = run_ids.astype(np.int64)
+            remapped[inside] = np.take(lookup_table, indices[inside])
+        return remapped.astype(run_ids.dtype, copy=False)
+
+    @staticmethod
+    def _remap_event_ids(event_ids, local_run_ids, event_id_state):
+        """Shift each contiguous same-RunID block of EventID by the next free
+        event id. The offsets of all blocks are computed with a cumulative sum.
+        """
+        change_indices = np.flatnonzero(np.diff(local_run_ids) != 0) + 1
+        block_stops = np.append(change_indices, len(event_ids))
+        block_lengths = np.diff(block_stops, prepend=0)
+        # offset of block b+1 = offset of block b + last EventID of block b + 1
+        last_event_ids = event_ids[block_stops - 1].astype(np.int64) + 1
+        offsets = event_id_state["next_event_id"] + np.concatenate(
+            ([0], np.cumsum(last_event_ids))
+        )
+        remapped_event_ids = event_ids + np.repeat(offsets[:-1], block_lengths)
+        event_id_state["next_event_id"] = int(offsets[-1])
+        return remapped_event_ids.astype(event_ids.dtype, copy=False)
+
     def _remap_chunk_identifiers(self, chunk_payload, merge_source, event_id_state):
         remapped_payload = OrderedDict()
         run_id_map = {
@@ -1112,10 +1150,8 @@ class RootDataItem(DataItem):
 
         for branch_name, branch_values in chunk_payload.items():
             if branch_name == "RunID":
-                run_ids = np.asarray(branch_values)
-                remapped_payload[branch_name] = np.asarray(
-                    [run_id_map.get(int(run_id), int(run_id)) for run_id in run_ids],
-                    dtype=run_ids.dtype,
+                remapped_payload[branch_name] = self._remap_run_ids(
+                    np.asarray(branch_values), run_id_map
                 )
             elif branch_name == "EventID":
                 event_ids = np.asarray(branch_values)
@@ -1138,32 +1174,20 @@ class RootDataItem(DataItem):
                     # respecting the fact that child-local EventID restarts from
                     # zero whenever the child simulation moves to its next local
                     # run.
-                    remapped_event_ids = np.empty_like(event_ids)
-                    change_indices = np.flatnonzero(np.diff(local_run_ids) != 0) + 1
-                    block_starts = np.concatenate(([0], change_indices))
-                    block_stops = np.concatenate((change_indices, [len(local_run_ids)]))
-                    for start, stop in zip(block_starts, block_stops):
-                        block_event_ids = event_ids[start:stop]
-                        if len(block_event_ids) == 0:
-                            continue
-                        # Within one contiguous local-run block, EventID is
-                        # already ordered and can be shifted by one constant
-                        # offset. The next block starts a fresh local EventID
-                        # sequence, so the global offset must be updated at each
-                        # boundary.
-                        remapped_event_ids[start:stop] = (
-                            block_event_ids + event_id_state["next_event_id"]
-                        )
-                        event_id_state["next_event_id"] = (
-                            int(remapped_event_ids[stop - 1]) + 1
-                        )
-                    remapped_payload[branch_name] = remapped_event_ids
+                    remapped_payload[branch_name] = self._remap_event_ids(
+                        event_ids, local_run_ids, event_id_state
+                    )
             else:
                 remapped_payload[branch_name] = branch_values
         return remapped_payload
 
     def stream_merge_to_writer(
-        self, writer, tree_name=None, step_size="64 MB", event_id_state=None
+        self,
+        writer,
+        tree_name=None,
+        step_size="64 MB",
+        event_id_state=None,
+        merge_sources=None,
     ):
         if not self.has_root_meta_data():
             fatal("Cannot stream-merge ROOT output because no ROOT metadata exists.")
@@ -1173,7 +1197,9 @@ class RootDataItem(DataItem):
         if event_id_state is None:
             event_id_state = {"next_event_id": 0}
 
-        for merge_source in self.root_meta_data.get("merge_sources", []):
+        if merge_sources is None:
+            merge_sources = self.root_meta_data.get("merge_sources", [])
+        for merge_source in merge_sources:
             for chunk in self._iter_merge_source_chunks(
                 merge_source, step_size=step_size, library="ak"
             ):
@@ -1219,6 +1245,9 @@ class RootDataItem(DataItem):
             if owns_writer:
                 writer.close()
 
+        self.set_merged_root_output_path(output_path, metadata_path=metadata_path)
+
+    def set_merged_root_output_path(self, output_path, metadata_path=None):
         self.root_meta_data["root_output_path"] = str(Path(output_path).resolve())
         if metadata_path is not None:
             self.save_root_metadata(metadata_path)
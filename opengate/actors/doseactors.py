@@ -256,7 +256,9 @@ class VoxelDepositActor(ActorBase):
                 data.append(None)
         self.user_output[output_name].store_data(run_index, *data)
 
-    def push_to_cpp_image(self, output_name, run_index, *cpp_image, copy_data=True):
+    def push_to_cpp_image(
+        self, output_name, run_index, *cpp_image, copy_data=True, allocate=True
+    ):
         self._assert_output_exists(output_name)
         for i, cppi in enumerate(cpp_image):
             if self.user_output[output_name].get_active(item=i):
@@ -264,6 +266,7 @@ class VoxelDepositActor(ActorBase):
                     self.user_output[output_name].get_data(run_index, item=i),
                     cppi,
                     copy_data,
+                    allocate=allocate,
                 )
 
     def EndOfRunActionMasterThread(self, run_index):
@@ -321,6 +324,8 @@ class DoseActor(VoxelDepositActor, g4.GateDoseActor):
 
     # hints for IDE
     score_in: str
+    thread_local_scoring: bool
+    scoring_backend: str
 
     user_info_defaults = {
         "square": (
@@ -446,6 +451,31 @@ class DoseActor(VoxelDepositActor, g4.GateDoseActor):
                 "deactivated": True,
             },
         ),
+        "thread_local_scoring": (
+            False,
+            {
+                "doc": "If True, each thread scores into its own flat buffers which are summed into the "
+                "output images at the end of each run, instead of locking a mutex shared by all threads "
+                "at every step. This removes the contention in multithreaded simulations at the cost of "
+                "memory: each thread allocates one buffer of 8 bytes per voxel for every scored quantity "
+                "(edep, dose, counts, and their squared values if uncertainty is scored). "
+                "Recommended for many threads and scoring grids that fit n_threads times in memory.",
+            },
+        ),
+        "scoring_backend": (
+            "dense",
+            {
+                "doc": "Storage used during the run. 'dense' scores in full images. "
+                "'sparse' scores in thread local hashes of 8x8x8 voxel bricks, which are only allocated "
+                "when a voxel is touched (32 bytes per voxel for each scored quantity and thread), and "
+                "the full images are only created at the end of the run (so the peak memory is still the "
+                "size of the output images plus the bricks). This is useful for large grids (e.g. a CT) "
+                "where only a small region is irradiated (pencil beam, brachytherapy), instead of the "
+                "per-thread full buffers of thread_local_scoring. 'sparse' implies thread_local_scoring "
+                "and cannot be used with uncertainty_goal.",
+                "allowed_values": ("dense", "sparse"),
+            },
+        ),
     }
 
     user_output_config = {
@@ -608,6 +638,17 @@ class DoseActor(VoxelDepositActor, g4.GateDoseActor):
         )
         # item=0 is the default
         self.SetCountsFlag(self.user_output.counts.get_active())
+        if self.scoring_backend == "sparse":
+            if self.uncertainty_goal is not None:
+                fatal(
+                    f"In actor {self.name}: scoring_backend='sparse' cannot be used "
+                    f"with uncertainty_goal because the images are only filled at the end of the run."
+                )
+            self.SetSparseScoringFlag(True)
+            self.SetThreadLocalScoringFlag(True)
+        else:
+            self.SetSparseScoringFlag(False)
+            self.SetThreadLocalScoringFlag(self.thread_local_scoring)
         self.SetScoreInMaterial(self.score_in)
         self.SetFastSPRCalculationFlag(self.fast_SPR_calculation)
         self.SetReferenceEnergySPR(self.reference_energy_SPR)
@@ -636,26 +677,41 @@ class DoseActor(VoxelDepositActor, g4.GateDoseActor):
         self.InitializeCpp()
 
     def BeginOfRunActionMasterThread(self, run_index):
-        self.prepare_output_for_run("edep_with_uncertainty", run_index)
+        # with the sparse backend, the images are only allocated (on the cpp side)
+        # at the end of the run, so we only set their geometry here
+        dense = self.scoring_backend == "dense"
+        self.prepare_output_for_run("edep_with_uncertainty", run_index, allocate=dense)
         self.push_to_cpp_image(
             "edep_with_uncertainty",
             run_index,
             self.cpp_edep_image,
             self.cpp_edep_squared_image,
+            copy_data=dense,
+            allocate=dense,
         )
 
         if self.user_output.dose_with_uncertainty.get_active(item="any"):
-            self.prepare_output_for_run("dose_with_uncertainty", run_index)
+            self.prepare_output_for_run(
+                "dose_with_uncertainty", run_index, allocate=dense
+            )
             self.push_to_cpp_image(
                 "dose_with_uncertainty",
                 run_index,
                 self.cpp_dose_image,
                 self.cpp_dose_squared_image,
+                copy_data=dense,
+                allocate=dense,
             )
 
         if self.user_output.counts.get_active():
-            self.prepare_output_for_run("counts", run_index)
-            self.push_to_cpp_image("counts", run_index, self.cpp_counts_image)
+            self.prepare_output_for_run("counts", run_index, allocate=dense)
+            self.push_to_cpp_image(
+                "counts",
+                run_index,
+                self.cpp_counts_image,
+                copy_data=dense,
+                allocate=dense,
+            )
 
         g4.GateDoseActor.BeginOfRunActionMasterThread(self, run_index)
 
@@ -1,3 +1,6 @@
+import multiprocessing
+import threading
+from collections import OrderedDict
 from typing import Optional
 
 import opengate_core as g4
@@ -7,6 +10,7 @@ from ..geometry.utility import rot_np_as_g4, vec_np_as_g4
 from ..exception import fatal
 from .base import ActorBase
 from ..decorators import requires_fatal
+from ..image import read_image_and_3D_CDF, create_image_like_info
 
 
 class DynamicActorBase(ActorBase, g4.GateVActor):
@@ -199,6 +203,8 @@ class VolumeImageChanger(GeometryChanger):
     # hints for IDE
     images: Optional[list]
     label_image: Optional[dict]
+    max_label_images: int
+    prefetch_next_image: bool
 
     user_info_defaults = {
         "images": (
@@ -217,24 +223,94 @@ class VolumeImageChanger(GeometryChanger):
                 "stored in the user info 'images'.",
             },
         ),
+        "max_label_images": (
+            0,
+            {
+                "doc": "Maximum number of label images kept in memory (0 means no limit). "
+                "The least recently used ones are evicted and created again when needed.",
+            },
+        ),
+        "prefetch_next_image": (
+            True,
+            {
+                "doc": "If True, the label image of the next run is created in a background "
+                "thread while the current run is simulated.",
+            },
+        ),
     }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._prefetch_thread = None
+
+    def __getstate__(self):
+        return_dict = super().__getstate__()
+        return_dict["_lock"] = None
+        return_dict["_prefetch_thread"] = None
+        return return_dict
+
     def initialize(self):
-        # Build the heavy ITK label-image cache at runtime rather than during
-        # config resolution. The changer itself must already exist earlier for
-        # split-job serialization, but the cache can be reconstructed from the
+        # The label images are created on demand (at the beginning of the run
+        # that needs them, or in advance by the prefetch thread), from the
         # attached ImageVolume and the serialized image list.
+        # The dict is kept in LRU order (most recently used last).
         self.label_image = {}
-        for path_to_image in set(self.images):
-            itk_image = self.attached_to_volume.load_input_image(path_to_image)
-            self.label_image[str(path_to_image)] = (
-                self.attached_to_volume.create_label_image(itk_image)
-            )
+        self._lock = threading.Lock()
+        self._prefetch_thread = None
+
+    def get_label_image(self, path_to_image):
+        key = str(path_to_image)
+        with self._lock:
+            if key in self.label_image:
+                label_image = self.label_image.pop(key)
+                self.label_image[key] = label_image
+                return label_image
+        label_image = self.create_label_image(path_to_image)
+        with self._lock:
+            self.label_image[key] = label_image
+            # evict the least recently used
+            while 0 < self.max_label_images < len(self.label_image):
+                del self.label_image[next(iter(self.label_image))]
+        return label_image
+
+    def create_label_image(self, path_to_image):
+        # the on-disk cache, if any, is the one of the volume
+        # (ImageVolume.label_image_cache_folder)
+        volume = self.attached_to_volume
+        return volume.create_label_image(volume.load_input_image(path_to_image))
+
+    def _prefetch(self, path_to_image):
+        try:
+            self.get_label_image(path_to_image)
+        except Exception:
+            # it will be created (and the error raised) when needed
+            pass
+
+    def start_prefetch(self, run_id):
+        if not self.prefetch_next_image or run_id + 1 >= len(self.images):
+            return
+        path_to_image = self.images[run_id + 1]
+        if str(path_to_image) in self.label_image:
+            return
+        self._prefetch_thread = threading.Thread(
+            target=self._prefetch,
+            args=(path_to_image,),
+            name=f"{self.name}_prefetch",
+            daemon=True,
+        )
+        self._prefetch_thread.start()
 
     def apply_change(self, run_id):
+        # wait for the label image prefetched during the previous run
+        if self._prefetch_thread is not None:
+            self._prefetch_thread.join()
+            self._prefetch_thread = None
         self.attached_to_volume.update_label_image(
-            self.label_image[str(self.images[run_id])]
+            self.get_label_image(self.images[run_id])
         )
+        # prepare the next one while this run is simulated
+        self.start_prefetch(run_id)
 
 
 class VolumeTranslationChanger(GeometryChanger):
@@ -340,10 +416,19 @@ class VolumeRotationChanger(GeometryChanger):
         self.g4_physical_volume.SetRotationHepRep3x3(self.g4_rotations[run_id])
 
 
+def _read_activity_frame(args):
+    # worker of the pool in SourceActivityImageChanger.prepare_all_frames
+    return read_image_and_3D_CDF(*args)
+
+
 class SourceActivityImageChanger(SourceChanger):
 
     # hints for IDE
     activity_images: Optional[list]
+    prepare_frames: bool
+    n_workers: int
+    cdf_cache_folder: Optional[str]
+    max_prepared_frames: int
 
     user_info_defaults = {
         "activity_images": (
@@ -355,10 +440,146 @@ class SourceActivityImageChanger(SourceChanger):
                 "doc": "List of activity map file names corresponding to the run timing intervals. ",
             },
         ),
+        "prepare_frames": (
+            False,
+            {
+                "doc": "If True, the CDF of all the activity maps are computed once at initialization, "
+                "and only swapped at the beginning of each run. Otherwise, the activity map is read "
+                "and its CDF computed at the beginning of each run.",
+            },
+        ),
+        "n_workers": (
+            1,
+            {
+                "doc": "With prepare_frames, number of processes used to compute the CDF of the activity maps.",
+            },
+        ),
+        "cdf_cache_folder": (
+            None,
+            {
+                "doc": "With prepare_frames, folder where the CDF are stored on disk, named after a hash "
+                "of the content of the activity maps: the CDF of an image are only computed once, "
+                "also for the next simulations.",
+            },
+        ),
+        "max_prepared_frames": (
+            0,
+            {
+                "doc": "With prepare_frames, maximum number of CDF kept in memory (0 means no limit). "
+                "The least recently used ones are evicted, and read again from the cache folder "
+                "(or computed again) when needed.",
+            },
+        ),
     }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # prepared frames: image hash of each filename, image (geometry only)
+        # of each hash, and CDF (cpp side) of each hash, in LRU order
+        self._frame_keys = {}
+        self._frame_images = {}
+        self._frame_cdfs = OrderedDict()
+
+    def __getstate__(self):
+        # the prepared frames (cpp side) cannot be pickled,
+        # they are prepared again if needed
+        return_dict = super().__getstate__()
+        return_dict["_frame_keys"] = {}
+        return_dict["_frame_images"] = {}
+        return_dict["_frame_cdfs"] = OrderedDict()
+        return return_dict
+
+    def initialize(self):
+        if self.prepare_frames:
+            self.prepare_all_frames()
+
+    def prepare_all_frames(self):
+        """
+        Compute the CDF of all activity maps (in parallel with n_workers) and
+        keep them in memory (up to max_prepared_frames, in run order).
+        """
+        self._frame_keys = {}
+        self._frame_images = {}
+        self._frame_cdfs = OrderedDict()
+        filenames = list(dict.fromkeys(str(f) for f in self.activity_images))
+        # without a cache folder, the CDF are sent back by the workers, only
+        # for the frames that are kept (the first max_prepared_frames ones)
+        args = [
+            (
+                f,
+                self.cdf_cache_folder,
+                self.cdf_cache_folder is None
+                and (self.max_prepared_frames <= 0 or i < self.max_prepared_frames),
+            )
+            for i, f in enumerate(filenames)
+        ]
+        pool = None
+        try:
+            if self.n_workers > 1 and len(filenames) > 1:
+                pool = multiprocessing.get_context("spawn").Pool(
+                    processes=int(self.n_workers)
+                )
+                frames = pool.imap(_read_activity_frame, args)
+            else:
+                frames = map(_read_activity_frame, args)
+            for filename, (key, info, cdf) in zip(filenames, frames):
+                self._frame_keys[filename] = key
+                if key not in self._frame_images:
+                    self._frame_images[key] = create_image_like_info(
+                        info, allocate=False
+                    )
+                if cdf is not None and not self._is_full():
+                    self._add_frame_cdf(key, cdf)
+            if pool is not None:
+                pool.close()
+                pool.join()
+        except Exception:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            raise
+
+        # with a cache folder, the CDF are read (in run order) now. Without,
+        # this only fills the room left by frames with the same content as a
+        # previous one
+        for filename in filenames:
+            if self._is_full():
+                break
+            self.get_frame_cdf(filename)
+
+    def _is_full(self):
+        return 0 < self.max_prepared_frames <= len(self._frame_cdfs)
+
+    def _add_frame_cdf(self, key, cdf):
+        cdf_x, cdf_y, cdf_z = cdf
+        g4_cdf = g4.GateSPSVoxelsCDF()
+        g4_cdf.SetCumulativeDistributionFunction(cdf_z, cdf_y, cdf_x)
+        self._frame_cdfs[key] = g4_cdf
+        # evict the least recently used
+        while 0 < self.max_prepared_frames < len(self._frame_cdfs):
+            self._frame_cdfs.popitem(last=False)
+        return g4_cdf
+
+    def get_frame_cdf(self, filename):
+        key = self._frame_keys[filename]
+        if key in self._frame_cdfs:
+            self._frame_cdfs.move_to_end(key)
+            return self._frame_cdfs[key]
+        # evicted (or not read yet): from the cache folder, or computed again
+        _, _, cdf = read_image_and_3D_CDF(filename, self.cdf_cache_folder)
+        return self._add_frame_cdf(key, cdf)
+
     def apply_change(self, run_id):
-        self.attached_to_source.update_activity_image(self.activity_images[run_id])
+        filename = str(self.activity_images[run_id])
+        if not self.prepare_frames:
+            self.attached_to_source.update_activity_image(filename)
+            return
+        if filename not in self._frame_keys:
+            self.prepare_all_frames()
+        g4_cdf = self.get_frame_cdf(filename)
+        self.attached_to_source.set_activity_frame(
+            self._frame_images[self._frame_keys[filename]], g4_cdf
+        )
 
 
 process_cls(DynamicActorBase)
@@ -20,14 +20,16 @@ The long-term direction is to prefer the generic attribute-comparison path.
 """
 
 import copy
+import math
 import sys
 import uuid
 from typing import Optional
 
 import opengate_core as g4
+from box import Box
 
 from ..base import GateObject, process_cls, create_gate_object_from_dict
-from ..exception import fatal
+from ..exception import fatal, warning
 
 
 class FilterBase(GateObject):
@@ -73,6 +75,29 @@ class FilterBase(GateObject):
 
     def initialize(self):
         self.InitializeUserInfo(self.user_info)
+        self.initialize_statistics()
+
+    def initialize_statistics(self):
+        collect = self.simulation is not None and self.simulation.filter_statistics
+        self.SetCollectStatistics(bool(collect))
+        self.ResetStatistics()
+
+    def get_statistics(self):
+        """
+        Number of evaluations, of accepted steps, accept rate, and total and
+        mean evaluation time (in s, sub-filters included) since the
+        initialization. Only counted if simulation.filter_statistics is True.
+        """
+        evaluations = self.GetNumberOfEvaluations()
+        accepted = self.GetNumberOfAccepted()
+        time = self.GetEvaluationTime()
+        return Box(
+            evaluations=evaluations,
+            accepted=accepted,
+            accept_rate=accepted / evaluations if evaluations > 0 else 0,
+            time=time,
+            mean_time=time / evaluations if evaluations > 0 else 0,
+        )
 
     def __setstate__(self, state):
         self.__dict__ = state
@@ -276,10 +301,14 @@ class AttributeProxy:
         if len(values) == 0:
             fatal(f'one_of() requires at least one value for attribute "{self.name}".')
 
-        filters = [self == value for value in values]
-        if len(filters) == 1:
-            return filters[0]
-        return BooleanFilter(filters=filters, operator="or")
+        if len(values) == 1:
+            return self == values[0]
+        # a single set lookup rather than one comparison per value
+        return AttributeComparisonFilter(
+            attribute=self.name,
+            compare_value=values,
+            compare_operation="in",
+        )
 
     def __invert__(self):
         fatal(
@@ -304,6 +333,8 @@ class BooleanFilter(FilterBase, g4.GateBooleanFilter):
     def __init__(self, *args, **kwargs):
         FilterBase.__init__(self, *args, **kwargs)
         self.__initcpp__()
+        # filters created by compile_filters (merged equality tests)
+        self.compiled_filters = []
         # sim.add_filter(self, self.name)
 
     def __initcpp__(self):
@@ -313,6 +344,106 @@ class BooleanFilter(FilterBase, g4.GateBooleanFilter):
         for subfilter in self.filters:
             subfilter.resolve_and_validate_config(context=context)
 
+    def initialize(self):
+        user_info = dict(self.user_info)
+        user_info["filters"] = self.compile_filters()
+        self.InitializeUserInfo(user_info)
+        self.initialize_statistics()
+
+    def compile_filters(self):
+        """
+        Return the sub-filters to be evaluated, equivalent to self.filters
+        (if simulation.optimize_filters is True):
+        - the equality tests on the same attribute are merged into a single
+          set lookup ('in'), e.g. (F.X == a) | (F.X == b) or, with 'and',
+          (F.X != a) & (F.X != b);
+        - the sub-filters are sorted by increasing expected cost, i.e. the mean
+          evaluation time divided by the probability to decide the result
+          (to reject for 'and', to accept for 'or'), if their statistics
+          were measured in a previous run (simulation.filter_statistics).
+          The sub-filters without statistics (never evaluated, or not in the
+          previous run) are evaluated last.
+        """
+        self.compiled_filters = []
+        if self.simulation is None or not self.simulation.optimize_filters:
+            return list(self.filters)
+        filters = self._merge_equality_filters()
+        return self._sort_filters_by_statistics(
+            filters, self.simulation.filter_manager.statistics
+        )
+
+    def _merge_equality_filters(self):
+        # merged: F == v (or ~(F != v)) with 'or', F != v (or ~(F == v)) with 'and'
+        merged_operation = "eq" if self.operator == "or" else "ne"
+        merged_negate = self.operator == "and"
+        groups = {}
+        keys = []
+        for f in self.filters:
+            key = None
+            if isinstance(f, AttributeComparisonFilter):
+                operation = f.compare_operation
+                if (
+                    operation in ("eq", "ne")
+                    and (operation == merged_operation) != f.negate
+                ) or (operation == "in" and f.negate == merged_negate):
+                    key = (type(f), f.attribute)
+                    values = f.compare_value if operation == "in" else [f.compare_value]
+                    group = groups.setdefault(key, [])
+                    for v in values:
+                        if v not in group:
+                            group.append(v)
+            keys.append(key)
+
+        filters = []
+        done = set()
+        for f, key in zip(self.filters, keys):
+            if key is None or keys.count(key) == 1:
+                filters.append(f)
+                continue
+            if key in done:
+                continue
+            done.add(key)
+            cls, attribute = key
+            merged = cls(
+                name=f"{self.name}_{attribute}_in",
+                attribute=attribute,
+                compare_value=groups[key],
+                compare_operation="in",
+                negate=merged_negate,
+            )
+            merged.simulation = self.simulation
+            merged.initialize()
+            self.compiled_filters.append(merged)
+            filters.append(merged)
+        return filters
+
+    def _sort_filters_by_statistics(self, filters, statistics):
+        if len(filters) < 2 or len(statistics) == 0:
+            return filters
+        stats = [statistics.get(f.name) for f in filters]
+        missing = [f.name for f, st in zip(filters, stats) if st is None]
+        if len(missing) > 0:
+            warning(
+                f"No statistics for the sub-filters {missing} of the filter "
+                f"'{self.name}' (not in the previous run): they are evaluated "
+                f"after the other ones."
+            )
+
+        def expected_cost(st):
+            # probability that this filter decides the result (short-circuit)
+            p = 1 - st.accept_rate if self.operator == "and" else st.accept_rate
+            return st.mean_time / p if p > 0 else math.inf
+
+        # the filters never evaluated (always short-circuited) or without
+        # statistics are kept last, in the user order;
+        # stable sort: the user order is kept for equal costs
+        measured = [
+            i for i, st in enumerate(stats) if st is not None and st.evaluations > 0
+        ]
+        order = sorted(measured, key=lambda i: expected_cost(stats[i]))
+        order += [i for i in range(len(filters)) if i not in measured]
+        return [filters[i] for i in order]
+
     def from_dictionary(self, d):
         serialized_subfilters = d["user_info"].get("filters", [])
         d_without_subfilters = copy.deepcopy(d)
@@ -367,7 +498,10 @@ class AttributeComparisonFilter(FilterBase):
         "compare_value": (None, {"doc": "Reference value used by the comparison."}),
         "compare_operation": (
             None,
-            {"doc": "Comparison operator shorthand such as lt, le, gt, ge, eq."},
+            {
+                "doc": "Comparison operator shorthand such as lt, le, gt, ge, eq, ne, "
+                "in (compare_value is a list of values), contains, startswith."
+            },
         ),
     }
 
@@ -384,9 +518,11 @@ class AttributeComparisonFilter(FilterBase):
         # If the user is calling the factory, choose the correct subclass
         if cls is AttributeComparisonFilter:
             val = kwargs.get("compare_value")
-            if isinstance(val, str):
+            # with the 'in' operation, the value is a list of values
+            values = val if isinstance(val, (list, tuple)) else [val]
+            if len(values) > 0 and all(isinstance(v, str) for v in values):
                 cls = AttributeFilterString
-            elif isinstance(val, int):
+            elif len(values) > 0 and all(isinstance(v, int) for v in values):
                 cls = AttributeFilterInt
             else:
                 # Default to Double for floats or unspecified types
@@ -397,6 +533,13 @@ class AttributeComparisonFilter(FilterBase):
     def resolve_and_validate_config(self, context=None):
         if self.user_info.attribute is None:
             fatal(f"The parameter 'attribute' is required for filter '{self.name}'.")
+        if self.compare_operation == "in" and not isinstance(
+            self.compare_value, (list, tuple)
+        ):
+            fatal(
+                f"The compare_value of filter '{self.name}' must be a list of values "
+                f"with the 'in' operation, not {self.compare_value}."
+            )
 
 
 class AttributeFilterDouble(AttributeComparisonFilter, g4.GateAttributeFilterDouble):
@@ -0,0 +1,236 @@
+import math
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from box import Box
+
+from .exception import fatal
+from .serialization import dump_json, load_json
+from .utility import g4_units
+
+AUTOTUNE_FORMAT_VERSION = 1
+DEFAULT_AUTOTUNE_FILENAME = "autotune.json"
+DEFAULT_AUTOTUNE_BATCH_SIZES = (1000, 10000, 100000)
+PILOT_STATS_ACTOR_NAME = "pilot_stats"
+
+
+def get_sources_with_batch_size(simulation):
+    """Names of the sources that read or generate their particles by batches
+    (phase-space and GAN sources), i.e. with a 'batch_size' parameter.
+    """
+    return [
+        name
+        for name, source in simulation.source_manager.sources.items()
+        if "batch_size" in source.user_info
+    ]
+
+
+def create_pilot_simulation(simulation, pilot_fraction, settings=None):
+    """Copy of the simulation restricted to the first pilot_fraction of each
+    run, with a SimulationStatisticsActor that keeps the counts of each run.
+
+    The sources with a number of primaries get pilot_fraction of them (at
+    least one), the activity sources are shortened by the run time intervals.
+    settings may contain 'number_of_threads' and a 'batch_size' dictionary
+    (source name -> batch size) applied to the copy.
+    Return the pilot simulation and its statistics actor.
+    """
+    if not 0 < pilot_fraction <= 1:
+        fatal(f"The pilot_fraction must be in ]0, 1], got {pilot_fraction}.")
+    from .jobs import _clone_simulation_from_dictionary
+
+    pilot = _clone_simulation_from_dictionary(
+        type(simulation), simulation.to_dictionary()
+    )
+    # the pilot must not consume the settings it is measuring
+    pilot.autotune_filename = None
+    pilot.progress_bar = False
+    pilot.visu = False
+    pilot.run_timing_intervals = [
+        [start, start + (end - start) * pilot_fraction]
+        for start, end in simulation.run_timing_intervals
+    ]
+    for source in pilot.source_manager.sources.values():
+        if source.activity == 0:
+            source.number_of_primaries = [
+                max(1, int(math.ceil(n * pilot_fraction)))
+                for n in np.atleast_1d(source.number_of_primaries)
+            ]
+    if settings is not None:
+        apply_autotune_settings(pilot, settings)
+    stats = pilot.add_actor("SimulationStatisticsActor", PILOT_STATS_ACTOR_NAME)
+    stats.keep_data_per_run = True
+    return pilot, stats
+
+
+def run_pilot_simulation(simulation, pilot_fraction, settings=None):
+    """Run a pilot simulation (see create_pilot_simulation) in a subprocess,
+    with a temporary output directory, and return the measured speed:
+    the number of events, the duration (in s) and the events per second,
+    in total and for each run.
+    """
+    pilot, stats = create_pilot_simulation(simulation, pilot_fraction, settings)
+    with tempfile.TemporaryDirectory(prefix="gate_pilot_") as output_dir:
+        pilot.output_dir = output_dir
+        pilot.run(start_new_process=True)
+    counts = stats.counts
+    duration = counts.duration / g4_units.s
+    events_per_second_per_run = []
+    for run_index in range(len(pilot.run_timing_intervals)):
+        run_counts = stats.user_output.stats.get_data(which=run_index)
+        if run_counts is None or run_counts.duration <= 0 or run_counts.events == 0:
+            run_counts = counts
+        events_per_second_per_run.append(
+            run_counts.events / (run_counts.duration / g4_units.s)
+        )
+    return Box(
+        {
+            "events": int(counts.events),
+            "duration": float(duration),
+            "events_per_second": (
+                float(counts.events / duration) if duration > 0 else 0.0
+            ),
+            "events_per_second_per_run": [float(v) for v in events_per_second_per_run],
+        }
+    )
+
+
+def _default_thread_counts(cpu_count):
+    thread_counts = [1]
+    while thread_counts[-1] * 2 <= cpu_count:
+        thread_counts.append(thread_counts[-1] * 2)
+    if thread_counts[-1] != cpu_count:
+        thread_counts.append(cpu_count)
+    return thread_counts
+
+
+def autotune_simulation(
+    simulation,
+    pilot_fraction=0.01,
+    thread_counts=None,
+    batch_sizes=None,
+    output_filename=DEFAULT_AUTOTUNE_FILENAME,
+):
+    """Run pilot simulations with several thread counts, then with several
+    batch sizes for each phase-space or GAN source, and write the measured
+    scaling curve and the recommended settings to a JSON file (relative to
+    the simulation output_dir). Return the content of the file.
+
+    The recommended number_of_threads gives the highest speed for a single
+    simulation. The recommended number_of_jobs and number_of_threads_per_job
+    give the highest total speed when the cores are shared between jobs,
+    estimated as (cpu_count // threads) times the speed measured with threads.
+    """
+    cpu_count = os.cpu_count() or 1
+    if thread_counts is None:
+        thread_counts = _default_thread_counts(cpu_count)
+    thread_counts = sorted({int(n) for n in thread_counts})
+    if len(thread_counts) == 0 or thread_counts[0] < 1:
+        fatal(f"The autotune thread_counts must be >= 1, got {thread_counts}.")
+    if batch_sizes is None:
+        batch_sizes = DEFAULT_AUTOTUNE_BATCH_SIZES
+    batch_sizes = sorted({int(b) for b in batch_sizes})
+
+    # 1) scaling with the number of threads
+    scaling = []
+    for n in thread_counts:
+        speed = run_pilot_simulation(
+            simulation, pilot_fraction, {"number_of_threads": n}
+        )
+        scaling.append({"number_of_threads": n, **speed})
+    # efficiency relative to the speed per thread with the fewest threads
+    speed_1 = scaling[0]["events_per_second"] / scaling[0]["number_of_threads"]
+    for s in scaling:
+        s["efficiency"] = (
+            s["events_per_second"] / (speed_1 * s["number_of_threads"])
+            if speed_1 > 0
+            else 0.0
+        )
+        s["number_of_jobs"] = max(1, cpu_count // s["number_of_threads"])
+        s["estimated_events_per_second_with_jobs"] = (
+            s["events_per_second"] * s["number_of_jobs"]
+        )
+    best = max(scaling, key=lambda s: s["events_per_second"])
+    # with equal total speed, prefer fewer jobs (less splitting and merging)
+    best_with_jobs = max(
+        scaling,
+        key=lambda s: (
+            s["estimated_events_per_second_with_jobs"],
+            -s["number_of_jobs"],
+        ),
+    )
+    recommended = {
+        "number_of_threads": best["number_of_threads"],
+        "number_of_jobs": best_with_jobs["number_of_jobs"],
+        "number_of_threads_per_job": best_with_jobs["number_of_threads"],
+        "batch_size": {},
+    }
+
+    # 2) batch size of each batched source, the other sources unchanged
+    batch_size_scan = {}
+    for source_name in get_sources_with_batch_size(simulation):
+        scan = []
+        for b in batch_sizes:
+            speed = run_pilot_simulation(
+                simulation,
+                pilot_fraction,
+                {
+                    "number_of_threads": recommended["number_of_threads"],
+                    "batch_size": {source_name: b},
+                },
+            )
+            scan.append({"batch_size": b, **speed})
+        batch_size_scan[source_name] = scan
+        recommended["batch_size"][source_name] = max(
+            scan, key=lambda s: s["events_per_second"]
+        )["batch_size"]
+
+    result = {
+        "format_version": AUTOTUNE_FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "simulation_name": simulation.name,
+        "cpu_count": cpu_count,
+        "pilot_fraction": pilot_fraction,
+        "recommended": recommended,
+        "scaling": scaling,
+        "batch_size_scan": batch_size_scan,
+    }
+    if output_filename is not None:
+        output_path = simulation.get_output_path(output_filename)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w") as f:
+            dump_json(result, f)
+        result["filename"] = str(output_path)
+    return result
+
+
+def read_autotune_file(filename):
+    """Read the recommended settings written by autotune_simulation."""
+    filename = Path(filename)
+    if not filename.is_file():
+        fatal(f"The autotune file {filename} does not exist.")
+    with open(filename) as f:
+        data = load_json(f)
+    if data.get("format_version") != AUTOTUNE_FORMAT_VERSION:
+        fatal(
+            f"The autotune file {filename} has format version "
+            f"{data.get('format_version')}, expected {AUTOTUNE_FORMAT_VERSION}. "
+            f"Run Simulation.autotune() again."
+        )
+    return data
+
+
+def apply_autotune_settings(simulation, settings):
+    """Set number_of_threads and the batch_size of the sources (by name) from
+    a dictionary of recommended settings. Unknown sources are ignored (the
+    simulation may have changed since the autotune).
+    """
+    if settings.get("number_of_threads") is not None:
+        simulation.number_of_threads = int(settings["number_of_threads"])
+    sources = simulation.source_manager.sources
+    for source_name, batch_size in settings.get("batch_size", {}).items():
+        if source_name in sources and "batch_size" in sources[source_name].user_info:
+            sources[source_name].batch_size = int(batch_size)
@@ -12,12 +12,21 @@ CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
 @click.command(context_settings=CONTEXT_SETTINGS)
 @click.argument("job_folder", type=click.Path(exists=True, file_okay=False))
 @click.option("--backend", default="local_cli", show_default=True)
-def go(job_folder, backend):
+@click.option(
+    "--failed-status",
+    type=click.Choice(["failed", "retrying"]),
+    default="failed",
+    show_default=True,
+    help="Execution status written if the job fails "
+    "('retrying' if the job will be run again)",
+)
+def go(job_folder, backend, failed_status):
     """Run one split-job folder from its persisted simulation.json and metadata."""
     result = _run_job_folder_cli(
         Path(job_folder),
         backend=backend,
         start_new_process=False,
+        failed_status=failed_status,
     )
     if result["status"] != "completed":
         raise click.ClickException(result.get("error_message", "Job execution failed."))
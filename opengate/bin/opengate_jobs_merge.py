@@ -18,9 +18,18 @@ CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
     default=None,
     help="Optional target output folder for the merged simulation. If omitted, the master simulation output_dir is used.",
 )
-def go(campaign_dir, to_path):
+@click.option(
+    "--n-workers",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Number of worker processes used to merge the image outputs.",
+)
+def go(campaign_dir, to_path, n_workers):
     """Merge a finished jobs campaign stored in CAMPAIGN_DIR."""
-    merge_manager = jobs_merge(Path(campaign_dir), to_path=to_path, execute=True)
+    merge_manager = jobs_merge(
+        Path(campaign_dir), to_path=to_path, execute=True, n_workers=n_workers
+    )
     merge_manager.print_merge_summary()
     click.echo(json.dumps(merge_manager.merge_result, indent=2, sort_keys=True))
 
@@ -31,9 +31,24 @@ CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
     "--policy",
     default=DEFAULT_SPLIT_POLICY,
     show_default=True,
-    type=click.Choice(["split_in_time_per_run", "split_in_time_total"]),
+    type=click.Choice(
+        ["split_in_time_per_run", "split_in_time_total", "split_in_cost"]
+    ),
     help="Split policy to apply.",
 )
+@click.option(
+    "--pilot-fraction",
+    type=float,
+    default=None,
+    help="split_in_cost: measure the events per second of each run with a pilot "
+    "run on this fraction of each run.",
+)
+@click.option(
+    "--events-per-second",
+    type=float,
+    default=None,
+    help="split_in_cost: simulation speed used to predict the duration of the jobs.",
+)
 @click.option(
     "--link-files/--copy-files",
     default=False,
@@ -52,12 +67,19 @@ def go(
     policy,
     link_files,
     overwrite_existing_job_folders,
+    pilot_fraction,
+    events_per_second,
 ):
     """Split the simulation found in CAMPAIGN_DIR into child job folders.
 
     The Python API returns a JobsSplitManager. The command-line tool prints the
     campaign folder path so shell workflows can pass it to later commands.
     """
+    cost_options = {}
+    if pilot_fraction is not None:
+        cost_options["pilot_fraction"] = pilot_fraction
+    if events_per_second is not None:
+        cost_options["events_per_second"] = events_per_second
     jobs_split_manager = jobs_split(
         simulation_folder=Path(campaign_dir),
         simulation_file=simulation_file,
@@ -67,6 +89,7 @@ def go(
         link_files=link_files,
         overwrite_existing_job_folders=overwrite_existing_job_folders,
         write_resolved_simulation=True,
+        **cost_options,
     )
     click.echo(str(jobs_split_manager.campaign_dir))
 
@@ -1,6 +1,10 @@
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from .exception import GateMergeError
+from .processing import dump_result, load_result
 from .rootio import RootMergeFileWriter
 
 
@@ -18,13 +22,140 @@ class _CoordinatorOutputMergeContext:
         return self._load_mode if self._load_mode is not None else default
 
 
+def _create_source_simulation(source_info):
+    from .managers import create_sim_from_json
+
+    child_simulation = create_sim_from_json(source_info["simulation_path"])
+    child_simulation.simulation_dir = Path(source_info["folder"])
+    child_simulation.output_dir = Path(source_info["folder"]) / "output"
+    return child_simulation
+
+
+# child simulations parsed by a merge worker process, by simulation path
+_worker_source_simulations = {}
+
+
+def _get_worker_source_simulation(source_info):
+    key = str(source_info["simulation_path"])
+    if key not in _worker_source_simulations:
+        _worker_source_simulations[key] = _create_source_simulation(source_info)
+    return _worker_source_simulations[key]
+
+
+def _merge_output_of_jobs(task):
+    """Pool worker: merge one actor output of a subset of jobs into a partial
+    result. The partial result only contains the data of the data items (per
+    target slot), it is sent back through shared memory (see dump_result).
+    """
+    actor_name, output_name, sources = task
+    t = time.perf_counter()
+    try:
+        # a separate instance of the first child output is used as accumulator,
+        # so that its slots are not mixed with the loaded source data
+        accumulator = (
+            _create_source_simulation(sources[0][0])
+            .get_actor(actor_name)
+            .user_output[output_name]
+        )
+        for source_info, contributions in sources:
+            source_simulation = _get_worker_source_simulation(source_info)
+            source_output = source_simulation.get_actor(actor_name).user_output[
+                output_name
+            ]
+            accumulator.execute_merge(
+                source_output, context=_CoordinatorOutputMergeContext(contributions)
+            )
+        slots = list(accumulator.data_per_run.items())
+        slots.append(("merged", accumulator.merged_data))
+        partial = {}
+        for which, container in slots:
+            if container is None:
+                continue
+            partial[which] = [
+                (
+                    None
+                    if data_item is None
+                    else (
+                        data_item.data,
+                        getattr(data_item, "number_of_samples", None),
+                        dict(data_item.meta_data),
+                    )
+                )
+                for data_item in container.data
+            ]
+        payload, blocks, _ = dump_result(partial)
+    except Exception as error:
+        job_indices = [source_info["job_index"] for source_info, _ in sources]
+        raise GateMergeError(
+            f"Failed to merge actor output '{output_name}' of actor '{actor_name}' "
+            f"from job_indices {job_indices}: {type(error).__name__}: {error}"
+        )
+    return actor_name, output_name, payload, blocks, time.perf_counter() - t
+
+
+def _merge_partial_into_output(target_output, partial):
+    for which, items in partial.items():
+        container = target_output.data_container_class(belongs_to=target_output)
+        for data_item, item in zip(container.data, items):
+            if data_item is None or item is None or item[0] is None:
+                continue
+            data, number_of_samples, meta_data = item
+            data_item.set_data(data)
+            if number_of_samples is not None:
+                data_item.number_of_samples = number_of_samples
+            data_item.meta_data.update(meta_data)
+        target_output.ensure_data_container(which).inplace_merge_with(container)
+
+
+def _select_jobs(groups, job_indices):
+    """Restrict the contributions of the output groups to the given jobs."""
+    if job_indices is None:
+        return groups
+    job_indices = set(job_indices)
+    return {
+        key: {
+            **group,
+            "contributions_by_job": {
+                job_index: contributions
+                for job_index, contributions in group["contributions_by_job"].items()
+                if job_index in job_indices
+            },
+        }
+        for key, group in groups.items()
+    }
+
+
+def _split_in_chunks(items, number_of_chunks):
+    n, r = divmod(len(items), number_of_chunks)
+    chunks = []
+    start = 0
+    for i in range(number_of_chunks):
+        end = start + n + (1 if i < r else 0)
+        if end > start:
+            chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
 class StandardMergeCoordinator:
-    """Execute and finalize merge for standard non-ROOT actor outputs."""
+    """Execute and finalize merge for standard non-ROOT actor outputs.
 
-    def __init__(self):
+    With n_workers > 1, image outputs are merged in a process pool: each worker
+    reduces the contributions of a subset of jobs into a partial image, and the
+    partial images are then merged into the target output as they arrive
+    (two-level reduction). Other outputs are merged sequentially.
+    """
+
+    def __init__(self, n_workers=1, source_simulations=None):
+        self.n_workers = int(n_workers)
         self._output_groups = {}
         self._source_infos = {}
         self._source_simulations_by_job_index = {}
+        # child simulations already parsed by the caller, by job index
+        self._cached_source_simulations = (
+            {} if source_simulations is None else source_simulations
+        )
+        self.output_merge_timings = {}
 
     def configure_from_context(self, standard_context, target_simulation):
         self._output_groups = {}
@@ -68,42 +199,125 @@ class StandardMergeCoordinator:
 
     def _get_source_simulation(self, job_index):
         if job_index not in self._source_simulations_by_job_index:
-            from .managers import create_sim_from_json
-
-            source_info = self._source_infos[job_index]
-            child_simulation = create_sim_from_json(source_info["simulation_path"])
-            child_simulation.simulation_dir = Path(source_info["folder"])
-            child_simulation.output_dir = Path(source_info["folder"]) / "output"
+            if job_index in self._cached_source_simulations:
+                child_simulation = self._cached_source_simulations[job_index]
+            else:
+                child_simulation = _create_source_simulation(
+                    self._source_infos[job_index]
+                )
             self._source_simulations_by_job_index[job_index] = child_simulation
         return self._source_simulations_by_job_index[job_index]
 
-    def execute_merge(self):
-        for (actor_name, output_name), group in self._output_groups.items():
-            target_output = group["target_output"]
-            for job_index, contributions in group["contributions_by_job"].items():
-                source_simulation = self._get_source_simulation(job_index)
-                source_actor = source_simulation.get_actor(actor_name)
-                source_output = source_actor.user_output[output_name]
+    def release_source_simulations(self, job_indices):
+        """Forget the child simulations of jobs that are already merged."""
+        for job_index in job_indices:
+            self._source_simulations_by_job_index.pop(job_index, None)
+            self._cached_source_simulations.pop(job_index, None)
+
+    def _can_merge_in_pool(self, group):
+        from .actors.actoroutput import ActorOutputImage
+
+        return (
+            isinstance(group["target_output"], ActorOutputImage)
+            and len(group["contributions_by_job"]) > 1
+        )
+
+    def _execute_merge_sequentially(self, actor_name, output_name, group):
+        target_output = group["target_output"]
+        for job_index, contributions in group["contributions_by_job"].items():
+            source_simulation = self._get_source_simulation(job_index)
+            source_actor = source_simulation.get_actor(actor_name)
+            source_output = source_actor.user_output[output_name]
+            try:
+                target_output.execute_merge(
+                    source_output,
+                    context=_CoordinatorOutputMergeContext(contributions),
+                )
+            except Exception as error:
+                if isinstance(error, GateMergeError):
+                    raise GateMergeError(
+                        f"Failed to execute standard merge for actor output "
+                        f"'{output_name}' of actor '{actor_name}' from job_index "
+                        f"{job_index}."
+                    ) from error
+                raise GateMergeError(
+                    f"Unexpected failure while executing standard merge for "
+                    f"actor output '{output_name}' of actor '{actor_name}' "
+                    f"from job_index {job_index}."
+                ) from error
+
+    def _execute_merge_in_pool(self, groups):
+        # all outputs share the same pool, each output is split in (at most)
+        # n_workers chunks of jobs
+        tasks = []
+        for (actor_name, output_name), group in groups.items():
+            sources = [
+                (self._source_infos[job_index], contributions)
+                for job_index, contributions in sorted(
+                    group["contributions_by_job"].items()
+                )
+            ]
+            for chunk in _split_in_chunks(sources, self.n_workers):
+                tasks.append((actor_name, output_name, chunk))
+
+        ctx = multiprocessing.get_context("spawn")
+        pool = ctx.Pool(processes=min(self.n_workers, len(tasks)))
+        try:
+            for (
+                actor_name,
+                output_name,
+                payload,
+                blocks,
+                duration,
+            ) in pool.imap_unordered(_merge_output_of_jobs, tasks):
+                t = time.perf_counter()
+                partial = load_result(payload, blocks)
+                group = groups[(actor_name, output_name)]
                 try:
-                    target_output.execute_merge(
-                        source_output,
-                        context=_CoordinatorOutputMergeContext(contributions),
-                    )
+                    _merge_partial_into_output(group["target_output"], partial)
                 except Exception as error:
-                    if isinstance(error, GateMergeError):
-                        raise GateMergeError(
-                            f"Failed to execute standard merge for actor output "
-                            f"'{output_name}' of actor '{actor_name}' from job_index "
-                            f"{job_index}."
-                        ) from error
                     raise GateMergeError(
-                        f"Unexpected failure while executing standard merge for "
-                        f"actor output '{output_name}' of actor '{actor_name}' "
-                        f"from job_index {job_index}."
+                        f"Failed to merge partial results for actor output "
+                        f"'{output_name}' of actor '{actor_name}'."
                     ) from error
+                timing = self.output_merge_timings[(actor_name, output_name)]
+                timing["execute"] += duration + time.perf_counter() - t
+            pool.close()
+            pool.join()
+        except Exception:
+            pool.terminate()
+            pool.join()
+            raise
+
+    def execute_merge(self, job_indices=None):
+        """Merge the outputs of all jobs, or only of the given jobs. In the
+        latter case, execute_merge can be called several times (incremental
+        merge), each job being merged once.
+        """
+        for key in self._output_groups:
+            self.output_merge_timings.setdefault(key, {"execute": 0.0, "finalize": 0.0})
+        output_groups = _select_jobs(self._output_groups, job_indices)
+        pool_groups = {}
+        if self.n_workers > 1:
+            pool_groups = {
+                key: group
+                for key, group in output_groups.items()
+                if self._can_merge_in_pool(group)
+            }
+        if len(pool_groups) > 0:
+            self._execute_merge_in_pool(pool_groups)
+        for (actor_name, output_name), group in output_groups.items():
+            if (actor_name, output_name) in pool_groups:
+                continue
+            t = time.perf_counter()
+            self._execute_merge_sequentially(actor_name, output_name, group)
+            self.output_merge_timings[(actor_name, output_name)]["execute"] += (
+                time.perf_counter() - t
+            )
 
     def finalize_merge(self):
         for (actor_name, output_name), group in self._output_groups.items():
+            t = time.perf_counter()
             try:
                 group["target_output"].finalize_merge()
             except Exception as error:
@@ -116,15 +330,35 @@ class StandardMergeCoordinator:
                     f"Unexpected failure while finalizing standard merge for actor "
                     f"output '{output_name}' of actor '{actor_name}'."
                 ) from error
+            timing = self.output_merge_timings.setdefault(
+                (actor_name, output_name), {"execute": 0.0, "finalize": 0.0}
+            )
+            timing["finalize"] += time.perf_counter() - t
 
 
 class RootMergeCoordinator:
-    """Grouped ROOT merge executor for split-job merge finalization."""
+    """Grouped ROOT merge executor for split-job merge finalization.
+
+    With n_workers > 1, the ROOT files are streamed concurrently in threads,
+    one ROOT file per thread (the outputs written to the same file share the
+    event id numbering, so they are streamed together).
+    """
 
-    def __init__(self):
+    def __init__(self, n_workers=1, source_simulations=None):
+        self.n_workers = int(n_workers)
         self._root_output_groups = {}
         self._source_infos = {}
         self._source_simulations_by_job_index = {}
+        # child simulations already parsed by the caller, by job index
+        self._cached_source_simulations = (
+            {} if source_simulations is None else source_simulations
+        )
+        self.output_merge_timings = {}
+        # incremental merge: open writers and event id states per ROOT file,
+        # and number of merge sources already streamed per output
+        self._writers = {}
+        self._event_id_states = {}
+        self._number_of_streamed_sources = {}
 
     def configure_from_context(self, root_context, target_simulation):
         self._root_output_groups = {}
@@ -169,24 +403,37 @@ class RootMergeCoordinator:
 
     def _get_source_simulation(self, job_index):
         if job_index not in self._source_simulations_by_job_index:
-            from .managers import create_sim_from_json
-
-            source_info = self._source_infos[job_index]
-            child_simulation = create_sim_from_json(source_info["simulation_path"])
-            child_simulation.simulation_dir = Path(source_info["folder"])
-            child_simulation.output_dir = Path(source_info["folder"]) / "output"
+            if job_index in self._cached_source_simulations:
+                child_simulation = self._cached_source_simulations[job_index]
+            else:
+                child_simulation = _create_source_simulation(
+                    self._source_infos[job_index]
+                )
             self._source_simulations_by_job_index[job_index] = child_simulation
         return self._source_simulations_by_job_index[job_index]
 
-    def execute_merge(self):
+    def release_source_simulations(self, job_indices):
+        """Forget the child simulations of jobs that are already merged."""
+        for job_index in job_indices:
+            self._source_simulations_by_job_index.pop(job_index, None)
+            self._cached_source_simulations.pop(job_index, None)
+
+    def execute_merge(self, job_indices=None):
+        """Register the ROOT files of all jobs, or only of the given jobs, as
+        merge sources. The entries are streamed in finalize_merge, or job by
+        job with stream_registered_sources (incremental merge).
+        """
         for grouped_outputs in self._root_output_groups.values():
             for grouped_output in grouped_outputs:
                 target_output = grouped_output["target_output"]
                 actor_name = target_output.belongs_to_actor.name
                 output_name = target_output.name
+                t = time.perf_counter()
                 for job_index, contributions in grouped_output[
                     "contributions_by_job"
                 ].items():
+                    if job_indices is not None and job_index not in job_indices:
+                        continue
                     source_simulation = self._get_source_simulation(job_index)
                     source_actor = source_simulation.get_actor(actor_name)
                     source_output = source_actor.user_output[output_name]
@@ -194,44 +441,162 @@ class RootMergeCoordinator:
                         source_output,
                         context=_CoordinatorOutputMergeContext(contributions),
                     )
+                timing = self.output_merge_timings.setdefault(
+                    (actor_name, output_name), {"execute": 0.0, "finalize": 0.0}
+                )
+                timing["execute"] += time.perf_counter() - t
 
-    def finalize_merge(self):
+    @staticmethod
+    def _get_merged_root_item(actor_output):
+        data_container = actor_output.get_data_container("merged")
+        if data_container is None:
+            return None
+        data_item = data_container.get_data_item_object(0)
+        if data_item is None or not data_item.has_root_meta_data():
+            return None
+        return data_item
+
+    def stream_registered_sources(self):
+        """Append the entries of the merge sources registered since the last
+        call to the merged ROOT files, which are kept open until
+        finalize_merge. The sources are streamed in the order they were
+        registered: the caller registers the jobs in job order (see
+        JobsMergeManager.merge_jobs) so that the entries and EventID offsets
+        are the same as with the standard merge.
+        """
         for output_path, grouped_outputs in self._root_output_groups.items():
-            writer = RootMergeFileWriter(output_path)
-            writer.open()
-            try:
-                event_id_states_by_tree = {}
-                active_root_outputs = []
+            for grouped_output in grouped_outputs:
+                actor_output = grouped_output["target_output"]
+                data_item = self._get_merged_root_item(actor_output)
+                if data_item is None:
+                    continue
+                key = (actor_output.belongs_to_actor.name, actor_output.name)
+                merge_sources = data_item.root_meta_data.get("merge_sources", [])
+                n = self._number_of_streamed_sources.get(key, 0)
+                if len(merge_sources) == n:
+                    continue
+                t = time.perf_counter()
+                if output_path not in self._writers:
+                    writer = RootMergeFileWriter(output_path)
+                    writer.open()
+                    self._writers[output_path] = writer
+                    self._event_id_states[output_path] = {}
+                tree_descriptor = data_item.get_single_tree_descriptor()
+                self._writers[output_path].create_tree(
+                    tree_descriptor["tree_name"], tree_descriptor["branches"]
+                )
+                event_id_state = self._event_id_states[output_path].setdefault(
+                    tree_descriptor["tree_name"], {"next_event_id": 0}
+                )
+                data_item.stream_merge_to_writer(
+                    self._writers[output_path],
+                    tree_name=tree_descriptor["tree_name"],
+                    event_id_state=event_id_state,
+                    merge_sources=merge_sources[n:],
+                )
+                self._number_of_streamed_sources[key] = len(merge_sources)
+                timing = self.output_merge_timings.setdefault(
+                    key, {"execute": 0.0, "finalize": 0.0}
+                )
+                timing["execute"] += time.perf_counter() - t
 
-                for grouped_output in grouped_outputs:
-                    actor_output = grouped_output["target_output"]
-                    data_container = actor_output.get_data_container("merged")
-                    if data_container is None:
-                        continue
-                    data_item = data_container.get_data_item_object(0)
-                    if (
-                        data_item is None
-                        or not data_item.has_root_meta_data()
-                        or len(data_item.root_meta_data.get("merge_sources", [])) == 0
-                    ):
-                        continue
-                    tree_descriptor = data_item.get_single_tree_descriptor()
-                    writer.create_tree(
-                        tree_descriptor["tree_name"], tree_descriptor["branches"]
-                    )
-                    active_root_outputs.append(
-                        (actor_output, data_item, tree_descriptor)
+    def _close_streamed_files(self):
+        self.stream_registered_sources()
+        for output_path, grouped_outputs in self._root_output_groups.items():
+            if output_path not in self._writers:
+                # nothing was streamed into this file
+                self._finalize_root_file(output_path, grouped_outputs)
+                continue
+            t = time.perf_counter()
+            self._writers[output_path].close()
+            for grouped_output in grouped_outputs:
+                actor_output = grouped_output["target_output"]
+                key = (actor_output.belongs_to_actor.name, actor_output.name)
+                data_item = self._get_merged_root_item(actor_output)
+                if data_item is not None and key in self._number_of_streamed_sources:
+                    data_item.set_merged_root_output_path(
+                        output_path, metadata_path=actor_output.get_metadata_path()
                     )
+                timing = self.output_merge_timings.setdefault(
+                    key, {"execute": 0.0, "finalize": 0.0}
+                )
+                timing["finalize"] += time.perf_counter() - t
+        self._writers = {}
+        self._event_id_states = {}
+        self._number_of_streamed_sources = {}
 
-                for actor_output, data_item, tree_descriptor in active_root_outputs:
-                    event_id_state = event_id_states_by_tree.setdefault(
-                        tree_descriptor["tree_name"], {"next_event_id": 0}
-                    )
-                    data_item.stream_write_merged_root(
-                        output_path,
-                        metadata_path=actor_output.get_metadata_path(),
-                        writer=writer,
-                        event_id_state=event_id_state,
-                    )
-            finally:
+    def close_streamed_files_on_error(self):
+        """Close the merged ROOT files of an aborted incremental merge (their
+        content is incomplete)."""
+        for writer in self._writers.values():
+            try:
                 writer.close()
+            except Exception:
+                pass
+        self._writers = {}
+        self._event_id_states = {}
+        self._number_of_streamed_sources = {}
+
+    def finalize_merge(self):
+        if len(self._writers) > 0:
+            # incremental merge: most entries are already streamed
+            self._close_streamed_files()
+        elif self.n_workers > 1 and len(self._root_output_groups) > 1:
+            with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+                futures = [
+                    executor.submit(self._finalize_root_file, *item)
+                    for item in self._root_output_groups.items()
+                ]
+                # re-raise the first error, if any
+                for future in futures:
+                    future.result()
+        else:
+            for output_path, grouped_outputs in self._root_output_groups.items():
+                self._finalize_root_file(output_path, grouped_outputs)
+
+    def _finalize_root_file(self, output_path, grouped_outputs):
+        t = time.perf_counter()
+        writer = RootMergeFileWriter(output_path)
+        writer.open()
+        try:
+            event_id_states_by_tree = {}
+            active_root_outputs = []
+
+            for grouped_output in grouped_outputs:
+                actor_output = grouped_output["target_output"]
+                data_container = actor_output.get_data_container("merged")
+                if data_container is None:
+                    continue
+                data_item = data_container.get_data_item_object(0)
+                if (
+                    data_item is None
+                    or not data_item.has_root_meta_data()
+                    or len(data_item.root_meta_data.get("merge_sources", [])) == 0
+                ):
+                    continue
+                tree_descriptor = data_item.get_single_tree_descriptor()
+                writer.create_tree(
+                    tree_descriptor["tree_name"], tree_descriptor["branches"]
+                )
+                active_root_outputs.append((actor_output, data_item, tree_descriptor))
+
+            for actor_output, data_item, tree_descriptor in active_root_outputs:
+                event_id_state = event_id_states_by_tree.setdefault(
+                    tree_descriptor["tree_name"], {"next_event_id": 0}
+                )
+                data_item.stream_write_merged_root(
+                    output_path,
+                    metadata_path=actor_output.get_metadata_path(),
+                    writer=writer,
+                    event_id_state=event_id_state,
+                )
+        finally:
+            writer.close()
+        duration = time.perf_counter() - t
+        for grouped_output in grouped_outputs:
+            target_output = grouped_output["target_output"]
+            timing = self.output_merge_timings.setdefault(
+                (target_output.belongs_to_actor.name, target_output.name),
+                {"execute": 0.0, "finalize": 0.0},
+            )
+            timing["finalize"] += duration
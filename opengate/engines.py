@@ -1,7 +1,10 @@
+import hashlib
+import shutil
 import time
 import sys
 import os
 import weakref
+from pathlib import Path
 from box import Box
 from anytree import PreOrderIter
 
@@ -20,6 +23,10 @@ from .physics import (
 )
 from .base import GateSingletonFatal
 from .logger import logger
+from .serialization import dump_json, dumps_json
+
+# file written in a physics tables cache folder once the tables are stored
+PHYSICS_TABLES_CACHE_METADATA_FILENAME = "physics_tables_cache.json"
 
 
 def _translate_track_structure_em_physics_to_geant4(track_structure_em_physics):
@@ -191,6 +198,9 @@ class SourceEngine(EngineBase):
         self.source_manager_options["max_primaries_per_run"] = (
             self.simulation_engine.simulation.max_primaries_per_run
         )
+        self.source_manager_options["source_scheduler"] = (
+            self.simulation_engine.simulation.source_scheduler
+        )
 
         ms.Initialize(self.run_timing_intervals, self.source_manager_options)
         self.expected_number_of_events = ms.GetExpectedNumberOfEvents()
@@ -314,6 +324,11 @@ class PhysicsEngine(EngineBase):
 
         self.optical_surfaces_properties_dict = {}
 
+        # physics tables cache (if physics_tables_cache_dir is set)
+        self.physics_tables_cache_folder = None
+        self.physics_tables_cache_status = None
+        self.physics_tables_cache_key_data = None
+
     def close(self):
         if self.verbose_close:
             warning("Closing PhysicsEngine")
@@ -401,6 +416,111 @@ class PhysicsEngine(EngineBase):
         self.initialize_ionisation_options()
         self.initialize_users_ionisation_potentials()
 
+    def get_physics_tables_cache_key(self):
+        """Hash of everything the physics tables depend on: the Geant4 version,
+        the physics settings (physics list, EM parameters, cuts, regions), the
+        Geant4 commands and the materials of the Geant4 material table.
+        Return the hash and the hashed data.
+        """
+        physics = self.physics_manager.to_dictionary()
+        physics["user_info"].pop("physics_tables_cache_dir", None)
+        materials = []
+        for mat in g4.G4Material.GetMaterialTable:
+            elements = [
+                [elem.GetName(), elem.GetZ(), elem.GetA(), mat.GetElementFraction(i)]
+                for i, elem in enumerate(mat.GetElementVector())
+            ]
+            materials.append(
+                [
+                    mat.GetName(),
+                    mat.GetDensity(),
+                    str(mat.GetState()),
+                    mat.GetTemperature(),
+                    mat.GetPressure(),
+                    mat.GetIonisation().GetMeanExcitationEnergy(),
+                    elements,
+                ]
+            )
+        simulation = self.physics_manager.simulation
+        key_data = {
+            "geant4_version": g4.GateInfo.get_G4Version(),
+            "physics": physics,
+            "g4_commands_before_init": list(simulation.g4_commands_before_init),
+            "g4_commands_after_init": list(simulation.g4_commands_after_init),
+            "materials": materials,
+        }
+        key = hashlib.sha256(
+            dumps_json(key_data, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        return key, key_data
+
+    def initialize_physics_tables_cache(self):
+        """If a physics tables cache is used, ask Geant4 to retrieve the tables
+        from the cache folder if they were stored by a previous simulation.
+        Must be called after the materials and cuts are set, and before the
+        physics tables are built (first BeamOn).
+        """
+        cache_dir = self.physics_manager.physics_tables_cache_dir
+        if cache_dir is None:
+            return
+        key, self.physics_tables_cache_key_data = self.get_physics_tables_cache_key()
+        self.physics_tables_cache_folder = Path(cache_dir) / key
+        metadata_path = (
+            self.physics_tables_cache_folder / PHYSICS_TABLES_CACHE_METADATA_FILENAME
+        )
+        if metadata_path.is_file():
+            logger.info(
+                f"Simulation: retrieve physics tables from {self.physics_tables_cache_folder}"
+            )
+            self.g4_augmented_physics_list.SetPhysicsTableRetrieved(
+                str(self.physics_tables_cache_folder)
+            )
+            self.physics_tables_cache_status = "retrieved"
+        else:
+            self.physics_tables_cache_status = "missing"
+
+    def finalize_physics_tables_cache(self, build_duration):
+        """After the physics tables are built: check that the retrieval worked,
+        or store the new tables in the cache folder.
+        """
+        folder = self.physics_tables_cache_folder
+        if folder is None:
+            return
+        if self.physics_tables_cache_status == "retrieved":
+            if not self.g4_augmented_physics_list.IsPhysicsTableRetrieved():
+                # Geant4 falls back to building the tables
+                warning(
+                    f"The physics tables in {folder} could not be retrieved "
+                    f"(incompatible cuts or materials), they were built."
+                )
+                self.physics_tables_cache_status = "rebuilt"
+            return
+        # store in a temporary folder renamed at the end: several simulations
+        # (e.g. split jobs) may store the same tables at the same time
+        tmp_folder = folder.parent / f".{folder.name}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+        tmp_folder.mkdir(parents=True)
+        if not self.g4_augmented_physics_list.StorePhysicsTable(str(tmp_folder)):
+            warning(f"The physics tables could not be stored in {folder}.")
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+            self.physics_tables_cache_status = "not_stored"
+            return
+        with open(tmp_folder / PHYSICS_TABLES_CACHE_METADATA_FILENAME, "w") as f:
+            dump_json(
+                {
+                    "build_duration": build_duration,
+                    "key_data": self.physics_tables_cache_key_data,
+                },
+                f,
+            )
+        try:
+            os.rename(tmp_folder, folder)
+        except OSError:
+            # another simulation stored the same tables first
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+        logger.info(f"Simulation: physics tables stored in {folder}")
+        self.physics_tables_cache_status = "stored"
+
     def initialize_parallel_world_physics(self):
         for (
             world
@@ -1070,6 +1190,19 @@ class FilterEngine(EngineBase):
         for f in self.filter_manager.filters.values():
             f.initialize()
 
+    def get_statistics(self):
+        """Statistics of all the filters (including the ones created by the
+        compilation of the boolean filters), or None if not collected."""
+        if not self.simulation_engine.simulation.filter_statistics:
+            return None
+        statistics = {}
+        for f in self.filter_manager.filters.values():
+            statistics[f.name] = f.get_statistics()
+            # the filters created by the compilation of a BooleanFilter
+            for cf in getattr(f, "compiled_filters", []):
+                statistics[cf.name] = cf.get_statistics()
+        return statistics
+
     def close(self):
         for f in self.filter_manager.filters.values():
             f.close()
@@ -1332,6 +1465,8 @@ class SimulationOutput:
         self.current_random_seed = None
         self.user_hook_log = []
         self.warnings = None
+        self.startup_timings = None
+        self.filter_statistics = None
 
     def __str__(self):
         s = f"SimulationOutput: \n"
@@ -1451,6 +1586,9 @@ class SimulationEngine(GateSingletonFatal):
         self.g4_HepRandomEngine = None
         self.current_random_seed = None
 
+        # duration (in s) of the initialization steps
+        self.startup_timings = Box()
+
         # Main Run Manager
         self.g4_RunManager = None
         self.g4_StateManager = g4.G4StateManager.GetStateManager()
@@ -1598,6 +1736,7 @@ class SimulationEngine(GateSingletonFatal):
             output.store_sources(self)
             output.store_hook_log(self)
             output.current_random_seed = self.current_random_seed
+            output.startup_timings = self.startup_timings
             output.expected_number_of_events = (
                 self.source_engine.expected_number_of_events
             )
@@ -1621,6 +1760,8 @@ class SimulationEngine(GateSingletonFatal):
         output.store_hook_log(self)
         output.current_random_seed = self.current_random_seed
         output.expected_number_of_events = self.source_engine.expected_number_of_events
+        output.startup_timings = self.startup_timings
+        output.filter_statistics = self.filter_engine.get_statistics()
         output.warnings = self.simulation.warnings
 
         # save the output and restore the sys.stdout
@@ -1723,6 +1864,8 @@ class SimulationEngine(GateSingletonFatal):
         Build the main geant4 objects and initialize them.
         """
 
+        t_start = time.perf_counter()
+
         # g4 verbose
         self.initialize_g4_verbose()
 
@@ -1828,11 +1971,31 @@ class SimulationEngine(GateSingletonFatal):
         logger.info("Simulation: initialize Chemistry")
         self.chemistry_engine.initialize_after_runmanager()
 
+        # retrieve the physics tables from the cache (if any)
+        self.physics_engine.initialize_physics_tables_cache()
+
+        # The physics tables are built during the first BeamOn
+        t = time.perf_counter()
         # G4's MT RunManager needs an empty run to initialise workers
         if self.simulation.multithreaded is True:
             logger.info("Simulation: initialize the worker threads (MT mode)")
             self.g4_RunManager.FakeBeamOn()
             # ConstructSDandField then ConfigureForWorker are called for each worker thread
+        elif self.physics_engine.physics_tables_cache_folder is not None:
+            # build the tables now (not at the first run), to store them
+            logger.info("Simulation: build the physics tables")
+            self.g4_RunManager.FakeBeamOn()
+        if (
+            self.simulation.multithreaded is True
+            or self.physics_engine.physics_tables_cache_folder is not None
+        ):
+            self.startup_timings.physics_tables = time.perf_counter() - t
+            self.physics_engine.finalize_physics_tables_cache(
+                self.startup_timings.physics_tables
+            )
+            self.startup_timings.physics_tables_cache = (
+                self.physics_engine.physics_tables_cache_status
+            )
 
         # Actions initialisation
         # This must come after the G4RunManager initialisation
@@ -1847,6 +2010,14 @@ class SimulationEngine(GateSingletonFatal):
             self.action_engine.register_auxiliary_attribute_actions(attribute)
 
         self.is_initialized = True
+        self.startup_timings.initialize = time.perf_counter() - t_start
+        s = f"Simulation: initialized in {self.startup_timings.initialize:.1f} s"
+        if "physics_tables" in self.startup_timings:
+            s += f" (physics tables: {self.startup_timings.physics_tables:.1f} s"
+            if self.startup_timings.physics_tables_cache is not None:
+                s += f", cache {self.startup_timings.physics_tables_cache}"
+            s += ")"
+        logger.info(s)
 
         # Check overlaps
         if self.simulation.check_volumes_overlap:
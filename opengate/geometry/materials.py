@@ -1,5 +1,7 @@
+import hashlib
 import os
 import re
+from pathlib import Path
 
 import itk
 import numpy as np
@@ -8,7 +10,9 @@ from box import Box
 
 from ..definitions import elements_name_symbol
 from ..exception import fatal, warning
-from ..utility import g4_best_unit, g4_units
+from ..image import apply_lut_to_array, create_intervals_lut
+from ..serialization import dump_json, load_json
+from ..utility import g4_best_unit, g4_units, write_file_atomically
 
 
 def read_voxel_materials(filename, def_mat="G4_AIR"):
@@ -146,17 +150,49 @@ def HU_find_max_density_difference(hu_min, hu_max, d_min, d_max, densities):
     return d_max - d_min
 
 
-def HounsfieldUnit_to_material(simulation, density_tolerance, file_mat, file_density):
+# bump when the content of the HU to material cache files changes
+HU_MATERIALS_CACHE_VERSION = 1
+
+
+def get_HU_materials_cache_key(density_tolerance, file_mat, file_density):
+    """
+    Hash (hex string) of the HU to material conversion settings: content of
+    the materials and densities tables, and density tolerance.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{HU_MATERIALS_CACHE_VERSION} {float(density_tolerance)!r}".encode())
+    for filename in (file_mat, file_density):
+        with open(filename, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def HounsfieldUnit_to_material(
+    simulation, density_tolerance, file_mat, file_density, cache_folder=None
+):
     """
     Same function than in GateHounsfieldToMaterialsBuilder class.
     Probably far from optimal, put we keep the compatibility
+
+    With a cache_folder, the materials and the HU intervals are stored in
+    (and read from) a json file in this folder, named after a hash of the
+    tables and of the density tolerance (see get_HU_materials_cache_key).
     """
+    cache_path = None
+    if cache_folder is not None:
+        key = get_HU_materials_cache_key(density_tolerance, file_mat, file_density)
+        cache_path = Path(cache_folder) / f"{key}_hu_materials.json"
+        if cache_path.is_file():
+            with open(cache_path) as f:
+                data = load_json(f)
+            return _add_HU_materials(
+                simulation, data["materials"], data["voxel_materials"]
+            )
 
     materials, elements = HU_read_materials_table(file_mat)
     densities = HU_read_density_table(file_density)
     voxel_materials = []
-    created_materials = []
-    gcm3 = g4_units.g_cm3
+    new_materials = []
 
     elems = elements[1 : len(elements) - 1]
     elems_symbol = [elements_name_symbol[x] for x in elems]
@@ -182,7 +218,7 @@ def HounsfieldUnit_to_material(simulation, density_tolerance, file_mat, file_den
         ddiff = HU_find_max_density_difference(hu_min, hu_max, dmin, dmax, densities)
 
         # nb of bins
-        n = max(1, ddiff * gcm3 / density_tolerance)
+        n = max(1, ddiff * g4_units.g_cm3 / density_tolerance)
         # n_naive = max(1, (dmax - dmin) * gcm3 / density_tolerance)
 
         # check if AIR
@@ -215,19 +251,45 @@ def HounsfieldUnit_to_material(simulation, density_tolerance, file_mat, file_den
             # normalise weight
             for k in range(len(weights_nz)):
                 weights_nz[k] = weights_nz[k] / sum_of_weights
-            # define a new material (will be created later at MaterialDatabase initialize)
             name = f'{mat["name"]}_{num}'
-            simulation.volume_manager.material_database.add_material_weights(
-                name, elems_symbol_nz, weights_nz, d * gcm3
+            new_materials.append(
+                {
+                    "name": name,
+                    "elements": elems_symbol_nz,
+                    "weights": weights_nz,
+                    "density": d,
+                }
             )
             # get the final correspondence
-            c = [h1, h2, name]
-            voxel_materials.append(c)
-            created_materials.append(name)
+            voxel_materials.append([h1, h2, name])
             num = num + 1
         #
         i = i + 1
-    return voxel_materials, created_materials
+
+    if cache_path is not None:
+
+        def write_cache(tmp):
+            with open(tmp, "w") as f:
+                dump_json(
+                    {"materials": new_materials, "voxel_materials": voxel_materials},
+                    f,
+                )
+
+        write_file_atomically(cache_path, write_cache)
+
+    return _add_HU_materials(simulation, new_materials, voxel_materials)
+
+
+def _add_HU_materials(simulation, new_materials, voxel_materials):
+    # define the new materials (will be created later at MaterialDatabase initialize)
+    gcm3 = g4_units.g_cm3
+    created_materials = []
+    for m in new_materials:
+        simulation.volume_manager.material_database.add_material_weights(
+            m["name"], list(m["elements"]), list(m["weights"]), m["density"] * gcm3
+        )
+        created_materials.append(m["name"])
+    return [list(v) for v in voxel_materials], created_materials
 
 
 def dump_material_like_Gate(mat):
@@ -291,7 +353,7 @@ def read_tag_with_unit(s, tag):
     return value * u
 
 
-def create_density_img(img_volume, material_database):
+def create_density_img(img_volume, material_database, number_of_threads=1):
     """
 
 
@@ -301,6 +363,8 @@ def create_density_img(img_volume, material_database):
         opengate ImageVolume class instance
     material_database : MaterialDatabase
         simulation.volume_manager.material_database
+    number_of_threads : int, optional
+        Number of threads used to convert the image. The default is 1.
 
     Returns
     -------
@@ -309,17 +373,18 @@ def create_density_img(img_volume, material_database):
 
     """
     img_volume.load_input_image()
-    act = itk.GetArrayFromImage(img_volume.itk_image)
-    arho = np.zeros(act.shape, dtype=np.float32)
+    act = itk.GetArrayViewFromImage(img_volume.itk_image)
 
+    # one density per HU interval, then a single lookup over the image
+    intervals = []
     for hu0, hu1, mat_name in img_volume.voxel_materials:
         if mat_name not in material_database.g4_materials:
             material_database.FindOrBuildMaterial(mat_name)
-        arho[(act >= hu0) * (act < hu1)] = material_database.g4_materials[
-            mat_name
-        ].GetDensity()
+        density = material_database.g4_materials[mat_name].GetDensity()
+        intervals.append((hu0, hu1, density * g4_units.cm3 / g4_units.g))
+    bins, lut = create_intervals_lut(intervals, dtype=np.float32)
+    arho = apply_lut_to_array(act, lut, bins=bins, number_of_threads=number_of_threads)
 
-    arho *= g4_units.cm3 / g4_units.g
     rho = itk.GetImageFromArray(arho)
     rho.CopyInformation(img_volume.itk_image)
 
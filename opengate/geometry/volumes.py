@@ -1,5 +1,6 @@
 import re
 import os
+from pathlib import Path
 from typing import List
 
 import numpy as np
@@ -12,10 +13,10 @@ import opengate_core as g4
 
 from ..base import DynamicGateObject, process_cls
 from . import solids
-from ..utility import ensure_filename_is_str
+from ..utility import ensure_filename_is_str, write_file_atomically
 from ..exception import fatal, warning
 from ..image import write_itk_image
-from ..image import update_image_py_to_cpp
+from ..image import update_image_py_to_cpp, apply_lut_to_array, compute_image_hash
 from .utility import (
     vec_np_as_g4,
     rot_np_as_g4,
@@ -879,6 +880,17 @@ def _setter_hook_image(self, image):
     return image
 
 
+# bump when the label image computation changes (invalidates the cached images)
+LABEL_IMAGE_CACHE_VERSION = 1
+
+
+def _setter_hook_label_image_cache_folder(self, folder):
+    # absolute path, so that the split jobs (run from other folders) share it
+    if folder is None:
+        return None
+    return Path(folder).absolute()
+
+
 class ImageVolume(VolumeBase, solids.ImageSolid):
     """
     Store information about a voxelized volume
@@ -887,6 +899,7 @@ class ImageVolume(VolumeBase, solids.ImageSolid):
     voxel_materials: List
     image: str
     dump_label_image: str
+    label_image_cache_folder: str
 
     user_info_defaults = {
         "voxel_materials": (
@@ -911,6 +924,17 @@ class ImageVolume(VolumeBase, solids.ImageSolid):
                 "Set to None to dump no image."
             },
         ),
+        "label_image_cache_folder": (
+            None,
+            {
+                "doc": "Folder where the label image is stored (compressed) once computed, "
+                "and read from at the next initializations, e.g. of the split jobs or of "
+                "the next runs on the same CT. The files are named after a hash of the "
+                "image content, voxel_materials and material. "
+                "Set to None (default) to compute the label image at each initialization.",
+                "setter_hook": _setter_hook_label_image_cache_folder,
+            },
+        ),
     }
 
     def __init__(self, *args, **kwargs):
@@ -1175,7 +1199,7 @@ class ImageVolume(VolumeBase, solids.ImageSolid):
             itk_image = itk.imread(ensure_filename_is_str(path))
         return itk_image
 
-    def create_attenuation_image(self, database, energy):
+    def create_attenuation_image(self, database, energy, number_of_threads=1):
         # convert all materials to mu
         label_to_mu = {}
         mu_handler = g4.GateMaterialMuHandler.GetInstance(
@@ -1189,10 +1213,12 @@ class ImageVolume(VolumeBase, solids.ImageSolid):
             mu = mu_handler.GetMu(couple, energy / g4_units.MeV)
             label_to_mu[label] = mu
 
-        arr = itk.GetArrayViewFromImage(self.label_image)
-        mu_arr = arr.copy().astype("float32")
+        # label -> mu lookup table (labels without material keep their value)
+        lut = np.arange(max(self.material_to_label_lut.values()) + 1, dtype=np.float32)
         for label, mu in label_to_mu.items():
-            mu_arr[mu_arr == label] = mu
+            lut[label] = mu
+        arr = itk.GetArrayViewFromImage(self.label_image)
+        mu_arr = apply_lut_to_array(arr, lut, number_of_threads=number_of_threads)
         itk_mu_img = itk.GetImageFromArray(mu_arr)
         itk_mu_img.CopyInformation(self.itk_image)
         return itk_mu_img
@@ -1207,6 +1233,22 @@ class ImageVolume(VolumeBase, solids.ImageSolid):
         if self.material_to_label_lut is None:
             self.material_to_label_lut = self.create_material_to_label_lut()
 
+        cache_path = None
+        if self.label_image_cache_folder is not None:
+            key = compute_image_hash(
+                itk_image,
+                LABEL_IMAGE_CACHE_VERSION,
+                sorted(
+                    (float(a), float(b), str(m)) for a, b, m in self.voxel_materials
+                ),
+                sorted(self.material_to_label_lut.items()),
+            )
+            cache_path = Path(self.label_image_cache_folder) / f"{key}_labels.mha"
+            if cache_path.is_file():
+                label_image = itk.imread(str(cache_path))
+                label_image.CopyInformation(itk_image)
+                return label_image
+
         # sort voxel_materials according to lower bounds
         voxel_materials_sorted = sorted(self.voxel_materials, key=lambda x: x[0])
 
@@ -1234,12 +1276,17 @@ class ImageVolume(VolumeBase, solids.ImageSolid):
         # get numpy array view of input itk image
         input_image = itk.array_view_from_image(itk_image)
 
-        label_image_arr = np.array(labels_sorted, dtype=np.ushort)[
-            np.digitize(input_image, bins=bins_sorted)
-        ]
+        label_image_arr = apply_lut_to_array(
+            input_image, np.array(labels_sorted, dtype=np.ushort), bins=bins_sorted
+        )
 
         label_image = itk.image_from_array(label_image_arr)
         label_image.CopyInformation(itk_image)
+        if cache_path is not None:
+            write_file_atomically(
+                cache_path,
+                lambda tmp: itk.imwrite(label_image, str(tmp), compression=True),
+            )
         return label_image
 
     def create_image_parametrisation(self, label_image=None):
@@ -1291,8 +1338,12 @@ class ImageVolume(VolumeBase, solids.ImageSolid):
             -(self.size_pix * self.spacing) / 2.0 + self.spacing / 2.0
         )
 
-    def create_density_image(self):
-        return create_density_img(self, self.volume_manager.material_database)
+    def create_density_image(self, number_of_threads=1):
+        return create_density_img(
+            self,
+            self.volume_manager.material_database,
+            number_of_threads=number_of_threads,
+        )
 
     def create_changers(self):
         # get the changers from the mother classes and append those specific to the ImageVolume class
@@ -1302,13 +1353,21 @@ class ImageVolume(VolumeBase, solids.ImageSolid):
             if dp["extra_params"]["auto_changer"] is True:
                 if "image" in dp:
                     # Only create the serializable changer definition here.
-                    # The heavy label-image LUT is rebuilt later in
-                    # VolumeImageChanger.initialize().
+                    # The label images are created on demand by the
+                    # VolumeImageChanger during the simulation.
+                    # Options of the changer may be given to add_dynamic_parametrisation
+                    # (e.g. max_label_images=2)
+                    options = {
+                        k: v
+                        for k, v in dp["extra_params"].items()
+                        if k in VolumeImageChanger.user_info_defaults
+                    }
                     new_changer = VolumeImageChanger(
                         name=f"{self.name}_volume_image_changer_{len(changers)}",
                         attached_to=self,
                         simulation=self.simulation,
                         images=dp["image"],
+                        **options,
                     )
                     changers.append(new_changer)
                     counter += 1
@@ -1,10 +1,14 @@
 import itk
+import hashlib
 import numpy as np
+from pathlib import Path
 from box import Box
 from scipy.spatial.transform import Rotation
 import math
 import SimpleITK as sitk
+from concurrent.futures import ThreadPoolExecutor
 from .exception import fatal
+from .utility import write_file_atomically
 from .geometry.utility import (
     get_transform_world_to_local,
     vec_g4_as_np,
@@ -12,14 +16,19 @@ from .geometry.utility import (
 from .definitions import __gate_list_objects__
 
 
-def update_image_py_to_cpp(py_img, cpp_img, copy_data=False):
-    cpp_img.set_size(py_img.GetLargestPossibleRegion().GetSize())
+def update_image_py_to_cpp(py_img, cpp_img, copy_data=False, allocate=True):
+    """Copy the geometry (and optionally the data) of py_img to cpp_img.
+    With allocate=False, only the geometry is set and the cpp image has no buffer
+    (it is then the responsibility of the cpp side to allocate it).
+    """
+    cpp_img.set_size(py_img.GetLargestPossibleRegion().GetSize(), allocate=allocate)
     cpp_img.set_spacing(py_img.GetSpacing())
     cpp_img.set_origin(py_img.GetOrigin())
     # this is needed !
     cpp_img.set_region(
         py_img.GetLargestPossibleRegion().GetIndex(),
         py_img.GetLargestPossibleRegion().GetSize(),
+        allocate=allocate,
     )
     # It is really a pain to convert GetDirection into
     # something that can be read by SetDirection !
@@ -310,11 +319,80 @@ def transform_images_point(p, img1, img2):
     return [i for i in pbis]
 
 
+def _normalized_cumsum(array, axis):
+    # cumulated sum along the axis, normalised when the last value (sum) is not zero
+    t = np.cumsum(array, axis=axis, dtype=np.float64)
+    last = np.take(t, [-1], axis=axis)
+    np.divide(t, last, out=t, where=last != 0)
+    return t
+
+
+# number of voxels converted at once by apply_lut_to_array (bounds the memory
+# of the temporary index arrays)
+DEFAULT_LUT_CHUNK_SIZE = 2**22
+
+
+def apply_lut_to_array(
+    array, lut, bins=None, chunk_size=DEFAULT_LUT_CHUNK_SIZE, number_of_threads=1
+):
+    """
+    Convert the array with a lookup table: return lut[array], or
+    lut[np.digitize(array, bins)] if bins are given (i.e. the value of the
+    interval of each voxel), with the dtype of the lut.
+
+    The whole array is converted with one gather per chunk of slices (first
+    axis) of about chunk_size voxels, so that the temporary index arrays stay
+    small. With number_of_threads > 1, the chunks are converted in parallel
+    (numpy releases the GIL).
+    """
+    lut = np.asarray(lut)
+    if array.ndim == 0 or array.size == 0:
+        return lut[np.digitize(array, bins) if bins is not None else array]
+    output = np.empty(array.shape, dtype=lut.dtype)
+    slice_size = max(1, array[0].size)
+    step = max(1, chunk_size // slice_size)
+
+    def convert(start):
+        chunk = array[start : start + step]
+        if bins is not None:
+            chunk = np.digitize(chunk, bins)
+        output[start : start + step] = lut[chunk]
+
+    starts = range(0, len(array), step)
+    if number_of_threads > 1 and len(starts) > 1:
+        with ThreadPoolExecutor(max_workers=number_of_threads) as executor:
+            list(executor.map(convert, starts))
+    else:
+        for start in starts:
+            convert(start)
+    return output
+
+
+def create_intervals_lut(intervals, default_value=0, dtype=np.float32):
+    """
+    Build the bins and the lookup table to convert an image with a list of
+    (lower, upper, value) intervals [lower, upper[, to be used with
+    apply_lut_to_array. If the intervals overlap, the last one wins. The
+    voxels outside all intervals get the default value.
+    """
+    bins = np.unique([b for lower, upper, _ in intervals for b in (lower, upper)])
+    # index i of np.digitize is the elementary interval [bins[i-1], bins[i][
+    lut = np.full(len(bins) + 1, default_value, dtype=dtype)
+    for lower, upper, value in intervals:
+        first = np.searchsorted(bins, lower) + 1
+        last = np.searchsorted(bins, upper) + 1
+        lut[first:last] = value
+    return bins, lut
+
+
 def compute_image_3D_CDF(image):
     """
     Compute the three CDF (Cumulative Density Function) for the given image
     Warning; numpy order is ZYX
 
+    The CDF are contiguous float64 arrays:
+    cdf_x is (Z, Y, X), cdf_y is (Z, Y) and cdf_z is (Z,)
+
     :param image: itk image
     """
     # consider the image as a np array
@@ -324,40 +402,65 @@ def compute_image_3D_CDF(image):
     # array = itk.array_view_from_image(image)
     array = itk.array_from_image(image)
 
-    # normalize
-    array = array / np.sum(array)
+    # X 3D CDF: cumulated sum along X axis
+    cdf_x = _normalized_cumsum(array, axis=2)
+
+    # Y 2D CDF: sum image on a single plane along X axis
+    sumx = np.sum(array, axis=2, dtype=np.float64)
+    cdf_y = _normalized_cumsum(sumx, axis=1)
 
-    # Sum image on a single plane along X axis
-    sumx = np.sum(array, axis=2)
-    # Y axis, sum plane on a single axis along Y axis
+    # Z 1D CDF: Y axis, sum plane on a single axis along Y axis
     sumxy = np.sum(sumx, axis=1)
-    # X 3D CDF
-    cdf_x = []
-    for i in range(array.shape[0]):  # Z
-        cdf_x.append([])
-        for j in range(array.shape[1]):  # Y
-            # cumulated sum along X axis
-            t = np.cumsum(array[i][j])
-            # normalise if the last value (sum) is not zero
-            if t[-1] != 0:
-                t = t / t[-1]
-            cdf_x[i].append(t)
-
-    # Y 2D CDF
-    cdf_y = []
-    for i in range(len(sumx)):  # Z
-        t = np.cumsum(sumx[i])
-        if t[-1] != 0:
-            t = t / t[-1]
-        cdf_y.append(t)
-
-    # Z 1D CDF
     cdf_z = np.cumsum(sumxy) / np.sum(sumxy)
 
     # return
     return cdf_x, cdf_y, cdf_z
 
 
+def compute_image_hash(image, *extra):
+    """
+    Hash (hex string) of the pixel values of the image (and of the optional extra
+    values, converted to str), to be used as key of on-disk caches.
+    """
+    array = itk.array_view_from_image(image)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str((array.shape, array.dtype.str) + extra).encode())
+    h.update(np.ascontiguousarray(array).data)
+    return h.hexdigest()
+
+
+def read_image_and_3D_CDF(filename, cache_folder=None, return_cdf=True):
+    """
+    Read an image and compute its three CDF (see compute_image_3D_CDF).
+    With a cache_folder, the CDF are stored in (and read from) this folder as
+    .npy files named after a hash of the image content, so they are only
+    computed once for a given image, whatever its filename.
+
+    Return the hash, the image info (size, spacing, origin, dir) and the CDF
+    (cdf_x, cdf_y, cdf_z), or None if return_cdf is False.
+    """
+    image = itk.imread(str(filename))
+    key = compute_image_hash(image)
+    info = get_info_from_image(image)
+    info.dir = itk.array_from_matrix(image.GetDirection())
+
+    if cache_folder is None:
+        cdf = compute_image_3D_CDF(image) if return_cdf else None
+        return key, info, cdf
+
+    cache_folder = Path(cache_folder)
+    paths = [cache_folder / f"{key}_cdf_{a}.npy" for a in ("x", "y", "z")]
+    if not all(p.exists() for p in paths):
+        cache_folder.mkdir(parents=True, exist_ok=True)
+        cdf = compute_image_3D_CDF(image)
+        for p, c in zip(paths, cdf):
+            write_file_atomically(p, lambda tmp: np.save(tmp, c))
+        return key, info, cdf if return_cdf else None
+    if not return_cdf:
+        return key, info, None
+    return key, info, tuple(np.load(p, mmap_mode="r") for p in paths)
+
+
 def scale_itk_image(img, scale):
     imgarr = itk.array_from_image(img)
     imgarr = imgarr * scale
@@ -9,6 +9,7 @@ import time
 import traceback
 import uuid
 import copy
+import functools
 from datetime import datetime
 from pathlib import Path
 import json
@@ -16,6 +17,7 @@ import json
 import numpy as np
 import opengate_core as g4
 
+from .autotune import run_pilot_simulation
 from .coordinators import RootMergeCoordinator, StandardMergeCoordinator
 from .exception import (
     GateJobsBackendError,
@@ -46,10 +48,18 @@ JOB_METADATA_FILENAME = "job_metadata.json"
 JOB_EXECUTION_STATUS_FILENAME = "job_execution_status.json"
 JOB_SIMULATION_FILENAME = DEFAULT_SIMULATION_FILENAME
 MASTER_SIMULATION_FILENAME = DEFAULT_SIMULATION_FILENAME
-JOB_EXECUTION_ALLOWED_STATUSES = ("running", "completed", "failed", "skipped")
+# "retrying": the last attempt failed, the job will be run again (not final)
+JOB_EXECUTION_ALLOWED_STATUSES = (
+    "running",
+    "completed",
+    "failed",
+    "retrying",
+    "skipped",
+)
 HTCONDOR_SUBMIT_FILENAME = "htcondor_jobs.submit"
 SLURM_SUBMIT_FILENAME = "slurm_jobs.sh"
 SLURM_JOB_FOLDERS_FILENAME = "slurm_job_folders.txt"
+JOB_RUNNER_LOG_FILENAME = "job_runner.log"
 
 
 def _prepare_package_root(path, overwrite=False):
@@ -237,11 +247,16 @@ def _split_in_time_per_run(run_timing_intervals, number_of_jobs):
     return job_definitions
 
 
-def _split_in_time_total(run_timing_intervals, number_of_jobs):
+def _split_in_time_total(
+    run_timing_intervals, number_of_jobs, job_active_durations=None
+):
     # Split the total active simulation time into consecutive jobs. Unlike
     # _split_in_time_per_run(), a single job may span several original runs.
+    # By default all jobs get the same active time, job_active_durations can
+    # set the active time of each job instead (the last job takes the rest).
     total_active_time = sum(end - start for start, end in run_timing_intervals)
-    target_job_active_duration = total_active_time / number_of_jobs
+    if job_active_durations is None:
+        job_active_durations = [total_active_time / number_of_jobs] * number_of_jobs
     job_definitions = []
 
     current_original_run_index = 0
@@ -254,7 +269,7 @@ def _split_in_time_total(run_timing_intervals, number_of_jobs):
         if job_index == number_of_jobs:
             remaining_active_time_to_fill_job = math.inf
         else:
-            remaining_active_time_to_fill_job = target_job_active_duration
+            remaining_active_time_to_fill_job = job_active_durations[job_index - 1]
 
         while current_original_run_index < len(run_timing_intervals):
             original_run_start, original_run_end = run_timing_intervals[
@@ -323,16 +338,200 @@ def _split_in_time_total(run_timing_intervals, number_of_jobs):
     return job_definitions
 
 
-def _generate_job_definitions(run_timing_intervals, number_of_jobs, policy):
+def _integrate_source_activity(source, t0, t1):
+    """Expected number of decays of an activity source during [t0, t1], with
+    the same activity model as the C++ sources (half life or TAC).
+    """
+    t0 = max(t0, source.start_time)
+    t1 = min(t1, source.end_time)
+    if t1 <= t0:
+        return 0.0
+    tac_times = getattr(source, "tac_times", None)
+    if tac_times is not None:
+        tac_times = np.asarray(tac_times, dtype=float)
+        tac_activities = np.asarray(source.tac_activities, dtype=float)
+        # the TAC is linear between its points: the trapezoid rule is exact
+        t = np.unique(
+            np.concatenate(([t0, t1], tac_times[(tac_times > t0) & (tac_times < t1)]))
+        )
+        a = np.interp(t, tac_times, tac_activities, left=0, right=0)
+        return float(np.sum(0.5 * (a[1:] + a[:-1]) * np.diff(t)))
+    if source.half_life <= 0:
+        return source.activity * (t1 - t0)
+    decay_constant = math.log(2) / source.half_life
+    return (
+        source.activity
+        / decay_constant
+        * (
+            math.exp(-decay_constant * (t0 - source.start_time))
+            - math.exp(-decay_constant * (t1 - source.start_time))
+        )
+    )
+
+
+def _compute_expected_events_per_run_bin(
+    simulation, run_timing_intervals, bins_per_run, source_costs=None
+):
+    """Expected number of events in each of the bins_per_run time bins of each
+    run, summed over the sources. Each source can be weighted by its relative
+    cost per event (source_costs, by source name, default 1).
+    Return a list of (bin_edges, events) per run.
+    """
+    source_costs = source_costs or {}
+    # one number of primaries per run for the sources without activity
+    primaries_per_run = {}
+    for source in simulation.source_manager.sources.values():
+        if source.activity > 0:
+            continue
+        counts = np.atleast_1d(source.number_of_primaries)
+        if len(counts) != len(run_timing_intervals):
+            fatal(
+                f"Source '{source.name}' defines number_of_primaries={list(counts)}, "
+                f"but the simulation has {len(run_timing_intervals)} run timing "
+                f"intervals: the split_in_cost policy needs one number of "
+                f"primaries per run."
+            )
+        primaries_per_run[source.name] = counts
+    unpredictable_sources = []
+    events_per_run_bin = []
+    for run_index, (start, end) in enumerate(run_timing_intervals):
+        edges = np.linspace(start, end, bins_per_run + 1)
+        events = np.zeros(bins_per_run)
+        for source in simulation.source_manager.sources.values():
+            weight = float(source_costs.get(source.name, 1.0))
+            if not source.can_predict_number_of_events():
+                unpredictable_sources.append(source.name)
+            if source.activity > 0:
+                events += weight * np.array(
+                    [
+                        _integrate_source_activity(source, t0, t1)
+                        for t0, t1 in zip(edges[:-1], edges[1:])
+                    ]
+                )
+            else:
+                # the primaries of a run are split in proportion to time, see
+                # _compute_source_primaries_assignments()
+                events += (
+                    weight * primaries_per_run[source.name][run_index] / bins_per_run
+                )
+        events_per_run_bin.append((edges, events))
+    if len(unpredictable_sources) > 0:
+        warning(
+            f"The number of events of the sources {sorted(set(unpredictable_sources))} "
+            f"cannot be predicted exactly, the number of primaries is used instead "
+            f"for the split cost model."
+        )
+    return events_per_run_bin
+
+
+def _measure_events_per_second_with_pilot_run(simulation, pilot_fraction):
+    """Run a short pilot simulation covering the first pilot_fraction of each
+    run and return the events per second measured in each run.
+    """
+    return run_pilot_simulation(simulation, pilot_fraction).events_per_second_per_run
+
+
+def _build_split_cost_model(
+    simulation,
+    run_timing_intervals,
+    events_per_second=None,
+    source_costs=None,
+    pilot_fraction=None,
+    cost_bins_per_run=1000,
+):
+    """Expected wall time (or relative cost if the speed is unknown) in the
+    time bins of each run, used by the split_in_cost policy.
+
+    The number of expected events comes from the sources (activity integrals
+    or number of primaries). It is converted to seconds with the events per
+    second of each run: given by the user (one value, or one per run), or
+    measured by a pilot run on pilot_fraction of each run.
+    """
+    # before the pilot run, so that an invalid source stops the split at once
+    expected_events_per_run_bin = _compute_expected_events_per_run_bin(
+        simulation, run_timing_intervals, int(cost_bins_per_run), source_costs
+    )
+    if pilot_fraction is not None:
+        if not 0 < pilot_fraction <= 1:
+            raise GateSplitError(
+                f"The split pilot_fraction must be in ]0, 1], got {pilot_fraction}."
+            )
+        events_per_second = _measure_events_per_second_with_pilot_run(
+            simulation, pilot_fraction
+        )
+    cost_unit = "s"
+    if events_per_second is None:
+        events_per_second = 1.0
+        cost_unit = "events"
+    events_per_second = np.broadcast_to(
+        np.asarray(events_per_second, dtype=float), (len(run_timing_intervals),)
+    )
+    if np.any(events_per_second <= 0):
+        raise GateSplitError(
+            f"The split events_per_second must be > 0, got {list(events_per_second)}."
+        )
+    cost_per_run_bin = [
+        (edges, events / speed)
+        for (edges, events), speed in zip(
+            expected_events_per_run_bin, events_per_second
+        )
+    ]
+    return {
+        "cost_per_run_bin": cost_per_run_bin,
+        "cost_unit": cost_unit,
+        "events_per_second": [float(v) for v in events_per_second],
+    }
+
+
+def _split_in_cost(run_timing_intervals, number_of_jobs, cost_model):
+    # Cumulated cost along the total active time (the runs put end to end, as
+    # in _split_in_time_total): the jobs are cut where it reaches k/N of the
+    # total, assuming a constant cost rate within each bin.
+    active_time = [0.0]
+    cumulated_cost = [0.0]
+    for edges, costs in cost_model["cost_per_run_bin"]:
+        active_time.extend(active_time[-1] + np.cumsum(np.diff(edges)))
+        cumulated_cost.extend(cumulated_cost[-1] + np.cumsum(costs))
+    active_time = np.asarray(active_time)
+    cumulated_cost = np.asarray(cumulated_cost)
+    total_cost = cumulated_cost[-1]
+    if total_cost <= 0:
+        warning(
+            "The expected cost of the simulation is zero, the split_in_cost "
+            "policy falls back to split_in_time_total."
+        )
+        return _split_in_time_total(run_timing_intervals, number_of_jobs)
+    cuts = np.interp(
+        np.linspace(0, total_cost, number_of_jobs + 1), cumulated_cost, active_time
+    )
+    cuts[-1] = active_time[-1]
+    job_definitions = _split_in_time_total(
+        run_timing_intervals,
+        number_of_jobs,
+        job_active_durations=[float(d) for d in np.diff(cuts)],
+    )
+    predicted_costs = np.diff(np.interp(cuts, active_time, cumulated_cost))
+    for job_definition, predicted_cost in zip(job_definitions, predicted_costs):
+        job_definition["predicted_cost"] = float(predicted_cost)
+        job_definition["predicted_cost_unit"] = cost_model["cost_unit"]
+    return job_definitions
+
+
+def _generate_job_definitions(
+    run_timing_intervals, number_of_jobs, policy, cost_model=None
+):
     if number_of_jobs < 1:
         fatal(f"The number of jobs must be >= 1, but received {number_of_jobs}.")
     if policy == "split_in_time_per_run":
         return _split_in_time_per_run(run_timing_intervals, number_of_jobs)
     if policy == "split_in_time_total":
         return _split_in_time_total(run_timing_intervals, number_of_jobs)
+    if policy == "split_in_cost":
+        return _split_in_cost(run_timing_intervals, number_of_jobs, cost_model)
     fatal(
         f"Unknown split policy '{policy}'. "
-        "Known policies are: 'split_in_time_per_run', 'split_in_time_total'."
+        "Known policies are: 'split_in_time_per_run', 'split_in_time_total', "
+        "'split_in_cost'."
     )
 
 
@@ -515,6 +714,8 @@ def _configure_child_simulation(
         ),
         "original_run_indices": list(job_definition["original_run_indices"]),
         "simulation_filename": JOB_SIMULATION_FILENAME,
+        "predicted_cost": job_definition.get("predicted_cost"),
+        "predicted_cost_unit": job_definition.get("predicted_cost_unit"),
     }
     return job_folder, child_metadata
 
@@ -848,6 +1049,7 @@ class JobsSplitManager:
         is_time_split = self.policy in (
             "split_in_time_per_run",
             "split_in_time_total",
+            "split_in_cost",
         )
 
         for actor_name, actor in self.master_simulation.actor_manager.actors.items():
@@ -933,10 +1135,30 @@ class JobsSplitManager:
 
         # Build the split plan before touching the filesystem so invalid
         # requests do not leave behind half-created split folders.
+        cost_model = None
+        if self.policy == "split_in_cost":
+            cost_model = _build_split_cost_model(
+                self.master_simulation,
+                self.original_run_timing_intervals,
+                **{
+                    key: self.options[key]
+                    for key in (
+                        "events_per_second",
+                        "source_costs",
+                        "pilot_fraction",
+                        "cost_bins_per_run",
+                    )
+                    if key in self.options
+                },
+            )
+            if "pilot_fraction" in self.options:
+                # measured by the pilot run: keep it in the manifest
+                self.options["events_per_second"] = cost_model["events_per_second"]
         self.job_definitions = _generate_job_definitions(
             self.original_run_timing_intervals,
             self.number_of_jobs,
             self.policy,
+            cost_model=cost_model,
         )
         self.source_primaries_assignments = _compute_source_primaries_assignments(
             self.master_simulation,
@@ -1041,6 +1263,8 @@ class JobsSplitManager:
                     "job_id": child_metadata["job_id"],
                     "folder_name": job_definition["folder_name"],
                     "metadata_filename": JOB_METADATA_FILENAME,
+                    "predicted_cost": job_definition.get("predicted_cost"),
+                    "predicted_cost_unit": job_definition.get("predicted_cost_unit"),
                 }
             )
             self._job_folders.append(job_folder)
@@ -1213,6 +1437,9 @@ def _build_jobs_split_summary_from_manifest(manifest_path, manifest):
                 ),
                 "original_run_indices": metadata.get("original_run_indices", []),
                 "run_timing_intervals": metadata.get("run_timing_intervals", []),
+                "predicted_cost": job_item.get("predicted_cost"),
+                "predicted_cost_unit": job_item.get("predicted_cost_unit"),
+                "actual_duration": job_item.get("actual_duration"),
             }
         )
     return {
@@ -1266,6 +1493,13 @@ def format_jobs_split_summary(summary_or_manifest_path):
                 f"|   | local timing intervals: {_format_timing_intervals(job['run_timing_intervals'])}",
             ]
         )
+        if job.get("predicted_cost") is not None:
+            lines.append(
+                f"|   | predicted cost: {job['predicted_cost']:.4g} "
+                f"{job['predicted_cost_unit']}"
+            )
+        if job.get("actual_duration") is not None:
+            lines.append(f"|   | actual duration: {job['actual_duration']:.4g} s")
     return "\n".join(lines)
 
 
@@ -1357,7 +1591,7 @@ def _write_job_execution_status(
     return status_data
 
 
-def _run_job_folder(job_folder, backend, start_new_process):
+def _run_job_folder(job_folder, backend, start_new_process, failed_status="failed"):
     """Execute one child job from its persisted job folder.
 
     The caller decides whether the simulation itself should run in the current
@@ -1365,6 +1599,9 @@ def _run_job_folder(job_folder, backend, start_new_process):
     ``sim.run(start_new_process=...)``. That choice is separate from the
     campaign-level process created in ``jobs_run()``, whose role is only to
     detach orchestration from the caller.
+
+    failed_status is the execution status written if the job fails:
+    "retrying" when the caller will run the job again.
     """
     job_folder = Path(job_folder).resolve()
     metadata = {
@@ -1417,7 +1654,7 @@ def _run_job_folder(job_folder, backend, start_new_process):
             job_folder,
             metadata,
             backend=backend,
-            status="failed",
+            status=failed_status,
             submitted_at=submitted_at,
             started_at=started_at,
             finished_at=finished_at,
@@ -1432,12 +1669,15 @@ def _run_job_folder(job_folder, backend, start_new_process):
         }
 
 
-def _run_job_folder_cli(job_folder, backend="local_cli", start_new_process=False):
+def _run_job_folder_cli(
+    job_folder, backend="local_cli", start_new_process=False, failed_status="failed"
+):
     """Run one persisted child job folder and return its execution summary."""
     return _run_job_folder(
         job_folder,
         backend=backend,
         start_new_process=start_new_process,
+        failed_status=failed_status,
     )
 
 
@@ -1503,6 +1743,204 @@ def _run_job_folders_in_local_pool(
         raise
 
 
+def _get_expected_job_cost(job_folder):
+    """Expected relative cost of a job: the cost predicted by the split_in_cost
+    policy if any, otherwise the total duration of its run timing intervals
+    (the primaries are split in proportion to time, so this is a proxy for the
+    number of simulated events).
+    """
+    try:
+        metadata = _load_job_metadata(job_folder)
+    except (OSError, ValueError):
+        return 0.0
+    if metadata.get("predicted_cost") is not None:
+        return float(metadata["predicted_cost"])
+    return float(
+        sum(
+            interval[1] - interval[0]
+            for interval in metadata.get("run_timing_intervals", [])
+        )
+    )
+
+
+def _resolve_cpu_affinity_slots(cpu_affinity, n_workers):
+    """Return one set of CPUs per concurrent job slot, or None."""
+    if cpu_affinity is None:
+        return None
+    if cpu_affinity == "auto":
+        cpus = sorted(os.sched_getaffinity(0))
+        n = max(1, len(cpus) // n_workers)
+        # with more jobs than CPUs, several slots share a CPU
+        return [set(cpus[(i * n) % len(cpus) :][:n]) for i in range(n_workers)]
+    return [set(int(cpu) for cpu in cpus) for cpus in cpu_affinity]
+
+
+def _set_process_cpu_affinity(cpus):
+    # run in the child process, before the job runner command is executed
+    os.sched_setaffinity(0, cpus)
+
+
+def _start_job_runner_process(
+    job_folder, job_runner_command, cpus, log_file, last_attempt=True
+):
+    command = list(job_runner_command) + [
+        str(job_folder),
+        "--backend",
+        "local_subprocess",
+    ]
+    if not last_attempt:
+        # a failure is not final, the job will be run again
+        command += ["--failed-status", "retrying"]
+    return subprocess.Popen(
+        command,
+        cwd=str(job_folder),
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+        preexec_fn=(
+            functools.partial(_set_process_cpu_affinity, cpus)
+            if cpus is not None
+            else None
+        ),
+    )
+
+
+def _finish_job_attempt(job_folder, process, timed_out, last_attempt=True):
+    """Return the status of a finished job runner process. The job runner
+    writes its own status, except when it crashed (e.g. segfault) or was
+    killed: the failure is then recorded here. The failure of an attempt that
+    is not the last one is recorded as "retrying" (not final, so that e.g. an
+    incremental merge does not stop on it).
+    """
+    failed_status = "failed" if last_attempt else "retrying"
+    status = load_job_execution_status(job_folder) or {}
+    if process.returncode == 0 and status.get("status") == "completed":
+        return "completed", None
+    if timed_out:
+        error_message = "The job exceeded the wall time and was killed."
+    elif status.get("status") in ("failed", "retrying"):
+        error_message = status.get("error_message")
+    else:
+        error_message = (
+            f"The job runner process terminated with exit code {process.returncode}."
+        )
+    if status.get("status") != failed_status or timed_out:
+        try:
+            metadata = _load_job_metadata(job_folder)
+        except (OSError, ValueError):
+            metadata = {}
+        _write_job_execution_status(
+            job_folder,
+            metadata,
+            backend="local_subprocess",
+            status=failed_status,
+            submitted_at=status.get("submitted_at"),
+            started_at=status.get("started_at"),
+            finished_at=_now_isoformat(),
+            error_message=error_message,
+        )
+    return "failed", error_message
+
+
+def _run_job_folders_in_local_subprocess(
+    job_folders,
+    n_workers,
+    max_retries=1,
+    wall_time=None,
+    cpu_affinity=None,
+    job_runner_command=None,
+    poll_interval=0.2,
+):
+    """Run each job in its own job runner OS process, at most n_workers at a
+    time. Contrary to local_pool, a crashed job (segfault, out of memory) only
+    affects itself: its exit code is checked, the job is retried up to
+    max_retries times, and killed if it runs longer than wall_time seconds.
+    The longest jobs are started first to shorten the total duration, and each
+    concurrent job can be pinned to a set of CPUs (cpu_affinity).
+    """
+    if int(n_workers) < 1:
+        raise GateJobsBackendError(
+            "The local_subprocess backend requires n_workers >= 1."
+        )
+    n_workers = int(n_workers)
+    cpu_slots = _resolve_cpu_affinity_slots(cpu_affinity, n_workers)
+    if cpu_slots is not None:
+        n_workers = min(n_workers, len(cpu_slots))
+
+    # longest expected jobs first (LPT scheduling)
+    job_folders = [Path(job_folder).resolve() for job_folder in job_folders]
+    pending = sorted(
+        job_folders,
+        key=lambda job_folder: -_get_expected_job_cost(job_folder),
+    )
+    attempts = {job_folder: 0 for job_folder in pending}
+    results = {}
+    running = {}
+    free_slots = list(range(n_workers))
+
+    try:
+        while len(pending) > 0 or len(running) > 0:
+            while len(pending) > 0 and len(free_slots) > 0:
+                job_folder = pending.pop(0)
+                slot = free_slots.pop(0)
+                attempts[job_folder] += 1
+                last_attempt = attempts[job_folder] > max_retries
+                log_file = open(job_folder / JOB_RUNNER_LOG_FILENAME, "a")
+                log_file.write(
+                    f"--- attempt {attempts[job_folder]} ({_now_isoformat()}) ---\n"
+                )
+                log_file.flush()
+                process = _start_job_runner_process(
+                    job_folder,
+                    job_runner_command,
+                    cpus=None if cpu_slots is None else cpu_slots[slot],
+                    log_file=log_file,
+                    last_attempt=last_attempt,
+                )
+                running[job_folder] = (process, slot, log_file, time.perf_counter())
+
+            time.sleep(poll_interval)
+
+            for job_folder, (process, slot, log_file, start) in list(running.items()):
+                timed_out = False
+                if process.poll() is None:
+                    if wall_time is None or time.perf_counter() - start <= wall_time:
+                        continue
+                    timed_out = True
+                    process.kill()
+                    process.wait()
+                log_file.close()
+                del running[job_folder]
+                free_slots.append(slot)
+                last_attempt = attempts[job_folder] > max_retries
+                status, error_message = _finish_job_attempt(
+                    job_folder, process, timed_out, last_attempt
+                )
+                if status == "failed" and not last_attempt:
+                    # retried first: it is (one of) the longest jobs
+                    pending.insert(0, job_folder)
+                    continue
+                metadata = _load_job_metadata(job_folder)
+                results[job_folder] = {
+                    "job_id": metadata.get("job_id"),
+                    "job_index": metadata.get("job_index"),
+                    "job_folder": str(job_folder),
+                    "status": status,
+                    "attempts": attempts[job_folder],
+                    "exit_code": process.returncode,
+                    "duration": time.perf_counter() - start,
+                }
+                if error_message is not None:
+                    results[job_folder]["error_message"] = error_message
+    finally:
+        # do not leave orphan simulations behind if the orchestration stops
+        for process, _, log_file, _ in running.values():
+            process.kill()
+            process.wait()
+            log_file.close()
+
+    return [results[job_folder] for job_folder in job_folders]
+
+
 def _render_htcondor_submit_file_lines(job_folders, backend_options):
     submit_file_commands = {
         "universe": "vanilla",
@@ -1731,6 +2169,39 @@ def _submit_job_folders_to_slurm(
     }
 
 
+def record_job_durations_in_manifest(split_path):
+    """Store the actual wall time of each completed job (from its execution
+    status) in the jobs manifest, next to the cost predicted at split time.
+    Return the list of (folder_name, predicted_cost, actual_duration).
+    """
+    manifest_path, manifest = _load_jobs_manifest(split_path)
+    durations = []
+    for job_item in manifest.get("jobs", []):
+        status = load_job_execution_status(
+            manifest_path.parent / job_item["folder_name"]
+        )
+        if (
+            status is None
+            or status.get("status") != "completed"
+            or status.get("started_at") is None
+            or status.get("finished_at") is None
+        ):
+            continue
+        job_item["actual_duration"] = (
+            datetime.fromisoformat(status["finished_at"])
+            - datetime.fromisoformat(status["started_at"])
+        ).total_seconds()
+        durations.append(
+            (
+                job_item["folder_name"],
+                job_item.get("predicted_cost"),
+                job_item["actual_duration"],
+            )
+        )
+    _dump_json_atomic(manifest_path, manifest)
+    return durations
+
+
 def _run_jobs_campaign(job_folders, backend, backend_options):
     """Run the detached campaign-level orchestration for a selected backend.
 
@@ -1739,12 +2210,16 @@ def _run_jobs_campaign(job_folders, backend, backend_options):
     campaign from the caller process.
     """
     if backend == "local_sequential":
-        return _run_job_folders_in_local_sequential(job_folders)
-
-    if backend == "local_pool":
-        return _run_job_folders_in_local_pool(job_folders, **backend_options)
-
-    raise GateJobsBackendError(f"Unknown jobs backend '{backend}'.")
+        results = _run_job_folders_in_local_sequential(job_folders)
+    elif backend == "local_pool":
+        results = _run_job_folders_in_local_pool(job_folders, **backend_options)
+    elif backend == "local_subprocess":
+        results = _run_job_folders_in_local_subprocess(job_folders, **backend_options)
+    else:
+        raise GateJobsBackendError(f"Unknown jobs backend '{backend}'.")
+    if len(job_folders) > 0:
+        record_job_durations_in_manifest(Path(job_folders[0]).parent)
+    return results
 
 
 def _validate_jobs_backend_options(backend, backend_options):
@@ -1770,6 +2245,71 @@ def _validate_jobs_backend_options(backend, backend_options):
             )
         return pooling_options
 
+    if backend == "local_subprocess":
+        allowed_backend_keys = {
+            "max_retries",
+            "wall_time",
+            "cpu_affinity",
+            "job_runner_command",
+        }
+        unknown_backend_keys = set(backend_options.keys()).difference(
+            allowed_backend_keys
+        )
+        if len(unknown_backend_keys) > 0:
+            raise GateJobsBackendError(
+                f"The local_subprocess backend received unknown backend_options: "
+                f"{sorted(unknown_backend_keys)}."
+            )
+        validated_options = dict(backend_options)
+        validated_options.setdefault("max_retries", 1)
+        validated_options.setdefault("wall_time", None)
+        validated_options.setdefault("cpu_affinity", None)
+        validated_options.setdefault(
+            "job_runner_command",
+            [sys.executable, "-m", "opengate.bin.opengate_job_runner"],
+        )
+        try:
+            validated_options["max_retries"] = int(validated_options["max_retries"])
+        except (TypeError, ValueError) as error:
+            raise GateJobsBackendError(
+                "The local_subprocess backend requires an integer max_retries."
+            ) from error
+        if validated_options["max_retries"] < 0:
+            raise GateJobsBackendError(
+                "The local_subprocess backend requires max_retries >= 0."
+            )
+        if validated_options["wall_time"] is not None:
+            validated_options["wall_time"] = float(validated_options["wall_time"])
+            if validated_options["wall_time"] <= 0:
+                raise GateJobsBackendError(
+                    "The local_subprocess backend requires wall_time > 0 (seconds)."
+                )
+        cpu_affinity = validated_options["cpu_affinity"]
+        if cpu_affinity is not None:
+            if not hasattr(os, "sched_setaffinity"):
+                raise GateJobsBackendError(
+                    "cpu_affinity is not supported on this platform."
+                )
+            if cpu_affinity != "auto" and (
+                not isinstance(cpu_affinity, (list, tuple))
+                or len(cpu_affinity) == 0
+                or not all(
+                    isinstance(cpus, (list, tuple)) and len(cpus) > 0
+                    for cpus in cpu_affinity
+                )
+            ):
+                raise GateJobsBackendError(
+                    "The local_subprocess backend requires cpu_affinity to be None, "
+                    "'auto', or a list with one list of CPU ids per concurrent job."
+                )
+        job_runner_command = validated_options["job_runner_command"]
+        if isinstance(job_runner_command, str):
+            job_runner_command = [job_runner_command]
+        validated_options["job_runner_command"] = [
+            str(argument) for argument in job_runner_command
+        ]
+        return validated_options
+
     if backend == "htcondor":
         allowed_top_level_keys = {
             "submit_file_commands",
@@ -1993,8 +2533,8 @@ def jobs_run(
             **submission_summary,
         }
 
-    if backend in ("local_sequential", "local_pool"):
-        if number_of_workers is None and backend == "local_pool":
+    if backend in ("local_sequential", "local_pool", "local_subprocess"):
+        if number_of_workers is None and backend in ("local_pool", "local_subprocess"):
             number_of_workers = manifest.get(
                 "number_of_jobs", len(manifest.get("jobs", []))
             )
@@ -2013,6 +2553,11 @@ def jobs_run(
             backend_options = {
                 "n_workers": number_of_workers,
             }
+        if backend == "local_subprocess":
+            backend_options = {
+                **backend_options,
+                "n_workers": number_of_workers,
+            }
 
         if detach is False:
             submitted_at = _now_isoformat()
@@ -2167,7 +2712,10 @@ class SplitRunMergeController:
             summary_counts = latest_jobs_status.get("summary_counts", {})
             if execution_counts.get("failed", 0) > 0:
                 return "failed"
-            if execution_counts.get("running", 0) > 0:
+            if (
+                execution_counts.get("running", 0) > 0
+                or execution_counts.get("retrying", 0) > 0
+            ):
                 return "running"
             if execution_counts.get("completed", 0) > 0 and execution_counts.get(
                 "completed", 0
@@ -2229,7 +2777,7 @@ class SplitRunMergeController:
             run_options = dict(run_options)
             run_options.setdefault("backend", self.backend)
             if (
-                run_options["backend"] == "local_pool"
+                run_options["backend"] in ("local_pool", "local_subprocess")
                 and "number_of_workers" not in run_options
             ):
                 run_options["number_of_workers"] = self._status["split_result"][
@@ -2279,6 +2827,41 @@ class SplitRunMergeController:
             self._set_error(error)
             raise
 
+    def merge_incrementally(self, poll_interval=1.0, timeout=None, **merge_options):
+        """Merge the job outputs as soon as each job completes, while the
+        campaign is running, see JobsMergeManager.merge_incrementally(). The
+        final merge only has to wait for the last job.
+        """
+        if self._campaign_dir is None:
+            fatal(
+                "SplitRunMergeController.merge_incrementally() requires split() "
+                "to be called first."
+            )
+        merge_options = dict(merge_options)
+        incremental_options = {
+            key: merge_options.pop(key)
+            for key in ("write_partial_results", "callback")
+            if key in merge_options
+        }
+        try:
+            self.merge_manager = jobs_merge(
+                self._campaign_dir,
+                target_simulation=self.simulation,
+                execute=False,
+                **merge_options,
+            )
+            self.merge_manager.merge_incrementally(
+                poll_interval=poll_interval, timeout=timeout, **incremental_options
+            )
+            self._status["merge_result"] = self.merge_manager.merge_result
+            self._stage = "merged"
+            self.refresh()
+            return self.merge_manager
+        except Exception as error:
+            self.refresh()
+            self._set_error(error)
+            raise
+
     def clean(self, **clean_options):
         if self._campaign_dir is None:
             fatal(
@@ -2307,7 +2890,14 @@ class SplitRunMergeController:
         run_options=None,
         merge_options=None,
         clean_options=None,
+        incremental_merge=False,
     ):
+        """Split, run and (optionally) wait for the campaign, merge and clean.
+
+        With incremental_merge=True (and wait_for_result=True), the outputs of
+        the jobs are merged as soon as each job completes, instead of once all
+        jobs are done.
+        """
         if merge_after_run is None:
             merge_after_run = self.merge_after_run
         if cleanup_after_run is None:
@@ -2316,7 +2906,22 @@ class SplitRunMergeController:
         self.split(number_of_jobs=number_of_jobs, **(split_options or {}))
         self.run(**(run_options or {}))
 
-        if wait_for_result:
+        if wait_for_result and merge_after_run and incremental_merge:
+            try:
+                self.merge_incrementally(
+                    poll_interval=poll_interval,
+                    timeout=timeout,
+                    **(merge_options or {}),
+                )
+            except GateMergeError:
+                # as with wait(), a failed job is reported in the status
+                jobs_status_data = self._status.get("jobs_status") or {}
+                if jobs_status_data.get("execution_counts", {}).get("failed", 0) > 0:
+                    return self
+                raise
+            if cleanup_after_run:
+                self.clean(**(clean_options or {}))
+        elif wait_for_result:
             self.wait(poll_interval=poll_interval, timeout=timeout)
             if self.stage == "failed":
                 return self
@@ -2650,6 +3255,7 @@ class JobsMergeManager:
         split_path,
         output_dir_override=None,
         target_simulation=None,
+        n_workers=1,
         **options,
     ):
         self.manifest_path, self.manifest = _load_jobs_manifest(split_path)
@@ -2658,6 +3264,15 @@ class JobsMergeManager:
             None if output_dir_override is None else Path(output_dir_override).resolve()
         )
         self.options = dict(options)
+        try:
+            self.n_workers = int(n_workers)
+        except (TypeError, ValueError):
+            self.n_workers = 0
+        if self.n_workers < 1:
+            raise GateMergeError(
+                f"jobs_merge(n_workers=...) requires an integer n_workers >= 1. "
+                f"Received: {n_workers}"
+            )
         self.master_simulation = target_simulation
         self._target_simulation_was_provided = target_simulation is not None
         self.leaf_sources = []
@@ -2677,6 +3292,12 @@ class JobsMergeManager:
         self.merge_context = None
         self.standard_merge_coordinator = None
         self.root_merge_coordinator = None
+        self._output_merge_timings = None
+        # jobs already merged by merge_jobs() (incremental merge), and merged
+        # jobs whose ROOT entries are held back until the ROOT entries of the
+        # previous jobs (in job order) are appended
+        self._merged_job_indices = set()
+        self._held_job_indices = set()
 
     def get_master_simulation_paths(self):
         return _get_master_simulation_paths_from_manifest(
@@ -2704,6 +3325,11 @@ class JobsMergeManager:
     def execution_duration(self):
         return self._execution_duration
 
+    @property
+    def output_merge_timings(self):
+        """Execute and finalize durations (in seconds) of each merged actor output."""
+        return self._output_merge_timings
+
     @property
     def merge_planned(self):
         return self._merge_planned
@@ -2826,6 +3452,7 @@ class JobsMergeManager:
             }
         )
 
+        source_simulations = {}
         for source in self.leaf_sources:
             job_index = source["job_index"]
             merge_context.set_source_info(
@@ -2841,9 +3468,9 @@ class JobsMergeManager:
                     ),
                 },
             )
-            child_simulation = create_sim_from_json(source["simulation_path"])
-            child_simulation.simulation_dir = source["folder"]
-            child_simulation.output_dir = Path(source["folder"]) / "output"
+            # parsed once, then re-used by the merge coordinators
+            child_simulation = self._get_child_simulation(source)
+            source_simulations[job_index] = child_simulation
             output_plans = child_simulation.plan_merge(mode=mode)
             for output_plan in output_plans:
                 merge_context.set_output_plan(
@@ -2861,12 +3488,16 @@ class JobsMergeManager:
                 source_simulation_id=source["metadata"].get("simulation_id"),
             )
 
-        self.standard_merge_coordinator = StandardMergeCoordinator()
+        self.standard_merge_coordinator = StandardMergeCoordinator(
+            n_workers=self.n_workers, source_simulations=source_simulations
+        )
         self.standard_merge_coordinator.configure_from_context(
             merge_context.get_standard_view(),
             self.master_simulation,
         )
-        self.root_merge_coordinator = RootMergeCoordinator()
+        self.root_merge_coordinator = RootMergeCoordinator(
+            n_workers=self.n_workers, source_simulations=source_simulations
+        )
         self.root_merge_coordinator.configure_from_context(
             merge_context.get_root_view(),
             self.master_simulation,
@@ -2882,6 +3513,8 @@ class JobsMergeManager:
         self._merge_planned = True
         self._merge_executed = False
         self._merge_finalized = False
+        self._merged_job_indices = set()
+        self._held_job_indices = set()
         return merge_context
 
     def build_summary_dict(self):
@@ -2945,6 +3578,8 @@ class JobsMergeManager:
             "total_merge_duration": self.total_merge_duration,
             "planning_duration": self.planning_duration,
             "execution_duration": self.execution_duration,
+            "n_workers": self.n_workers,
+            "output_merge_timings": self.output_merge_timings,
             "merge_planned": self.merge_planned,
             "merge_executed": self.merge_executed,
             "merge_finalized": self.merge_finalized,
@@ -2978,6 +3613,15 @@ class JobsMergeManager:
             lines.append(f"| planning duration: {self.planning_duration:.3f} s")
         if self.execution_duration is not None:
             lines.append(f"| execution duration: {self.execution_duration:.3f} s")
+        lines.append(f"| merge workers: {self.n_workers}")
+        if self.output_merge_timings is not None:
+            lines.append("| merge duration per actor output:")
+            for timing in self.output_merge_timings:
+                lines.append(
+                    f"| - {timing['actor_name']}.{timing['output_name']}: "
+                    f"execute {timing['execute_duration']:.3f} s, "
+                    f"finalize {timing['finalize_duration']:.3f} s"
+                )
         lines.append(f"| merge planned: {self.merge_planned}")
         lines.append(f"| merge executed: {self.merge_executed}")
         lines.append(f"| merge finalized: {self.merge_finalized}")
@@ -3065,6 +3709,23 @@ class JobsMergeManager:
                 "Call execute_merge() before finalize_merge(), or use merge()."
             )
         self.master_simulation.finalize_merge()
+        self._output_merge_timings = [
+            {
+                "actor_name": actor_name,
+                "output_name": output_name,
+                "coordinator": coordinator_name,
+                "execute_duration": timing["execute"],
+                "finalize_duration": timing["finalize"],
+            }
+            for coordinator_name, coordinator in (
+                ("standard", self.standard_merge_coordinator),
+                ("root", self.root_merge_coordinator),
+            )
+            for (
+                actor_name,
+                output_name,
+            ), timing in coordinator.output_merge_timings.items()
+        ]
         if self._execution_start_time is not None:
             self._execution_duration = time.perf_counter() - self._execution_start_time
         if self._merge_start_time is not None:
@@ -3089,11 +3750,154 @@ class JobsMergeManager:
             "planning_duration": self.planning_duration,
             "execution_duration": self.execution_duration,
             "total_merge_duration": self.total_merge_duration,
+            "n_workers": self.n_workers,
+            "output_merge_timings": self.output_merge_timings,
             "merge_planned": self.merge_planned,
             "merge_executed": self.merge_executed,
             "merge_finalized": self.merge_finalized,
         }
 
+    def merge_jobs(self, job_indices):
+        """Merge the outputs of the given (completed) jobs into the target
+        simulation. Each job must be given once; finalize_merge() must be
+        called once all jobs are merged.
+
+        Images and counters are added right away, whatever the job order. The
+        ROOT entries are appended in job order, as in the standard merge, so
+        that the merged ROOT files are identical (entry order and EventID
+        offsets): the ROOT entries of a job are held back until those of all
+        the previous jobs are appended. Return the sorted indices of the given
+        jobs.
+        """
+        if self._merge_planned is not True:
+            raise GateMergeError(
+                "JobsMergeManager.merge_jobs() requires planning to be completed first. "
+                "Call plan_merge() before merge_jobs()."
+            )
+        job_indices = sorted(set(job_indices))
+        already_merged = set(job_indices) & self._merged_job_indices
+        if len(already_merged) > 0:
+            raise GateMergeError(
+                f"JobsMergeManager.merge_jobs() received jobs that are already "
+                f"merged: {sorted(already_merged)}"
+            )
+        if self._execution_start_time is None:
+            self._execution_start_time = time.perf_counter()
+        root_job_indices = []
+        try:
+            self.standard_merge_coordinator.execute_merge(job_indices=job_indices)
+            self._merged_job_indices |= set(job_indices)
+            self._held_job_indices |= set(job_indices)
+            # contiguous block of held jobs following the jobs already appended
+            for source in self.leaf_sources:
+                job_index = source["job_index"]
+                if job_index not in self._merged_job_indices:
+                    break
+                if job_index in self._held_job_indices:
+                    root_job_indices.append(job_index)
+            if len(root_job_indices) > 0:
+                self.root_merge_coordinator.execute_merge(job_indices=root_job_indices)
+                # ROOT entries are appended to the merged files right away
+                self.root_merge_coordinator.stream_registered_sources()
+        except Exception:
+            self.root_merge_coordinator.close_streamed_files_on_error()
+            raise
+        self._held_job_indices -= set(root_job_indices)
+        # the held jobs are parsed again when their ROOT entries are appended
+        self.standard_merge_coordinator.release_source_simulations(job_indices)
+        self.root_merge_coordinator.release_source_simulations(root_job_indices)
+        if (
+            self._merged_job_indices
+            == {source["job_index"] for source in self.leaf_sources}
+            and len(self._held_job_indices) == 0
+        ):
+            self._merge_executed = True
+        return job_indices
+
+    @property
+    def merged_job_indices(self):
+        return sorted(self._merged_job_indices)
+
+    def write_partial_result(self):
+        """Write the non-ROOT outputs accumulated so far by merge_jobs(). The
+        merged ROOT files are only complete after finalize_merge().
+        """
+        if self._merge_planned is not True:
+            raise GateMergeError(
+                "JobsMergeManager.write_partial_result() requires planning to be "
+                "completed first. Call plan_merge() before write_partial_result()."
+            )
+        self.standard_merge_coordinator.finalize_merge()
+
+    def _poll_jobs_to_merge(self):
+        completed = []
+        for source in self.leaf_sources:
+            job_index = source["job_index"]
+            if job_index in self._merged_job_indices:
+                continue
+            status = load_job_execution_status(source["folder"])
+            if status is None:
+                continue
+            if status.get("status") == "failed":
+                raise GateMergeError(
+                    f"Job '{source['job_id']}' failed, the incremental merge is "
+                    f"aborted. Error: {status.get('error_message')}"
+                )
+            if status.get("status") == "completed":
+                completed.append(job_index)
+        return completed
+
+    def merge_incrementally(
+        self,
+        poll_interval=1.0,
+        timeout=None,
+        write_partial_results=False,
+        callback=None,
+    ):
+        """Merge the outputs of the jobs as they complete, while the campaign
+        is still running. The execution status files of the job folders are
+        polled every poll_interval seconds. Image and counter outputs are
+        accumulated into the target simulation, ROOT entries are appended to
+        the merged files. The merge is finalized once all jobs are merged.
+
+        If write_partial_results is True, the non-ROOT outputs are written
+        after each merged batch of jobs. callback(manager, job_indices) is
+        called after each merged batch, e.g. to inspect the partial results.
+        """
+        if self.master_simulation is None:
+            self.prepare_target_simulation()
+        if len(self.leaf_sources) == 0 and len(self.original_run_to_sources_map) == 0:
+            self.load_campaign_metadata()
+        self._merge_start_time = time.perf_counter()
+        if self._merge_planned is not True:
+            self.plan_merge()
+        all_job_indices = {source["job_index"] for source in self.leaf_sources}
+        try:
+            while self._merged_job_indices != all_job_indices:
+                job_indices = self._poll_jobs_to_merge()
+                if len(job_indices) > 0:
+                    job_indices = self.merge_jobs(job_indices)
+                    if write_partial_results:
+                        self.write_partial_result()
+                    if callback is not None:
+                        callback(self, job_indices)
+                    continue
+                if (
+                    timeout is not None
+                    and time.perf_counter() - self._merge_start_time > timeout
+                ):
+                    raise GateMergeError(
+                        f"Timed out after {timeout} s while waiting for jobs to "
+                        f"complete. Merged jobs: {sorted(self._merged_job_indices)}"
+                    )
+                time.sleep(poll_interval)
+            self.finalize_merge()
+        except BaseException:
+            # do not leave the merged ROOT files open
+            self.root_merge_coordinator.close_streamed_files_on_error()
+            raise
+        return self._merge_result
+
     def merge(self):
         if self.master_simulation is None:
             self.prepare_target_simulation()
@@ -3115,12 +3919,19 @@ def jobs_merge(
     target_simulation=None,
     to_path=None,
     execute=True,
+    n_workers=1,
     **options,
 ):
+    """Merge the outputs of the jobs of a campaign.
+
+    With n_workers > 1, image outputs are reduced in a pool of n_workers
+    processes and ROOT files are streamed concurrently.
+    """
     merge_manager = JobsMergeManager(
         from_path,
         output_dir_override=to_path,
         target_simulation=target_simulation,
+        n_workers=n_workers,
         **options,
     )
     merge_manager.prepare_target_simulation()
@@ -3370,6 +4181,7 @@ def jobs_status(campaign_dir):
             "running": 0,
             "completed": 0,
             "failed": 0,
+            "retrying": 0,
             "skipped": 0,
         },
     }
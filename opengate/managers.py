@@ -41,7 +41,11 @@ from .physics import (
     cut_particle_names,
     translate_particle_name_gate_to_geant4,
 )
-from .processing import dispatch_to_subprocess
+from .processing import (
+    dispatch_to_subprocess,
+    format_subprocess_timings,
+    result_transports,
+)
 from .runtiming import assert_run_timing
 from .serialization import (
     dump_json,
@@ -225,6 +229,8 @@ class FilterManager:
         self.simulation = simulation
         # self.user_info_filters = {}
         self.filters = {}
+        # statistics of the filters measured in the last runs (by filter name)
+        self.statistics = {}
 
     def __str__(self):
         v = [v.name for v in self.filters.values()]
@@ -247,6 +253,18 @@ class FilterManager:
             s += indent(2, a)
         return s
 
+    def dump_statistics(self):
+        s = (
+            f"{'Filter':<40} {'evaluations':>12} {'accept rate':>12} "
+            f"{'time/eval (ns)':>15}"
+        )
+        for name, stats in self.statistics.items():
+            s += (
+                f"\n{name:<40} {stats.evaluations:>12} {stats.accept_rate:>12.3f} "
+                f"{stats.mean_time * 1e9:>15.1f}"
+            )
+        return s
+
     def get_filter(self, name):
         try:
             return self.filters[name]
@@ -685,6 +703,13 @@ def _setter_hook_physics_list_name(self, physics_list_name):
     return physics_list_name
 
 
+def _setter_hook_physics_tables_cache_dir(self, cache_dir):
+    # absolute path, so that the split jobs (run from other folders) share it
+    if cache_dir is None:
+        return None
+    return Path(cache_dir).absolute()
+
+
 def _setter_hook_user_limits_particles(self, particle_names):
     if not isinstance(particle_names, (list, set, tuple)):
         return list([particle_names])
@@ -798,6 +823,18 @@ class PhysicsManager(GateObject):
                 "doc": "Dict of material_name:energy_value, such that: sim.physics_manager.material_ionisation_potential['IEC_PLASTIC'] = 5.0 * eV. "
             },
         ),
+        "physics_tables_cache_dir": (
+            None,
+            {
+                "doc": "Folder where the Geant4 physics tables are stored once built, and "
+                "retrieved from at the next initializations with the same Geant4 version, "
+                "physics list, EM parameters, cuts and materials (one sub-folder per hash "
+                "of these settings). It can be shared by simulations, split jobs and "
+                "campaigns. Disabled if None (default). A relative path is relative to "
+                "the current working directory.",
+                "setter_hook": _setter_hook_physics_tables_cache_dir,
+            },
+        ),
         # "processes_to_bias": (
         #     Box(
         #         [
@@ -1845,6 +1882,11 @@ class Simulation(GateObject):
     progress_hook_interval: Optional[float]
     dyn_geom_open_close: bool
     dyn_geom_optimise: bool
+    subprocess_result_transport: str
+    autotune_filename: Optional[Path]
+    source_scheduler: str
+    optimize_filters: bool
+    filter_statistics: bool
 
     default_simulation_filename = Path("simulation.json")
     default_resolved_simulation_filename = Path("simulation_resolved.json")
@@ -2116,6 +2158,66 @@ class Simulation(GateObject):
             True,
             {"doc": "'Optimise' geometry when open/close during dynamic simulation. "},
         ),
+        "subprocess_result_transport": (
+            "shared_memory",
+            {
+                "doc": "How the output of a simulation run with start_new_process=True "
+                "is sent back to the main process. "
+                "'shared_memory': images and large arrays are copied to shared memory, "
+                "only the rest of the output is pickled. "
+                "'file': same, with temporary memory-mapped files instead of shared memory "
+                "(use it if /dev/shm is small). "
+                "'pickle': everything is pickled (former behavior). "
+                "The timing breakdown of the transfer is stored in sim.subprocess_timings.",
+                "allowed_values": result_transports,
+            },
+        ),
+        "source_scheduler": (
+            "scan",
+            {
+                "doc": "How the source manager selects the source of the next event. "
+                "'scan': all sources are asked for their next time at each event. "
+                "'queue': the next times are kept in a priority queue and only the "
+                "source of the last event is asked, which is faster with many sources "
+                "(e.g. PHID or multi-lesion voxel sources). The order of the events "
+                "is the same for sources with a number of primaries. For sources with "
+                "a constant activity, the times are statistically equivalent but the "
+                "random sequence differs from 'scan'. The sources with a time dependent "
+                "activity (half_life, TAC) are still asked at each event.",
+                "allowed_values": ("scan", "queue"),
+            },
+        ),
+        "autotune_filename": (
+            None,
+            {
+                "doc": "JSON file written by sim.autotune() (relative to the output_dir). "
+                "If set, sim.run() applies the recommended number_of_threads and "
+                "batch_size of the phase-space and GAN sources, and "
+                "sim.run(number_of_jobs='auto') uses the recommended number of jobs "
+                "and of threads per job.",
+            },
+        ),
+        "optimize_filters": (
+            True,
+            {
+                "doc": "Compile the boolean filters at initialization: the equality tests "
+                "on the same attribute are merged into a single set lookup, and the "
+                "sub-filters are reordered by their accept rate and evaluation time "
+                "measured in a previous run (see filter_statistics), so that the cheapest "
+                "and most selective ones are evaluated first. The result of the filters "
+                "is unchanged.",
+            },
+        ),
+        "filter_statistics": (
+            False,
+            {
+                "doc": "Count, for each filter, the number of evaluations, of accepted steps "
+                "and the evaluation time. After the run, they are available in "
+                "sim.filter_manager.statistics (see sim.filter_manager.dump_statistics()) "
+                "and used by optimize_filters at the next run. "
+                "It slows down the filters a bit.",
+            },
+        ),
     }
 
     def __init__(self, name="simulation", **kwargs):
@@ -2155,6 +2257,13 @@ class Simulation(GateObject):
         self.expected_number_of_events = None
         self._merge_coordinators = []
 
+        # timing breakdown of the last run in a subprocess
+        self.subprocess_timings = None
+
+        # duration of the initialization steps of the last run (and status of
+        # the physics tables cache)
+        self.startup_timings = None
+
     def __setstate__(self, state):
         super().__setstate__(state)
         if hasattr(self, "auxiliary_attributes"):
@@ -2815,6 +2924,61 @@ class Simulation(GateObject):
             output = se.run_engine()
         return output
 
+    def autotune(
+        self,
+        pilot_fraction=0.01,
+        thread_counts=None,
+        batch_sizes=None,
+        output_filename="autotune.json",
+    ):
+        """Measure the speed (events per second, with a SimulationStatisticsActor)
+        of short pilot runs of this simulation with several numbers of threads,
+        and several batch sizes of the phase-space and GAN sources.
+
+        Each pilot runs in a subprocess on the first pilot_fraction of each run.
+        The scaling curve and the recommended settings are written in
+        output_filename (relative to the output_dir), and sim.autotune_filename
+        is set so that the next sim.run() uses them.
+        By default, thread_counts are 1, 2, 4 ... up to the number of CPUs and
+        batch_sizes are 1000, 10000 and 100000.
+        """
+        from .autotune import autotune_simulation
+
+        result = autotune_simulation(
+            self,
+            pilot_fraction=pilot_fraction,
+            thread_counts=thread_counts,
+            batch_sizes=batch_sizes,
+            output_filename=output_filename,
+        )
+        if output_filename is not None:
+            self.autotune_filename = result["filename"]
+        r = result["recommended"]
+        logger.info(
+            f"Autotune: {r['number_of_threads']} threads, or {r['number_of_jobs']} "
+            f"jobs with {r['number_of_threads_per_job']} threads each, "
+            f"batch sizes {r['batch_size']}"
+        )
+        return result
+
+    def _apply_autotune_file(self, number_of_jobs):
+        from .autotune import apply_autotune_settings, read_autotune_file
+
+        recommended = read_autotune_file(self.get_output_path(self.autotune_filename))[
+            "recommended"
+        ]
+        settings = dict(recommended)
+        if number_of_jobs == "auto":
+            number_of_jobs = recommended["number_of_jobs"]
+            settings["number_of_threads"] = recommended["number_of_threads_per_job"]
+        apply_autotune_settings(self, settings)
+        logger.info(
+            f"Settings from {self.autotune_filename}: "
+            f"{self.number_of_threads} threads, "
+            f"{number_of_jobs or 1} job(s), batch sizes {recommended['batch_size']}"
+        )
+        return number_of_jobs
+
     def run(
         self,
         start_new_process=False,
@@ -2826,6 +2990,7 @@ class Simulation(GateObject):
         cleanup_after_run=False,
         poll_interval=1.0,
         timeout=None,
+        incremental_merge=False,
     ):
         # if windows and MT -> fail
         if os.name == "nt" and self.multithreaded:
@@ -2834,6 +2999,16 @@ class Simulation(GateObject):
                 "Run the simulation with one thread."
             )
 
+        if self.autotune_filename is not None:
+            # the children of a split campaign already got their settings
+            if self._is_split_child_simulation_context() is False:
+                number_of_jobs = self._apply_autotune_file(number_of_jobs)
+        elif number_of_jobs == "auto":
+            fatal(
+                "Simulation.run(number_of_jobs='auto') requires sim.autotune_filename "
+                "(see sim.autotune())."
+            )
+
         if number_of_jobs is not None:
             try:
                 number_of_jobs = int(number_of_jobs)
@@ -2874,6 +3049,7 @@ class Simulation(GateObject):
                     wait_for_result=wait_for_result,
                     poll_interval=poll_interval,
                     timeout=timeout,
+                    incremental_merge=incremental_merge,
                 )
                 return split_run_controller
 
@@ -2889,7 +3065,14 @@ class Simulation(GateObject):
             """
 
             logger.info("Dispatching simulation to subprocess ...")
-            output = dispatch_to_subprocess(self._run_simulation_engine, True)
+            self.subprocess_timings = Box()
+            output = dispatch_to_subprocess(
+                self._run_simulation_engine,
+                True,
+                result_transport=self.subprocess_result_transport,
+                timings=self.subprocess_timings,
+            )
+            logger.info(format_subprocess_timings(self.subprocess_timings))
 
             # Recover output from unpickled actors coming from the subprocess queue
             for actor in self.actor_manager.actors.values():
@@ -2921,6 +3104,9 @@ class Simulation(GateObject):
 
         # FIXME workaround
         self.expected_number_of_events = output.expected_number_of_events
+        self.startup_timings = output.startup_timings
+        if output.filter_statistics is not None:
+            self.filter_manager.statistics.update(output.filter_statistics)
 
         # store the hook log
         self.user_hook_log = output.user_hook_log
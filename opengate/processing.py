@@ -1,16 +1,275 @@
+import io
 import multiprocessing
+import pickle
 import queue
+import secrets
+import shutil
+import tempfile
+import time
+from multiprocessing import shared_memory, resource_tracker
+from pathlib import Path
+
+import numpy as np
+from box import Box
+
 from .exception import fatal
 import os
 import sys
 
+# Available ways to send the result of a subprocess back to the parent process:
+# - "pickle": the whole result is pickled through the queue (historical)
+# - "shared_memory": large arrays and ITK images are copied into shared memory
+#   blocks, only their meta data is pickled through the queue
+# - "file": same, but the arrays are stored in temporary memory-mapped files
+result_transports = ("shared_memory", "file", "pickle")
+
+# arrays smaller than this (in bytes) are simply pickled
+min_nbytes_out_of_band = 1 << 16
+
+
+def _is_itk_image(obj):
+    return type(obj).__name__.startswith("itkImage") and hasattr(
+        obj, "GetLargestPossibleRegion"
+    )
+
+
+def _shared_memory_has_room(nbytes):
+    # in containers, /dev/shm is often small (e.g. 64 MB), and writing beyond
+    # its size crashes the process (SIGBUS) instead of raising an error
+    if not os.path.isdir("/dev/shm"):
+        return True
+    return shutil.disk_usage("/dev/shm").free > 2 * nbytes
+
+
+class _ResultPickler(pickle.Pickler):
+    """Pickler that moves large numpy arrays and ITK images out of the pickle
+    stream, into shared memory blocks or memory-mapped files.
+
+    If block_prefix is given, the shared memory blocks are named
+    {block_prefix}_0, {block_prefix}_1, ... and the files are stored in the
+    folder {tmp}/{block_prefix}, so that the parent process can release them
+    if this process dies before sending them (see _release_orphan_blocks).
+    """
+
+    def __init__(self, file, transport, block_prefix=None):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        # shared memory is not persistent on Windows: the block would be
+        # destroyed when the subprocess terminates
+        if transport == "shared_memory" and os.name == "nt":
+            transport = "file"
+        self.transport = transport
+        self.block_prefix = block_prefix
+        self.blocks = []
+        self.folder = None
+        self.nbytes = 0
+        self._number_of_shared_memory_blocks = 0
+        # the same array may be referenced several times: export it once
+        self._exported = {}
+
+    def persistent_id(self, obj):
+        if self.transport == "pickle":
+            return None
+        if id(obj) in self._exported:
+            return self._exported[id(obj)][1]
+        pid = self.get_persistent_id(obj)
+        if pid is not None:
+            # keep a reference so that the id is not reused
+            self._exported[id(obj)] = (obj, pid)
+        return pid
+
+    def get_persistent_id(self, obj):
+        # only plain arrays: the subclasses (masked arrays, matrices, ...) would
+        # be rebuilt as plain arrays, they are pickled as usual
+        if type(obj) is np.ndarray:
+            if obj.dtype.hasobject or obj.nbytes < min_nbytes_out_of_band:
+                return None
+            return "array", self.export_array(obj)
+        if _is_itk_image(obj):
+            import itk
+
+            arr = itk.array_view_from_image(obj)
+            if arr.nbytes < min_nbytes_out_of_band:
+                return None
+            info = (
+                tuple(obj.GetOrigin()),
+                tuple(obj.GetSpacing()),
+                np.asarray(itk.array_from_matrix(obj.GetDirection())),
+                obj.GetNumberOfComponentsPerPixel() > 1,
+            )
+            return "itk_image", self.export_array(arr), info
+        return None
+
+    def export_array(self, arr):
+        self.nbytes += arr.nbytes
+        if self.transport == "shared_memory" and _shared_memory_has_room(arr.nbytes):
+            name = None
+            if self.block_prefix is not None:
+                name = f"{self.block_prefix}_{self._number_of_shared_memory_blocks}"
+            shm = shared_memory.SharedMemory(
+                name=name, create=True, size=max(arr.nbytes, 1)
+            )
+            self._number_of_shared_memory_blocks += 1
+            # the parent process unlinks the block once it has been read:
+            # it must not be released when this process terminates
+            resource_tracker.unregister(shm._name, "shared_memory")
+            block = ("shared_memory", shm.name)
+            self.blocks.append(block)
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+            shm.close()
+        else:
+            if self.folder is None:
+                if self.block_prefix is None:
+                    self.folder = tempfile.mkdtemp(prefix="gate_result_")
+                else:
+                    self.folder = _orphan_blocks_folder(self.block_prefix)
+                    os.makedirs(self.folder)
+            path = Path(self.folder) / f"{len(self.blocks)}.npy"
+            block = ("file", str(path))
+            self.blocks.append(block)
+            m = np.lib.format.open_memmap(
+                path, mode="w+", dtype=arr.dtype, shape=arr.shape
+            )
+            m[...] = arr
+            m.flush()
+            del m
+        return block, arr.shape, arr.dtype.str
+
+
+class _ResultUnpickler(pickle.Unpickler):
+    def __init__(self, file):
+        super().__init__(file)
+        self._imported = {}
+
+    def persistent_load(self, pid):
+        # objects exported once and referenced several times are rebuilt once
+        block = pid[1][0]
+        if block not in self._imported:
+            self._imported[block] = self.import_object(pid)
+        return self._imported[block]
+
+    def import_object(self, pid):
+        if pid[0] == "array":
+            return _import_array(*pid[1])
+        if pid[0] == "itk_image":
+            import itk
+
+            arr = _import_array(*pid[1])
+            origin, spacing, direction, is_vector = pid[2]
+            image = itk.image_from_array(arr, is_vector=is_vector)
+            image.SetOrigin(origin)
+            image.SetSpacing(spacing)
+            image.SetDirection(direction)
+            return image
+        raise pickle.UnpicklingError(f"Unknown persistent id {pid[0]}")
+
+
+def _import_array(block, shape, dtype):
+    kind, name = block
+    if kind == "shared_memory":
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+        return arr
+    return np.array(np.load(name, mmap_mode="r"))
+
+
+def _release_blocks(blocks):
+    for kind, name in blocks:
+        try:
+            if kind == "shared_memory":
+                shm = shared_memory.SharedMemory(name=name)
+                shm.close()
+                shm.unlink()
+            else:
+                os.remove(name)
+                folder = os.path.dirname(name)
+                if not os.listdir(folder):
+                    os.rmdir(folder)
+        except (FileNotFoundError, OSError):
+            pass
+
+
+def _orphan_blocks_folder(block_prefix):
+    return os.path.join(tempfile.gettempdir(), block_prefix)
+
+
+def _release_orphan_blocks(block_prefix):
+    """Release the blocks created with the given prefix by a subprocess that
+    died before sending them to the parent process (the shared memory blocks
+    are not released by the resource tracker, see _ResultPickler.export_array).
+    """
+    i = 0
+    while True:
+        try:
+            shm = shared_memory.SharedMemory(name=f"{block_prefix}_{i}")
+        except (FileNotFoundError, OSError):
+            break
+        shm.close()
+        try:
+            shm.unlink()
+        except (FileNotFoundError, OSError):
+            pass
+        i += 1
+    shutil.rmtree(_orphan_blocks_folder(block_prefix), ignore_errors=True)
+
+
+def dump_result(result, transport="shared_memory", block_prefix=None):
+    """Serialize the result of a subprocess. Return the pickled bytes, the list
+    of shared memory blocks (or files) holding the large arrays, and the
+    number of bytes transferred out of band. See _ResultPickler for
+    block_prefix.
+    """
+    if transport not in result_transports:
+        fatal(
+            f"Unknown result transport '{transport}'. "
+            f"Available transports are: {result_transports}"
+        )
+    f = io.BytesIO()
+    pickler = _ResultPickler(f, transport, block_prefix)
+    try:
+        pickler.dump(result)
+    except Exception:
+        _release_blocks(pickler.blocks)
+        raise
+    return f.getvalue(), pickler.blocks, pickler.nbytes
+
+
+def load_result(payload, blocks):
+    """Rebuild the result serialized by dump_result and release the blocks."""
+    try:
+        return _ResultUnpickler(io.BytesIO(payload)).load()
+    finally:
+        _release_blocks(blocks)
+
 
 # define a thin wrapper function to handle the queue
-def target_func(q, f, *args, **kwargs):
-    q.put(f(*args, **kwargs))
+def target_func(q, f, transport, block_prefix, *args, **kwargs):
+    t = time.perf_counter()
+    result = f(*args, **kwargs)
+    run_time = time.perf_counter() - t
+    t = time.perf_counter()
+    payload, blocks, nbytes = dump_result(result, transport, block_prefix)
+    timings = {
+        "run": run_time,
+        "serialization": time.perf_counter() - t,
+        "pickled_bytes": len(payload),
+        "out_of_band_bytes": nbytes,
+    }
+    q.put((payload, blocks, timings))
 
 
-def dispatch_to_subprocess(func, *args, **kwargs):
+def dispatch_to_subprocess(
+    func, *args, result_transport="shared_memory", timings=None, **kwargs
+):
+    """Run func(*args, **kwargs) in a subprocess and return its result.
+
+    result_transport selects how the result is sent back (see
+    result_transports). If timings is a dict, it is filled with the time spent
+    in the subprocess, in the serialization and deserialization of the result,
+    and in the queue transfer (all in seconds).
+    """
     # 1. Determine the start method
     # macOS ('darwin') and Windows ('nt') MUST use spawn for GUI safety
     # otherwise, it crashs with qt visualization
@@ -35,6 +294,12 @@ def dispatch_to_subprocess(func, *args, **kwargs):
         except RuntimeError:
             pass
 
+    if result_transport not in result_transports:
+        fatal(
+            f"Unknown result transport '{result_transport}'. "
+            f"Available transports are: {result_transports}"
+        )
+
     # 3. Select the Queue type based on the method
     # If we are spawning, standard Queue is supposed to be safe and faster.
     # if method_name == "spawn":
@@ -45,8 +310,14 @@ def dispatch_to_subprocess(func, *args, **kwargs):
     q = multiprocessing.Manager().Queue()
 
     # 4. Create and start the process
+    # (the blocks holding the result are named after block_prefix, so that they
+    # can be released if the subprocess dies before sending them)
+    t_start = time.perf_counter()
+    block_prefix = f"gate_{os.getpid()}_{secrets.token_hex(4)}"
     p = multiprocessing.Process(
-        target=target_func, args=(q, func, *args), kwargs=kwargs
+        target=target_func,
+        args=(q, func, result_transport, block_prefix, *args),
+        kwargs=kwargs,
     )
     p.start()
     p.join()
@@ -55,7 +326,38 @@ def dispatch_to_subprocess(func, *args, **kwargs):
     try:
         # We can usually block=True here because p.join() has finished,
         # but if the child crashed without putting data, block=False catches it.
-        return q.get(block=False)
+        payload, blocks, child_timings = q.get(block=False)
     except queue.Empty:
+        _release_orphan_blocks(block_prefix)
         fatal("The queue is empty. The spawned process probably died or crashed.")
         return None
+    t_received = time.perf_counter()
+    result = load_result(payload, blocks)
+    t_end = time.perf_counter()
+
+    if timings is not None:
+        timings.update(child_timings)
+        timings["result_transport"] = result_transport
+        timings["deserialization"] = t_end - t_received
+        timings["total"] = t_end - t_start
+        # what remains: process start and shutdown, and the queue transfer
+        timings["transfer"] = max(
+            0.0,
+            timings["total"]
+            - child_timings["run"]
+            - child_timings["serialization"]
+            - timings["deserialization"],
+        )
+    return result
+
+
+def format_subprocess_timings(timings):
+    t = Box(timings)
+    mb = 1024 * 1024
+    return (
+        f"Subprocess ({t.result_transport}): total {t.total:.3f} s = "
+        f"run {t.run:.3f} s + serialization {t.serialization:.3f} s + "
+        f"transfer {t.transfer:.3f} s + deserialization {t.deserialization:.3f} s "
+        f"({t.pickled_bytes / mb:.1f} MB pickled, "
+        f"{t.out_of_band_bytes / mb:.1f} MB out of band)"
+    )
@@ -1,5 +1,6 @@
 import sys
 import time
+import queue
 import scipy
 from scipy.spatial.transform import Rotation
 import numpy as np
@@ -56,6 +57,10 @@ class VoxelizedSourcePDFSampler:
     It is needed because the cond voxel source is used on python side.
 
     There are two versions, version 2 is much slower (do not use)
+
+    Version 4 uses a Walker alias table built on the nonzero voxels only: the
+    memory is proportional to the number of nonzero voxels (no grid of indices)
+    and the sampling cost does not depend on the image size (O(1) per sample).
     """
 
     def __init__(self, itk_image, version=1):
@@ -65,6 +70,10 @@ class VoxelizedSourcePDFSampler:
         self.imga = itk.array_view_from_image(itk_image)
         imga = self.imga
 
+        if version == 4:
+            self.init_alias_table()
+            return
+
         # image sizes
         lx = self.imga.shape[0]
         ly = self.imga.shape[1]
@@ -118,6 +127,43 @@ class VoxelizedSourcePDFSampler:
         """
         # ------------------------------------------
 
+    def init_alias_table(self):
+        # flat indices (np order) of the nonzero voxels and their probabilities
+        pdf = self.imga.ravel()
+        self.alias_voxels = np.flatnonzero(pdf)
+        if len(self.alias_voxels) == 0:
+            fatal(f"VoxelizedSourcePDFSampler: the activity image is empty")
+        q = pdf[self.alias_voxels].astype(np.float64)
+        n = len(q)
+        q *= n / q.sum()
+
+        # Vose's alias method, vectorized: at each round, all the small columns
+        # (q < 1) are filled by the large ones, in order. A large column gives to
+        # the small columns whose cumulated deficit ends within its surplus, so it
+        # can become small (but stays >= 0) and is then filled at the next round.
+        alias = np.arange(n)
+        small = np.flatnonzero(q < 1.0)
+        large = np.flatnonzero(q >= 1.0)
+        while len(small) > 0 and len(large) > 0:
+            deficit = np.cumsum(1.0 - q[small])
+            surplus = np.cumsum(q[large] - 1.0)
+            j = np.minimum(np.searchsorted(surplus, deficit), len(large) - 1)
+            alias[small] = large[j]
+            np.subtract.at(q, large[j], 1.0 - q[small])
+            small = large[q[large] < 1.0]
+            large = large[q[large] >= 1.0]
+        # remaining columns are (up to rounding errors) full
+        q[small] = 1.0
+        q[large] = 1.0
+        self.alias_prob = q
+        self.alias_index = alias
+
+    def sample_indices_alias(self, n, rs=np.random):
+        u = rs.uniform(0, len(self.alias_prob), size=n)
+        col = np.minimum(u.astype(np.int64), len(self.alias_prob) - 1)
+        col = np.where(u - col < self.alias_prob[col], col, self.alias_index[col])
+        return np.unravel_index(self.alias_voxels[col], self.imga.shape)
+
     def init_cdf(self):
         self.cdf_x, self.cdf_y, self.cdf_z = compute_image_3D_CDF(self.image)
         self.cdf_x = np.array(self.cdf_x)
@@ -177,6 +223,8 @@ class VoxelizedSourcePDFSampler:
         return p[:, 2], p[:, 1], p[:, 0]
 
     def sample_indices(self, n, rs=np.random):
+        if self.version == 4:
+            return self.sample_indices_alias(n, rs)
         indices = rs.choice(self.linear_indices, size=n, replace=True, p=self.pdf)
         i = self.xi[indices]
         j = self.yi[indices]
@@ -220,7 +268,7 @@ class VoxelizedSourceConditionGenerator:
             self.image = itk.imread(self.activity_source_filename)
         self.source_img_info = get_info_from_image(self.image)
         if self.sampler is None:
-            self.sampler = VoxelizedSourcePDFSampler(self.image)
+            self.sampler = VoxelizedSourcePDFSampler(self.image, version=4)
         self.rs = np.random
         # we set the points in the g4 coord system (according to the center of the image)
         # or according to the activity source image origin
@@ -391,6 +439,15 @@ class GANSource(GenericSource):
                 "allowed_values": ("auto", "cpu", "gpu"),
             },
         ),
+        "pipeline_depth": (
+            0,
+            {
+                "doc": "If > 0, the batches are generated in advance by a dedicated inference thread, "
+                "while the current batches are tracked: the simulation threads only take the next "
+                "ready batch. This is the maximum number of batches generated in advance. "
+                "With 0 (default), each batch is generated when needed, by the thread that needs it.",
+            },
+        ),
     }
 
     def __init__(self, *args, **kwargs):
@@ -416,6 +473,20 @@ class GANSource(GenericSource):
 
         GenericSource.initialize_g4_source(self, g4_source, run_timing_intervals)
 
+    def prepare_output(self):
+        # stop the inference thread (the batches generated in advance are lost)
+        if self.user_info.generator is not None:
+            self.user_info.generator.stop_pipeline()
+
+    @property
+    def generator_statistics(self):
+        """Number of batches generated by the GAN, time to generate each of them and
+        time the G4 threads waited for each of them (in sec).
+        Without pipeline, both times are the same."""
+        if self.user_info.generator is None:
+            return None
+        return self.user_info.generator.statistics
+
     def set_default_generator(self):
         # non-conditional generator
         if self.cond_image is None:
@@ -463,7 +534,11 @@ class GANSourceDefaultGenerator:
 
     - 'initialize' function: the GAN is loaded and the list of keys is initialized
 
-    - 'generator' function: default generator
+    - 'generator' function: called from cpp, hand the next batch of particles to the cpp part. The batch
+    is generated by 'generate_batch', either now or in advance by the inference thread (if
+    'user_info.pipeline_depth' > 0).
+
+    - 'generate_batch' function: default generator, return the columns of a batch of particles
 
     - 'get_output_keys' function: map the user defined keys to the ones of the generator. There are two usages, either
     with on single primary (3 values for position, direction), or paired primary (6 values).
@@ -472,7 +547,8 @@ class GANSourceDefaultGenerator:
     using the factor provided by the user in 'user_info.backward_distance'. This is useful to allow generating
     particles that do not intersect with the detector.
 
-    - 'copy_generated_particle_to_g4' function: copy all the particles (pos, dir, time, energy) to the cpp part.
+    - 'get_batch_columns' function: get all the particles (pos, dir, time, energy) as columns that are handed
+    to the cpp part in a single call and without copy.
 
     """
 
@@ -485,11 +561,22 @@ class GANSourceDefaultGenerator:
         self.keys_output = None
         self.gan_info = None
         self.gpu_mode = None
+        # inference thread (if pipeline_depth > 0)
+        self.pipeline_queue = None
+        self.pipeline_stop = None
+        self.pipeline_thread = None
+        # per-batch timing (in sec)
+        self.statistics = Box(
+            {"number_of_batches": 0, "generation_times": [], "wait_times": []}
+        )
 
     def __getstate__(self):
         self.lock = None
         # self.gaga = None
         self.gan_info = None
+        self.pipeline_queue = None
+        self.pipeline_stop = None
+        self.pipeline_thread = None
         return self.__dict__
 
     def initialize(self):
@@ -645,8 +732,73 @@ class GANSourceDefaultGenerator:
         """
         Main function that will be called from the cpp side every time a batch
         of particles should be created.
-        Once created here, the particles are copied to cpp.
-        (Yes maybe the copy could be avoided, but I did not manage to do it)
+        The batch is generated now or taken from the inference thread, then
+        handed to cpp (without copy).
+        """
+        t = time.perf_counter()
+        if self.user_info.pipeline_depth > 0:
+            with self.lock:
+                if self.pipeline_thread is None:
+                    self.start_pipeline()
+            batch = self.pipeline_queue.get()
+            if isinstance(batch, BaseException):
+                # put it back for the other threads (the inference thread stopped)
+                self.pipeline_queue.put(batch)
+                raise batch
+        else:
+            batch = self.generate_timed_batch()
+        with self.lock:
+            self.statistics.wait_times.append(time.perf_counter() - t)
+            self.statistics.number_of_batches += 1
+
+        # the cpp side keeps a reference to the arrays until the next batch
+        source.SetBatch(batch)
+
+    def generate_timed_batch(self):
+        t = time.perf_counter()
+        batch = self.generate_batch()
+        self.statistics.generation_times.append(time.perf_counter() - t)
+        return batch
+
+    def start_pipeline(self):
+        self.pipeline_queue = queue.Queue(maxsize=int(self.user_info.pipeline_depth))
+        self.pipeline_stop = threading.Event()
+        self.pipeline_thread = threading.Thread(
+            target=self._pipeline_loop,
+            name=f"{self.user_info.name}_inference",
+            daemon=True,
+        )
+        self.pipeline_thread.start()
+
+    def _pipeline_loop(self):
+        # Generate the batches in advance (GAN inference, output keys and move
+        # backward), the G4 threads only take them from the queue.
+        # Errors are forwarded to the consumers (generator) through the queue.
+        while not self.pipeline_stop.is_set():
+            try:
+                item = self.generate_timed_batch()
+            except BaseException as e:
+                item = e
+            while not self.pipeline_stop.is_set():
+                try:
+                    self.pipeline_queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            if isinstance(item, BaseException):
+                return
+
+    def stop_pipeline(self):
+        if self.pipeline_thread is None:
+            return
+        self.pipeline_stop.set()
+        self.pipeline_thread.join()
+        self.pipeline_thread = None
+        self.pipeline_queue = None
+
+    def generate_batch(self):
+        """
+        Generate a batch of particles with the GAN and return its columns.
         """
         # get the info
         g = self.gan_info
@@ -675,17 +827,22 @@ class GANSourceDefaultGenerator:
         # move particle backward ?
         self.move_backward(g, fake)
 
-        # copy to cpp
-        self.copy_generated_particle_to_g4(source, g, fake)
-
         # verbose
         if self.user_info.verbose_generator:
             end = time.time()
             print(f"in {end - start:0.1f} sec (GPU={g.params.current_gpu_mode})")
 
+        return self.get_batch_columns(g, fake)
+
     def copy_generated_particle_to_g4(self, source, g, fake):
+        # the cpp side keeps a reference to the arrays until the next batch
+        source.SetBatch(self.get_batch_columns(g, fake))
+
+    def get_batch_columns(self, g, fake):
         # get the index of from the GAN vector
         # (or some fixed values)
+        # The columns are handed to cpp in a single call, without copy
+        batch = {}
 
         # position
         if g.position_is_set_by_GAN:
@@ -696,10 +853,9 @@ class GANSourceDefaultGenerator:
                     pos.append(fake[:, g.position_gan_index[i]])
                 else:
                     pos.append(g.position_gan_index[i])
-            # copy to c++
-            source.fPositionX = pos[0]
-            source.fPositionY = pos[1]
-            source.fPositionZ = pos[2]
+            batch["position_x"] = pos[0]
+            batch["position_y"] = pos[1]
+            batch["position_z"] = pos[2]
 
         # direction
         if g.direction_is_set_by_GAN:
@@ -710,25 +866,23 @@ class GANSourceDefaultGenerator:
                     dir.append(fake[:, g.direction_gan_index[i]])
                 else:
                     dir.append(g.direction_gan_index[i])
-            # copy to c++
-            source.fDirectionX = dir[0]
-            source.fDirectionY = dir[1]
-            source.fDirectionZ = dir[2]
+            batch["direction_x"] = dir[0]
+            batch["direction_y"] = dir[1]
+            batch["direction_z"] = dir[2]
 
         # energy
         if g.energy_is_set_by_GAN:
-            # copy to c++
-            source.fEnergy = fake[:, g.energy_gan_index]
+            batch["energy"] = fake[:, g.energy_gan_index]
 
         # time
         if g.time_is_set_by_GAN:
-            # copy to c++
-            source.fTime = fake[:, g.time_gan_index]
+            batch["time"] = fake[:, g.time_gan_index]
 
         # weight
         if g.weight_is_set_by_GAN:
-            # copy to c++
-            source.fWeight = fake[:, g.weight_gan_index]
+            batch["weight"] = fake[:, g.weight_gan_index]
+
+        return batch
 
     def move_backward(self, g, fake):
         # move particle backward ?
@@ -768,6 +922,9 @@ class GANSourceDefaultPairsGenerator(GANSourceDefaultGenerator):
     def __getstate__(self):
         self.lock = None
         self.gan_info = None
+        self.pipeline_queue = None
+        self.pipeline_stop = None
+        self.pipeline_thread = None
         return self.__dict__
 
     def check_parameters(self, g):
@@ -810,12 +967,9 @@ class GANSourceDefaultPairsGenerator(GANSourceDefaultGenerator):
             self.fatal(f"you must provide 2 values for weight, while it was {dim}")
         g.weight_gan_index = [the_keys.index(ek[0]), the_keys.index(ek[1])]
 
-    def generator(self, source):
+    def generate_batch(self):
         """
-        Main function that will be called from the cpp side every time a batch
-        of particles should be created.
-        Once created here, the particles are copied to cpp.
-        (Yes maybe the copy could be avoided, but I did not manage to do it)
+        Generate a batch of pairs of particles with the GAN and return its columns.
         """
         # get the info
         g = self.gan_info
@@ -844,15 +998,17 @@ class GANSourceDefaultPairsGenerator(GANSourceDefaultGenerator):
         # move particle backward ?
         self.move_backward(g, fake)
 
-        # copy to cpp
-        self.copy_generated_particle_to_g4(source, g, fake)
-
         # verbose
         if self.user_info.verbose_generator:
             end = time.time()
             print(f"in {end - start:0.1f} sec (device={g.params.current_gpu_device})")
 
-    def copy_generated_particle_to_g4(self, source, g, fake):
+        return self.get_batch_columns(g, fake)
+
+    def get_batch_columns(self, g, fake):
+        # The columns are handed to cpp in a single call, without copy
+        batch = {}
+
         # position
         if g.position_is_set_by_GAN:
             pos = []
@@ -862,13 +1018,9 @@ class GANSourceDefaultPairsGenerator(GANSourceDefaultGenerator):
                     pos.append(fake[:, g.position_gan_index[i]])
                 else:
                     pos.append(g.position_gan_index[i])
-            # copy to c++
-            source.fPositionX = pos[0]
-            source.fPositionY = pos[1]
-            source.fPositionZ = pos[2]
-            source.fPositionX2 = pos[3]
-            source.fPositionY2 = pos[4]
-            source.fPositionZ2 = pos[5]
+            for i, key in enumerate(["position_x", "position_y", "position_z"]):
+                batch[key] = pos[i]
+                batch[f"{key}2"] = pos[i + 3]
 
         # direction
         if g.direction_is_set_by_GAN:
@@ -879,31 +1031,26 @@ class GANSourceDefaultPairsGenerator(GANSourceDefaultGenerator):
                     dir.append(fake[:, g.direction_gan_index[i]])
                 else:
                     dir.append(g.direction_gan_index[i])
-            # copy to c++
-            source.fDirectionX = dir[0]
-            source.fDirectionY = dir[1]
-            source.fDirectionZ = dir[2]
-            source.fDirectionX2 = dir[3]
-            source.fDirectionY2 = dir[4]
-            source.fDirectionZ2 = dir[5]
+            for i, key in enumerate(["direction_x", "direction_y", "direction_z"]):
+                batch[key] = dir[i]
+                batch[f"{key}2"] = dir[i + 3]
 
         # energy
         if g.energy_is_set_by_GAN:
-            # copy to c++
-            source.fEnergy = fake[:, g.energy_gan_index[0]]
-            source.fEnergy2 = fake[:, g.energy_gan_index[1]]
+            batch["energy"] = fake[:, g.energy_gan_index[0]]
+            batch["energy2"] = fake[:, g.energy_gan_index[1]]
 
         # time
         if g.time_is_set_by_GAN:
-            # copy to c++
-            source.fTime = fake[:, g.time_gan_index[0]]
-            source.fTime2 = fake[:, g.time_gan_index[1]]
+            batch["time"] = fake[:, g.time_gan_index[0]]
+            batch["time2"] = fake[:, g.time_gan_index[1]]
 
         # weight
         if g.weight_is_set_by_GAN:
-            # copy to c++
-            source.fWeight = fake[:, g.weight_gan_index[0]]
-            source.fWeight2 = fake[:, g.weight_gan_index[1]]
+            batch["weight"] = fake[:, g.weight_gan_index[0]]
+            batch["weight2"] = fake[:, g.weight_gan_index[1]]
+
+        return batch
 
     def move_backward(self, g, fake):
         # move particle backward ?
@@ -952,7 +1099,7 @@ class GANSourceConditionalGenerator(GANSourceDefaultGenerator):
         )
         return None
 
-    def generator(self, source):
+    def generate_batch(self):
         """
         Generate particles with a GAN, considering conditional vectors.
         """
@@ -996,14 +1143,13 @@ class GANSourceConditionalGenerator(GANSourceDefaultGenerator):
         # move particle backward ?
         self.move_backward(g, fake)
 
-        # copy to cpp (g4)
-        self.copy_generated_particle_to_g4(source, g, fake)
-
         # verbose
         if self.user_info.verbose_generator:
             end = time.time()
             print(f"in {end - start:0.2f} sec (GPU={g.params.current_gpu_mode})")
 
+        return self.get_batch_columns(g, fake)
+
 
 class GANSourceConditionalPairsGenerator(GANSourceDefaultPairsGenerator):
     """
@@ -1024,6 +1170,9 @@ class GANSourceConditionalPairsGenerator(GANSourceDefaultPairsGenerator):
         self.gan = None
         self.generate_condition = None
         self.lock = None
+        self.pipeline_queue = None
+        self.pipeline_stop = None
+        self.pipeline_thread = None
         return self.__dict__
 
     def generate_condition(self, n):
@@ -1034,7 +1183,7 @@ class GANSourceConditionalPairsGenerator(GANSourceDefaultPairsGenerator):
         )
         return None
 
-    def generator(self, source):
+    def generate_batch(self):
         # get the info
         g = self.gan_info
         n = self.user_info.batch_size
@@ -1075,9 +1224,6 @@ class GANSourceConditionalPairsGenerator(GANSourceDefaultPairsGenerator):
         # back from torch to numpy
         fake = fake.cpu().data.numpy()
 
-        # copy to cpp
-        self.copy_generated_particle_to_g4(source, g, fake)
-
         # verbose
         if self.user_info.verbose_generator:
             end = time.time()
@@ -1085,6 +1231,8 @@ class GANSourceConditionalPairsGenerator(GANSourceDefaultPairsGenerator):
                 f"in {end - start_time:0.1f} sec (device={g.params.current_gpu_device})"
             )
 
+        return self.get_batch_columns(g, fake)
+
 
 process_cls(GANSource)
 process_cls(GANPairsSource)
@@ -4,6 +4,11 @@ import numbers
 from scipy.spatial.transform import Rotation
 from box import Box
 import sys
+import time
+import queue
+import threading
+import json
+from pathlib import Path
 
 import opengate_core as g4
 from ..exception import fatal, warning
@@ -11,10 +16,142 @@ from .generic import SourceBase
 from ..base import process_cls
 
 
+class PhaseSpaceStore:
+    """
+    Read-only columnar phase-space file, memory-mapped (see
+    convert_phsp_root_to_store to create it from a root phase-space).
+
+    The file contains a small header (JSON) followed by one uncompressed and
+    aligned column per key, so a batch is a slice of the columns: nothing is
+    decompressed and the pages are shared by all threads and all the processes
+    (jobs) on the same machine. Use PhaseSpaceStore.open to get the store
+    shared by all the threads of the process.
+
+    It provides the subset of the uproot TTree interface used by the
+    PhaseSpaceSource: num_entries, keys() and arrays().
+    """
+
+    magic = b"GATEPHSP"
+    alignment = 64
+
+    _opened_stores = {}
+    _opened_stores_lock = threading.Lock()
+
+    def __init__(self, filename):
+        self.filename = Path(filename)
+        with open(self.filename, "rb") as f:
+            if f.read(len(self.magic)) != self.magic:
+                fatal(f"{filename} is not a phase-space store file")
+            header_size = int(np.frombuffer(f.read(8), dtype="<u8")[0])
+            self.header = json.loads(f.read(header_size).decode("utf-8"))
+        self.num_entries = int(self.header["num_entries"])
+        self._buffer = np.memmap(self.filename, dtype=np.uint8, mode="r")
+        self.columns = {}
+        for key, c in self.header["columns"].items():
+            self.columns[key] = np.frombuffer(
+                self._buffer,
+                dtype=np.dtype(c["dtype"]),
+                count=self.num_entries,
+                offset=c["offset"],
+            )
+
+    @classmethod
+    def is_store(cls, filename):
+        try:
+            with open(filename, "rb") as f:
+                return f.read(len(cls.magic)) == cls.magic
+        except OSError:
+            return False
+
+    @classmethod
+    def open(cls, filename):
+        """Return the store of this file, opened once per process."""
+        filename = Path(filename).resolve()
+        key = (filename, filename.stat().st_mtime_ns)
+        with cls._opened_stores_lock:
+            if key not in cls._opened_stores:
+                cls._opened_stores[key] = cls(filename)
+            return cls._opened_stores[key]
+
+    def keys(self):
+        return list(self.columns.keys())
+
+    def arrays(self, entry_start=0, entry_stop=None, library="np"):
+        # views on the mapped file, no copy
+        return {
+            key: column[entry_start:entry_stop] for key, column in self.columns.items()
+        }
+
+
+def convert_phsp_root_to_store(
+    root_filename, store_filename, keys=None, step_size=1000000
+):
+    """
+    Convert a root phase-space (first tree of the file) to a PhaseSpaceStore file.
+    Floating point branches are stored as float32 and integer branches as int32
+    (the types used by the PhaseSpaceSource), other branches (e.g. strings) are
+    ignored. If keys is given, only these branches are converted.
+    """
+    tree = uproot.open(root_filename)
+    tree = tree[tree.keys()[0]]
+    n = int(tree.num_entries)
+    first = tree.arrays(keys, entry_stop=1, library="np")
+    columns = {}
+    for key, values in first.items():
+        if values.dtype.kind == "f":
+            columns[key] = np.dtype("<f4")
+        elif values.dtype.kind in "iub":
+            columns[key] = np.dtype("<i4")
+        else:
+            warning(f"Branch {key} ({values.dtype}) is not stored in {store_filename}")
+
+    # header then the aligned columns
+    a = PhaseSpaceStore.alignment
+    header = {"num_entries": n, "columns": {}}
+    header_size = 4096
+    offset = header_size
+    for key, dtype in columns.items():
+        header["columns"][key] = {"dtype": dtype.str, "offset": offset}
+        offset += (n * dtype.itemsize + a - 1) // a * a
+    header_bytes = json.dumps(header).encode("utf-8")
+    start = len(PhaseSpaceStore.magic) + 8
+    if start + len(header_bytes) > header_size:
+        fatal(f"Too many branches to convert in {root_filename}")
+    with open(store_filename, "wb") as f:
+        f.write(PhaseSpaceStore.magic)
+        f.write(np.array([len(header_bytes)], dtype="<u8").tobytes())
+        f.write(header_bytes)
+        f.truncate(offset)
+
+    data = np.memmap(store_filename, dtype=np.uint8, mode="r+")
+    out = {
+        key: np.frombuffer(
+            data, dtype=dtype, count=n, offset=header["columns"][key]["offset"]
+        )
+        for key, dtype in columns.items()
+    }
+    i = 0
+    for chunk in tree.iterate(list(columns.keys()), step_size=step_size, library="np"):
+        m = len(chunk[next(iter(columns))])
+        for key in columns:
+            out[key][i : i + m] = chunk[key]
+        i += m
+    data.flush()
+    del out, data
+
+
+# types of the batch columns read in place by the C++ side (GateBatchColumn),
+# for the float columns (position, direction, energy, weight) and the PDG codes
+BATCH_COLUMN_DTYPES = {
+    "f": (np.float32, np.float64, np.int32, np.int64),
+    "i": (np.int32, np.int64),
+}
+
+
 class PhaseSpaceSourceGenerator:
     """
     Class that read phase space root file and extract position/direction/energy/weights of particles.
-    Particles information will be copied to the c++ side to be used as a source
+    Particles information is handed (without copy) to the c++ side to be used as a source
     """
 
     def __init__(self, tid):
@@ -25,21 +162,16 @@ class PhaseSpaceSourceGenerator:
         self.cycle_count = 0
         self.cycle_changed_flag = False
         # used during generation
-        self.batch = None
-        self.points = None
         self.current_index = 0
-        self.w = None
-        # need to avoid garbage collection
-        self.pos_x = None
-        self.pos_y = None
-        self.pos_z = None
-        self.dir_x = None
-        self.dir_y = None
-        self.dir_z = None
-        self.energy = None
-        self.pdg = None
-        self.name = None
-        self.weight = None
+        self.read_cycle_count = 0
+        # prefetch thread (if prefetch_queue_depth > 0)
+        self.prefetch_queue = None
+        self.prefetch_stop = None
+        self.prefetch_thread = None
+        # I/O counters (in sec)
+        self.number_of_batches = 0
+        self.io_read_time = 0
+        self.io_wait_time = 0
 
     def initialize(self, phsp_source):
         self.phsp_source = phsp_source
@@ -52,22 +184,31 @@ class PhaseSpaceSourceGenerator:
         self.phsp_source.batch_size = int(self.phsp_source.batch_size)
         if self.phsp_source.batch_size < 1:
             fatal("PhaseSpaceSourceGenerator: Batch size should be > 0")
+        self.phsp_source.prefetch_queue_depth = int(
+            self.phsp_source.prefetch_queue_depth
+        )
+        if self.phsp_source.prefetch_queue_depth < 0:
+            fatal("PhaseSpaceSourceGenerator: prefetch_queue_depth should be >= 0")
 
         if g4.IsMultithreadedApplication() and g4.G4GetThreadId() == -1:
             # do nothing for master thread
             return
 
-        # open root file and get the first branch
-        # FIXME could have an option to select the branch
-        self.root_file = uproot.open(self.phsp_source.phsp_file)
-        branches = self.root_file.keys()
-        if len(branches) > 0:
-            self.root_file = self.root_file[branches[0]]
+        if PhaseSpaceStore.is_store(self.phsp_source.phsp_file):
+            # a phase-space store is mapped once and shared by all threads
+            self.root_file = PhaseSpaceStore.open(self.phsp_source.phsp_file)
         else:
-            fatal(
-                f"PhaseSpaceSourceGenerator: No usable branches in the root file {self.phsp_source.phsp_file}. Aborting."
-            )
-            sys.exit()
+            # open root file and get the first branch
+            # FIXME could have an option to select the branch
+            self.root_file = uproot.open(self.phsp_source.phsp_file)
+            branches = self.root_file.keys()
+            if len(branches) > 0:
+                self.root_file = self.root_file[branches[0]]
+            else:
+                fatal(
+                    f"PhaseSpaceSourceGenerator: No usable branches in the root file {self.phsp_source.phsp_file}. Aborting."
+                )
+                sys.exit()
 
         self.num_entries = int(self.root_file.num_entries)
 
@@ -77,6 +218,7 @@ class PhaseSpaceSourceGenerator:
 
         # initialize counters
         self.cycle_count = 0
+        self.read_cycle_count = 0
 
     def get_entry_start(self, entry_start):
         if not g4.IsMultithreadedApplication():
@@ -114,52 +256,51 @@ class PhaseSpaceSourceGenerator:
             )
         return n
 
-    def generate(self, g4_source, pid):
+    def next_batch_range(self):
         """
-        Main function called from C++ to generate a batch of particles.
+        Compute the range of the next batch in the phsp (cycle management).
+        Return the entry start, the number of entries, and the cycle count
+        after this batch.
         """
-        # --- 1. Cycle Management ---
         if self.current_index >= self.num_entries:
             self.current_index = 0
 
-        if self.cycle_changed_flag:
-            warning(
-                f"End of the phase-space {self.num_entries} elements, "
-                f"restart from beginning. Cycle count = {self.cycle_count}"
-            )
-            self.cycle_changed_flag = False
-
-        # --- 2. Calculate Batch Size ---
         requested_batch_size = self.phsp_source.batch_size
 
+        cycle_changed = False
         if self.current_index + requested_batch_size >= self.num_entries:
             requested_batch_size = self.num_entries - self.current_index
-            self.cycle_count += 1
-            self.cycle_changed_flag = True
+            self.read_cycle_count += 1
+            cycle_changed = True
 
         if requested_batch_size == 0:
             self.current_index = 0
             requested_batch_size = min(self.phsp_source.batch_size, self.num_entries)
-            self.cycle_count += 1
-            self.cycle_changed_flag = True
+            self.read_cycle_count += 1
+            cycle_changed = True
+
+        entry_start = self.current_index
+        self.current_index += requested_batch_size
+        return entry_start, requested_batch_size, self.read_cycle_count, cycle_changed
 
+    def read_batch(self, entry_start, batch_size):
+        """
+        Read a batch of particles from the phsp and return the columns sent to
+        the C++ side (read arrays are not copied). This does not use the G4
+        engine, so it can be run in the prefetch thread.
+        """
         if self.phsp_source.verbose_batch:
             print(
-                f"Thread {g4.G4GetThreadId()} reading {requested_batch_size} events from index {self.current_index}"
+                f"Thread {self.tid} reading {batch_size} events from index {entry_start}"
             )
 
-        # --- 3. Read Data ---
-        # We store 'batch' in self to keep the raw data alive
-        self.batch = self.root_file.arrays(
-            entry_start=self.current_index,
-            entry_stop=self.current_index + requested_batch_size,
+        batch = self.root_file.arrays(
+            entry_start=entry_start,
+            entry_stop=entry_start + batch_size,
             library="numpy",
         )
-        batch = self.batch
-        self.current_index += requested_batch_size
 
-        # --- 4. Paranoid Data Extractor ---
-        def get_data(key, dtype, must_exist=True):
+        def get_data(key, dtype=np.float32, must_exist=True):
             raw = None
             if hasattr(batch, "dtype") and batch.dtype.names:
                 if key in batch.dtype.names:
@@ -179,75 +320,139 @@ class PhaseSpaceSourceGenerator:
                     )
                 return None
 
+            # No copy: the C++ side reads float32/float64/int32/int64 arrays
+            # without conversion. Other types are converted here, as well as
+            # the float PDG codes (cast to int).
+            raw = np.asarray(raw)
+            if raw.dtype in BATCH_COLUMN_DTYPES[np.dtype(dtype).kind]:
+                return raw
             try:
-                # copy=True creates a new array. We MUST store this new array in 'self' later!
-                return np.array(raw, dtype=dtype, copy=True, order="C")
+                return raw.astype(dtype)
             except Exception as e:
                 fatal(f"PhaseSpaceSource: Conversion error for '{key}'. {e}")
 
-        # --- 5. Extract & STORE IN SELF (Prevent GC) ---
-
-        # We assign to 'self.X' to ensure the Python object survives
-        # as long as the C++ side needs it (until the next batch overwrites it).
-
-        self.pos_x = get_data(self.phsp_source.position_key_x, np.float32)
-        actual_size = len(self.pos_x)
+        c = {}
+        c["position_x"] = get_data(self.phsp_source.position_key_x)
+        actual_size = len(c["position_x"])
 
-        self.pos_y = get_data(self.phsp_source.position_key_y, np.float32)
-        self.pos_z = get_data(self.phsp_source.position_key_z, np.float32)
+        c["position_y"] = get_data(self.phsp_source.position_key_y)
+        c["position_z"] = get_data(self.phsp_source.position_key_z)
 
-        self.dir_x = get_data(self.phsp_source.direction_key_x, np.float32)
-        self.dir_y = get_data(self.phsp_source.direction_key_y, np.float32)
-        self.dir_z = get_data(self.phsp_source.direction_key_z, np.float32)
+        c["direction_x"] = get_data(self.phsp_source.direction_key_x)
+        c["direction_y"] = get_data(self.phsp_source.direction_key_y)
+        c["direction_z"] = get_data(self.phsp_source.direction_key_z)
 
-        self.energy = get_data(self.phsp_source.energy_key, np.float32)
+        c["energy"] = get_data(self.phsp_source.energy_key)
 
         # Weights
-        self.weight = None
+        weight = None
         if self.phsp_source.weight_key:
-            self.weight = get_data(
-                self.phsp_source.weight_key, np.float32, must_exist=False
-            )
-        if self.weight is None:
-            self.weight = np.ones(actual_size, dtype=np.float32)
+            weight = get_data(self.phsp_source.weight_key, must_exist=False)
+        if weight is None:
+            weight = np.ones(actual_size, dtype=np.float32)
+        c["weight"] = weight
 
         # PDG Code
-        self.pdg = None
         if not self.phsp_source.particle:
-            self.pdg = get_data(self.phsp_source.PDGCode_key, np.int32)
+            c["pdg_code"] = get_data(self.phsp_source.PDGCode_key, np.int32)
 
-        # --- 6. Transforms (Modify SELF) ---
+        # Transforms (new arrays, the read ones may be read-only views)
         if self.phsp_source.translate_position:
-            self.pos_x += float(self.phsp_source.position.translation[0])
-            self.pos_y += float(self.phsp_source.position.translation[1])
-            self.pos_z += float(self.phsp_source.position.translation[2])
+            t = self.phsp_source.position.translation
+            c["position_x"] = c["position_x"] + np.float32(t[0])
+            c["position_y"] = c["position_y"] + np.float32(t[1])
+            c["position_z"] = c["position_z"] + np.float32(t[2])
 
         if self.phsp_source.rotate_direction:
-            points = np.column_stack((self.dir_x, self.dir_y, self.dir_z))
+            points = np.column_stack(
+                (c["direction_x"], c["direction_y"], c["direction_z"])
+            )
             r = Rotation.from_matrix(self.phsp_source.position.rotation)
             rotated = r.apply(points)
-            self.dir_x = np.ascontiguousarray(rotated[:, 0], dtype=np.float32)
-            self.dir_y = np.ascontiguousarray(rotated[:, 1], dtype=np.float32)
-            self.dir_z = np.ascontiguousarray(rotated[:, 2], dtype=np.float32)
+            # the (strided) columns are read directly by the C++ side
+            c["direction_x"] = rotated[:, 0]
+            c["direction_y"] = rotated[:, 1]
+            c["direction_z"] = rotated[:, 2]
+
+        if len(c["energy"]) != actual_size:
+            fatal(f"Size mismatch: Pos {actual_size} vs Energy {len(c['energy'])}")
+
+        return Box({"columns": c, "size": actual_size})
+
+    def read_next_batch(self):
+        entry_start, batch_size, cycle_count, cycle_changed = self.next_batch_range()
+        t = time.perf_counter()
+        batch = self.read_batch(entry_start, batch_size)
+        self.io_read_time += time.perf_counter() - t
+        batch.cycle_count = cycle_count
+        batch.cycle_changed = cycle_changed
+        return batch
+
+    def start_prefetch(self):
+        self.prefetch_queue = queue.Queue(maxsize=self.phsp_source.prefetch_queue_depth)
+        self.prefetch_stop = threading.Event()
+        self.prefetch_thread = threading.Thread(
+            target=self._prefetch_loop,
+            name=f"{self.name}_prefetch_{self.tid}",
+            daemon=True,
+        )
+        self.prefetch_thread.start()
 
-        # --- 7. Send to C++ ---
-        if len(self.energy) != actual_size:
-            fatal(f"Size mismatch: Pos {actual_size} vs Energy {len(self.energy)}")
+    def _prefetch_loop(self):
+        # Read the batches in advance, in the same order as without prefetch.
+        # Errors are forwarded to the consumer (generate) through the queue.
+        while not self.prefetch_stop.is_set():
+            try:
+                item = self.read_next_batch()
+            except BaseException as e:
+                item = e
+            while not self.prefetch_stop.is_set():
+                try:
+                    self.prefetch_queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            if isinstance(item, BaseException):
+                return
+
+    def stop_prefetch(self):
+        if self.prefetch_thread is None:
+            return
+        self.prefetch_stop.set()
+        self.prefetch_thread.join()
+        self.prefetch_thread = None
+        self.prefetch_queue = None
 
-        # Pass the SELF variables to C++
-        g4_source.SetPositionXBatch(self.pos_x)
-        g4_source.SetPositionYBatch(self.pos_y)
-        g4_source.SetPositionZBatch(self.pos_z)
-        g4_source.SetDirectionXBatch(self.dir_x)
-        g4_source.SetDirectionYBatch(self.dir_y)
-        g4_source.SetDirectionZBatch(self.dir_z)
-        g4_source.SetEnergyBatch(self.energy)
-        g4_source.SetWeightBatch(self.weight)
+    def generate(self, g4_source, pid):
+        """
+        Main function called from C++ to generate a batch of particles.
+        """
+        if self.cycle_changed_flag:
+            warning(
+                f"End of the phase-space {self.num_entries} elements, "
+                f"restart from beginning. Cycle count = {self.cycle_count}"
+            )
+            self.cycle_changed_flag = False
 
-        if self.pdg is not None:
-            g4_source.SetPDGCodeBatch(self.pdg)
+        # Get the next batch, either read now or from the prefetch thread.
+        # The time spent here is the time the G4 thread waits for the I/O.
+        t = time.perf_counter()
+        if self.phsp_source.prefetch_queue_depth > 0:
+            if self.prefetch_thread is None:
+                self.start_prefetch()
+            batch = self.prefetch_queue.get()
+            if isinstance(batch, BaseException):
+                raise batch
+        else:
+            batch = self.read_next_batch()
+        self.io_wait_time += time.perf_counter() - t
+        self.number_of_batches += 1
+        self.cycle_count = batch.cycle_count
+        self.cycle_changed_flag = batch.cycle_changed
 
-        return actual_size
+        # The C++ side keeps a reference to the arrays until the next batch
+        g4_source.SetBatch(batch.columns)
+        return batch.size
 
 
 class PhaseSpaceSource(SourceBase):
@@ -270,6 +475,7 @@ class PhaseSpaceSource(SourceBase):
     translate_position: bool
     rotate_direction: bool
     batch_size: int
+    prefetch_queue_depth: int
     position_key: str
     position_key_x: str
     position_key_y: str
@@ -370,6 +576,15 @@ class PhaseSpaceSource(SourceBase):
                 "doc": "Batch size to read the phsp",
             },
         ),
+        "prefetch_queue_depth": (
+            0,
+            {
+                "doc": "If > 0, the batches are read and decoded in advance by a background "
+                "thread (one per G4 thread), while the current batch is tracked. "
+                "This is the maximum number of batches read in advance. "
+                "With 0 (default), the batches are read when needed.",
+            },
+        ),
         "position_key": (
             "PrePositionLocal",
             {
@@ -494,7 +709,14 @@ class PhaseSpaceSource(SourceBase):
         all_pg = self.particle_generators
         self.particle_generators = {}
         for k, pg in all_pg.items():
-            self.particle_generators[k] = Box({"cycle_count": pg.cycle_count})
+            self.particle_generators[k] = Box(
+                {
+                    "cycle_count": pg.cycle_count,
+                    "number_of_batches": pg.number_of_batches,
+                    "io_read_time": pg.io_read_time,
+                    "io_wait_time": pg.io_wait_time,
+                }
+            )
         state_dict = super().__getstate__()
         return state_dict
 
@@ -572,6 +794,23 @@ class PhaseSpaceSource(SourceBase):
         # set the function pointer to the cpp side
         g4_source.SetGeneratorFunction(self.particle_generators[tid].generate)
 
+    def prepare_output(self):
+        # stop the prefetch threads (the batches read in advance are lost)
+        for pg in self.particle_generators.values():
+            if isinstance(pg, PhaseSpaceSourceGenerator):
+                pg.stop_prefetch()
+
+    @property
+    def io_statistics(self):
+        """Number of batches read, time spent reading/decoding them, and time
+        the G4 threads waited for them (in sec), summed over the threads.
+        Without prefetch, both times are the same."""
+        stats = Box({"number_of_batches": 0, "io_read_time": 0, "io_wait_time": 0})
+        for pg in self.particle_generators.values():
+            for k in stats:
+                stats[k] += pg[k] if isinstance(pg, Box) else getattr(pg, k)
+        return stats
+
     @property
     def cycle_count(self):
         if not g4.IsMultithreadedApplication():
@@ -40,21 +40,27 @@ class VoxelSource(GenericSource):
         GenericSource.__init__(self, *args, **kwargs)
         # the loaded image
         self._current_itk_image = None
-        # cached CDFs
-        self._cdf_x = None
-        self._cdf_y = None
-        self._cdf_z = None
+        # cached CDFs (cpp side), shared by all thread-local sources
+        self._g4_cdf = None
 
     def create_changers(self):
         changers = super().create_changers()
         for dp in self.dynamic_params.values():
             if dp["extra_params"]["auto_changer"] is True:
                 if "image" in dp:
+                    # options of the changer given to add_dynamic_parametrisation
+                    # (e.g. prepare_frames=True)
+                    options = {
+                        k: v
+                        for k, v in dp["extra_params"].items()
+                        if k in SourceActivityImageChanger.user_info_defaults
+                    }
                     new_changer = SourceActivityImageChanger(
                         name=f"{self.name}_source_activity_changer_{len(changers)}",
                         activity_images=dp["image"],
                         attached_to=self,
                         simulation=self.simulation,
+                        **options,
                     )
                     changers.append(new_changer)
             else:
@@ -84,25 +90,38 @@ class VoxelSource(GenericSource):
         """
         Compute the Cumulative Distribution Function of the image
         Composed of: CDF_Z = 1D, CDF_Y = 2D, CDF_X = 3D
+        They are computed and copied to the cpp side once, then shared
+        (read-only) by the sources of all threads.
         """
-        if self._cdf_x is None or self._cdf_y is None or self._cdf_z is None:
-            self._cdf_x, self._cdf_y, self._cdf_z = compute_image_3D_CDF(
-                self._current_itk_image
-            )
+        if self._g4_cdf is None:
+            cdf_x, cdf_y, cdf_z = compute_image_3D_CDF(self._current_itk_image)
+            self._g4_cdf = g4.GateSPSVoxelsCDF()
+            self._g4_cdf.SetCumulativeDistributionFunction(cdf_z, cdf_y, cdf_x)
 
         # set CDF to the position generator
         pg = g4_source.GetSPSVoxelPosDistribution()
-        pg.SetCumulativeDistributionFunction(self._cdf_z, self._cdf_y, self._cdf_x)
+        pg.SetCumulativeDistributionFunction(self._g4_cdf)
 
     def update_activity_image(self, filename):
         # read source image
         self._current_itk_image = itk.imread(ensure_filename_is_str(filename))
 
         # Reset CDF cache
-        self._cdf_x = None
-        self._cdf_y = None
-        self._cdf_z = None
+        self._g4_cdf = None
 
+        self.update_thread_sources()
+
+    def set_activity_frame(self, image, g4_cdf):
+        """
+        Set an activity image whose CDF are already computed (g4_cdf is a
+        GateSPSVoxelsCDF). The image is only used for its geometry, it does not
+        need a buffer.
+        """
+        self._current_itk_image = image
+        self._g4_cdf = g4_cdf
+        self.update_thread_sources()
+
+    def update_thread_sources(self):
         # update all thread-local sources
         for g4_source in self.g4_thread_sources:
             # compute position
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compilation of the filters (sim.optimize_filters): one_of and the equality
+tests on the same attribute become set lookups, and the sub-filters are
+reordered with the statistics of a previous run (sim.filter_statistics).
+The first test (energy below 10 MeV) never rejects a step, so it must be moved
+after the others. The selected steps must be exactly the same as without the
+optimization.
+"""
+
+import uproot
+import numpy as np
+
+import opengate as gate
+from opengate.tests import utility
+from opengate.actors.filters import (
+    GateFilterBuilder,
+    AttributeFilterString,
+    BooleanFilter,
+)
+
+
+def run_simulation(sim, phsp):
+    sim.run(start_new_process=True)
+    with uproot.open(phsp.get_output_path()) as f:
+        return f[phsp.name].arrays(library="np")
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, "", "test023")
+
+    sim = gate.Simulation()
+    sim.random_seed = 123654
+    sim.output_dir = paths.output
+    sim.number_of_threads = 1
+
+    m = gate.g4_units.m
+    cm = gate.g4_units.cm
+    MeV = gate.g4_units.MeV
+    keV = gate.g4_units.keV
+
+    sim.world.size = [1 * m, 1 * m, 1 * m]
+    sim.world.material = "G4_AIR"
+
+    waterbox = sim.add_volume("Box", "waterbox")
+    waterbox.size = [20 * cm, 20 * cm, 20 * cm]
+    waterbox.material = "G4_WATER"
+
+    source = sim.add_source("GenericSource", "beam")
+    source.particle = "e-"
+    source.energy.mono = 6 * MeV
+    source.position.type = "disc"
+    source.position.radius = 1 * cm
+    source.position.translation = [0, 0, -30 * cm]
+    source.direction.type = "momentum"
+    source.direction.momentum = [0, 0, 1]
+    source.n = 2000
+
+    F = GateFilterBuilder()
+    one_of = F.ParticleName.one_of("e-", "e+", "proton")
+    particles = (F.ParticleName == "gamma") | (F.ParticleName == "e+")
+    phsp = sim.add_actor("PhaseSpaceActor", "phsp")
+    phsp.attached_to = waterbox
+    phsp.attributes = ["EventID", "TrackID", "ParticleName", "KineticEnergy"]
+    phsp.output_filename = "test023_filters_compiled.root"
+    phsp.filter = (
+        (F.KineticEnergy < 10 * MeV)
+        & (F.KineticEnergy > 50 * keV)
+        & ((F.TrackID != 1) & (F.TrackID != 2))
+        & (one_of | particles)
+    )
+    sim.physics_manager.physics_list_name = "G4EmStandardPhysics_option4"
+
+    is_ok = utility.print_test(
+        isinstance(one_of, AttributeFilterString)
+        and one_of.compare_operation == "in"
+        and one_of.compare_value == ["e-", "e+", "proton"],
+        "one_of is a single set lookup",
+    )
+
+    # reference: filters evaluated as written
+    sim.optimize_filters = False
+    ref = run_simulation(sim, phsp)
+
+    # compiled filters, statistics collected
+    sim.optimize_filters = True
+    sim.filter_statistics = True
+    compiled = run_simulation(sim, phsp)
+    print(sim.filter_manager.dump_statistics())
+    statistics = sim.filter_manager.statistics
+    is_ok = (
+        utility.print_test(
+            len(statistics) > 0
+            and statistics[phsp.filter.name].evaluations > 0
+            and all(0 <= s.accept_rate <= 1 for s in statistics.values())
+            and any(name.endswith("_TrackID_in") for name in statistics),
+            "Statistics of the filters (with the merged TrackID tests)",
+        )
+        and is_ok
+    )
+
+    # compiled and reordered with the statistics of the previous run
+    reordered = run_simulation(sim, phsp)
+
+    # the sub-filters have been reordered (not only merged)
+    reordered_filters = [
+        f.name
+        for f in sim.filter_manager.filters.values()
+        if isinstance(f, BooleanFilter)
+        and [g.name for g in f.compile_filters()]
+        != [g.name for g in f._merge_equality_filters()]
+    ]
+    is_ok = (
+        utility.print_test(
+            len(reordered_filters) > 0,
+            f"Sub-filters reordered with the statistics in {reordered_filters}",
+        )
+        and is_ok
+    )
+
+    # a sub-filter without statistics is evaluated after the other ones
+    top = phsp.filter
+    children = top._merge_equality_filters()
+    statistics = dict(sim.filter_manager.statistics)
+    del statistics[children[0].name]
+    order = top._sort_filters_by_statistics(children, statistics)
+    is_ok = (
+        utility.print_test(
+            order[-1] is children[0] and len(order) == len(children),
+            f"Sub-filter without statistics evaluated last: {[g.name for g in order]}",
+        )
+        and is_ok
+    )
+
+    for name, data in (("compiled", compiled), ("reordered", reordered)):
+        is_ok = (
+            utility.print_test(
+                len(ref["EventID"]) > 0
+                and all(np.array_equal(ref[k], data[k]) for k in ref),
+                f"Same {len(data['EventID'])} steps with the {name} filters",
+            )
+            and is_ok
+        )
+    is_ok = (
+        utility.print_test(
+            set(ref["ParticleName"]) <= {"e-", "e+", "proton", "gamma"}
+            and np.all(ref["KineticEnergy"] > 50 * keV)
+            and np.all(ref["TrackID"] > 2),
+            "Selected steps match the filter",
+        )
+        and is_ok
+    )
+
+    utility.test_ok(is_ok)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARF applied by a dedicated inference thread (queue_size > 0), with the waiting
+batches concatenated (coalesce_batches > 1). The projections must be the same
+as with the ARF applied inline by the simulation thread (queue_size = 0).
+"""
+
+import itk
+import numpy as np
+
+import opengate as gate
+import opengate.contrib.spect.ge_discovery_nm670 as gate_spect
+from opengate.sources.utility import get_spectrum
+from opengate.tests import utility
+
+
+def create_simulation(paths, number_of_threads, queue_size, coalesce_batches, name):
+    m = gate.g4_units.m
+    cm = gate.g4_units.cm
+    mm = gate.g4_units.mm
+    nm = gate.g4_units.nm
+    km = gate.g4_units.km
+    Bq = gate.g4_units.Bq
+
+    sim = gate.Simulation()
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.number_of_threads = number_of_threads
+    sim.random_seed = 321654987
+    sim.output_dir = paths.output
+    sim.world.size = [3 * m, 3 * m, 3 * m]
+    sim.world.material = "G4_AIR"
+    sim.physics_manager.physics_list_name = "G4EmStandardPhysics_option4"
+    sim.physics_manager.global_production_cuts.all = 1 * km
+
+    # fake spect head and detector input plane (+ 1nm to avoid overlap)
+    head = gate_spect.add_fake_spect_head(sim, "spect")
+    head.translation = [0, 0, -15 * cm]
+    pos, crystal_dist, _ = gate_spect.get_plane_position_and_distance_to_crystal("lehr")
+    plane = sim.add_volume("Box", "detPlane")
+    plane.mother = head.name
+    plane.size = [57.6 * cm, 44.6 * cm, 1 * nm]
+    plane.translation = [0, 0, pos + 1 * nm]
+    plane.material = "G4_Galactic"
+
+    tc99m = get_spectrum("Tc99m", "gamma")
+    source = sim.add_source("GenericSource", "source")
+    source.particle = "gamma"
+    source.activity = 2e5 * Bq
+    source.position.type = "sphere"
+    source.position.radius = 15 * mm
+    source.direction.type = "iso"
+    source.energy.type = "spectrum_discrete"
+    source.energy.spectrum_energies = tc99m.energies
+    source.energy.spectrum_weights = tc99m.weights
+
+    # small batches: many batches are queued and concatenated
+    arf = sim.add_actor("ARFActor", "arf")
+    arf.attached_to = plane.name
+    arf.output_filename = f"test043_projection_{name}.mhd"
+    arf.batch_size = 2e3
+    arf.image_size = [128, 128]
+    arf.image_spacing = [4.41806 * mm, 4.41806 * mm]
+    arf.distance_to_crystal = crystal_dist
+    arf.pth_filename = paths.gate_data / "pth" / "arf_Tc99m_v034.pth"
+    arf.enable_hit_slice = True
+    arf.flip_plane = True
+    arf.gpu_mode = utility.get_gpu_mode_for_tests()
+    arf.queue_size = queue_size
+    arf.coalesce_batches = coalesce_batches
+
+    stats = sim.add_actor("SimulationStatisticsActor", "stats")
+    return sim, arf, stats
+
+
+def run_simulation(paths, number_of_threads, queue_size, coalesce_batches, name):
+    sec = gate.g4_units.s
+    sim, arf, stats = create_simulation(
+        paths, number_of_threads, queue_size, coalesce_batches, name
+    )
+    sim.run_timing_intervals = [[0, 0.5 * sec]]
+    sim.run(start_new_process=True)
+    print(stats)
+    img = itk.imread(str(arf.get_output_path("counts")))
+    return itk.array_from_image(img), stats
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, "gate_test043_garf", "test043")
+
+    # reference: ARF applied by the simulation thread
+    ref, stats_ref = run_simulation(paths, 1, 0, 1, "inline")
+    print(f"Inline: {ref.sum():.1f} counts")
+    is_ok = utility.print_test(ref.sum() > 0, "Inline projection is not empty")
+
+    # same simulation, ARF applied by the inference thread
+    arr, stats = run_simulation(paths, 1, 4, 3, "queue")
+    print(f"Queue: {arr.sum():.1f} counts")
+    tol = 1e-5 * ref.max()
+    is_ok = (
+        utility.print_test(
+            stats.counts.events == stats_ref.counts.events
+            and arr.shape == ref.shape
+            and np.allclose(arr, ref, rtol=1e-5, atol=tol),
+            "Same projection with the inference thread (queue_size=4, coalesce_batches=3)",
+        )
+        and is_ok
+    )
+
+    # multithread: other events, the total counts must be statistically the same
+    arr_mt, stats_mt = run_simulation(paths, 2, 4, 3, "queue_mt")
+    diff = abs(arr_mt.sum() - ref.sum()) / ref.sum()
+    print(f"Queue MT: {arr_mt.sum():.1f} counts ({diff * 100:.2f}%)")
+    is_ok = (
+        utility.print_test(
+            arr_mt.shape == ref.shape and diff < 0.05,
+            "Same total counts with the inference thread in multithread",
+        )
+        and is_ok
+    )
+
+    utility.test_ok(is_ok)
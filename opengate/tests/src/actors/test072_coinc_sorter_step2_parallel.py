@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import opengate as gate
+from opengate.tests import utility
+from opengate.actors.coincidences import CoincidenceSorter
+import os
+import time
+import pandas as pd
+
+
+def main(dependency="test072_coinc_sorter_step1.py"):
+
+    # If output_singles.root does not exist, run a simulation to generate it
+    paths = utility.get_default_test_paths(__file__, output_folder="test072")
+    root_filename = paths.output / "output_singles.root"
+    if not os.path.exists(root_filename):
+        print(f"Simulating singles to create {root_filename} ...")
+        subdir = os.path.dirname(__file__)
+        os.system(f"python {str(paths.current / subdir / dependency)}")
+
+    ns = gate.g4_units.nanosecond
+    mm = gate.g4_units.mm
+
+    sorter = CoincidenceSorter()
+    sorter.window = 3 * ns
+    sorter.transaxial_plane = "XY"
+    sorter.min_transaxial_distance = 0 * mm
+    sorter.max_axial_distance = 32 * mm
+    # small slabs, to have many slab boundaries
+    sorter.chunk_size = 5000
+
+    # The coincidences sorted with several processes must be exactly the same
+    # as with a single process, for all policies and both window modes
+    is_ok = True
+    for policy in ["RemoveMultiples", "TakeAllGoods", "TakeWinnerOfGoods"]:
+        for multi_window in [True, False]:
+            sorter.multiples_policy = policy
+            sorter.multi_window = multi_window
+            durations = []
+            coincidences = []
+            for n_workers in [1, 4]:
+                sorter.n_workers = n_workers
+                t = time.time()
+                coincidences.append(sorter.run(root_filename, "Singles_crystal"))
+                durations.append(time.time() - t)
+            print(
+                f"{policy} multi_window={multi_window}: {len(coincidences[0])} coincidences, "
+                f"1 process {durations[0]:.2f} sec, 4 processes {durations[1]:.2f} sec"
+            )
+            try:
+                pd.testing.assert_frame_equal(coincidences[0], coincidences[1])
+            except AssertionError as e:
+                print(e)
+                is_ok = False
+
+    utility.test_ok(is_ok)
+
+
+if __name__ == "__main__":
+    main()
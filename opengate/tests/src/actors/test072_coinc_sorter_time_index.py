@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Coincidence sorting over the GlobalTime-sorted index of the singles
+(SinglesTimeIndex), with synthetic singles that are not in time order, as
+written by a multithreaded simulation (interleaved blocks of time-ordered
+singles, one thread per block). The coincidences must not depend on
+chunk_size, must be the same with the time index read from
+time_index_folder, and must be the same as with the previous implementation
+(chunks of singles in tree order, restarted with a twice larger chunk when
+the chunks are not in time order), stored as the number and a digest of the
+coincidences. The previous implementation returned the windows of the
+"winner" policies in the tree order of the single opening the window, so the
+comparison with it ignores the order of the rows.
+"""
+
+import hashlib
+import shutil
+
+import numpy as np
+import pandas as pd
+import uproot
+
+import opengate as gate
+from opengate.tests import utility
+from opengate.contrib.root_helpers import (
+    root_tree_get_branch_data,
+    root_tree_get_branch_types,
+    root_write_tree,
+)
+from opengate.actors.coincidences import (
+    coincidences_sorter,
+    cc_coincidences_sorter,
+    SinglesTimeIndex,
+    _read_singles_entries,
+)
+
+
+def create_singles(rng, n_threads, n_singles_per_thread, duration, block_size):
+    # each thread produces time-ordered singles, written block by block
+    threads = []
+    for thread in range(n_threads):
+        n = n_singles_per_thread
+        threads.append(
+            pd.DataFrame(
+                {
+                    "EventID": np.arange(n) * n_threads + thread,
+                    "GlobalTime": np.sort(rng.uniform(0, duration, n)),
+                    "PreStepUniqueVolumeID": rng.choice(
+                        [f"0_0_{i}" for i in range(12)], n
+                    ),
+                    "TotalEnergyDeposit": rng.uniform(0.1, 0.6, n),
+                    "PostPosition_X": rng.uniform(-300, 300, n),
+                    "PostPosition_Y": rng.uniform(-300, 300, n),
+                    "PostPosition_Z": rng.uniform(-100, 100, n),
+                }
+            )
+        )
+    blocks = [
+        t.iloc[i : i + block_size]
+        for i in range(0, n_singles_per_thread, block_size)
+        for t in threads
+    ]
+    return pd.concat(blocks, ignore_index=True)
+
+
+def write_singles(singles, path):
+    singles = singles.copy()
+    singles["PreStepUniqueVolumeID"] = pd.Categorical(singles["PreStepUniqueVolumeID"])
+    data = root_tree_get_branch_data(singles.to_dict(orient="list"))
+    with uproot.recreate(path) as f:
+        root_write_tree(f, "Singles", root_tree_get_branch_types(data), data)
+
+
+# Reference: number and digest of the coincidences found by the previous
+# implementation of the sorter (before SinglesTimeIndex: chunks of singles in
+# tree order, all the singles in one chunk here) on the singles above. The
+# winner policies returned the windows in the tree order of the single opening
+# them, so the digest ignores the order of the coincidences.
+REFERENCE_COINCIDENCES = {
+    ("TakeAllGoods", True): (23702, "7c0a9ecdc2058291"),
+    ("TakeAllGoods", False): (1839, "b1f417e1739e7e22"),
+    ("RemoveMultiples", True): (1739, "a353aeb4d8267dc0"),
+    ("TakeWinnerOfGoods", True): (9048, "ccfe8669ce6412b0"),
+    ("TakeWinnerIfAllAreGoods", True): (6452, "66404185da0885e6"),
+}
+REFERENCE_COINCIDENT_SINGLES = (2041, "f01fc690a62fcc4a")
+
+
+def digest(coincidences, keys, ignore_order=False):
+    # the EventID of a single is unique, so it identifies the single
+    a = np.stack([np.asarray(coincidences[k], dtype="<i8") for k in keys], axis=1)
+    if ignore_order:
+        a = a[np.lexsort(a.T[::-1])]
+    return hashlib.sha256(np.ascontiguousarray(a).tobytes()).hexdigest()[:16]
+
+
+class RecordingTree:
+    # singles tree that records the number of entries of each read
+    def __init__(self, tree):
+        self.tree = tree
+        self.read_sizes = []
+
+    def arrays(self, branches, entry_start, entry_stop, library):
+        self.read_sizes.append(entry_stop - entry_start)
+        return self.tree.arrays(
+            branches, entry_start=entry_start, entry_stop=entry_stop, library=library
+        )
+
+
+def same_coincidences(c1, c2):
+    return (
+        len(c1) == len(c2)
+        and set(c1.columns) == set(c2.columns)
+        and all(np.array_equal(c1[k].to_numpy(), c2[k].to_numpy()) for k in c1)
+    )
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test072")
+    ns = gate.g4_units.ns
+    mm = gate.g4_units.mm
+
+    # 4 threads, about 3 singles per time window
+    rng = np.random.default_rng(72)
+    singles = create_singles(rng, 4, 2500, 1e6 * ns, 300)
+    root_filename = paths.output / "test072_singles_unsorted.root"
+    write_singles(singles, root_filename)
+    time_window = 300 * ns
+    is_ok = utility.print_test(
+        np.any(np.diff(singles["GlobalTime"]) < 0),
+        f"{len(singles)} singles, not in time order",
+    )
+
+    index_folder = paths.output / "test072_time_index"
+    shutil.rmtree(index_folder, ignore_errors=True)
+    configurations = [
+        ("TakeAllGoods", True, 100 * mm, 150 * mm),
+        ("TakeAllGoods", False, None, None),
+        ("RemoveMultiples", True, None, None),
+        ("TakeWinnerOfGoods", True, 100 * mm, 150 * mm),
+        ("TakeWinnerIfAllAreGoods", True, 100 * mm, 150 * mm),
+    ]
+
+    with uproot.open(root_filename) as f:
+        tree = f["Singles"]
+
+        # time index saved then read (memory-mapped)
+        SinglesTimeIndex.from_tree(tree, index_folder)
+        index = SinglesTimeIndex.from_tree(tree, index_folder)
+        is_ok = (
+            utility.print_test(
+                (index_folder / "entries.npy").is_file()
+                and isinstance(index.times, np.memmap)
+                and np.all(np.diff(index.times) >= 0)
+                and np.array_equal(
+                    index.times, singles["GlobalTime"].to_numpy()[index.entries]
+                ),
+                "Time index saved and reloaded from the folder",
+            )
+            and is_ok
+        )
+
+        # scattered entries (a single at the end of each thread block) are read
+        # in ranges of at most max_read_size entries
+        entries = np.arange(9999, 0, -300)
+        recording_tree = RecordingTree(tree)
+        values = _read_singles_entries(
+            recording_tree, ["EventID"], entries, max_read_size=500
+        )
+        is_ok = (
+            utility.print_test(
+                np.array_equal(
+                    values["EventID"], singles["EventID"].to_numpy()[entries]
+                )
+                and max(recording_tree.read_sizes) <= 500,
+                f"Scattered singles read in {len(recording_tree.read_sizes)} ranges "
+                f"of at most {max(recording_tree.read_sizes)} entries",
+            )
+            and is_ok
+        )
+
+        for policy, multi_window, min_td, max_ad in configurations:
+            plane = "xy" if min_td is not None else None
+            n_ref, digest_ref = REFERENCE_COINCIDENCES[(policy, multi_window)]
+            results = {
+                chunk_size: coincidences_sorter(
+                    tree,
+                    time_window,
+                    policy,
+                    min_td,
+                    plane,
+                    max_ad,
+                    chunk_size=chunk_size,
+                    return_type="pd",
+                    allDigiOpenCoincGate=multi_window,
+                )
+                for chunk_size in (97, 1000, 100000)
+            }
+            with_index = coincidences_sorter(
+                tree,
+                time_window,
+                policy,
+                min_td,
+                plane,
+                max_ad,
+                chunk_size=1000,
+                return_type="pd",
+                allDigiOpenCoincGate=multi_window,
+                time_index_folder=index_folder,
+            )
+            ok = len(with_index) == n_ref and digest_ref == digest(
+                with_index, ["EventID1", "EventID2"], ignore_order=True
+            )
+            ok = ok and all(same_coincidences(with_index, c) for c in results.values())
+            is_ok = (
+                utility.print_test(
+                    ok,
+                    f"{policy:<24} multi_window={multi_window!s:<5}: {len(with_index)} "
+                    f"coincidences, same as before, same for chunk_size "
+                    f"{list(results)} and with the time index folder",
+                )
+                and is_ok
+            )
+
+        # coincident singles
+        n_ref, digest_ref = REFERENCE_COINCIDENT_SINGLES
+        ok = True
+        for chunk_size in (97, 100000):
+            c = cc_coincidences_sorter(
+                tree, time_window, chunk_size, time_index_folder=index_folder
+            )
+            ok = (
+                ok
+                and len(c) == n_ref
+                and digest(c, ["CoincID", "EventID"]) == digest_ref
+            )
+        is_ok = (
+            utility.print_test(ok, f"{n_ref} coincident singles, same as before")
+            and is_ok
+        )
+
+    utility.test_ok(is_ok)
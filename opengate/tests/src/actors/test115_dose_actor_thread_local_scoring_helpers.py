@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import opengate as gate
+
+
+def simulate(paths, number_of_threads, thread_local_scoring, n=5e3):
+    # units
+    m = gate.g4_units.m
+    cm = gate.g4_units.cm
+    mm = gate.g4_units.mm
+    MeV = gate.g4_units.MeV
+    sec = gate.g4_units.s
+
+    sim = gate.Simulation()
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.random_seed = 123654
+    sim.number_of_threads = number_of_threads
+    sim.output_dir = paths.output
+
+    sim.world.size = [1 * m, 1 * m, 1 * m]
+
+    waterbox = sim.add_volume("Box", "waterbox")
+    waterbox.size = [20 * cm, 20 * cm, 20 * cm]
+    waterbox.material = "G4_WATER"
+
+    source = sim.add_source("GenericSource", "mysource")
+    source.energy.mono = 150 * MeV
+    source.particle = "proton"
+    source.position.type = "disc"
+    source.position.radius = 5 * mm
+    source.position.translation = [0, 0, -15 * cm]
+    source.direction.type = "momentum"
+    source.direction.momentum = [0, 0, 1]
+    source.n = n / number_of_threads
+
+    suffix = f"{number_of_threads}_{int(thread_local_scoring)}"
+    dose = sim.add_actor("DoseActor", "dose")
+    dose.attached_to = waterbox
+    dose.size = [50, 50, 100]
+    dose.spacing = [4 * mm, 4 * mm, 2 * mm]
+    dose.thread_local_scoring = thread_local_scoring
+    dose.output_filename = f"test115_{suffix}.mhd"
+    dose.edep_uncertainty.active = True
+    dose.counts.active = True
+
+    stats = sim.add_actor("SimulationStatisticsActor", "Stats")
+
+    sim.run(start_new_process=True)
+
+    return stats.counts["duration"] / sec, dose
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compare the DoseActor scoring with and without thread local scoring buffers
+(dose.thread_local_scoring = True). Both modes must give the same edep,
+edep uncertainty and counts images. The run time versus the number of threads
+is measured by test115_dose_actor_thread_local_scoring_speed_wip.py.
+"""
+
+from opengate.tests import utility
+
+from opengate.tests.src.actors.test115_dose_actor_thread_local_scoring_helpers import (
+    simulate,
+)
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test115")
+
+    # the two scoring modes must give the same images
+    # (same seed and number of threads, so the same particles are tracked)
+    n_threads = 4
+    _, dose_mutex = simulate(paths, n_threads, False)
+    _, dose_local = simulate(paths, n_threads, True)
+    is_ok = True
+    for name in ("edep", "edep_uncertainty", "counts"):
+        print(f"Compare {name}")
+        is_ok = (
+            utility.assert_images(
+                getattr(dose_mutex, name).get_output_path(),
+                getattr(dose_local, name).get_output_path(),
+                tolerance=1e-6,
+                sum_tolerance=1e-6,
+            )
+            and is_ok
+        )
+
+    utility.test_ok(is_ok)
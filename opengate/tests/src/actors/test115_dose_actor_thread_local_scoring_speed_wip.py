@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Simple benchmark of the DoseActor thread local scoring buffers
+(dose.thread_local_scoring = True): run time with 1 to 8 threads for both
+modes. Not part of the default test suite (see
+test115_dose_actor_thread_local_scoring_mt.py for the comparison of the images).
+"""
+
+import matplotlib.pyplot as plt
+
+from opengate.tests import utility
+
+from opengate.tests.src.actors.test115_dose_actor_thread_local_scoring_helpers import (
+    simulate,
+)
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test115")
+
+    # run time versus number of threads for both modes
+    threads = [1, 2, 4, 8]
+    durations = {False: [], True: []}
+    for nt in threads:
+        for mode in (False, True):
+            d, _ = simulate(paths, nt, mode, n=2e4)
+            durations[mode].append(d)
+
+    print("********")
+    for nt, d0, d1 in zip(threads, durations[False], durations[True]):
+        print(
+            f"{nt} threads: mutex {d0:.2f} sec, thread local {d1:.2f} sec, "
+            f"speedup {d0 / d1:.2f}"
+        )
+    print("********")
+
+    plt.figure()
+    plt.plot(threads, durations[False], "o-", label="mutex per step")
+    plt.plot(threads, durations[True], "o-", label="thread local scoring")
+    plt.legend(loc="best")
+    plt.xlabel("Number of threads")
+    plt.ylabel("Geant4 simulation run time in sec")
+    plt.tight_layout()
+    plt.savefig(paths.output / "test115_thread_local_scoring.pdf")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compare the DoseActor with the default dense scoring and with the sparse
+scoring backend (dose.scoring_backend = "sparse") for a pencil beam in a large
+scoring grid where only a small region is irradiated. Both backends must give
+the same edep, edep uncertainty, dose and counts images.
+"""
+
+import opengate as gate
+from opengate.tests import utility
+
+
+def simulate(paths, scoring_backend):
+    # units
+    m = gate.g4_units.m
+    cm = gate.g4_units.cm
+    mm = gate.g4_units.mm
+    MeV = gate.g4_units.MeV
+    sec = gate.g4_units.s
+
+    sim = gate.Simulation()
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.random_seed = 321654
+    sim.number_of_threads = 4
+    sim.output_dir = paths.output
+
+    sim.world.size = [1 * m, 1 * m, 1 * m]
+
+    waterbox = sim.add_volume("Box", "waterbox")
+    waterbox.size = [40 * cm, 40 * cm, 30 * cm]
+    waterbox.material = "G4_WATER"
+
+    source = sim.add_source("GenericSource", "mysource")
+    source.energy.mono = 120 * MeV
+    source.particle = "proton"
+    source.position.type = "disc"
+    source.position.radius = 2 * mm
+    source.position.translation = [0, 0, -20 * cm]
+    source.direction.type = "momentum"
+    source.direction.momentum = [0, 0, 1]
+    source.n = 2000
+
+    # 256 x 256 x 200 voxels, only a few percent are touched
+    dose = sim.add_actor("DoseActor", "dose")
+    dose.attached_to = waterbox
+    dose.size = [256, 256, 200]
+    dose.spacing = [40 * cm / 256, 40 * cm / 256, 1.5 * mm]
+    dose.scoring_backend = scoring_backend
+    dose.output_filename = f"test116_{scoring_backend}.mhd"
+    dose.edep_uncertainty.active = True
+    dose.dose.active = True
+    dose.dose_uncertainty.active = True
+    dose.counts.active = True
+
+    stats = sim.add_actor("SimulationStatisticsActor", "Stats")
+
+    sim.run(start_new_process=True)
+
+    return stats.counts["duration"] / sec, dose
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test116")
+
+    duration_dense, dose_dense = simulate(paths, "dense")
+    duration_sparse, dose_sparse = simulate(paths, "sparse")
+    print(f"Dense backend:  {duration_dense:.2f} sec")
+    print(f"Sparse backend: {duration_sparse:.2f} sec")
+
+    is_ok = True
+    for name in ("edep", "edep_uncertainty", "dose", "dose_uncertainty", "counts"):
+        print(f"Compare {name}")
+        is_ok = (
+            utility.assert_images(
+                getattr(dose_dense, name).get_output_path(),
+                getattr(dose_sparse, name).get_output_path(),
+                tolerance=1e-6,
+                sum_tolerance=1e-6,
+            )
+            and is_ok
+        )
+
+    utility.test_ok(is_ok)
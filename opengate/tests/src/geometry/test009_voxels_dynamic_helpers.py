@@ -21,6 +21,7 @@ def build_dynamic_voxel_simulation(
     run_timing_intervals,
     dynamic_image_paths=None,
     random_seed=123456,
+    label_image_options=None,
 ):
     """Build the dynamic voxel test simulation with configurable timing/images."""
 
@@ -73,7 +74,11 @@ def build_dynamic_voxel_simulation(
         [300, 800, "G4_B-100_BONE"],
         [800, 6000, "G4_BONE_COMPACT_ICRU"],
     ]
-    patient.add_dynamic_parametrisation(image=dynamic_image_paths)
+    if label_image_options is None:
+        label_image_options = {}
+    patient.add_dynamic_parametrisation(
+        image=dynamic_image_paths, **label_image_options
+    )
 
     voxel_materials_from_file = read_voxel_materials(
         paths.gate_data / "patient-HU2mat-v1.txt"
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test 009: Dynamic Voxelized Volumes with a bounded label image cache
+
+Same simulation as test009_voxels_dynamic, with two different phase images
+(the second one has a bone block in a corner, far from the beam) used in the
+order A, B, A. The label images are created on demand, at most one is kept in
+memory (max_label_images=1) and they are stored in the on-disk cache of the
+image volume (label_image_cache_folder).
+
+The changer is first checked alone: the least recently used label image is
+evicted, created again from the disk cache with the geometry of the input
+image, and the label image of the next run is prefetched. The simulation is
+then run twice: the second run must only reuse the cached label images and
+both runs must agree with the reference.
+"""
+
+import itk
+import numpy as np
+
+import opengate as gate
+from opengate.tests import utility
+
+from opengate.tests.src.geometry.test009_voxels_dynamic_helpers import (
+    build_dynamic_voxel_simulation,
+)
+
+
+def create_phase_images(paths):
+    phase_a = paths.data / "patient-4mm.mhd"
+    img = itk.imread(str(phase_a))
+    arr = itk.array_from_image(img)
+    arr[:3, :3, :3] = 1000
+    img_b = itk.image_from_array(arr)
+    img_b.CopyInformation(img)
+    phase_b = paths.output / "patient-4mm-phase_b.mhd"
+    itk.imwrite(img_b, str(phase_b))
+    return [phase_a, phase_b, phase_a]
+
+
+def same_geometry(img1, img2):
+    return (
+        np.allclose(img1.GetOrigin(), img2.GetOrigin())
+        and np.allclose(img1.GetSpacing(), img2.GetSpacing())
+        and np.allclose(
+            itk.array_from_matrix(img1.GetDirection()),
+            itk.array_from_matrix(img2.GetDirection()),
+        )
+    )
+
+
+def check_changer(paths, phases, cache_folder):
+    sec = gate.g4_units.s
+    sim, patient, _, _ = build_dynamic_voxel_simulation(
+        paths,
+        paths.output / "changer",
+        [(0, 0.3 * sec), (0.3 * sec, 0.6 * sec), (0.6 * sec, 1 * sec)],
+        dynamic_image_paths=phases,
+        label_image_options={"max_label_images": 1},
+    )
+    patient.label_image_cache_folder = cache_folder
+    changer = patient.create_changers()[0]
+    changer.initialize()
+
+    label_a = itk.array_from_image(changer.get_label_image(phases[0]))
+    label_b = itk.array_from_image(changer.get_label_image(phases[1]))
+    cached = list(cache_folder.glob("*_labels.mha"))
+    is_ok = utility.print_test(
+        list(changer.label_image) == [str(phases[1])]
+        and len(cached) == 2
+        and not np.array_equal(label_a, label_b),
+        f"Two different label images, the first one evicted: {len(cached)} cached",
+    )
+
+    # A again: read from the disk cache, with the geometry of the input image
+    label_image = changer.get_label_image(phases[2])
+    b = (
+        list(changer.label_image) == [str(phases[2])]
+        and np.array_equal(itk.array_from_image(label_image), label_a)
+        and same_geometry(label_image, patient.load_input_image(phases[2]))
+        and len(list(cache_folder.glob("*_labels.mha"))) == 2
+    )
+    is_ok = utility.print_test(b, "Evicted label image read from the cache") and is_ok
+
+    # the label image of the next run is created in the background
+    changer.start_prefetch(0)
+    changer._prefetch_thread.join()
+    key = str(changer.images[1])
+    b = list(changer.label_image) == [key] and np.array_equal(
+        itk.array_from_image(changer.label_image[key]), label_b
+    )
+    is_ok = utility.print_test(b, "Label image of the next run prefetched") and is_ok
+    return is_ok
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(
+        __file__, "gate_test009_voxels", "test009_label_cache"
+    )
+    sec = gate.g4_units.s
+
+    cache_folder = paths.output / "label_cache"
+    for f in cache_folder.glob("*_labels.mha"):
+        f.unlink()
+    phases = create_phase_images(paths)
+
+    is_ok = check_changer(paths, phases, cache_folder)
+    cached_before = {f: f.stat().st_mtime_ns for f in cache_folder.glob("*.mha")}
+
+    stats_ref = utility.read_stats_file(paths.gate_output / "stat.txt")
+    for i in range(2):
+        sim, patient, dose, stats = build_dynamic_voxel_simulation(
+            paths,
+            paths.output / f"run{i}",
+            [(0, 0.3 * sec), (0.3 * sec, 0.6 * sec), (0.6 * sec, 1 * sec)],
+            dynamic_image_paths=phases,
+            label_image_options={"max_label_images": 1},
+        )
+        patient.label_image_cache_folder = cache_folder
+        sim.run(start_new_process=True)
+        print(stats)
+
+        # the label images of both phases are only read from the cache
+        cached = {f: f.stat().st_mtime_ns for f in cache_folder.glob("*.mha")}
+        print(f"Cached label images: {[f.name for f in cached]}")
+        is_ok = (
+            utility.print_test(
+                cached == cached_before, "Label images read from the cache"
+            )
+            and is_ok
+        )
+
+        stats.counts.runs = 1
+        is_ok = utility.assert_stats(stats, stats_ref, 0.15) and is_ok
+        is_ok = (
+            utility.assert_images(
+                paths.gate_output / "output-Edep.mhd",
+                dose.edep.get_output_path(),
+                stats,
+                tolerance=35,
+                ignore_value_data2=0,
+                apply_ignore_mask_to_sum_check=False,
+            )
+            and is_ok
+        )
+
+    utility.test_ok(is_ok)
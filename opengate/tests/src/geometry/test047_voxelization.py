@@ -12,7 +12,7 @@ def test_voxelized(img, version):
     # create voxelized sampling
     v = gate.sources.gansources.VoxelizedSourcePDFSampler(img, version=version)
     start = time.time()
-    if version == 1:
+    if version == 1 or version == 4:
         i, j, k = v.sample_indices(n)
     else:
         i, j, k = v.sample_indices_slower(n)
@@ -53,5 +53,6 @@ if __name__ == "__main__":
     is_ok = test_voxelized(img, 1)
     is_ok = test_voxelized(img, 2) and is_ok
     is_ok = test_voxelized(img, 3) and is_ok
+    is_ok = test_voxelized(img, 4) and is_ok
 
     utility.test_ok(is_ok)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compare the sampling of a 256^3 SPECT-like activity map (a body with a hot
+lesion) with the VoxelizedSourcePDFSampler versions 1 (np.random.choice on the
+full image) and 4 (alias table on the nonzero voxels): both must follow the
+activity distribution. The timings are only reported (they depend on the
+machine).
+"""
+
+import time
+import itk
+import numpy as np
+import opengate as gate
+from opengate.tests import utility
+
+
+def create_activity_map(rs):
+    s = 256
+    z, y, x = np.ogrid[:s, :s, :s]
+    a = np.zeros((s, s, s), dtype=np.float32)
+    a[((x - 128) / 110) ** 2 + ((y - 128) / 80) ** 2 < 1] = 1
+    a[((x - 100) ** 2 + (y - 150) ** 2 + (z - 128) ** 2) < 15**2] = 20
+    a[:, :, :] *= rs.uniform(0.5, 1.5, size=a.shape).astype(np.float32)
+    img = itk.image_from_array(a)
+    img.SetSpacing([2.0, 2.0, 2.0])
+    return img
+
+
+def sample(img, version, n, rs):
+    start = time.time()
+    v = gate.sources.gansources.VoxelizedSourcePDFSampler(img, version=version)
+    init = time.time()
+    for _ in range(10):
+        i, j, k = v.sample_indices(n, rs)
+    end = time.time()
+    print(
+        f"Version {version}: init {init - start:0.2f} sec, "
+        f"10 x {n} samples {end - init:0.2f} sec"
+    )
+    return (i, j, k), end - init
+
+
+if __name__ == "__main__":
+    rs = np.random.RandomState(123)
+    n = int(1e5)
+    img = create_activity_map(rs)
+    imga = itk.array_view_from_image(img)
+
+    is_ok = True
+    times = {}
+    for version in (1, 4):
+        (i, j, k), times[version] = sample(img, version, n, rs)
+
+        # no sample in the zero voxels
+        zz = np.count_nonzero(imga[i, j, k] == 0)
+        # fraction of samples in the lesion versus the expected one
+        lesion = imga > 10
+        expected = imga[lesion].sum() / imga.sum()
+        fraction = np.count_nonzero(lesion[i, j, k]) / n
+        b = zz == 0 and abs(fraction - expected) < 5 * np.sqrt(expected / n)
+        utility.print_test(
+            b,
+            f"Version {version}: {zz} samples in zero voxels, "
+            f"lesion fraction {fraction:.4f} vs {expected:.4f}",
+        )
+        is_ok = b and is_ok
+
+    print(f"Alias table speedup: {times[1] / times[4]:.1f}x")
+
+    utility.test_ok(is_ok)
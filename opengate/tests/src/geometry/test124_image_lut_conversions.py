@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Conversion of a CT image into density and label images with lookup tables
+(one gather over the image), compared with the previous implementations (one
+full-image mask per material) on a synthetic CT with the Schneider materials.
+The images must be identical, the timings are only printed. The attenuation
+image of ImageVolume.create_attenuation_image (AttenuationImageActor) must be
+the same as the reference of test084_attenuation_map2_hu.
+"""
+
+import time
+
+import itk
+import numpy as np
+
+import opengate as gate
+from opengate.sources.utility import get_spectrum
+from opengate.tests import utility
+
+
+def density_per_interval(patient, material_database):
+    # previous implementation of materials.create_density_img
+    act = itk.GetArrayFromImage(patient.itk_image)
+    arho = np.zeros(act.shape, dtype=np.float32)
+    for hu0, hu1, mat_name in patient.voxel_materials:
+        arho[(act >= hu0) * (act < hu1)] = material_database.FindOrBuildMaterial(
+            mat_name
+        ).GetDensity()
+    arho *= gate.g4_units.cm3 / gate.g4_units.g
+    return arho
+
+
+def simulate_attenuation_image(paths):
+    # same simulation as test084_attenuation_map2_hu
+    sim = gate.Simulation()
+    sim.output_dir = paths.output
+    sim.verbose_level = "NONE"
+    sim.world.size = [1 * gate.g4_units.m, 1 * gate.g4_units.m, 1 * gate.g4_units.m]
+    sim.volume_manager.add_material_database(paths.data / "GateMaterials.db")
+
+    patient = sim.add_volume("Image", "patient")
+    patient.image = paths.data / "patient-4mm.mhd"
+    patient.material = "G4_AIR"
+    patient.voxel_materials, _ = gate.geometry.materials.HounsfieldUnit_to_material(
+        sim,
+        0.01 * gate.g4_units.g_cm3,
+        paths.data / "Schneider2000MaterialsTable.txt",
+        paths.data / "Schneider2000DensitiesTable.txt",
+    )
+
+    mumap = sim.add_actor("AttenuationImageActor", "mumap")
+    mumap.image_volume = patient
+    mumap.output_filename = "test124_mumap.mhd"
+    mumap.energy = get_spectrum("Lu177", "gamma", "radar").energies[3]
+    mumap.database = "EPDL"
+
+    t = time.perf_counter()
+    sim.run(start_new_process=True)
+    print(f"Attenuation: {time.perf_counter() - t:.2f} s for the simulation")
+    return mumap.get_output_path()
+
+
+def timed(f, *args, **kwargs):
+    t = time.perf_counter()
+    result = f(*args, **kwargs)
+    return result, time.perf_counter() - t
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test124")
+    gcm3 = gate.g4_units.g_cm3
+
+    # synthetic CT
+    rng = np.random.default_rng(123)
+    ct_arr = rng.integers(-1050, 3000, size=(100, 200, 200)).astype(np.int16)
+    ct = itk.image_from_array(ct_arr)
+    ct.SetSpacing([1.0, 1.0, 2.0])
+    ct_path = paths.output / "test124_ct.mhd"
+    itk.imwrite(ct, str(ct_path))
+
+    sim = gate.Simulation()
+    sim.output_dir = paths.output
+    patient = sim.add_volume("Image", "patient")
+    patient.image = str(ct_path)
+    patient.material = "G4_AIR"
+    patient.voxel_materials, materials = (
+        gate.geometry.materials.HounsfieldUnit_to_material(
+            sim,
+            0.01 * gcm3,
+            paths.data / "Schneider2000MaterialsTable.txt",
+            paths.data / "Schneider2000DensitiesTable.txt",
+        )
+    )
+    database = sim.volume_manager.material_database
+    patient.load_input_image()
+    print(f"{ct_arr.size} voxels, {len(patient.voxel_materials)} materials")
+
+    # density
+    ref, t_ref = timed(density_per_interval, patient, database)
+    rho, t_lut = timed(patient.create_density_image)
+    rho_mt, t_mt = timed(patient.create_density_image, number_of_threads=4)
+    # the timings depend on the machine, they are not checked
+    print(
+        f"Density: {t_ref:.2f} s per interval, {t_lut:.2f} s with the LUT, "
+        f"{t_mt:.2f} s with 4 threads"
+    )
+    is_ok = utility.print_test(
+        np.allclose(itk.array_view_from_image(rho), ref, rtol=1e-6, atol=0)
+        and np.array_equal(
+            itk.array_view_from_image(rho), itk.array_view_from_image(rho_mt)
+        ),
+        "Same density image",
+    )
+
+    # labels
+    label_image, t_label = timed(patient.create_label_image)
+    label_arr = itk.array_view_from_image(label_image)
+    print(f"Labels: {t_label:.2f} s")
+    density_of_label = np.zeros(len(patient.material_to_label_lut), dtype=np.float32)
+    for name, label in patient.material_to_label_lut.items():
+        density_of_label[label] = database.FindOrBuildMaterial(name).GetDensity() / (
+            gate.g4_units.g / gate.g4_units.cm3
+        )
+    in_intervals = ref > 0
+    is_ok = (
+        utility.print_test(
+            np.allclose(density_of_label[label_arr][in_intervals], ref[in_intervals]),
+            "Label image consistent with the density image",
+        )
+        and is_ok
+    )
+
+    # attenuation, with the lookup table of create_attenuation_image
+    mu_path = simulate_attenuation_image(paths)
+    is_ok = (
+        utility.assert_images(
+            paths.output_ref.parent / "test084" / "mumap2.mhd",
+            mu_path,
+            tolerance=1e-5,
+            fig_name=paths.output / "test124_mumap.png",
+            sum_tolerance=1e-5,
+        )
+        and is_ok
+    )
+
+    utility.test_ok(is_ok)
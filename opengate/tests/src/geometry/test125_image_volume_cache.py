@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""On-disk cache of the HU to material conversion and of the label images.
+
+The second conversion and the second label image must be read from the cache
+and be identical to the first ones. A modified CT must lead to another label
+image. The simulation must then use the cached label image.
+"""
+
+import shutil
+import time
+
+import itk
+import numpy as np
+
+import opengate as gate
+from opengate.tests import utility
+
+
+def create_simulation(paths, ct_path, cache_folder):
+    m = gate.g4_units.m
+    MeV = gate.g4_units.MeV
+    gcm3 = gate.g4_units.g_cm3
+
+    sim = gate.Simulation()
+    sim.output_dir = paths.output
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.number_of_threads = 1
+    sim.random_seed = 987654
+    sim.world.size = [1 * m, 1 * m, 1 * m]
+    sim.world.material = "G4_AIR"
+
+    patient = sim.add_volume("Image", "patient")
+    patient.image = str(ct_path)
+    patient.material = "G4_AIR"
+    patient.label_image_cache_folder = cache_folder
+    t = time.perf_counter()
+    patient.voxel_materials, materials = (
+        gate.geometry.materials.HounsfieldUnit_to_material(
+            sim,
+            0.01 * gcm3,
+            paths.data / "Schneider2000MaterialsTable.txt",
+            paths.data / "Schneider2000DensitiesTable.txt",
+            cache_folder=cache_folder,
+        )
+    )
+    print(f"HU to {len(materials)} materials in {time.perf_counter() - t:.3f} s")
+
+    source = sim.add_source("GenericSource", "beam")
+    source.particle = "gamma"
+    source.energy.mono = 1 * MeV
+    source.direction.type = "iso"
+    source.n = 1000
+
+    stats = sim.add_actor("SimulationStatisticsActor", "stats")
+    return sim, patient, stats
+
+
+def create_label_image(patient):
+    t = time.perf_counter()
+    label_image = patient.create_label_image()
+    print(f"Label image in {time.perf_counter() - t:.3f} s")
+    return itk.array_from_image(label_image)
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test125")
+    cache_folder = paths.output / "cache"
+    shutil.rmtree(cache_folder, ignore_errors=True)
+
+    # synthetic CT
+    rng = np.random.default_rng(42)
+    ct_arr = rng.integers(-1050, 3000, size=(60, 100, 100)).astype(np.int16)
+    ct = itk.image_from_array(ct_arr)
+    ct.SetSpacing([2.0, 2.0, 2.0])
+    ct_path = paths.output / "test125_ct.mhd"
+    itk.imwrite(ct, str(ct_path))
+
+    sim1, patient1, _ = create_simulation(paths, ct_path, cache_folder)
+    labels1 = create_label_image(patient1)
+    sim2, patient2, stats = create_simulation(paths, ct_path, cache_folder)
+    labels2 = create_label_image(patient2)
+
+    hu_files = list(cache_folder.glob("*_hu_materials.json"))
+    label_files = list(cache_folder.glob("*_labels.mha"))
+    is_ok = utility.print_test(
+        len(hu_files) == 1
+        and len(label_files) == 1
+        and patient1.voxel_materials == patient2.voxel_materials
+        and np.array_equal(labels1, labels2),
+        "Same materials and label image read from the cache",
+    )
+
+    # another CT: another label image
+    ct_arr[0, 0, 0] += 1000
+    ct_path_modified = paths.output / "test125_ct_modified.mhd"
+    itk.imwrite(itk.image_from_array(ct_arr), str(ct_path_modified))
+    sim3, patient3, _ = create_simulation(paths, ct_path_modified, cache_folder)
+    create_label_image(patient3)
+    is_ok = (
+        utility.print_test(
+            len(list(cache_folder.glob("*_labels.mha"))) == 2,
+            "New label image for a modified CT",
+        )
+        and is_ok
+    )
+
+    # the simulation uses the cached label image
+    sim2.run(start_new_process=True)
+    is_ok = (
+        utility.print_test(
+            stats.counts.events == 1000
+            and len(list(cache_folder.glob("*_labels.mha"))) == 2,
+            "Simulation run with the cached label image",
+        )
+        and is_ok
+    )
+
+    utility.test_ok(is_ok)
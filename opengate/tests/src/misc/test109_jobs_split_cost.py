@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+"""Test the split_in_cost policy without executing Geant4.
+
+The simulation has a decaying activity source (half life 2 s) and a source
+with a fixed number of primaries per run, and two runs with a different
+simulation speed (events_per_second). The jobs must all have the same expected
+wall time: jobs at the beginning (high activity) are shorter in time than the
+jobs at the end. The predicted cost must be stored in the job metadata and in
+the manifest.
+"""
+
+import math
+import shutil
+
+import opengate as gate
+from opengate.serialization import load_json
+from opengate.tests import utility
+
+
+def build_simulation(output_path):
+    sec = gate.g4_units.s
+    Bq = gate.g4_units.Bq
+    MeV = gate.g4_units.MeV
+
+    sim = gate.Simulation()
+    sim.output_dir = output_path
+    sim.visu = False
+
+    box = sim.add_volume("Box", "box")
+    box.size = [10.0, 10.0, 10.0]
+
+    decaying = sim.add_source("GenericSource", "decaying")
+    decaying.particle = "gamma"
+    decaying.energy.mono = 1 * MeV
+    decaying.activity = 1000 * Bq
+    decaying.half_life = 2 * sec
+
+    constant = sim.add_source("GenericSource", "constant")
+    constant.particle = "gamma"
+    constant.energy.mono = 1 * MeV
+    constant.number_of_primaries = [500, 1000]
+
+    sim.run_timing_intervals = [[0, 5 * sec], [5 * sec, 10 * sec]]
+    return sim
+
+
+def expected_cost(t0, t1, events_per_second):
+    """Analytical expected wall time of [t0, t1] (in s), see build_simulation."""
+    cost = 0
+    for run_index, (start, end) in enumerate([(0, 5), (5, 10)]):
+        a, b = max(t0, start), min(t1, end)
+        if b <= a:
+            continue
+        decay_constant = math.log(2) / 2
+        events = (
+            1000
+            / decay_constant
+            * (math.exp(-decay_constant * a) - math.exp(-decay_constant * b))
+        )
+        events += [500, 1000][run_index] * (b - a) / (end - start)
+        cost += events / events_per_second[run_index]
+    return cost
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test109_cost")
+    shutil.rmtree(paths.output, ignore_errors=True)
+    sec = gate.g4_units.s
+    events_per_second = [100, 50]
+
+    sim = build_simulation(paths.output / "output")
+    manager = gate.jobs_split(
+        simulation=sim,
+        number_of_jobs=5,
+        campaign_dir=paths.output / "campaign",
+        policy="split_in_cost",
+        events_per_second=events_per_second,
+    )
+    manager.print_summary()
+
+    with open(manager.manifest_path) as f:
+        manifest = load_json(f)
+
+    is_ok = True
+    total = expected_cost(0, 10, events_per_second)
+    durations = []
+    for job in manifest["jobs"]:
+        with open(manager.campaign_dir / job["folder_name"] / "job_metadata.json") as f:
+            metadata = load_json(f)
+        intervals = [
+            (start / sec, end / sec) for start, end in metadata["run_timing_intervals"]
+        ]
+        cost = sum(expected_cost(a, b, events_per_second) for a, b in intervals)
+        durations.append(sum(b - a for a, b in intervals))
+        is_ok = (
+            utility.print_test(
+                abs(cost - total / 5) / (total / 5) < 1e-3
+                and abs(metadata["predicted_cost"] - cost) / cost < 1e-3
+                and job["predicted_cost"] == metadata["predicted_cost"]
+                and job["predicted_cost_unit"] == "s",
+                f"{job['folder_name']}: intervals {intervals}, expected cost "
+                f"{cost:.2f} s, predicted {job['predicted_cost']:.2f} s, "
+                f"target {total / 5:.2f} s",
+            )
+            and is_ok
+        )
+
+    is_ok = (
+        utility.print_test(
+            durations[0] < durations[-1],
+            f"High-activity jobs are shorter in time: {durations}",
+        )
+        and is_ok
+    )
+
+    utility.test_ok(is_ok)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+"""Test the split_in_cost policy with the speed measured by a pilot run.
+
+The pilot run simulates pilot_fraction of each run and measures the events
+per second of each run. The jobs are split with this speed, so the predicted
+cost is in seconds and is the same for all the jobs. After the jobs are run,
+the actual wall time of each completed job is stored in the manifest next to
+the predicted cost. A source with a single number of primaries for several
+runs is rejected before the pilot run.
+"""
+
+import shutil
+
+import opengate as gate
+from opengate.autotune import run_pilot_simulation
+from opengate.jobs import (
+    JOB_EXECUTION_STATUS_FILENAME,
+    _measure_events_per_second_with_pilot_run,
+)
+from opengate.serialization import dump_json, load_json
+from opengate.tests import utility
+
+
+def build_simulation(output_path, number_of_primaries):
+    sec = gate.g4_units.s
+    cm = gate.g4_units.cm
+    MeV = gate.g4_units.MeV
+
+    sim = gate.Simulation()
+    sim.output_dir = output_path
+    sim.visu = False
+    sim.g4_verbose = False
+    sim.number_of_threads = 1
+    sim.random_seed = 654321
+    sim.world.material = "G4_AIR"
+
+    box = sim.add_volume("Box", "box")
+    box.size = [10 * cm, 10 * cm, 10 * cm]
+    box.material = "G4_WATER"
+
+    source = sim.add_source("GenericSource", "source")
+    source.particle = "gamma"
+    source.energy.mono = 1 * MeV
+    source.direction.type = "iso"
+    source.number_of_primaries = number_of_primaries
+
+    sim.add_actor("SimulationStatisticsActor", "stats")
+    sim.run_timing_intervals = [[0, 1 * sec], [1 * sec, 2 * sec]]
+    return sim
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test109_pilot")
+    shutil.rmtree(paths.output, ignore_errors=True)
+    number_of_primaries = [2000, 4000]
+
+    # a single number of primaries for two runs: clear error, no pilot run
+    sim = build_simulation(paths.output / "output", 1000)
+    try:
+        gate.jobs_split(
+            simulation=sim,
+            number_of_jobs=3,
+            campaign_dir=paths.output / "campaign_scalar",
+            policy="split_in_cost",
+            pilot_fraction=0.1,
+        )
+        error = ""
+    except Exception as e:
+        error = str(e)
+    print(f"Expected error: {error}")
+    is_ok = utility.print_test(
+        "number_of_primaries" in error and "one number of primaries per run" in error,
+        "Scalar number_of_primaries with two runs rejected",
+    )
+
+    # pilot run: 10% of the primaries of each run
+    sim = build_simulation(paths.output / "output", number_of_primaries)
+    pilot = run_pilot_simulation(sim, 0.1)
+    print(f"Pilot run: {pilot}")
+    speeds = _measure_events_per_second_with_pilot_run(sim, 0.1)
+    is_ok = (
+        utility.print_test(
+            pilot.events == 600
+            and len(pilot.events_per_second_per_run) == 2
+            and all(v > 0 for v in pilot.events_per_second_per_run)
+            and len(speeds) == 2
+            and all(v > 0 for v in speeds),
+            f"Pilot run: {pilot.events} events, {speeds} events/s per run",
+        )
+        and is_ok
+    )
+
+    # split with the measured speed: same predicted cost (in s) for all jobs
+    manager = gate.jobs_split(
+        simulation=sim,
+        number_of_jobs=3,
+        campaign_dir=paths.output / "campaign",
+        policy="split_in_cost",
+        pilot_fraction=0.1,
+    )
+    with open(manager.manifest_path) as f:
+        manifest = load_json(f)
+    speeds = manifest["options"]["events_per_second"]
+    total = sum(n / v for n, v in zip(number_of_primaries, speeds))
+    costs = [job["predicted_cost"] for job in manifest["jobs"]]
+    is_ok = (
+        utility.print_test(
+            len(speeds) == 2
+            and all(job["predicted_cost_unit"] == "s" for job in manifest["jobs"])
+            and all(abs(c - total / 3) / (total / 3) < 1e-3 for c in costs),
+            f"Predicted costs {costs} s with the pilot speeds {speeds} "
+            f"(target {total / 3:.3f} s)",
+        )
+        and is_ok
+    )
+
+    # the actual wall time is stored in the manifest after the local run
+    gate.jobs_run(manager.campaign_dir, backend="local_sequential", detach=False)
+    with open(manager.manifest_path) as f:
+        manifest = load_json(f)
+    for job in manifest["jobs"]:
+        print(
+            f"{job['folder_name']}: predicted {job['predicted_cost']:.3f} s, "
+            f"actual {job.get('actual_duration')} s"
+        )
+    is_ok = (
+        utility.print_test(
+            all(job.get("actual_duration", 0) > 0 for job in manifest["jobs"]),
+            "Actual durations stored in the manifest",
+        )
+        and is_ok
+    )
+
+    # only the completed jobs are recorded
+    job_folder = manager.campaign_dir / manifest["jobs"][0]["folder_name"]
+    status_path = job_folder / JOB_EXECUTION_STATUS_FILENAME
+    with open(status_path) as f:
+        status = load_json(f)
+    status["status"] = "failed"
+    with open(status_path, "w") as f:
+        dump_json(status, f)
+    durations = gate.record_job_durations_in_manifest(manager.campaign_dir)
+    print(durations)
+    is_ok = (
+        utility.print_test(
+            [d[0] for d in durations]
+            == [job["folder_name"] for job in manifest["jobs"][1:]]
+            and all(
+                d[1] == job["predicted_cost"] and d[2] == job["actual_duration"]
+                for d, job in zip(durations, manifest["jobs"][1:])
+            ),
+            "Predicted and actual durations of the completed jobs",
+        )
+        and is_ok
+    )
+
+    utility.test_ok(is_ok)
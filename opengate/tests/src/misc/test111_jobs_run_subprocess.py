@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import sys
+
+import opengate as gate
+from opengate.jobs import JOB_RUNNER_LOG_FILENAME, JOB_EXECUTION_STATUS_FILENAME
+from opengate.tests import utility
+
+from opengate.tests.src.misc.test111_helpers import (
+    build_simple_simulation,
+    load_backend_status,
+    load_execution_status,
+    load_manifest,
+)
+
+
+def pretty_json(data):
+    return json.dumps(data, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test111_subprocess")
+    shutil.rmtree(paths.output, ignore_errors=True)
+    is_ok = True
+
+    sim = build_simple_simulation(paths.output / "subprocess_input")
+    split_root = gate.jobs_split(
+        simulation=sim,
+        number_of_jobs=4,
+        campaign_dir=paths.output / "subprocess_campaign",
+        policy="split_in_time_per_run",
+    ).campaign_dir
+
+    backend_options = {"max_retries": 1, "wall_time": 600}
+    if hasattr(os, "sched_setaffinity"):
+        backend_options["cpu_affinity"] = "auto"
+    summary = gate.jobs_run(
+        split_root,
+        backend="local_subprocess",
+        backend_options=backend_options,
+        number_of_workers=2,
+        detach=False,
+    )
+    backend_status = load_backend_status(split_root)
+    is_ok = is_ok and utility.print_test(
+        summary["submitted_jobs"] == 4
+        and backend_status["backend"] == "local_subprocess"
+        and backend_status["status"] == "completed",
+        f"local_subprocess summary:\n{pretty_json(summary)}",
+    )
+
+    manifest = load_manifest(split_root)
+    for job in manifest["jobs"]:
+        job_folder = split_root / job["folder_name"]
+        status = load_execution_status(job_folder)
+        is_ok = is_ok and utility.print_test(
+            status is not None
+            and status["status"] == "completed"
+            and status["backend"] == "local_subprocess"
+            and (job_folder / JOB_RUNNER_LOG_FILENAME).exists(),
+            f"local_subprocess execution status for {job['folder_name']}:\n"
+            f"{pretty_json(status)}",
+        )
+
+    # a job runner that crashes with a segfault: the crash must be detected
+    # from the exit code, the job retried once, then reported as failed
+    print("Running a job runner that crashes with SIGSEGV on job0001")
+    crashing_runner = [
+        sys.executable,
+        "-c",
+        "import os, signal; os.kill(os.getpid(), signal.SIGSEGV)",
+    ]
+    from opengate.jobs import _run_job_folders_in_local_subprocess
+
+    results = _run_job_folders_in_local_subprocess(
+        [split_root / "job0001"],
+        n_workers=1,
+        max_retries=1,
+        job_runner_command=crashing_runner,
+    )
+    print(pretty_json(results))
+    failed_status = load_execution_status(split_root / "job0001")
+    is_ok = is_ok and utility.print_test(
+        results[0]["status"] == "failed"
+        and results[0]["attempts"] == 2
+        and results[0]["exit_code"] != 0
+        and failed_status["status"] == "failed"
+        and "exit code" in failed_status["error_message"],
+        f"Crashed job detected and retried:\n{pretty_json(failed_status)}",
+    )
+
+    # the failure of an attempt that will be retried is not final: the status
+    # is "retrying" between the attempts, and "failed" only after the last one
+    print("Running a job runner that records the status seen by each attempt")
+    recording_runner = [
+        sys.executable,
+        "-c",
+        "import json, os, signal, sys\n"
+        "folder = sys.argv[1]\n"
+        f"path = os.path.join(folder, '{JOB_EXECUTION_STATUS_FILENAME}')\n"
+        "status = json.load(open(path))['status']\n"
+        "with open(os.path.join(folder, 'attempts.txt'), 'a') as f:\n"
+        "    f.write(' '.join([status] + sys.argv[2:]) + '\\n')\n"
+        "os.kill(os.getpid(), signal.SIGSEGV)\n",
+    ]
+    results = _run_job_folders_in_local_subprocess(
+        [split_root / "job0003"],
+        n_workers=1,
+        max_retries=2,
+        job_runner_command=recording_runner,
+    )
+    with open(split_root / "job0003" / "attempts.txt") as f:
+        attempts = [line.split() for line in f.read().splitlines()]
+    print(attempts)
+    failed_status = load_execution_status(split_root / "job0003")
+    retrying = ["--failed-status", "retrying"]
+    is_ok = is_ok and utility.print_test(
+        results[0]["attempts"] == 3
+        and [a[0] for a in attempts] == ["completed", "retrying", "retrying"]
+        and [a[-2:] == retrying for a in attempts] == [True, True, False]
+        and failed_status["status"] == "failed",
+        "Status 'retrying' between the attempts, 'failed' after the last one",
+    )
+
+    # a job that runs longer than the wall time is killed
+    print("Running a job runner that hangs on job0002")
+    results = _run_job_folders_in_local_subprocess(
+        [split_root / "job0002"],
+        n_workers=1,
+        max_retries=0,
+        wall_time=1,
+        job_runner_command=[sys.executable, "-c", "import time; time.sleep(60)"],
+    )
+    failed_status = load_execution_status(split_root / "job0002")
+    is_ok = is_ok and utility.print_test(
+        results[0]["status"] == "failed"
+        and results[0]["attempts"] == 1
+        and "wall time" in failed_status["error_message"],
+        f"Job killed after the wall time:\n{pretty_json(failed_status)}",
+    )
+
+    utility.test_ok(is_ok)
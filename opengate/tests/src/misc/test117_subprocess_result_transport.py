@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Run the same simulation in a subprocess (start_new_process=True) with the three
+result transports ("pickle", "shared_memory" and "file"). The dose images sent
+back to the main process must be identical, and the images must be transferred
+out of band (not pickled) with "shared_memory" and "file". The numpy array
+subclasses (e.g. masked arrays) must be received unchanged, and the shared
+memory blocks of a subprocess that dies while sending its result must be
+released.
+"""
+
+import os
+
+import itk
+import numpy as np
+import opengate as gate
+from opengate.processing import (
+    format_subprocess_timings,
+    dispatch_to_subprocess,
+    dump_result,
+    load_result,
+)
+from opengate.tests import utility
+
+
+def simulate(paths, transport):
+    # units
+    m = gate.g4_units.m
+    cm = gate.g4_units.cm
+    mm = gate.g4_units.mm
+    MeV = gate.g4_units.MeV
+
+    sim = gate.Simulation()
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.random_seed = 654987
+    sim.output_dir = paths.output
+    sim.subprocess_result_transport = transport
+
+    sim.world.size = [1 * m, 1 * m, 1 * m]
+
+    waterbox = sim.add_volume("Box", "waterbox")
+    waterbox.size = [30 * cm, 30 * cm, 30 * cm]
+    waterbox.material = "G4_WATER"
+
+    source = sim.add_source("GenericSource", "mysource")
+    source.energy.mono = 100 * MeV
+    source.particle = "proton"
+    source.position.type = "disc"
+    source.position.radius = 5 * mm
+    source.position.translation = [0, 0, -20 * cm]
+    source.direction.type = "momentum"
+    source.direction.momentum = [0, 0, 1]
+    source.n = 500
+
+    dose = sim.add_actor("DoseActor", "dose")
+    dose.attached_to = waterbox
+    dose.size = [200, 200, 200]
+    dose.spacing = [1.5 * mm, 1.5 * mm, 1.5 * mm]
+    dose.output_filename = f"test117_{transport}.mhd"
+    dose.edep_uncertainty.active = True
+    dose.dose.active = True
+
+    sim.run(start_new_process=True)
+
+    print(format_subprocess_timings(sim.subprocess_timings))
+    return sim.subprocess_timings, dose
+
+
+class DieWhilePickled:
+    def __reduce__(self):
+        os._exit(1)
+
+
+def create_result_and_die():
+    # the first arrays are exported to shared memory, then the process dies
+    return [np.ones(100000), np.ones(200000), DieWhilePickled()]
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test117")
+
+    timings_pickle, dose_pickle = simulate(paths, "pickle")
+    timings_shm, dose_shm = simulate(paths, "shared_memory")
+    timings_file, dose_file = simulate(paths, "file")
+
+    is_ok = utility.print_test(
+        timings_pickle.out_of_band_bytes == 0, "Pickle: everything pickled"
+    )
+    for t in (timings_shm, timings_file):
+        b = t.out_of_band_bytes > 0 and t.pickled_bytes < t.out_of_band_bytes
+        is_ok = (
+            utility.print_test(b, f"{t.result_transport}: images out of band") and is_ok
+        )
+
+    # compare the images received in memory (the files are written by the
+    # subprocess, they do not depend on the transport)
+    for dose in (dose_shm, dose_file):
+        for name in ("edep", "edep_uncertainty", "dose"):
+            ref = getattr(dose_pickle, name).image
+            img = getattr(dose, name).image
+            b = (
+                np.array_equal(
+                    itk.array_view_from_image(ref), itk.array_view_from_image(img)
+                )
+                and np.allclose(ref.GetSpacing(), img.GetSpacing())
+                and np.allclose(ref.GetOrigin(), img.GetOrigin())
+            )
+            is_ok = utility.print_test(b, f"Same {name} image") and is_ok
+
+    # array subclasses are pickled, not transferred as plain arrays
+    values = np.arange(100000, dtype=np.float64)
+    result = {
+        "masked": np.ma.masked_array(values, mask=values % 3 == 0),
+        "matrix": np.asmatrix(values.reshape(100, 1000)),
+    }
+    for transport in ("shared_memory", "file"):
+        r = load_result(*dump_result(result, transport)[:2])
+        b = (
+            isinstance(r["masked"], np.ma.MaskedArray)
+            and np.array_equal(r["masked"].mask, result["masked"].mask)
+            and np.array_equal(r["masked"].data, values)
+            and isinstance(r["matrix"], np.matrix)
+        )
+        is_ok = (
+            utility.print_test(b, f"{transport}: masked array and matrix kept")
+            and is_ok
+        )
+
+    # no shared memory left behind by a subprocess that dies
+    if os.path.isdir("/dev/shm"):
+        prefix = f"gate_{os.getpid()}_"
+        before = {f for f in os.listdir("/dev/shm") if f.startswith(prefix)}
+        try:
+            dispatch_to_subprocess(create_result_and_die)
+            died = False
+        except Exception as e:
+            print(f"Expected error: {e}")
+            died = True
+        after = {f for f in os.listdir("/dev/shm") if f.startswith(prefix)}
+        is_ok = (
+            utility.print_test(
+                died and after == before,
+                "Shared memory released when the subprocess dies",
+            )
+            and is_ok
+        )
+
+    utility.test_ok(is_ok)
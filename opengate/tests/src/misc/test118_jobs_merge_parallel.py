@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Merge the same split campaign sequentially and with jobs_merge(n_workers=3).
+
+The campaign (6 jobs, 2 original runs) contains a statistics actor and a dose
+actor with edep, edep uncertainty and per-run images. The parallel merge
+reduces the images in a process pool and must give the same merged images and
+statistics as the sequential merge. The merge summary must report the merge
+duration of each actor output.
+"""
+
+import shutil
+
+import itk
+import numpy as np
+import opengate as gate
+from opengate.tests import utility
+
+
+def build_simulation(output_path):
+    sim = gate.Simulation()
+    sim.output_dir = output_path
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.number_of_threads = 1
+    sim.random_seed = 987654321
+
+    cm = gate.g4_units.cm
+    mm = gate.g4_units.mm
+    m = gate.g4_units.m
+    MeV = gate.g4_units.MeV
+    sec = gate.g4_units.s
+
+    sim.world.size = [1.0 * m] * 3
+
+    waterbox = sim.add_volume("Box", "waterbox")
+    waterbox.size = [20.0 * cm] * 3
+    waterbox.material = "G4_WATER"
+
+    source = sim.add_source("GenericSource", "beam")
+    source.particle = "proton"
+    source.energy.mono = 80 * MeV
+    source.number_of_primaries = [600, 1200]
+    source.position.type = "disc"
+    source.position.radius = 5 * mm
+    source.position.translation = [0, 0, -15 * cm]
+    source.direction.type = "momentum"
+    source.direction.momentum = [0, 0, 1]
+
+    stats = sim.add_actor("SimulationStatisticsActor", "Stats")
+    stats.output_filename = "stats.json"
+    stats.keep_data_per_run = True
+
+    dose = sim.add_actor("DoseActor", "dose")
+    dose.attached_to = waterbox
+    dose.size = [50, 50, 100]
+    dose.spacing = [4 * mm, 4 * mm, 2 * mm]
+    dose.edep.output_filename = "edep.mhd"
+    dose.edep.keep_data_per_run = True
+    dose.edep_uncertainty.active = True
+    dose.edep_uncertainty.output_filename = "edep_uncertainty.mhd"
+
+    sim.run_timing_intervals = [(0.0 * sec, 1.0 * sec), (1.0 * sec, 3.0 * sec)]
+    return sim
+
+
+def compare_images(path1, path2):
+    a1 = itk.array_view_from_image(itk.imread(str(path1)))
+    a2 = itk.array_view_from_image(itk.imread(str(path2)))
+    return utility.print_test(
+        np.allclose(a1, a2, rtol=1e-5, atol=1e-12),
+        f"Same image {path1.name} (sum {a1.sum():.6g} vs {a2.sum():.6g})",
+    )
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test118")
+    shutil.rmtree(paths.output, ignore_errors=True)
+
+    sim = build_simulation(paths.output / "master_output")
+    split_root = gate.jobs_split(
+        simulation=sim,
+        number_of_jobs=6,
+        campaign_dir=paths.output / "campaign",
+        policy="split_in_time_total",
+    ).campaign_dir
+    gate.jobs_run(split_root, backend="local_pool", number_of_workers=3)
+
+    sequential = gate.jobs_merge(split_root, to_path=paths.output / "merged_sequential")
+    parallel = gate.jobs_merge(
+        split_root, to_path=paths.output / "merged_parallel", n_workers=3
+    )
+    parallel.print_merge_summary()
+    print(f"Sequential merge: {sequential.execution_duration:.3f} s")
+    print(f"Parallel merge:   {parallel.execution_duration:.3f} s")
+
+    # all merged images: cumulative and per run, edep and uncertainty
+    is_ok = True
+    image_paths = sorted((paths.output / "merged_sequential").glob("*.mhd"))
+    is_ok = utility.print_test(len(image_paths) >= 4, f"{len(image_paths)} images")
+    for path in image_paths:
+        is_ok = (
+            compare_images(path, paths.output / "merged_parallel" / path.name) and is_ok
+        )
+
+    stats_seq = utility.read_stats_file(
+        paths.output / "merged_sequential" / "stats.json"
+    )
+    stats_par = utility.read_stats_file(paths.output / "merged_parallel" / "stats.json")
+    is_ok = utility.assert_stats(stats_seq, stats_par, 0) and is_ok
+
+    timings = {
+        (t["actor_name"], t["output_name"]): t
+        for t in parallel.merge_result["output_merge_timings"]
+    }
+    print(timings)
+    is_ok = (
+        utility.print_test(
+            ("dose", "edep_with_uncertainty") in timings
+            and ("Stats", "stats") in timings,
+            "Merge duration reported per actor output",
+        )
+        and is_ok
+    )
+
+    utility.test_ok(is_ok)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmark the streamed ROOT merge path used by jobs_merge.
+
+Several child ROOT files (two local runs each, EventID restarting at zero in
+each run) are merged with RootDataItem.stream_write_merged_root(). The merged
+RunID must follow the run_id_map of each merge source and the merged EventID
+must be strictly increasing. The throughput of the merge and of the
+RunID/EventID remapping alone is printed in entries per second.
+"""
+
+import time
+
+import numpy as np
+import uproot
+from opengate.actors.dataitems import RootDataItem
+from opengate.tests import utility
+
+
+def write_child_file(path, entries_per_run, rng):
+    run_ids = np.repeat(np.arange(2, dtype=np.int32), entries_per_run)
+    event_ids = np.concatenate(
+        [np.arange(entries_per_run, dtype=np.int32) // 3 for _ in range(2)]
+    )
+    energies = rng.random(2 * entries_per_run)
+    with uproot.recreate(path) as f:
+        f["phsp"] = {"RunID": run_ids, "EventID": event_ids, "KineticEnergy": energies}
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test119")
+    paths.output.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(42)
+
+    n_sources = 8
+    entries_per_run = 500_000
+    child_paths = []
+    for i in range(n_sources):
+        p = paths.output / f"child_{i}.root"
+        write_child_file(p, entries_per_run, rng)
+        child_paths.append(p)
+
+    # local run 0 and 1 of the child i are the original runs i and i + 1
+    item = RootDataItem()
+    item.set_root_meta_data(
+        {
+            "root_output_path": str(child_paths[0]),
+            "trees": RootDataItem.inspect_root_file(child_paths[0]),
+            "merge_sources": [
+                {"root_output_path": str(p), "run_id_map": {"0": i, "1": i + 1}}
+                for i, p in enumerate(child_paths)
+            ],
+        }
+    )
+
+    n_entries = n_sources * 2 * entries_per_run
+    output_path = paths.output / "merged.root"
+    t = time.perf_counter()
+    item.stream_write_merged_root(output_path)
+    duration = time.perf_counter() - t
+    print(f"Stream merge: {n_entries} entries in {duration:.2f} s")
+    print(f"Stream merge: {n_entries / duration / 1e6:.2f} M entries/s")
+
+    # remapping alone (already in memory)
+    with uproot.open(child_paths[0]) as f:
+        chunk = f["phsp"].arrays(["RunID", "EventID"], library="np")
+    state = {"next_event_id": 0}
+    t = time.perf_counter()
+    for i in range(n_sources):
+        item._remap_chunk_identifiers(
+            chunk, item.root_meta_data["merge_sources"][i], state
+        )
+    duration = time.perf_counter() - t
+    print(f"RunID/EventID remap: {n_entries / duration / 1e6:.2f} M entries/s")
+
+    with uproot.open(output_path) as f:
+        merged = f["phsp"].arrays(["RunID", "EventID"], library="np")
+    is_ok = utility.print_test(
+        len(merged["RunID"]) == n_entries, f"Number of entries {n_entries}"
+    )
+    expected_run_ids = np.concatenate(
+        [np.repeat([i, i + 1], entries_per_run) for i in range(n_sources)]
+    )
+    is_ok = (
+        utility.print_test(
+            np.array_equal(merged["RunID"], expected_run_ids), "RunID remapped"
+        )
+        and is_ok
+    )
+    # EventID is shared by consecutive entries (3 entries per event) but must
+    # increase across runs and sources
+    expected_n_events = n_sources * 2 * ((entries_per_run - 1) // 3 + 1)
+    d = np.diff(merged["EventID"].astype(np.int64))
+    is_ok = (
+        utility.print_test(
+            np.all(d >= 0) and merged["EventID"][-1] + 1 == expected_n_events,
+            "EventID increasing across runs and sources",
+        )
+        and is_ok
+    )
+
+    utility.test_ok(is_ok)
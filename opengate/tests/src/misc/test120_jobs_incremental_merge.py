@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Merge a running split campaign incrementally, job by job as they complete.
+
+The campaign (4 jobs, 2 original runs) contains a statistics actor, a dose
+actor and a phase-space actor (ROOT output). The jobs are launched in the
+background and merge_incrementally() merges each job as soon as its execution
+status is "completed", writing the partial images after each batch. The result
+must be the same as the standard merge of the completed campaign. The jobs may
+complete and be merged in any order, but the ROOT entries are appended in job
+order, so they must be identical, entry by entry.
+"""
+
+import shutil
+
+import itk
+import numpy as np
+import uproot
+import opengate as gate
+from opengate.tests import utility
+
+
+def build_simulation(output_path):
+    sim = gate.Simulation()
+    sim.output_dir = output_path
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.number_of_threads = 1
+    sim.random_seed = 123456789
+
+    cm = gate.g4_units.cm
+    mm = gate.g4_units.mm
+    m = gate.g4_units.m
+    MeV = gate.g4_units.MeV
+    sec = gate.g4_units.s
+
+    sim.world.size = [1.0 * m] * 3
+
+    waterbox = sim.add_volume("Box", "waterbox")
+    waterbox.size = [20.0 * cm] * 3
+    waterbox.material = "G4_WATER"
+
+    plane = sim.add_volume("Box", "plane")
+    plane.size = [30.0 * cm, 30.0 * cm, 1 * mm]
+    plane.translation = [0, 0, 15 * cm]
+    plane.material = "G4_AIR"
+
+    source = sim.add_source("GenericSource", "beam")
+    source.particle = "gamma"
+    source.energy.mono = 1 * MeV
+    source.number_of_primaries = [500, 1000]
+    source.position.type = "disc"
+    source.position.radius = 5 * mm
+    source.position.translation = [0, 0, -15 * cm]
+    source.direction.type = "momentum"
+    source.direction.momentum = [0, 0, 1]
+
+    stats = sim.add_actor("SimulationStatisticsActor", "Stats")
+    stats.output_filename = "stats.json"
+
+    dose = sim.add_actor("DoseActor", "dose")
+    dose.attached_to = waterbox
+    dose.size = [20, 20, 50]
+    dose.spacing = [10 * mm, 10 * mm, 4 * mm]
+    dose.edep.output_filename = "edep.mhd"
+
+    phsp = sim.add_actor("PhaseSpaceActor", "PhaseSpace")
+    phsp.attached_to = plane
+    phsp.attributes = ["KineticEnergy", "EventID"]
+    phsp.output_filename = "phsp.root"
+
+    sim.run_timing_intervals = [(0.0 * sec, 1.0 * sec), (1.0 * sec, 3.0 * sec)]
+    return sim
+
+
+def compare_images(path1, path2):
+    a1 = itk.array_view_from_image(itk.imread(str(path1)))
+    a2 = itk.array_view_from_image(itk.imread(str(path2)))
+    return utility.print_test(
+        np.allclose(a1, a2, rtol=1e-5, atol=1e-12),
+        f"Same image {path1.name} (sum {a1.sum():.6g} vs {a2.sum():.6g})",
+    )
+
+
+def read_phsp(path):
+    with uproot.open(path) as root_file:
+        return root_file["PhaseSpace"].arrays(library="np")
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test120")
+    shutil.rmtree(paths.output, ignore_errors=True)
+
+    sim = build_simulation(paths.output / "master_output")
+    split_root = gate.jobs_split(
+        simulation=sim,
+        number_of_jobs=4,
+        campaign_dir=paths.output / "campaign",
+        policy="split_in_time_total",
+    ).campaign_dir
+
+    # the jobs run in the background (detached) while the merge proceeds
+    gate.jobs_run(split_root, backend="local_pool", number_of_workers=2)
+
+    batches = []
+    incremental = gate.jobs_merge(
+        split_root, to_path=paths.output / "merged_incremental", execute=False
+    )
+    incremental.merge_incrementally(
+        poll_interval=0.2,
+        timeout=600,
+        write_partial_results=True,
+        callback=lambda manager, job_indices: batches.append(job_indices),
+    )
+    print(f"Merged batches of jobs: {batches}")
+    incremental.print_merge_summary()
+
+    # reference: standard merge of the completed campaign
+    standard = gate.jobs_merge(split_root, to_path=paths.output / "merged_standard")
+
+    is_ok = utility.print_test(
+        sorted(sum(batches, [])) == [1, 2, 3, 4], "All jobs merged exactly once"
+    )
+    is_ok = (
+        utility.print_test(incremental.merge_finalized, "Incremental merge finalized")
+        and is_ok
+    )
+
+    image_paths = sorted((paths.output / "merged_standard").glob("*.mhd"))
+    is_ok = (
+        utility.print_test(len(image_paths) >= 1, f"{len(image_paths)} images")
+        and is_ok
+    )
+    for path in image_paths:
+        is_ok = (
+            compare_images(path, paths.output / "merged_incremental" / path.name)
+            and is_ok
+        )
+
+    stats_std = utility.read_stats_file(paths.output / "merged_standard" / "stats.json")
+    stats_inc = utility.read_stats_file(
+        paths.output / "merged_incremental" / "stats.json"
+    )
+    is_ok = utility.assert_stats(stats_std, stats_inc, 0) and is_ok
+
+    phsp_std = read_phsp(paths.output / "merged_standard" / "phsp.root")
+    phsp_inc = read_phsp(paths.output / "merged_incremental" / "phsp.root")
+    n_std = len(phsp_std["KineticEnergy"])
+    n_inc = len(phsp_inc["KineticEnergy"])
+    is_ok = (
+        utility.print_test(n_std == n_inc, f"Phase-space entries: {n_inc} vs {n_std}")
+        and is_ok
+    )
+    is_ok = (
+        utility.print_test(
+            all(np.array_equal(phsp_std[k], phsp_inc[k]) for k in phsp_std),
+            "Same phase-space entries (energies and merged EventID)",
+        )
+        and is_ok
+    )
+
+    utility.test_ok(is_ok)
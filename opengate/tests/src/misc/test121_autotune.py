@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Auto-tune the number of threads and the phase-space batch size with pilot runs.
+
+sim.autotune() runs pilots with 1 and 2 threads, then with two batch sizes of
+the phase-space source. The JSON file must contain the scaling curve and the
+recommended settings, and the next sim.run() must apply them.
+"""
+
+import shutil
+
+import opengate as gate
+from opengate.serialization import load_json
+from opengate.tests import utility
+
+
+def build_simulation(paths):
+    sim = gate.Simulation()
+    sim.output_dir = paths.output
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.random_seed = 123456
+
+    m = gate.g4_units.m
+    cm = gate.g4_units.cm
+    nm = gate.g4_units.nm
+    MeV = gate.g4_units.MeV
+
+    sim.world.size = [1 * m, 1 * m, 2 * m]
+    sim.world.material = "G4_AIR"
+
+    waterbox = sim.add_volume("Box", "waterbox")
+    waterbox.size = [20 * cm, 20 * cm, 20 * cm]
+    waterbox.material = "G4_WATER"
+
+    plane = sim.add_volume("Box", "plane")
+    plane.size = [1 * m, 1 * m, 1 * nm]
+    plane.translation = [0, 0, 50 * cm]
+    plane.material = "G4_AIR"
+
+    phsp = sim.add_source("PhaseSpaceSource", "phsp")
+    phsp.attached_to = plane
+    phsp.phsp_file = paths.output_ref.parent / "test019" / "test019_hits.root"
+    phsp.position_key = "PrePosition"
+    phsp.direction_key = "PreDirection"
+    phsp.weight_key = "Weight"
+    phsp.particle = "gamma"
+    phsp.number_of_primaries = 20000
+
+    beam = sim.add_source("GenericSource", "beam")
+    beam.particle = "gamma"
+    beam.energy.mono = 1 * MeV
+    beam.direction.type = "iso"
+    beam.number_of_primaries = 20000
+
+    stats = sim.add_actor("SimulationStatisticsActor", "Stats")
+    return sim, stats
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test121")
+    shutil.rmtree(paths.output, ignore_errors=True)
+
+    sim, stats = build_simulation(paths)
+    result = sim.autotune(
+        pilot_fraction=0.1, thread_counts=[1, 2], batch_sizes=[100, 10000]
+    )
+
+    with open(paths.output / "autotune.json") as f:
+        data = load_json(f)
+    recommended = data["recommended"]
+    print(f"Scaling: {[s['events_per_second'] for s in data['scaling']]}")
+    print(f"Recommended: {recommended}")
+
+    is_ok = utility.print_test(
+        [s["number_of_threads"] for s in data["scaling"]] == [1, 2]
+        and all(s["events_per_second"] > 0 for s in data["scaling"])
+        and all(0 < s["events"] <= 4000 for s in data["scaling"]),
+        "Scaling curve measured with 1 and 2 threads on 10% of the primaries",
+    )
+    is_ok = (
+        utility.print_test(
+            list(data["batch_size_scan"]) == ["phsp"]
+            and [s["batch_size"] for s in data["batch_size_scan"]["phsp"]]
+            == [100, 10000]
+            and recommended["batch_size"]["phsp"] in (100, 10000),
+            "Batch size scanned for the phase-space source only",
+        )
+        and is_ok
+    )
+    is_ok = (
+        utility.print_test(
+            recommended["number_of_threads"] in (1, 2)
+            and recommended["number_of_jobs"] >= 1
+            and sim.autotune_filename == result["filename"],
+            "Recommended settings written and autotune_filename set",
+        )
+        and is_ok
+    )
+
+    # the pilots must not change the simulation, the run applies the settings
+    sim.run(start_new_process=True)
+    is_ok = (
+        utility.print_test(
+            sim.number_of_threads == recommended["number_of_threads"]
+            and sim.source_manager.get_source("phsp").batch_size
+            == recommended["batch_size"]["phsp"]
+            and stats.counts.events > 4000
+            and "pilot_stats" not in sim.actor_manager.actors,
+            f"Run with the recommended settings: {stats.counts.events} events",
+        )
+        and is_ok
+    )
+
+    utility.test_ok(is_ok)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Cache of the physics tables (physics_manager.physics_tables_cache_dir).
+
+The first simulation builds the tables and stores them in the cache, the second
+one (same physics and materials) retrieves them. A change of the cuts must lead
+to another cache folder. The results must be statistically the same.
+"""
+
+import shutil
+
+import opengate as gate
+from opengate.tests import utility
+
+
+def run_simulation(paths, cache_dir, cut):
+    m = gate.g4_units.m
+    cm = gate.g4_units.cm
+    mm = gate.g4_units.mm
+    MeV = gate.g4_units.MeV
+
+    sim = gate.Simulation()
+    sim.output_dir = paths.output
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.number_of_threads = 1
+    sim.random_seed = 654987
+    sim.world.size = [1 * m, 1 * m, 1 * m]
+    sim.world.material = "G4_AIR"
+
+    for i, material in enumerate(["G4_WATER", "G4_BONE_COMPACT_ICRU", "G4_LUNG_ICRP"]):
+        box = sim.add_volume("Box", f"box_{i}")
+        box.size = [10 * cm, 10 * cm, 10 * cm]
+        box.translation = [0, 0, (i - 1) * 10 * cm]
+        box.material = material
+
+    sim.physics_manager.physics_list_name = "G4EmStandardPhysics_option4"
+    sim.physics_manager.set_production_cut("world", "all", cut * mm)
+    sim.physics_manager.physics_tables_cache_dir = cache_dir
+
+    source = sim.add_source("GenericSource", "beam")
+    source.particle = "e-"
+    source.energy.mono = 10 * MeV
+    source.position.type = "disc"
+    source.position.radius = 1 * cm
+    source.position.translation = [0, 0, -40 * cm]
+    source.direction.type = "momentum"
+    source.direction.momentum = [0, 0, 1]
+    source.n = 2000
+
+    stats = sim.add_actor("SimulationStatisticsActor", "stats")
+    sim.run(start_new_process=True)
+    print(f"Start-up timings: {sim.startup_timings}")
+    return sim.startup_timings, stats
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test123")
+    cache_dir = paths.output / "physics_tables_cache"
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+    timings_1, stats_1 = run_simulation(paths, cache_dir, cut=1)
+    timings_2, stats_2 = run_simulation(paths, cache_dir, cut=1)
+    timings_3, stats_3 = run_simulation(paths, cache_dir, cut=2)
+
+    folders = [f for f in cache_dir.iterdir() if f.is_dir()]
+    is_ok = utility.print_test(
+        timings_1.physics_tables_cache == "stored"
+        and timings_2.physics_tables_cache == "retrieved"
+        and timings_3.physics_tables_cache == "stored",
+        f"Cache status: {timings_1.physics_tables_cache}, "
+        f"{timings_2.physics_tables_cache}, {timings_3.physics_tables_cache}",
+    )
+    is_ok = (
+        utility.print_test(
+            len(folders) == 2
+            and all((f / "physics_tables_cache.json").is_file() for f in folders),
+            f"One cache folder per set of cuts: {[f.name for f in folders]}",
+        )
+        and is_ok
+    )
+    print(
+        f"Physics tables: {timings_1.physics_tables:.2f} s (built) vs "
+        f"{timings_2.physics_tables:.2f} s (retrieved)"
+    )
+
+    # same physics: the results must be compatible
+    is_ok = utility.assert_stats(stats_1, stats_2, tolerance=0.03) and is_ok
+
+    utility.test_ok(is_ok)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+VoxelSource with a 128^3 activity map: the CDF are built with a vectorized
+cumsum (compared here to the row-by-row construction) and copied to the cpp
+side once, shared by the sources of all threads. The activity map has two
+cubes with an activity ratio of 3: the deposited energy must follow it. The
+map is kept small (a few tens of MB of CDF) so that the test runs in the default
+suite; the code path is the same for larger maps.
+"""
+
+import time
+import itk
+import numpy as np
+import opengate as gate
+from opengate.tests import utility
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test021")
+
+    # units
+    m = gate.g4_units.m
+    mm = gate.g4_units.mm
+    MeV = gate.g4_units.MeV
+    Bq = gate.g4_units.Bq
+
+    # 128^3 activity map with two cubes (activity 1 and 3)
+    s = 128
+    a = np.zeros((s, s, s), dtype=np.float32)
+    a[24:40, 24:40, 24:40] = 1
+    a[72:88, 72:88, 72:88] = 3
+    img = itk.image_from_array(a)
+    img.SetSpacing([1 * mm, 1 * mm, 1 * mm])
+    activity_filename = paths.output / "test021_large_activity.mhd"
+    itk.imwrite(img, str(activity_filename))
+
+    # benchmark the CDF
+    start = time.time()
+    cdf_x, cdf_y, cdf_z = gate.image.compute_image_3D_CDF(img)
+    print(f"CDF of a {s}^3 image computed in {time.time() - start:0.2f} sec")
+    is_ok = True
+    rs = np.random.RandomState(42)
+    for i, j in rs.randint(20, 92, size=(20, 2)):
+        t = np.cumsum(a[i][j], dtype=np.float64)
+        if t[-1] != 0:
+            t = t / t[-1]
+        is_ok = np.allclose(cdf_x[i][j], t) and is_ok
+    is_ok = cdf_x.flags.c_contiguous and cdf_x.shape == (s, s, s) and is_ok
+    utility.print_test(is_ok, f"Vectorized CDF is the same as the row-by-row one")
+
+    # create the simulation
+    sim = gate.Simulation()
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.number_of_threads = 4
+    sim.random_seed = 123456
+    sim.output_dir = paths.output
+
+    sim.world.size = [1 * m, 1 * m, 1 * m]
+    waterbox = sim.add_volume("Box", "waterbox")
+    waterbox.size = [s * mm, s * mm, s * mm]
+    waterbox.material = "G4_WATER"
+
+    # voxel source
+    source = sim.add_source("VoxelSource", "vox_source")
+    source.attached_to = waterbox.name
+    source.particle = "alpha"
+    source.activity = 20000 * Bq
+    source.image = activity_filename
+    source.direction.type = "iso"
+    source.energy.mono = 1 * MeV
+
+    # coarse dose actor
+    dose = sim.add_actor("DoseActor", "dose")
+    dose.attached_to = waterbox.name
+    dose.size = [32, 32, 32]
+    dose.spacing = [4 * mm, 4 * mm, 4 * mm]
+    dose.edep.write_to_disk = False
+
+    sim.physics_manager.physics_list_name = "QGSP_BERT_EMZ"
+    sim.physics_manager.enable_decay = False
+    sim.physics_manager.global_production_cuts.all = 1 * mm
+
+    stats = sim.add_actor("SimulationStatisticsActor", "Stats")
+
+    # start simulation
+    start = time.time()
+    sim.run()
+    print(f"Simulation with the {s}^3 voxel source in {time.time() - start:0.2f} sec")
+    print(stats)
+
+    # the edep ratio between the two cubes is the activity ratio
+    edep = itk.array_view_from_image(dose.edep.get_data())
+    e1 = edep[5:11, 5:11, 5:11].sum()
+    e3 = edep[17:23, 17:23, 17:23].sum()
+    ratio = e3 / e1
+    b = abs(ratio - 3) / 3 < 0.05 and np.isclose(e1 + e3, edep.sum())
+    utility.print_test(b, f"Edep ratio between the two cubes {ratio:.3f} (vs 3)")
+    is_ok = b and is_ok
+
+    utility.test_ok(is_ok)
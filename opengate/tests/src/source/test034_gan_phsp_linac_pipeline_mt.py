@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Same as test034 but multithreaded, with the GAN batches generated in advance by
+the inference thread (pipeline_depth): the results must be the same as the
+reference, and the per-batch timing statistics must be available on the source.
+"""
+
+import opengate as gate
+from opengate.tests import utility
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(
+        __file__, "gate_test034_gan_phsp_linac", "test034"
+    )
+
+    # create the simulation
+    sim = gate.Simulation()
+
+    # main options
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.check_volumes_overlap = False
+    sim.number_of_threads = 4
+    sim.output_dir = paths.output
+
+    # units
+    m = gate.g4_units.m
+    mm = gate.g4_units.mm
+    cm = gate.g4_units.cm
+
+    #  adapt world size
+    world = sim.world
+    world.size = [2 * m, 2 * m, 2 * m]
+    world.material = "G4_AIR"
+
+    # add a waterbox
+    waterbox = sim.add_volume("Box", "waterbox")
+    waterbox.size = [30 * cm, 30 * cm, 30 * cm]
+    waterbox.translation = [0 * cm, 0 * cm, 52.2 * cm]
+    waterbox.material = "G4_WATER"
+
+    # virtual plane, origin of the coordinate system of the GAN source
+    plane = sim.add_volume("Box", "phase_space_plane")
+    plane.mother = world.name
+    plane.material = "G4_AIR"
+    plane.size = [3 * cm, 4 * cm, 5 * cm]
+
+    # GAN source, with batches generated in advance
+    gsource = sim.add_source("GANSource", "gaga")
+    gsource.particle = "gamma"
+    gsource.attached_to = plane.name
+    gsource.number_of_primaries = 1e6
+    gsource.pth_filename = paths.data / "003_v3_40k.pth"
+    gsource.position_keys = ["X", "Y", 271.1 * mm]
+    gsource.direction_keys = ["dX", "dY", "dZ"]
+    gsource.energy_key = "Ekine"
+    gsource.weight_key = None
+    gsource.time_key = None
+    gsource.batch_size = 5e4
+    gsource.pipeline_depth = 2
+    gsource.gpu_mode = utility.get_gpu_mode_for_tests()
+
+    # add stat actor
+    s = sim.add_actor("SimulationStatisticsActor", "Stats")
+    s.track_types_flag = True
+
+    # dose actor
+    dose = sim.add_actor("DoseActor", "dose")
+    dose.attached_to = waterbox.name
+    dose.spacing = [4 * mm, 4 * mm, 4 * mm]
+    dose.size = [75, 75, 75]
+    dose.output_filename = "test034_pipeline.mhd"
+    dose.hit_type = "post"
+
+    # phys
+    sim.physics_manager.physics_list_name = "G4EmStandardPhysics_option4"
+    sim.physics_manager.set_production_cut("world", "all", 1000 * m)
+    sim.physics_manager.set_production_cut("waterbox", "all", 1 * mm)
+
+    # start simulation
+    sim.run()
+
+    # timing statistics of the generator
+    gs = gsource.generator_statistics
+    print(f"Number of batches:     {gs.number_of_batches}")
+    print(f"Total generation time: {sum(gs.generation_times):.2f} sec")
+    print(f"Total wait time:       {sum(gs.wait_times):.2f} sec")
+    is_ok = gs.number_of_batches >= 1e6 / gsource.batch_size
+    is_ok = len(gs.wait_times) == gs.number_of_batches and is_ok
+    utility.print_test(is_ok, f"Generator statistics")
+
+    # compare with the reference
+    gate.exception.warning(f"Check stats")
+    stats = sim.get_actor("Stats")
+    print(stats)
+    stats_ref = utility.read_stats_file(paths.gate / "stats.txt")
+    stats.counts.runs = stats_ref.counts.runs
+    is_ok = utility.assert_stats(stats, stats_ref, 0.10) and is_ok
+
+    gate.exception.warning(f"Check dose")
+    is_ok = (
+        utility.assert_images(
+            paths.gate / "dose-Edep.mhd",
+            dose.edep.get_output_path(),
+            stats,
+            tolerance=58,
+            ignore_value_data2=0,
+        )
+        and is_ok
+    )
+
+    utility.test_ok(is_ok)
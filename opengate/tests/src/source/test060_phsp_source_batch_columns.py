@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Batches handed to the C++ sources as a dict of columns (SetBatch).
+
+- The float32/float64 columns, also strided ones (e.g. a column of a 2D array),
+  are used without copy, other types are converted once.
+- A PhaseSpaceSource reading a phsp with mixed column types (float64, int16,
+  and float PDG codes, which are cast to int) with rotated directions (strided
+  columns) must emit the same particles as from the same phsp stored as
+  float32 columns and int32 PDG codes.
+"""
+
+import numpy as np
+import opengate_core as g4
+import uproot
+from scipy.spatial.transform import Rotation
+
+import opengate as gate
+from opengate.tests import utility
+
+m = gate.g4_units.m
+cm = gate.g4_units.cm
+nm = gate.g4_units.nm
+MeV = gate.g4_units.MeV
+
+
+def check_gan_source_columns():
+    source = g4.GateGANSource()
+    xyz = np.random.default_rng(12).uniform(-10, 10, size=(1000, 3))
+    energy = np.linspace(0.1, 1, 1000, dtype=np.float32)
+    weight = np.ones(1000, dtype=np.int16)
+    source.SetBatch(
+        {
+            "position_x": xyz[:, 0],
+            "position_y": xyz[:, 1],
+            "position_z": xyz[:, 2],
+            "energy": energy,
+            "weight": weight,
+        }
+    )
+    b = (
+        np.shares_memory(source.fPositionX, xyz)
+        and source.fPositionY.strides == xyz[:, 1].strides
+        and np.array_equal(source.fPositionZ, xyz[:, 2])
+        and np.shares_memory(source.fEnergy, energy)
+    )
+    is_ok = utility.print_test(b, "Strided and float32 columns used without copy")
+    b = (
+        not np.shares_memory(source.fWeight, weight)
+        and source.fWeight.dtype == np.float64
+        and np.array_equal(source.fWeight, weight)
+    )
+    is_ok = utility.print_test(b, "int16 column converted once") and is_ok
+
+    # a column may also be set alone
+    direction = xyz / np.linalg.norm(xyz, axis=1)[:, np.newaxis]
+    source.fDirectionX = direction[:, 0]
+    b = np.shares_memory(source.fDirectionX, direction)
+    is_ok = utility.print_test(b, "Column set alone without copy") and is_ok
+    return is_ok
+
+
+def create_phsp(filename, n, mixed_types):
+    rng = np.random.default_rng(456)
+    direction = rng.normal(size=(n, 3))
+    direction[:, 2] = np.abs(direction[:, 2])
+    direction /= np.linalg.norm(direction, axis=1)[:, np.newaxis]
+    pdg = rng.choice([22, 11], size=n)
+    phsp = {
+        "PrePositionLocal_X": rng.uniform(-5 * cm, 5 * cm, n),
+        # integer values, so that both types hold the same positions
+        "PrePositionLocal_Y": rng.integers(-50, 50, n).astype(np.int16),
+        "PrePositionLocal_Z": np.full(n, -20 * cm),
+        "PreDirectionLocal_X": direction[:, 0],
+        "PreDirectionLocal_Y": direction[:, 1],
+        "PreDirectionLocal_Z": direction[:, 2],
+        "KineticEnergy": rng.uniform(0.1 * MeV, 1 * MeV, n),
+        "Weight": np.ones(n),
+        "PDGCode": pdg.astype(np.float64),
+    }
+    if not mixed_types:
+        phsp = {k: v.astype(np.float32) for k, v in phsp.items()}
+        phsp["PDGCode"] = pdg.astype(np.int32)
+    with uproot.recreate(filename) as f:
+        f["phsp"] = phsp
+
+
+def simulate(paths, phsp_filename, output_filename):
+    sim = gate.Simulation()
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.number_of_threads = 1
+    sim.random_seed = 123456
+    sim.output_dir = paths.output
+    sim.world.size = [1 * m, 1 * m, 1 * m]
+    sim.world.material = "G4_Galactic"
+
+    plane = sim.add_volume("Tubs", "plane")
+    plane.material = "G4_Galactic"
+    plane.rmin = 0
+    plane.rmax = 40 * cm
+    plane.dz = 1 * nm
+    plane.translation = [0, 0, 10 * cm]
+
+    source = sim.add_source("PhaseSpaceSource", "phsp_source")
+    source.attached_to = "world"
+    source.phsp_file = phsp_filename
+    # the particle types are read from the PDG codes
+    source.particle = ""
+    source.batch_size = 3000
+    source.n = 8000
+    source.rotate_direction = True
+    source.position.rotation = Rotation.from_euler("x", 10, degrees=True).as_matrix()
+
+    phsp = sim.add_actor("PhaseSpaceActor", "PhaseSpace")
+    phsp.attached_to = plane
+    phsp.attributes = ["KineticEnergy", "PrePosition", "PreDirection", "PDGCode"]
+    phsp.output_filename = output_filename
+
+    sim.run(start_new_process=True)
+    return phsp.get_output_path()
+
+
+def main():
+    paths = utility.get_default_test_paths(__file__, output_folder="test060")
+
+    is_ok = check_gan_source_columns()
+
+    ref_input = paths.output / "test060_batch_columns_float32.root"
+    mixed_input = paths.output / "test060_batch_columns_mixed.root"
+    create_phsp(ref_input, 5000, mixed_types=False)
+    create_phsp(mixed_input, 5000, mixed_types=True)
+    ref_filename = simulate(paths, ref_input, "test060_batch_columns_ref.root")
+    filename = simulate(paths, mixed_input, "test060_batch_columns.root")
+
+    # the float64 columns are read without the conversion to float32
+    ref = uproot.open(ref_filename)["PhaseSpace"].arrays(library="np")
+    phsp = uproot.open(filename)["PhaseSpace"].arrays(library="np")
+    print(f"Number of particles {len(ref['PDGCode'])} {len(phsp['PDGCode'])}")
+    b = len(ref["PDGCode"]) == len(phsp["PDGCode"]) and np.array_equal(
+        np.sort(ref["PDGCode"]), np.sort(phsp["PDGCode"])
+    )
+    is_ok = utility.print_test(b, "Same particle types (float PDG codes)") and is_ok
+    for k in ref:
+        if k == "PDGCode":
+            continue
+        b = len(ref[k]) == len(phsp[k]) and np.allclose(
+            np.sort(ref[k]), np.sort(phsp[k]), rtol=1e-5, atol=1e-4
+        )
+        is_ok = utility.print_test(b, f"Same {k}") and is_ok
+
+    utility.test_ok(is_ok)
+
+
+if __name__ == "__main__":
+    main()
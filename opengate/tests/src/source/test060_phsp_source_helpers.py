@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 import os
+import numpy as np
+import uproot
 from scipy.spatial.transform import Rotation
 import gatetools.phsp as phsp
 import opengate as gate
@@ -439,3 +441,79 @@ def check_value_from_root_file(
     # print("ref_value: ", ref_value)
     # print("value: ", value)
     return is_ok
+
+
+def create_random_phsp(filename, n):
+    rng = np.random.default_rng(123)
+    direction = rng.normal(size=(n, 3))
+    direction[:, 2] = np.abs(direction[:, 2])
+    direction /= np.linalg.norm(direction, axis=1)[:, np.newaxis]
+    phsp = {
+        "PrePositionLocal_X": rng.uniform(-5 * cm, 5 * cm, n),
+        "PrePositionLocal_Y": rng.uniform(-5 * cm, 5 * cm, n),
+        "PrePositionLocal_Z": np.full(n, -20 * cm),
+        "PreDirectionLocal_X": direction[:, 0],
+        "PreDirectionLocal_Y": direction[:, 1],
+        "PreDirectionLocal_Z": direction[:, 2],
+        "KineticEnergy": rng.uniform(0.1 * MeV, 1 * MeV, n),
+        "Weight": np.ones(n),
+    }
+    with uproot.recreate(filename) as f:
+        f["phsp"] = phsp
+
+
+def simulate_phsp_source_mt(
+    paths,
+    phsp_filename,
+    output_filename,
+    prefetch_queue_depth=0,
+    start_new_process=True,
+):
+    sim = gate.Simulation()
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.number_of_threads = 2
+    sim.random_seed = 123456
+    sim.output_dir = paths.output
+    sim.world.size = [1 * m, 1 * m, 1 * m]
+    sim.world.material = "G4_Galactic"
+
+    plane = sim.add_volume("Tubs", "plane")
+    plane.material = "G4_Galactic"
+    plane.rmin = 0
+    plane.rmax = 40 * cm
+    plane.dz = 1 * nm
+    plane.translation = [0, 0, 10 * cm]
+
+    source = sim.add_source("PhaseSpaceSource", "phsp_source")
+    source.attached_to = "world"
+    source.phsp_file = phsp_filename
+    source.particle = "gamma"
+    source.batch_size = 3000
+    # the phsp is read several times (cycles) by each thread
+    source.entry_start = [0, 10000]
+    source.n = 40000
+    source.prefetch_queue_depth = prefetch_queue_depth
+
+    phsp = sim.add_actor("PhaseSpaceActor", "PhaseSpace")
+    phsp.attached_to = plane
+    phsp.attributes = ["KineticEnergy", "PrePosition", "PreDirection"]
+    phsp.output_filename = output_filename
+
+    sim.run(start_new_process=start_new_process)
+    return source, phsp.get_output_path()
+
+
+def compare_phsp_outputs(ref_filename, filename):
+    # the order of the events between the two threads may change, so the values are sorted
+    ref = uproot.open(ref_filename)["PhaseSpace"].arrays(library="np")
+    phsp = uproot.open(filename)["PhaseSpace"].arrays(library="np")
+    is_ok = len(ref["KineticEnergy"]) == len(phsp["KineticEnergy"])
+    print(
+        f"Number of particles {len(ref['KineticEnergy'])} {len(phsp['KineticEnergy'])}"
+    )
+    for k in ref:
+        same = np.allclose(np.sort(ref[k]), np.sort(phsp[k]))
+        print(f"Compare {k}: {same}")
+        is_ok = is_ok and same
+    return is_ok
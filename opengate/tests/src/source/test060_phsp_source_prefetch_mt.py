@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+The PhaseSpaceSource with prefetch (batches read by a background thread,
+source.prefetch_queue_depth > 0) must emit exactly the same particles as
+without prefetch. The particles are stored with a PhaseSpaceActor and compared.
+"""
+
+import test060_phsp_source_helpers as t
+from opengate.tests import utility
+
+
+def main():
+    paths = utility.get_default_test_paths(__file__, output_folder="test060")
+    phsp_filename = paths.output / "test060_prefetch_input.root"
+    t.create_random_phsp(phsp_filename, 25000)
+
+    _, ref_filename = t.simulate_phsp_source_mt(
+        paths, phsp_filename, "test060_prefetch_0.root"
+    )
+    source, filename = t.simulate_phsp_source_mt(
+        paths,
+        phsp_filename,
+        "test060_prefetch_2.root",
+        prefetch_queue_depth=2,
+        start_new_process=False,
+    )
+    print(f"I/O statistics with prefetch: {source.io_statistics}")
+
+    is_ok = t.compare_phsp_outputs(ref_filename, filename)
+
+    utility.test_ok(is_ok)
+
+
+if __name__ == "__main__":
+    main()
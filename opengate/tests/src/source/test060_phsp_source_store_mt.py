@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Convert a root phase-space to a (memory-mapped) phase-space store with
+convert_phsp_root_to_store. The PhaseSpaceSource must emit exactly the same
+particles when reading the store as when reading the root file.
+"""
+
+import test060_phsp_source_helpers as t
+from opengate.sources.phspsources import convert_phsp_root_to_store
+from opengate.tests import utility
+
+
+def main():
+    paths = utility.get_default_test_paths(__file__, output_folder="test060")
+    phsp_filename = paths.output / "test060_store_input.root"
+    store_filename = paths.output / "test060_store_input.phsp"
+    t.create_random_phsp(phsp_filename, 25000)
+    convert_phsp_root_to_store(phsp_filename, store_filename)
+
+    _, ref_filename = t.simulate_phsp_source_mt(
+        paths, phsp_filename, "test060_store_root.root"
+    )
+    _, filename = t.simulate_phsp_source_mt(
+        paths, store_filename, "test060_store_phsp.root"
+    )
+
+    is_ok = t.compare_phsp_outputs(ref_filename, filename)
+
+    utility.test_ok(is_ok)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Dynamic voxel source with prepared frames: the CDF of the activity images are
+computed once (with 2 processes), stored in a cache folder, and swapped at each
+run. Only one frame is kept in memory, so the frames are evicted and read again
+from the cache. Three runs with the frames 1, 2, 1: the dose ratio between two
+voxels must follow the activity ratio of the frame of each run.
+"""
+
+import itk
+import numpy as np
+
+import opengate as gate
+from opengate.tests import utility
+
+
+def create_activity_image(peak_weights, output_path):
+    array = np.zeros((10, 10, 10), dtype=np.float32)
+    for (x, y, z), weight in peak_weights.items():
+        array[z, y, x] = weight
+    image = itk.image_from_array(array)
+    image.SetSpacing([1.0, 1.0, 1.0])
+    itk.imwrite(image, str(output_path))
+    return image
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test097_mt")
+
+    sim = gate.Simulation()
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.number_of_threads = 2
+    sim.random_seed = 123456
+    sim.output_dir = paths.output
+
+    m = gate.g4_units.m
+    mm = gate.g4_units.mm
+    MeV = gate.g4_units.MeV
+    sec = gate.g4_units.s
+
+    sim.world.size = [1 * m, 1 * m, 1 * m]
+    waterbox = sim.add_volume("Box", "waterbox")
+    waterbox.size = [10 * mm, 10 * mm, 10 * mm]
+    waterbox.material = "G4_WATER"
+
+    # two frames, with different activity ratios between two voxels
+    peak_1 = (2, 5, 5)
+    peak_2 = (7, 5, 5)
+    frame_1 = paths.output / "prepared_frame_1.mhd"
+    frame_2 = paths.output / "prepared_frame_2.mhd"
+    create_activity_image({peak_1: 3.0, peak_2: 1.0}, frame_1)
+    create_activity_image({peak_1: 1.0, peak_2: 4.0}, frame_2)
+    expected_ratios = [3.0, 1 / 4.0, 3.0]
+
+    cache_folder = paths.output / "test097_cdf_cache"
+    for f in cache_folder.glob("*.npy"):
+        f.unlink()
+
+    source = sim.add_source("VoxelSource", "vox_source")
+    source.attached_to = waterbox.name
+    source.particle = "alpha"
+    source.number_of_primaries = [4000, 4000, 4000]
+    source.image = str(frame_1)
+    source.direction.type = "iso"
+    source.energy.mono = 1 * MeV
+    source.add_dynamic_parametrisation(
+        image=[frame_1, frame_2, frame_1],
+        prepare_frames=True,
+        n_workers=2,
+        cdf_cache_folder=cache_folder,
+        max_prepared_frames=1,
+    )
+
+    dose = sim.add_actor("DoseActor", "dose")
+    dose.attached_to = waterbox.name
+    dose.size = [10, 10, 10]
+    dose.spacing = [1 * mm, 1 * mm, 1 * mm]
+    dose.edep.keep_data_per_run = True
+    dose.edep.write_to_disk = False
+
+    sim.physics_manager.physics_list_name = "QGSP_BERT_EMZ"
+    sim.physics_manager.enable_decay = False
+    sim.physics_manager.global_production_cuts.all = 1 * mm
+    sim.run_timing_intervals = [(0, 1 * sec), (1 * sec, 2 * sec), (2 * sec, 3 * sec)]
+
+    sim.run()
+
+    # one set of CDF files per frame content
+    n = len(list(cache_folder.glob("*_cdf_*.npy")))
+    is_ok = n == 6
+    utility.print_test(is_ok, f"Number of CDF files in the cache: {n} (vs 6)")
+
+    for run_id, expected in enumerate(expected_ratios):
+        img = dose.edep.get_data(which=run_id)
+        ratio = img.GetPixel(peak_1) / img.GetPixel(peak_2)
+        b = abs(ratio - expected) / expected < 0.2
+        utility.print_test(
+            b, f"Run {run_id}: dose ratio {ratio:.2f}, expected {expected:.2f}"
+        )
+        is_ok = b and is_ok
+
+    utility.test_ok(is_ok)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Compare the 'scan' and 'queue' source schedulers (sim.source_scheduler).
+
+With sources having a number of primaries (some of them starting later), the
+sequence of events (time, energy i.e. source) must be exactly the same. With
+activity sources, the random sequence differs, but the number of events of
+each source must be statistically compatible and the times increasing. A
+source with a TAC (no activity before the first TAC time) next to a source
+with a constant activity must start emitting at the first TAC time, with the
+same number of events with both schedulers.
+"""
+
+import numpy as np
+import uproot
+
+import opengate as gate
+from opengate.tests import utility
+
+
+def build_simulation(paths, name, scheduler, activity):
+    m = gate.g4_units.m
+    cm = gate.g4_units.cm
+    MeV = gate.g4_units.MeV
+    sec = gate.g4_units.s
+    Bq = gate.g4_units.Bq
+
+    sim = gate.Simulation()
+    sim.output_dir = paths.output
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.number_of_threads = 1
+    sim.random_seed = 321654
+    sim.source_scheduler = scheduler
+    sim.world.size = [1 * m, 1 * m, 1 * m]
+    sim.world.material = "G4_Galactic"
+
+    box = sim.add_volume("Box", "box")
+    box.size = [10 * cm, 10 * cm, 10 * cm]
+    box.material = "G4_Galactic"
+
+    # the energy identifies the source of each event
+    for i in range(12):
+        source = sim.add_source("GenericSource", f"source_{i}")
+        source.attached_to = box
+        source.particle = "geantino"
+        source.energy.mono = (i + 1) * MeV
+        source.direction.type = "iso"
+        if activity:
+            source.activity = (i + 1) * 20 * Bq
+            if i % 3 == 0:
+                source.half_life = 2 * sec
+        else:
+            source.number_of_primaries = [10 + i, 20 - i]
+        if i % 4 == 1:
+            source.start_time = 1.5 * sec
+
+    phsp = sim.add_actor("PhaseSpaceActor", f"phsp_{name}")
+    phsp.attached_to = box
+    phsp.steps_to_store = "first"
+    phsp.attributes = ["EventID", "TrackID", "PreGlobalTime", "KineticEnergy"]
+    phsp.output_filename = f"test122_{name}.root"
+
+    sim.run_timing_intervals = [[0, 1 * sec], [1 * sec, 3 * sec]]
+    return sim, phsp
+
+
+def build_tac_simulation(paths, name, scheduler):
+    m = gate.g4_units.m
+    cm = gate.g4_units.cm
+    MeV = gate.g4_units.MeV
+    sec = gate.g4_units.s
+    Bq = gate.g4_units.Bq
+
+    sim = gate.Simulation()
+    sim.output_dir = paths.output
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.number_of_threads = 1
+    sim.random_seed = 654987
+    sim.source_scheduler = scheduler
+    sim.world.size = [1 * m, 1 * m, 1 * m]
+    sim.world.material = "G4_Galactic"
+
+    box = sim.add_volume("Box", "box")
+    box.size = [10 * cm, 10 * cm, 10 * cm]
+    box.material = "G4_Galactic"
+
+    constant = sim.add_source("GenericSource", "constant")
+    constant.attached_to = box
+    constant.particle = "geantino"
+    constant.energy.mono = 1 * MeV
+    constant.direction.type = "iso"
+    constant.activity = 200 * Bq
+
+    # no activity before 1.5 s, then 300 Bq
+    tac = sim.add_source("GenericSource", "tac")
+    tac.attached_to = box
+    tac.particle = "geantino"
+    tac.energy.mono = 2 * MeV
+    tac.direction.type = "iso"
+    tac.tac_times = np.linspace(1.5, 3, 16) * sec
+    tac.tac_activities = np.full(16, 300 * Bq)
+
+    phsp = sim.add_actor("PhaseSpaceActor", f"phsp_{name}")
+    phsp.attached_to = box
+    phsp.steps_to_store = "first"
+    phsp.attributes = ["EventID", "TrackID", "PreGlobalTime", "KineticEnergy"]
+    phsp.output_filename = f"test122_{name}.root"
+
+    sim.run_timing_intervals = [[0, 1 * sec], [1 * sec, 3 * sec]]
+    return sim, phsp
+
+
+def run_events(paths, name, scheduler, activity=None):
+    if activity is None:
+        sim, phsp = build_tac_simulation(paths, name, scheduler)
+    else:
+        sim, phsp = build_simulation(paths, name, scheduler, activity)
+    sim.run(start_new_process=True)
+    with uproot.open(phsp.get_output_path()) as f:
+        data = f[phsp.name].arrays(library="np")
+    primaries = data["TrackID"] == 1
+    return {k: v[primaries] for k, v in data.items()}
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test122")
+    MeV = gate.g4_units.MeV
+    sec = gate.g4_units.s
+
+    # fixed number of primaries: identical sequence of events
+    scan = run_events(paths, "scan", "scan", activity=False)
+    queue = run_events(paths, "queue", "queue", activity=False)
+    is_ok = utility.print_test(
+        len(scan["EventID"]) > 0
+        and all(np.array_equal(scan[k], queue[k]) for k in scan),
+        f"Same sequence of {len(queue['EventID'])} events with the queue",
+    )
+
+    # activity: same statistics, increasing times
+    scan = run_events(paths, "scan_activity", "scan", activity=True)
+    queue = run_events(paths, "queue_activity", "queue", activity=True)
+    for i in range(12):
+        n_scan = np.sum(np.isclose(scan["KineticEnergy"], (i + 1) * MeV))
+        n_queue = np.sum(np.isclose(queue["KineticEnergy"], (i + 1) * MeV))
+        sigma = np.sqrt(n_scan + n_queue)
+        is_ok = (
+            utility.print_test(
+                abs(n_scan - n_queue) < 4 * sigma,
+                f"source_{i}: {n_scan} events (scan) vs {n_queue} (queue)",
+            )
+            and is_ok
+        )
+    t = queue["PreGlobalTime"] / sec
+    run_1 = t < 1
+    is_ok = (
+        utility.print_test(
+            np.all(np.diff(t[run_1]) >= 0) and np.all(np.diff(t[~run_1]) >= 0),
+            "Event times increase within each run with the queue",
+        )
+        and is_ok
+    )
+
+    # TAC source without activity before 1.5 s: expected 1.5 s x 300 Bq
+    scan = run_events(paths, "scan_tac", "scan")
+    queue = run_events(paths, "queue_tac", "queue")
+    for name, data in (("scan", scan), ("queue", queue)):
+        tac = np.isclose(data["KineticEnergy"], 2 * MeV)
+        n = np.sum(tac)
+        t_first = np.min(data["PreGlobalTime"][tac]) / sec if n > 0 else 0
+        is_ok = (
+            utility.print_test(
+                abs(n - 450) < 4 * np.sqrt(450) and t_first >= 1.5,
+                f"TAC source with '{name}': {n} events (expected 450), "
+                f"first at {t_first:.3f} s",
+            )
+            and is_ok
+        )
+    for energy in (1, 2):
+        n_scan = np.sum(np.isclose(scan["KineticEnergy"], energy * MeV))
+        n_queue = np.sum(np.isclose(queue["KineticEnergy"], energy * MeV))
+        is_ok = (
+            utility.print_test(
+                abs(n_scan - n_queue) < 4 * np.sqrt(n_scan + n_queue),
+                f"{energy} MeV source: {n_scan} events (scan) vs {n_queue} (queue)",
+            )
+            and is_ok
+        )
+
+    utility.test_ok(is_ok)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Speed of the 'scan' and 'queue' source schedulers with 1, 10, 100 and 1000
+sources (same total activity, geantino in vacuum so that the time is spent in
+the source selection). The speeds are only reported (they depend on the
+machine); both schedulers must emit the same number of events, within the
+statistical uncertainty.
+"""
+
+import numpy as np
+
+import opengate as gate
+from opengate.tests import utility
+
+
+def run_speed(paths, scheduler, number_of_sources, total_activity):
+    m = gate.g4_units.m
+    cm = gate.g4_units.cm
+    MeV = gate.g4_units.MeV
+    sec = gate.g4_units.s
+
+    sim = gate.Simulation()
+    sim.output_dir = paths.output
+    sim.g4_verbose = False
+    sim.visu = False
+    sim.number_of_threads = 1
+    sim.random_seed = 123
+    sim.source_scheduler = scheduler
+    sim.world.size = [1 * m, 1 * m, 1 * m]
+    sim.world.material = "G4_Galactic"
+
+    for i in range(number_of_sources):
+        source = sim.add_source("GenericSource", f"source_{i}")
+        source.particle = "geantino"
+        source.energy.mono = 1 * MeV
+        source.position.type = "box"
+        source.position.size = [10 * cm, 10 * cm, 10 * cm]
+        source.direction.type = "iso"
+        source.activity = total_activity / number_of_sources
+
+    stats = sim.add_actor("SimulationStatisticsActor", "stats")
+    sim.run_timing_intervals = [[0, 1 * sec]]
+    sim.run(start_new_process=True)
+    return stats.counts.events, stats.counts.events / (stats.counts.duration / sec)
+
+
+if __name__ == "__main__":
+    paths = utility.get_default_test_paths(__file__, output_folder="test122")
+    Bq = gate.g4_units.Bq
+
+    is_ok = True
+    for n in (1, 10, 100, 1000):
+        events = {}
+        speeds = {}
+        for scheduler in ("scan", "queue"):
+            events[scheduler], speeds[scheduler] = run_speed(
+                paths, scheduler, n, 20000 * Bq
+            )
+        print(
+            f"{n:5d} sources: scan {speeds['scan']:10.0f} events/s, "
+            f"queue {speeds['queue']:10.0f} events/s, speedup "
+            f"{speeds['queue'] / speeds['scan']:.2f}"
+        )
+        # Poisson: 5 standard deviations of the difference
+        tol = 5 * np.sqrt(events["scan"] + events["queue"])
+        is_ok = (
+            utility.print_test(
+                abs(events["scan"] - events["queue"]) < tol,
+                f"{n} sources: {events['scan']} and {events['queue']} events",
+            )
+            and is_ok
+        )
+
+    utility.test_ok(is_ok)
@@ -10,6 +10,7 @@ import shutil
 import string
 import sys
 import textwrap
+import uuid
 from importlib.metadata import version
 from pathlib import Path
 
@@ -76,6 +77,22 @@ def ensure_directory_exists(directory):
     p.mkdir(parents=True, exist_ok=True)
 
 
+def write_file_atomically(path, writer):
+    """
+    Call writer(tmp_path) to write a temporary file in the folder of path, then
+    rename it to path: a partial file is never read, e.g. by the parallel jobs
+    sharing a cache folder. The temporary file keeps the extension of path.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.stem}.{uuid.uuid4().hex}.tmp{path.suffix}")
+    try:
+        writer(tmp)
+        tmp.replace(path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
 def delete_folder_contents(folder_path):
     if os.path.exists(folder_path):
         for filename in os.listdir(folder_path):